@@ -0,0 +1,109 @@
+"""
+图表广播模块
+Chart Broadcast Module
+
+实时曲线页面是PageManager中的单例，多个浏览器会话同时查看时共用同一份采样和同一个图表ID。
+广播器登记所有正在查看的会话：每次更新的脚本（标签和数据的JSON）只生成一次，
+同一个字符串以不等待结果的run_javascript发给各会话，
+每多一个会话只增加一次发送的开销；没有会话查看时不生成脚本。已删除或发送失败的会话自动移除。
+"""
+# flake8: noqa
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ChartBroadcaster:
+    """向所有查看同一图表的浏览器会话广播更新脚本"""
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._clients: Dict[str, Any] = {}  # 会话ID -> NiceGUI Client
+
+        # 统计信息
+        self.broadcasts = 0
+        self.deliveries = 0
+        self.failures = 0
+        self.bytes_built = 0
+        self.build_time_total = 0.0
+        self.send_time_total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, client: Any) -> bool:
+        return client.id in self._clients
+
+    @property
+    def clients(self) -> List[Any]:
+        return list(self._clients.values())
+
+    def add(self, client: Any) -> bool:
+        """登记会话，新登记时返回True"""
+        if client.id in self._clients:
+            return False
+        self._clients[client.id] = client
+        logger.info(f"图表会话加入 ({self.name}): {client.id}，当前 {len(self._clients)} 个")
+        return True
+
+    def remove(self, client: Any) -> bool:
+        """移除会话，原已登记时返回True"""
+        if self._clients.pop(client.id, None) is None:
+            return False
+        logger.info(f"图表会话离开 ({self.name}): {client.id}，当前 {len(self._clients)} 个")
+        return True
+
+    def send(self, client: Any, script: str) -> bool:
+        """向单个会话发送脚本，失败时移除该会话"""
+        if getattr(client, 'is_deleted', False):
+            self.remove(client)
+            return False
+        try:
+            client.run_javascript(script)
+            return True
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"图表更新发送失败 ({self.name} {client.id}): {e}")
+            self.remove(client)
+            return False
+
+    def broadcast(self, build: Callable[[], Optional[str]]) -> int:
+        """生成一次脚本并发送给所有会话
+
+        Args:
+            build: 生成脚本的函数，没有会话时不调用；返回None时不发送
+
+        Returns:
+            int: 发送成功的会话数
+        """
+        if not self._clients:
+            return 0
+        started = time.perf_counter()
+        script = build()
+        built = time.perf_counter()
+        self.build_time_total += built - started
+        if script is None:
+            return 0
+        self.broadcasts += 1
+        self.bytes_built += len(script)
+        sent = 0
+        for client in list(self._clients.values()):
+            if self.send(client, script):
+                sent += 1
+        self.deliveries += sent
+        self.send_time_total += time.perf_counter() - built
+        return sent
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取会话数、广播次数和生成/发送耗时统计"""
+        return {
+            'clients': len(self._clients),
+            'broadcasts': self.broadcasts,
+            'deliveries': self.deliveries,
+            'failures': self.failures,
+            'bytes_built': self.bytes_built,
+            'build_avg_us': self.build_time_total * 1e6 / self.broadcasts if self.broadcasts else 0.0,
+            'send_avg_us': self.send_time_total * 1e6 / self.deliveries if self.deliveries else 0.0,
+        }
@@ -111,6 +111,10 @@ class ConfigManager:
         """获取设备信息"""
         return self.get_section("设备配置")
     
+    def get_station_devices(self) -> Dict[str, str]:
+        """获取站点设备配置（设备ID -> WebSocket地址）"""
+        return {device_id: str(url) for device_id, url in self.get_section("站点设备配置").items() if url}
+    
     def get_websocket_config(self) -> Dict[str, Any]:
         """获取WebSocket配置"""
         return self.get_section("Web Socket配置")
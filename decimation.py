@@ -0,0 +1,119 @@
+"""
+曲线抽稀模块
+Curve Decimation Module
+
+长时间窗口的采样在服务端抽稀到约等于图表像素宽度的点数再发送，绘图开销与窗口长度无关。
+两种方法都让所有通道共用同一组时间标签（Chart.js的类别轴），并保留短时的尖峰：
+- minmax: 按采样数等分成桶，每个桶输出两个点（桶内最小值和最大值，按出现的先后顺序），
+  时间标签为桶内第一个和最后一个采样的时间；
+- lttb: Largest-Triangle-Three-Buckets，每个桶选出与前一个选中点和下一个桶平均点构成三角形面积最大的采样，
+  多通道时面积按各通道的数值范围归一化后相加。
+NaN（该通道缺失的采样）在结果中保持为NaN。
+"""
+# flake8: noqa
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 支持的抽稀方法
+DECIMATION_METHODS = ('minmax', 'lttb')
+
+
+def minmax_decimate(timestamps: np.ndarray, values: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """最小值/最大值包络抽稀
+
+    Args:
+        timestamps: n个时间戳（单调不减）
+        values: 形状为(通道数, n)的数组
+        points: 输出的最大点数（每个桶两个点）
+
+    Returns:
+        (时间戳数组, 形状为(通道数, m)的数组)，m <= points；n <= points时原样返回
+    """
+    count = len(timestamps)
+    if count <= points:
+        return timestamps, values
+    buckets = max(1, points // 2)
+    size = -(-count // buckets)  # 每个桶的采样数（向上取整）
+    buckets = -(-count // size)
+    pad = buckets * size - count
+    channels = values.shape[0]
+
+    missing = np.isnan(values)
+    low = np.pad(np.where(missing, np.inf, values), ((0, 0), (0, pad)), constant_values=np.inf)
+    high = np.pad(np.where(missing, -np.inf, values), ((0, 0), (0, pad)), constant_values=-np.inf)
+    low = low.reshape(channels, buckets, size)
+    high = high.reshape(channels, buckets, size)
+    low_index = low.argmin(axis=2)
+    high_index = high.argmax(axis=2)
+    low_value = np.take_along_axis(low, low_index[..., None], axis=2)[..., 0]
+    high_value = np.take_along_axis(high, high_index[..., None], axis=2)[..., 0]
+    # 桶内全部缺失时两个点都是NaN
+    low_value[np.isinf(low_value)] = np.nan
+    high_value[np.isinf(high_value)] = np.nan
+
+    low_first = low_index <= high_index
+    result = np.empty((channels, buckets, 2), dtype=values.dtype)
+    result[..., 0] = np.where(low_first, low_value, high_value)
+    result[..., 1] = np.where(low_first, high_value, low_value)
+
+    starts = np.arange(buckets) * size
+    ends = np.minimum(starts + size, count) - 1
+    result_timestamps = np.stack((timestamps[starts], timestamps[ends]), axis=1)
+    return result_timestamps.reshape(-1), result.reshape(channels, -1)
+
+
+def lttb_decimate(timestamps: np.ndarray, values: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets抽稀，保留第一个和最后一个采样
+
+    Args:
+        timestamps: n个时间戳（单调不减）
+        values: 形状为(通道数, n)的数组
+        points: 输出的点数（至少3）
+
+    Returns:
+        (时间戳数组, 形状为(通道数, points)的数组)；n <= points时原样返回
+    """
+    count = len(timestamps)
+    if count <= points:
+        return timestamps, values
+    points = max(3, points)
+
+    # 各通道按数值范围归一化，缺失值不参与面积计算
+    x = (timestamps - timestamps[0]).astype(np.float64)
+    y = values.astype(np.float64)
+    y[np.isnan(y).all(axis=1)] = 0.0
+    low = np.nanmin(y, axis=1, keepdims=True)
+    span = np.nanmax(y, axis=1, keepdims=True) - low
+    y = np.nan_to_num((y - low) / np.where(span > 0, span, 1.0))
+
+    # 中间的n-2个采样分成points-2个桶
+    edges = np.linspace(1, count - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else count)
+        if next_end <= next_start:
+            next_end = next_start + 1
+        next_x = x[next_start:next_end].mean()
+        next_y = y[:, next_start:next_end].mean(axis=1, keepdims=True)
+        ax, ay = x[previous], y[:, previous:previous + 1]
+        area = np.abs((ax - next_x) * (y[:, start:end] - ay) - (ax - x[start:end]) * (next_y - ay)).sum(axis=0)
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return timestamps[selected], values[:, selected]
+
+
+def decimate(timestamps: np.ndarray, values: np.ndarray, points: int,
+             method: str = 'minmax') -> Tuple[np.ndarray, np.ndarray]:
+    """按方法名抽稀，参见minmax_decimate()和lttb_decimate()"""
+    if method == 'minmax':
+        return minmax_decimate(timestamps, values, points)
+    if method == 'lttb':
+        return lttb_decimate(timestamps, values, points)
+    raise ValueError(f"不支持的抽稀方法: {method}")
@@ -0,0 +1,224 @@
+"""
+多设备连接管理模块
+Device Connection Manager Module
+"""
+# flake8: noqa
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from ingest_worker import create_websocket_client
+from message_codec import get_codec
+from message_dispatcher import MessageDispatcher, CoalescingSubscription
+from protocol_messages import TypedMessageCache, TypedCallback
+from subscription import Subscription
+from websocket_client import LOSSLESS_TYPES, WebSocketClient
+
+logger = logging.getLogger(__name__)
+
+
+class _DeviceSubscription:
+    """按设备订阅的回调"""
+    __slots__ = ('device_id', 'callback', 'full_message', 'target')
+
+    def __init__(self, device_id: Optional[str], message_type: str, callback: Callable,
+                 full_message: bool, coalesce: bool, convert: Optional[Callable] = None):
+        self.device_id = device_id
+        self.callback = callback
+        # 消息对象由整条消息转换
+        self.full_message = full_message or convert is not None
+        target = TypedCallback(callback, convert) if convert is not None else callback
+        # 合并投递时由CoalescingSubscription只保留最新一帧
+        self.target = CoalescingSubscription(message_type, target) if coalesce else target
+
+    def matches(self, device_id: Optional[str], callback: Callable) -> bool:
+        return self.device_id == device_id and self.callback == callback
+
+    def cancel(self) -> None:
+        if isinstance(self.target, CoalescingSubscription):
+            self.target.cancel()
+
+
+class DeviceConnectionManager:
+    """站点多设备连接管理器
+
+    在同一事件循环中维护多台设备的WebSocket连接，所有连接共享JSON编解码器和
+    按消息类型的分发工作协程（每种消息类型一个工作协程，与设备数量和页面数量无关）。
+    每台设备的每种消息类型只在连接上注册一个路由回调，由路由回调按消息的device_id
+    分发给订阅了该设备（或全部设备）的页面回调。
+    """
+
+    def __init__(self, config_manager, devices: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            config_manager: 配置管理器
+            devices: 设备ID -> WebSocket地址，为None时读取[站点设备配置]，
+                     配置为空时只连接[设备配置]中的设备
+        """
+        self.config = config_manager
+        ws_config = self.config.get_websocket_config()
+
+        if devices is None:
+            devices = self.config.get_station_devices()
+        if not devices:
+            devices = {self.config.get_device_info().get('设备ID', 'HYP_RPLD_001'): None}
+
+        # 所有设备共享的编解码器和分发器，队列长度按设备数量放大
+        self.codec = get_codec(ws_config.get('json_codec', 'auto'))
+        self.dispatcher = MessageDispatcher(ws_config.get('dispatch_queue_size', 100) * len(devices),
+                                            on_dispatch=self._on_dispatch, lossless_types=LOSSLESS_TYPES)
+
+        # typed=True的订阅共享同一份消息对象（按消息类型缓存最近一帧）
+        self.typed_messages = TypedMessageCache()
+
+        self.clients: Dict[str, WebSocketClient] = {}
+        for device_id, url in devices.items():
+            client = create_websocket_client(
+                self.config, device_id=device_id, websocket_url=url,
+                dispatcher=self.dispatcher, codec=self.codec)
+            client.register_connection_callback(self._make_connection_callback(device_id))
+            self.clients[device_id] = client
+
+        # message_type -> 订阅列表
+        self._subscriptions: Dict[str, List[_DeviceSubscription]] = {}
+        self._connection_callbacks: List[Callable] = []
+        logger.info(f"多设备连接管理器初始化: {len(self.clients)} 台设备，编解码器 {self.codec.name}")
+
+    @property
+    def device_ids(self) -> List[str]:
+        """管理的设备ID列表"""
+        return list(self.clients)
+
+    def get_client(self, device_id: str) -> Optional[WebSocketClient]:
+        """获取设备的连接"""
+        return self.clients.get(device_id)
+
+    async def connect_all(self) -> Dict[str, bool]:
+        """同时连接所有设备（已连接的设备不重复连接），返回各设备的连接结果"""
+        results = await asyncio.gather(*(client.connect() for client in self.clients.values()))
+        return dict(zip(self.clients, results))
+
+    async def disconnect_all(self) -> None:
+        """断开所有设备并停止共享的分发工作协程"""
+        await asyncio.gather(*(client.disconnect() for client in self.clients.values()))
+        self.dispatcher.stop()
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.cancel()
+
+    @staticmethod
+    def _on_dispatch(message_type: str, seconds: float, handler: Callable) -> None:
+        """共享分发队列取出一帧时，交给提交该帧的连接记录该设备的分发排队时间"""
+        client = getattr(handler, '__self__', None)
+        if isinstance(client, WebSocketClient):
+            client.on_dispatch(message_type, seconds)
+
+    def _make_connection_callback(self, device_id: str) -> Callable:
+        async def on_connection_changed(connected: bool) -> None:
+            for callback in self._connection_callbacks:
+                try:
+                    await callback(device_id, connected)
+                except Exception as e:
+                    logger.error(f"设备连接状态回调失败 ({device_id}): {e}")
+        return on_connection_changed
+
+    def register_connection_callback(self, callback: Callable) -> Subscription:
+        """注册连接状态回调，回调参数为(device_id, connected)"""
+        self._connection_callbacks.append(callback)
+        return Subscription('connection', getattr(callback, '__qualname__', repr(callback)),
+                            lambda: self._connection_callbacks.remove(callback))
+
+    def register_data_callback(self, device_id: Optional[str], message_type: str, callback: Callable,
+                               coalesce: bool = False, typed: bool = False) -> Subscription:
+        """按设备注册数据回调（接收消息的data字段）
+
+        Args:
+            device_id: 设备ID，为None时接收所有设备的消息
+            message_type: 消息类型
+            callback: 回调函数
+            coalesce: 是否使用最新值合并投递
+            typed: 是否接收消息对象（protocol_messages）而不是data字典
+        
+        Returns:
+            Subscription: 订阅句柄，close()等同于unregister_callback
+        """
+        return self._subscribe(device_id, message_type, callback, full_message=False, coalesce=coalesce,
+                               convert=self.typed_messages.convert if typed else None)
+
+    def register_message_callback(self, device_id: Optional[str], message_type: str, callback: Callable,
+                                  coalesce: bool = False) -> Subscription:
+        """按设备注册消息回调（接收完整消息），device_id为None时接收所有设备的消息"""
+        return self._subscribe(device_id, message_type, callback, full_message=True, coalesce=coalesce)
+
+    def unregister_callback(self, device_id: Optional[str], message_type: str, callback: Callable) -> None:
+        """取消按设备注册的回调"""
+        subscriptions = self._subscriptions.get(message_type, [])
+        for subscription in list(subscriptions):
+            if subscription.matches(device_id, callback):
+                subscription.cancel()
+                subscriptions.remove(subscription)
+                logger.debug(f"取消设备订阅: {device_id or '全部设备'} {message_type}")
+                break
+
+    def _subscribe(self, device_id: Optional[str], message_type: str, callback: Callable,
+                   full_message: bool, coalesce: bool, convert: Optional[Callable] = None) -> Subscription:
+        if device_id is not None and device_id not in self.clients:
+            logger.warning(f"订阅了未配置的设备: {device_id}")
+        if message_type not in self._subscriptions:
+            # 每种消息类型只在每个连接上注册一个路由回调
+            self._subscriptions[message_type] = []
+            for client in self.clients.values():
+                client.register_message_callback(message_type, self._make_router(client.device_id, message_type))
+        self._subscriptions[message_type].append(
+            _DeviceSubscription(device_id, message_type, callback, full_message, coalesce, convert))
+        logger.debug(f"注册设备订阅: {device_id or '全部设备'} {message_type}")
+        return Subscription(message_type, getattr(callback, '__qualname__', repr(callback)),
+                            lambda: self.unregister_callback(device_id, message_type, callback))
+
+    def _make_router(self, connection_device_id: str, message_type: str) -> Callable:
+        async def route(message: Dict[str, Any]) -> None:
+            # 消息未携带device_id时按所在连接的设备路由
+            device_id = message.get('device_id') or connection_device_id
+            data = message.get('data', {})
+            for subscription in self._subscriptions.get(message_type, ()):
+                if subscription.device_id is not None and subscription.device_id != device_id:
+                    continue
+                try:
+                    await subscription.target(message if subscription.full_message else data)
+                except Exception as e:
+                    logger.error(f"设备订阅回调执行失败 ({device_id} {message_type}): {e}")
+        return route
+
+    async def send_message(self, device_id: str, message_type: str, data: Dict[str, Any]) -> bool:
+        """向指定设备发送消息"""
+        client = self.clients.get(device_id)
+        if client is None:
+            logger.warning(f"未配置的设备: {device_id}")
+            return False
+        return await client.send_message(message_type, data)
+
+    async def request(self, device_id: str, message_type: str, data: Dict[str, Any],
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """向指定设备发送请求并等待应答，异常与WebSocketClient.request相同"""
+        client = self.clients.get(device_id)
+        if client is None:
+            raise KeyError(f"未配置的设备: {device_id}")
+        return await client.request(message_type, data, timeout=timeout)
+
+    def set_topic_demand(self, owner, topics: Dict[str, float]) -> None:
+        """向所有设备登记订阅方需要的推送主题，参数与WebSocketClient.set_topic_demand相同"""
+        for client in self.clients.values():
+            client.set_topic_demand(owner, topics)
+
+    def release_topic_demand(self, owner) -> None:
+        """订阅方关闭，所有设备不再需要的主题取消订阅"""
+        for client in self.clients.values():
+            client.release_topic_demand(owner)
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有设备的连接状态"""
+        return {device_id: client.get_connection_status() for device_id, client in self.clients.items()}
+
+    def get_dispatch_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取共享分发队列的统计信息"""
+        return self.dispatcher.get_stats()
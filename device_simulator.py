@@ -0,0 +1,865 @@
+#!/usr/bin/env python3
+"""
+设备/后端模拟器模块
+Device and Backend Simulator Module
+
+按《WebSocket及API接口协议》模拟后端：以可配置的频率（最高可达kHz）推送
+analog_data、system_status、fault、full_snapshot，应答参数读写、控制命令和故障录波请求，
+按seq_num补推缺失的帧，并提供/api/v1/history/*历史数据接口。既可在测试中启动，
+也可作为独立进程进行本地长时间压力测试：
+
+    python device_simulator.py --analog-rate 1000 --status-rate 10
+"""
+# flake8: noqa
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import websockets
+from aiohttp import web
+
+from message_codec import get_codec
+
+logger = logging.getLogger(__name__)
+
+# 可选的二进制帧编码库，客户端注册时声明支持才使用
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 取决于运行环境
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - 取决于运行环境
+    cbor2 = None
+
+# 各推送类型的默认频率（帧/秒），full_snapshot按协议每30秒一次
+DEFAULT_RATES = {
+    'analog_data': 10.0,
+    'system_status': 1.0,
+    'fault': 0.0,
+    'full_snapshot': 1 / 30,
+}
+
+# 推送循环的最小等待间隔（秒），频率更高时每次唤醒补齐应发送的帧数
+_MIN_TICK = 0.005
+
+_DEFAULT_ANALOG_CHANNELS = [
+    ('轨地电流SA1', 'A'), ('可控硅电流SA2', 'A'), ('保留', 'A'), ('保留', 'V'),
+    ('保留', 'V'), ('保留', 'A'), ('轨地电压SV1', 'V'), ('轨地电压SV2', 'V'),
+]
+
+# 故障录波记录的寄存器布局：记录头7个寄存器，之后300个数据点各13个寄存器，共3907个，每批读取125个
+FAULT_RECORD_HEADER = 7
+FAULT_POINT_REGISTERS = 13
+FAULT_RECORD_POINTS = 300
+FAULT_RECORD_REGISTERS = FAULT_RECORD_HEADER + FAULT_POINT_REGISTERS * FAULT_RECORD_POINTS
+FAULT_BATCH_REGISTERS = 125
+
+_FAULT_DESCRIPTIONS = ['1段电压保护', '2段电压保护', '3段电压保护', '晶闸管动作', '接触器故障']
+
+_HISTORY_EVENT_TYPES = ['系统启动', '通信连接正常', '参数修改', '故障复位']
+
+
+def _now() -> str:
+    """协议时间戳格式 YYYY-MM-DD HH:MM:SS.sss"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+def _build_encoders() -> Dict[str, Any]:
+    encoders = {}
+    if msgpack is not None:
+        encoders['msgpack'] = lambda message: msgpack.packb(message, use_bin_type=True)
+    if cbor2 is not None:
+        encoders['cbor'] = cbor2.dumps
+    return encoders
+
+
+BINARY_ENCODERS = _build_encoders()
+
+
+class _TopicFilter:
+    """连接的推送主题订阅，收到第一条subscribe/unsubscribe后按订阅和频率过滤推送"""
+    __slots__ = ('unsubscribed', 'intervals', 'next_due', 'last_seq')
+
+    def __init__(self, last_seq: int):
+        self.unsubscribed = set()
+        self.intervals: Dict[str, float] = {}  # 主题 -> 最小推送间隔（秒），0为不限
+        self.next_due: Dict[str, float] = {}
+        self.last_seq = last_seq  # 发给本连接的上一帧序列号
+
+    def subscribe(self, topic: str, rate: Any) -> None:
+        self.unsubscribed.discard(topic)
+        rate = float(rate or 0)
+        self.intervals[topic] = 1.0 / rate if rate > 0 else 0.0
+        self.next_due.pop(topic, None)
+
+    def unsubscribe(self, topic: str) -> None:
+        self.unsubscribed.add(topic)
+
+    def accept(self, topic: str, now: float) -> bool:
+        """判断该帧是否发给本连接（限频时按固定节拍，容许半个间隔的抖动）"""
+        if topic in self.unsubscribed:
+            return False
+        interval = self.intervals.get(topic, 0.0)
+        if interval:
+            due = self.next_due.get(topic, now)
+            if now < due - interval / 2:
+                return False
+            self.next_due[topic] = max(due, now - interval / 2) + interval
+        return True
+
+    def get_topics(self) -> Dict[str, Any]:
+        return {
+            'unsubscribed': sorted(self.unsubscribed),
+            'rates': {topic: round(1.0 / interval, 3) if interval else 0 for topic, interval in self.intervals.items()
+                      if topic not in self.unsubscribed},
+        }
+
+
+class DeviceSimulator:
+    """钢轨电位限制装置后端模拟器
+
+    所有推送帧共用一个递增的seq_num并写入补推缓存，data_lost_request和
+    data_resume_request从缓存中按data_recovery格式补推。每帧按连接协商的编码
+    只编码一次，再广播给所有已注册的连接（不等待慢连接）。发送过subscribe/unsubscribe的
+    连接只接收订阅的主题，帧中附带prev_seq（发给该连接的上一帧序列号）。
+    """
+
+    def __init__(self, config_manager=None, device_id: Optional[str] = None, host: str = '127.0.0.1',
+                 port: int = 0, http_port: Optional[int] = None, rates: Optional[Dict[str, float]] = None,
+                 ring_size: int = 10000, encodings: Optional[List[str]] = None,
+                 fault_record_count: int = 15, fault_batch_delay: float = 0.05,
+                 history_interval: int = 60):
+        """
+        Args:
+            config_manager: 配置管理器，用于读取设备ID、模拟量通道和控制参数点表，可为None
+            device_id: 设备ID，为None时读取[设备配置]
+            host: 监听地址
+            port: WebSocket监听端口，0为自动分配
+            http_port: 历史数据接口端口，None为不启动，0为自动分配
+            rates: 各推送类型的频率（帧/秒），未指定的类型使用DEFAULT_RATES
+            ring_size: 补推缓存保留的帧数
+            encodings: 可协商的二进制编码，为None时使用所有已安装的编码，空列表为只使用JSON
+            fault_record_count: 模拟的故障录波记录数
+            fault_batch_delay: 故障录波每批读取的模拟耗时（秒）
+            history_interval: 历史模拟量数据的记录间隔（秒）
+        """
+        self.config = config_manager
+        if device_id is None and config_manager is not None:
+            device_id = config_manager.get_device_info().get('设备ID')
+        self.device_id = device_id or 'HYP_RPLD_001'
+        self.host = host
+        self.port = port
+        self.http_port = http_port
+        self.rates = dict(DEFAULT_RATES)
+        self.rates.update(rates or {})
+        self.ring = deque(maxlen=max(1, int(ring_size)))
+        if encodings is None:
+            encodings = list(BINARY_ENCODERS)
+        self.encodings = [name for name in encodings if name in BINARY_ENCODERS]
+        self.fault_batch_delay = fault_batch_delay
+        self.history_interval = max(1, int(history_interval))
+        self.codec = get_codec('auto')
+
+        self.seq = 0
+        # 序列号纪元：每次启动不同，客户端据此识别重启后从头计数的序列号
+        self.seq_epoch = f"{random.getrandbits(48):012x}"
+        self.mode = 'auto'
+        self.analog_channels = self._load_analog_channels()
+        self.params = {addr: 100 for addr in self._load_param_mapping()}
+        self.fault_records = [
+            {
+                'record_id': i,
+                'fault_time': (datetime.now() - timedelta(hours=i * 7)).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                'fault_bits': f"0x{1 << (i % 12):04x}",
+                'fault_desc': _FAULT_DESCRIPTIONS[i % len(_FAULT_DESCRIPTIONS)],
+            }
+            for i in range(fault_record_count)
+        ]
+        self.switch_input = {f'bit{i}': 0 for i in range(16)}
+        self.switch_input['bit0'] = 1
+        self.fault_status = {f'bit{i}': 0 for i in range(16)}
+
+        # 连接 -> 协商的编码（注册前不在其中，不接收推送）
+        self._connections: Dict[Any, str] = {}
+        # 连接 -> 推送主题订阅（未协商的连接接收所有推送）
+        self._topic_filters: Dict[Any, _TopicFilter] = {}
+        self._push_tasks: Dict[str, asyncio.Task] = {}
+        self._read_tasks: Dict[str, asyncio.Task] = {}
+        self._drop_next = 0
+        self._server = None
+        self._http_runner = None
+        self._started_at = None
+
+        self.frames_pushed = {message_type: 0 for message_type in self.rates}
+        self.frames_dropped = 0
+        self.frames_recovered = 0
+        self.requests_handled: Dict[str, int] = {}
+
+    def _load_analog_channels(self) -> List[tuple]:
+        if self.config is not None:
+            channels = []
+            for value in self.config.get_analog_channel_config().values():
+                parts = [part.strip() for part in str(value).split(',')]
+                if parts and parts[0]:
+                    channels.append((parts[0], parts[1] if len(parts) > 1 else ''))
+            if channels:
+                return channels
+        return list(_DEFAULT_ANALOG_CHANNELS)
+
+    def _load_param_mapping(self) -> Dict[str, str]:
+        if self.config is not None:
+            mapping = self.config.get_control_parameters_mapping()
+            if mapping:
+                return mapping
+        return {f"0x{0x2200 + i:04x}": f"参数{i + 1}" for i in range(56)}
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def http_url(self) -> Optional[str]:
+        return f"http://{self.host}:{self.http_port}" if self.http_port is not None else None
+
+    # ------------------------------------------------------------------
+    # 启动与停止
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """启动WebSocket服务器、历史数据接口和推送循环"""
+        self._server = await websockets.serve(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+        if self.http_port is not None:
+            app = web.Application()
+            app.router.add_get('/api/v1/history/analog', self._handle_history_analog)
+            app.router.add_get('/api/v1/history/status', self._handle_history_status)
+            app.router.add_get('/api/v1/history/events', self._handle_history_events)
+            self._http_runner = web.AppRunner(app)
+            await self._http_runner.setup()
+            await web.TCPSite(self._http_runner, self.host, self.http_port).start()
+            self.http_port = self._http_runner.addresses[0][1]
+
+        self._started_at = time.monotonic()
+        for message_type in self.rates:
+            self._start_push(message_type)
+        logger.info(f"设备模拟器已启动: {self.url}" + (f"，历史数据接口 {self.http_url}" if self.http_url else ""))
+
+    async def stop(self) -> None:
+        """停止推送并关闭所有连接"""
+        for task in list(self._push_tasks.values()) + list(self._read_tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._push_tasks.values(), *self._read_tasks.values(), return_exceptions=True)
+        self._push_tasks.clear()
+        self._read_tasks.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._http_runner is not None:
+            await self._http_runner.cleanup()
+            self._http_runner = None
+        logger.info("设备模拟器已停止")
+
+    def set_rate(self, message_type: str, rate: float) -> None:
+        """调整推送频率（帧/秒），0为停止推送该类型"""
+        self.rates[message_type] = max(0.0, float(rate))
+        self.frames_pushed.setdefault(message_type, 0)
+        if self._started_at is not None:
+            self._start_push(message_type)
+
+    def drop_next(self, count: int) -> None:
+        """之后推送的count帧只写入补推缓存而不发送，模拟传输中丢帧"""
+        self._drop_next += max(0, int(count))
+
+    def _start_push(self, message_type: str) -> None:
+        task = self._push_tasks.pop(message_type, None)
+        if task is not None:
+            task.cancel()
+        if self.rates.get(message_type, 0) > 0:
+            self._push_tasks[message_type] = asyncio.create_task(self._push_loop(message_type))
+
+    async def _push_loop(self, message_type: str) -> None:
+        """按频率推送：按已过时间计算应发送的帧数，高频时每次唤醒批量补齐"""
+        rate = self.rates[message_type]
+        interval = max(1.0 / rate, _MIN_TICK)
+        started = time.monotonic()
+        sent = 0
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                due = int((time.monotonic() - started) * rate)
+                # 事件循环长时间阻塞后最多补发1秒的帧，避免瞬间突发
+                if due - sent > rate:
+                    sent = due - max(1, int(rate))
+                while sent < due:
+                    self.push(message_type)
+                    sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"模拟器推送 {message_type} 失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 推送帧
+    # ------------------------------------------------------------------
+
+    def push(self, message_type: str, data: Any = None) -> Dict[str, Any]:
+        """生成一帧推送（data为None时按当前模拟状态生成），写入补推缓存并广播"""
+        if data is None:
+            data = self._build_data(message_type)
+        self.seq += 1
+        frame = {
+            'type': message_type,
+            'device_id': self.device_id,
+            'timestamp': _now(),
+            'seq_num': self.seq,
+            'data': data,
+            'status': 'success',
+        }
+        self.ring.append(frame)
+        self.frames_pushed[message_type] = self.frames_pushed.get(message_type, 0) + 1
+        if self._drop_next:
+            self._drop_next -= 1
+            self.frames_dropped += 1
+            # 丢弃的帧同样计入各连接的prev_seq，客户端据此发现缺失
+            self._broadcast(frame, send=False)
+        else:
+            self._broadcast(frame)
+        return frame
+
+    def _broadcast(self, message: Dict[str, Any], send: bool = True) -> None:
+        """按编码分组，每种编码只编码一次后广播；按订阅过滤的连接单独编码（帧中带prev_seq）"""
+        groups: Dict[str, List[Any]] = {}
+        now = time.monotonic()
+        for websocket, encoding in self._connections.items():
+            topic_filter = self._topic_filters.get(websocket)
+            if topic_filter is None:
+                groups.setdefault(encoding, []).append(websocket)
+            elif topic_filter.accept(message['type'], now):
+                frame = dict(message, prev_seq=topic_filter.last_seq)
+                topic_filter.last_seq = message['seq_num']
+                if send:
+                    websockets.broadcast((websocket,), self._encode(encoding, frame))
+        if send:
+            for encoding, connections in groups.items():
+                websockets.broadcast(connections, self._encode(encoding, message))
+
+    def _encode(self, encoding: str, message: Dict[str, Any]):
+        encoder = BINARY_ENCODERS.get(encoding)
+        return encoder(message) if encoder is not None else self.codec.dumps(message)
+
+    def _build_data(self, message_type: str) -> Any:
+        if message_type == 'analog_data':
+            return self._build_analog_data()
+        if message_type == 'system_status':
+            return self._build_system_status()
+        if message_type == 'fault':
+            return self._build_fault()
+        if message_type == 'full_snapshot':
+            return self._build_full_snapshot()
+        return {}
+
+    def _build_analog_data(self) -> List[Dict[str, Any]]:
+        phase = time.monotonic()
+        data = []
+        for index, (name, unit) in enumerate(self.analog_channels):
+            value = round(20 * math.sin(phase / 5 + index) + random.uniform(-0.5, 0.5), 1)
+            data.append({
+                'reg_addr': f"0x{0x0006 + index:04x}",
+                'name': name,
+                'raw_value': int(value * 10),
+                'physical_value': value,
+                'unit': unit,
+            })
+        return data
+
+    def _build_system_status(self) -> Dict[str, Any]:
+        # 偶尔切换KM1状态（开关量输入bit0）
+        if random.random() < 0.01:
+            self.switch_input['bit0'] ^= 1
+        return {
+            'system_status': {f'bit{i}': 1 if i in (7, 9) else 0 for i in range(16)},
+            'switch_input': dict(self.switch_input),
+            'switch_output': {f'bit{i}': 1 if i in (0, 8) else 0 for i in range(16)},
+            'fault_status': dict(self.fault_status),
+        }
+
+    def _build_fault(self) -> Dict[str, Any]:
+        fault_bit = random.randrange(12)
+        key = f'bit{fault_bit}'
+        self.fault_status[key] ^= 1
+        return {
+            'fault_bit': fault_bit,
+            'fault_code': f'FAULT_BIT_{fault_bit}',
+            'fault_desc': _FAULT_DESCRIPTIONS[fault_bit % len(_FAULT_DESCRIPTIONS)],
+            'fault_status': self.fault_status[key],
+            'recovery_method': '手动复位故障线圈（0x0101）',
+        }
+
+    def _build_full_snapshot(self) -> Dict[str, Any]:
+        snapshot = self._build_system_status()
+        snapshot['analog_data'] = [
+            {'reg_addr': item['reg_addr'], 'name': item['name'], 'value': item['physical_value'], 'unit': item['unit']}
+            for item in self._build_analog_data()
+        ]
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # WebSocket连接与请求应答
+    # ------------------------------------------------------------------
+
+    async def _handle_connection(self, websocket) -> None:
+        encoding = 'json'
+        try:
+            await websocket.send(self.codec.dumps({
+                'type': 'connect_ack',
+                'status': 'success',
+                'connection_id': f"conn_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
+                'device_id': self.device_id,
+                'timestamp': _now(),
+            }))
+            async for raw in websocket:
+                try:
+                    message = json.loads(raw)
+                except ValueError:
+                    logger.warning(f"模拟器收到无法解析的消息: {raw!r:.100}")
+                    continue
+                message_type = message.get('type')
+                self.requests_handled[message_type] = self.requests_handled.get(message_type, 0) + 1
+                if message_type == 'device_register':
+                    encoding = self._negotiate_encoding(message)
+                    await websocket.send(self.codec.dumps({
+                        'type': 'device_register_ack',
+                        'device_id': self.device_id,
+                        'status': 'success',
+                        'encoding': encoding,
+                        'seq_epoch': self.seq_epoch,
+                        'timestamp': _now(),
+                    }))
+                    # 注册应答之后的帧按协商的编码发送
+                    self._connections[websocket] = encoding
+                else:
+                    await self._handle_request(websocket, encoding, message)
+        except websockets.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"模拟器处理连接失败: {e}")
+        finally:
+            self._connections.pop(websocket, None)
+            self._topic_filters.pop(websocket, None)
+
+    def _negotiate_encoding(self, registration: Dict[str, Any]) -> str:
+        """按客户端声明的优先顺序选择双方都支持的编码"""
+        for encoding in registration.get('supported_encodings') or []:
+            if encoding in self.encodings:
+                return encoding
+        return 'json'
+
+    async def _handle_request(self, websocket, encoding: str, message: Dict[str, Any]) -> None:
+        message_type = message.get('type')
+        data = message.get('data')
+        if not isinstance(data, dict):
+            data = {}
+        request_id = data.get('request_id') or message.get('request_id')
+
+        def build(reply_type: str, **fields) -> Dict[str, Any]:
+            response = {'type': reply_type, 'device_id': self.device_id, 'request_id': request_id}
+            response.update(fields)
+            response['timestamp'] = _now()
+            return response
+
+        async def reply(reply_type: str, **fields) -> None:
+            await websocket.send(self._encode(encoding, build(reply_type, **fields)))
+
+        def measure(reply_type: str, **fields) -> int:
+            # 应答的时间戳长度固定，预先编码即可得到实际发送的字节数
+            frame = self._encode(encoding, build(reply_type, **fields))
+            return len(frame.encode('utf-8')) if isinstance(frame, str) else len(frame)
+
+        if message_type == 'heartbeat':
+            await reply('heartbeat_ack', summary={
+                'device_online': True, 'pscada_connected': True, 'server_connected': True,
+                'fault_count': sum(self.fault_status.values()),
+            })
+        elif message_type == 'param_read':
+            await reply('param_read_ack', data=self._read_params(data))
+        elif message_type == 'param_write':
+            results = self._write_params(data.get('params'))
+            success_count = sum(1 for item in results if item['write_result'] == 'success')
+            exec_status = 'success' if success_count == len(results) else ('partial_success' if success_count else 'fail')
+            await reply('param_write_ack', exec_status=exec_status,
+                        exec_msg='参数写入成功' if exec_status == 'success' else '部分参数写入失败',
+                        data={'success_count': success_count, 'total_count': len(results), 'params': results})
+        elif message_type == 'control_cmd':
+            await self._handle_control_cmd(reply, data)
+        elif message_type == 'fault_record_list':
+            await reply('fault_record_list_ack', data={
+                'total_records': len(self.fault_records),
+                'max_capacity': 100,
+                'record_length': 3907,
+                'records': self.fault_records,
+            })
+        elif message_type == 'fault_record_read':
+            if request_id in self._read_tasks:
+                await reply('error', error_code=409, error_msg='该请求正在读取中')
+            else:
+                task = asyncio.create_task(self._read_fault_record(
+                    reply, data.get('record_id', 0), chunked=bool(data.get('chunked') or message.get('chunked')),
+                    measure=measure))
+                self._read_tasks[request_id] = task
+                task.add_done_callback(lambda _: self._read_tasks.pop(request_id, None))
+        elif message_type == 'fault_record_cancel':
+            task = self._read_tasks.get(request_id)
+            if task is not None:
+                task.cancel()
+        elif message_type == 'snapshot_request':
+            # last_seq为快照对应的最后推送序列号，客户端丢弃暂存的更早的增量帧
+            await reply('full_snapshot', data=self._build_full_snapshot(), last_seq=self.seq, status='success')
+        elif message_type in ('subscribe', 'unsubscribe'):
+            topic_filter = self._topic_filters.get(websocket)
+            if topic_filter is None:
+                # 此前的帧都已发给该连接，过滤后的第一帧prev_seq为当前序列号
+                topic_filter = self._topic_filters[websocket] = _TopicFilter(self.seq)
+            if message_type == 'subscribe':
+                topic_filter.subscribe(data.get('topic'), data.get('rate'))
+            else:
+                topic_filter.unsubscribe(data.get('topic'))
+        elif message_type == 'data_lost_request':
+            await self._send_recovery(websocket, encoding, self._find_frames(data.get('missing_seq') or []))
+        elif message_type == 'data_resume_request':
+            # 客户端的纪元不同时last_seq是本模拟器重启前的序列号，不补推（由全量快照恢复状态）
+            if data.get('device_id', self.device_id) == self.device_id \
+                    and data.get('seq_epoch', self.seq_epoch) == self.seq_epoch:
+                last_seq = data.get('last_seq', -1)
+                await self._send_recovery(websocket, encoding, [f for f in self.ring if f['seq_num'] > last_seq])
+        elif request_id is not None:
+            await reply('error', error_code=400, error_msg=f"不支持的消息类型: {message_type}")
+        else:
+            logger.debug(f"模拟器忽略消息: {message_type}")
+
+    def _read_params(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        mapping = self._load_param_mapping()
+        read_type = request.get('read_type', 'control_params')
+        if read_type == 'single':
+            addr = request.get('reg_addr')
+            return {'reg_addr': addr, 'param_name': mapping.get(addr, addr), 'current_value': self.params.get(addr)}
+        if read_type == 'sensor_params':
+            return {
+                'sensor_down': [{'channel': f'AI{i}', 'down_limit': -1000} for i in range(1, 9)],
+                'sensor_up': [{'channel': f'AI{i}', 'up_limit': 1000} for i in range(1, 9)],
+            }
+        return {'params': [
+            {'reg_addr': addr, 'param_name': mapping.get(addr, addr), 'current_value': value, 'value_range': '0-65535'}
+            for addr, value in self.params.items()
+        ]}
+
+    def _write_params(self, params) -> List[Dict[str, Any]]:
+        """写入参数，params可为[{reg_addr, param_value}]或{reg_addr: value}"""
+        if isinstance(params, dict):
+            params = [{'reg_addr': addr, 'param_value': value} for addr, value in params.items()]
+        results = []
+        for param in params or []:
+            addr = param.get('reg_addr')
+            value = param.get('param_value')
+            result = dict(param)
+            if addr in self.params and isinstance(value, (int, float)) and 0 <= value <= 65535:
+                self.params[addr] = value
+                result['write_result'] = 'success'
+            else:
+                result['write_result'] = 'fail'
+                result['error_msg'] = '地址不存在或数值超出范围'
+            results.append(result)
+        return results
+
+    async def _handle_control_cmd(self, reply, data: Dict[str, Any]) -> None:
+        cmd = data.get('cmd')
+        if cmd == 'fault_reset':
+            for key in self.fault_status:
+                self.fault_status[key] = 0
+            await reply('control_ack', cmd=cmd, exec_status='success', exec_msg='故障复位成功')
+        elif cmd == 'fault_record_clear':
+            cleared_count = len(self.fault_records)
+            self.fault_records = []
+            await reply('control_ack', cmd=cmd, exec_status='success', exec_msg='故障录波记录已清除',
+                        cleared_count=cleared_count)
+        elif cmd == 'set_mode':
+            self.mode = (data.get('cmd_param') or {}).get('mode', self.mode)
+            await reply('control_ack', cmd=cmd, exec_status='success', exec_msg=f'工作模式已切换为{self.mode}',
+                        current_mode=self.mode)
+        else:
+            await reply('control_ack', cmd=cmd, exec_status='fail', error_code=400, exec_msg=f'不支持的命令: {cmd}')
+
+    async def _read_fault_record(self, reply, record_id: int, chunked: bool = False, measure=None) -> None:
+        """模拟分批读取故障录波：read_start → 每批progress → complete
+
+        chunked为True时每批发送该批凑齐的数据点（fault_record_chunk）代替progress，
+        read_start中的total_bytes为全部分块帧按连接的编码发送的总字节数，complete不再重复数据点。
+        """
+        record = next((r for r in self.fault_records if r['record_id'] == record_id), None)
+        if record is None:
+            await reply('fault_record_error', error_code=404, error_msg=f'故障录波记录不存在: {record_id}', current_batch=0)
+            return
+        total_batches = math.ceil(FAULT_RECORD_REGISTERS / FAULT_BATCH_REGISTERS)
+        data_points = self._build_fault_points()
+        chunks = [self._fault_chunk(data_points, batch, total_batches) for batch in range(1, total_batches + 1)]
+        start_fields = {}
+        if chunked and measure is not None:
+            start_fields['total_bytes'] = sum(measure('fault_record_chunk', **chunk) for chunk in chunks)
+        await reply('fault_record_read_start', exec_status='success', total_registers=FAULT_RECORD_REGISTERS,
+                    batch_size=FAULT_BATCH_REGISTERS, total_batches=total_batches, total_points=len(data_points),
+                    estimated_time=round(total_batches * self.fault_batch_delay, 1), **start_fields)
+        batch = 0
+        try:
+            for batch in range(1, total_batches + 1):
+                await asyncio.sleep(self.fault_batch_delay)
+                if chunked:
+                    await reply('fault_record_chunk', **chunks[batch - 1])
+                else:
+                    await reply('fault_record_progress', current_batch=batch, total_batches=total_batches,
+                                percentage=round(batch * 100 / total_batches, 1))
+        except asyncio.CancelledError:
+            await reply('fault_record_cancelled', cancelled_at_batch=batch)
+            return
+        fault_info = {
+            'fault_time': record['fault_time'],
+            'fault_bits': record['fault_bits'],
+            'fault_point': FAULT_RECORD_POINTS // 2,
+            'record_cycle': 100,
+        }
+        if chunked:
+            await reply('fault_record_complete', data={'fault_info': fault_info, 'total_points': len(data_points)})
+        else:
+            await reply('fault_record_complete', data={'fault_info': fault_info, 'data_points': data_points})
+
+    @staticmethod
+    def _build_fault_points() -> List[Dict[str, Any]]:
+        return [
+            {
+                'point_index': i,
+                'system_status': '0x0104',
+                'switch_input': '0x0200',
+                'switch_output': '0x0101',
+                'rail_potential_max': 255 + (i % 20),
+                'max_polarization': -120 + (i % 10),
+                'branch_currents': [12, 13, 11, 10, 9, 8],
+                'branch_voltages': [24, 25],
+            }
+            for i in range(FAULT_RECORD_POINTS)
+        ]
+
+    @staticmethod
+    def _fault_chunk(data_points: List[Dict[str, Any]], batch: int, total_batches: int) -> Dict[str, Any]:
+        """第batch批寄存器读完后凑齐的数据点（记录头之后每个数据点占固定寄存器数）"""
+        def ready(batch_count: int) -> int:
+            registers = min(batch_count * FAULT_BATCH_REGISTERS, FAULT_RECORD_REGISTERS) - FAULT_RECORD_HEADER
+            return max(0, min(len(data_points), registers // FAULT_POINT_REGISTERS))
+
+        offset = ready(batch - 1)
+        return {
+            'chunk_index': batch - 1,
+            'total_chunks': total_batches,
+            'point_offset': offset,
+            'data_points': data_points[offset:ready(batch)],
+        }
+
+    def _find_frames(self, seqs: List[int]) -> List[Dict[str, Any]]:
+        """从补推缓存中查找帧（缓存内seq_num连续，直接按下标定位）"""
+        if not self.ring:
+            return []
+        first = self.ring[0]['seq_num']
+        frames = []
+        for seq in sorted(set(seqs)):
+            index = seq - first
+            if 0 <= index < len(self.ring):
+                frames.append(self.ring[index])
+        return frames
+
+    async def _send_recovery(self, websocket, encoding: str, frames: List[Dict[str, Any]]) -> None:
+        for frame in frames:
+            await websocket.send(self._encode(encoding, {
+                'type': 'data_recovery',
+                'device_id': self.device_id,
+                'seq_num': frame['seq_num'],
+                'data': frame,
+            }))
+        self.frames_recovered += len(frames)
+
+    # ------------------------------------------------------------------
+    # 历史数据接口
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _api_response(data: Any, code: int = 200, msg: str = 'success') -> web.Response:
+        return web.json_response({'code': code, 'msg': msg, 'data': data, 'timestamp': _now()},
+                                 status=code, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+    def _parse_query(self, request: web.Request) -> Optional[tuple]:
+        """解析start_time/end_time/page/page_size，page_size为0时返回全部"""
+        try:
+            start = datetime.fromisoformat(request.query['start_time'].replace('Z', '+00:00')).replace(tzinfo=None)
+            end = datetime.fromisoformat(request.query['end_time'].replace('Z', '+00:00')).replace(tzinfo=None)
+            page = max(1, int(request.query.get('page', 1)))
+            page_size = max(0, int(request.query.get('page_size', 20)))
+        except (KeyError, ValueError):
+            return None
+        if end < start:
+            return None
+        return start, end, page, page_size
+
+    @staticmethod
+    def _page(total: int, page: int, page_size: int) -> range:
+        if page_size == 0:
+            return range(total)
+        start = (page - 1) * page_size
+        return range(min(start, total), min(start + page_size, total))
+
+    async def _handle_history_analog(self, request: web.Request) -> web.Response:
+        query = self._parse_query(request)
+        if query is None:
+            return self._api_response(None, 400, 'start_time/end_time参数缺失或格式错误')
+        start, end, page, page_size = query
+        names = [request.query['param_name']] if request.query.get('param_name') else [name for name, _ in self.analog_channels]
+        units = dict(self.analog_channels)
+        points = int((end - start).total_seconds() // self.history_interval) + 1
+        total = points * len(names)
+        rows = []
+        # 按需生成当前页的记录，查询长时间范围时不生成全部数据
+        for index in self._page(total, page, page_size):
+            point, name_index = divmod(index, len(names))
+            timestamp = start + timedelta(seconds=point * self.history_interval)
+            seconds = timestamp.timestamp()
+            rows.append({
+                'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S.000'),
+                'parameter_name': names[name_index],
+                'value': round(20 * math.sin(seconds / 3600 + name_index), 2),
+                'unit': units.get(names[name_index], ''),
+            })
+        return self._api_response({'total': total, 'page': page, 'page_size': page_size, 'list': rows})
+
+    async def _handle_history_status(self, request: web.Request) -> web.Response:
+        query = self._parse_query(request)
+        if query is None:
+            return self._api_response(None, 400, 'start_time/end_time参数缺失或格式错误')
+        start, end, page, page_size = query
+        interval = 900  # 每15分钟一次状态变化
+        total = int((end - start).total_seconds() // interval) + 1
+        rows = []
+        for index in self._page(total, page, page_size):
+            bit = index % 12
+            rows.append({
+                'timestamp': (start + timedelta(seconds=index * interval)).strftime('%Y-%m-%d %H:%M:%S.000'),
+                'device_id': self.device_id,
+                'status_type': 'FaultStatus',
+                'bit_position': bit,
+                'old_value': index % 2,
+                'new_value': 1 - index % 2,
+                'status_name': _FAULT_DESCRIPTIONS[bit % len(_FAULT_DESCRIPTIONS)],
+            })
+        return self._api_response({'total': total, 'page': page, 'page_size': page_size, 'list': rows})
+
+    async def _handle_history_events(self, request: web.Request) -> web.Response:
+        query = self._parse_query(request)
+        if query is None:
+            return self._api_response(None, 400, 'start_time/end_time参数缺失或格式错误')
+        start, end, page, page_size = query
+        interval = 3600  # 每小时一条事件
+        total = int((end - start).total_seconds() // interval) + 1
+        rows = []
+        for index in self._page(total, page, page_size):
+            event_type = _HISTORY_EVENT_TYPES[index % len(_HISTORY_EVENT_TYPES)]
+            rows.append({
+                'event_time': (start + timedelta(seconds=index * interval)).strftime('%Y-%m-%d %H:%M:%S.000'),
+                'device_id': self.device_id,
+                'event_type': event_type,
+                'description': f"模拟事件: {event_type}",
+            })
+        return self._api_response({'total': total, 'page': page, 'page_size': page_size, 'list': rows})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取模拟器统计"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            'connections': len(self._connections),
+            'subscriptions': [topic_filter.get_topics() for topic_filter in self._topic_filters.values()],
+            'seq_num': self.seq,
+            'elapsed_seconds': round(elapsed, 1),
+            'frames_pushed': dict(self.frames_pushed),
+            'frames_dropped': self.frames_dropped,
+            'frames_recovered': self.frames_recovered,
+            'requests': dict(self.requests_handled),
+        }
+
+
+async def _run_from_args(args) -> None:
+    config = None
+    if args.config:
+        from config_manager import ConfigManager
+        config = ConfigManager(args.config)
+        config.load_config_sync()
+
+    port = args.port
+    http_port = args.http_port
+    if config is not None:
+        if port is None:
+            port = config.get_websocket_config().get('listen_port', 8765)
+        if http_port is None:
+            http_port = urlsplit(config.get('API配置', 'base_url', default='http://localhost:8001')).port or 8001
+
+    simulator = DeviceSimulator(
+        config, device_id=args.device_id, host=args.host, port=port or 8765, http_port=http_port,
+        rates={
+            'analog_data': args.analog_rate,
+            'system_status': args.status_rate,
+            'fault': args.fault_rate,
+            'full_snapshot': 1 / args.snapshot_interval if args.snapshot_interval > 0 else 0,
+        },
+        ring_size=args.ring_size,
+        encodings=[name.strip() for name in args.encodings.split(',') if name.strip()],
+        fault_batch_delay=args.fault_batch_delay,
+    )
+    await simulator.start()
+    try:
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            logger.info(f"模拟器统计: {json.dumps(simulator.get_stats(), ensure_ascii=False)}")
+    finally:
+        await simulator.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='钢轨电位限制装置后端模拟器')
+    parser.add_argument('--config', default='config.ini', help='配置文件路径，留空则不读取配置')
+    parser.add_argument('--host', default='0.0.0.0', help='监听地址')
+    parser.add_argument('--port', type=int, default=None, help='WebSocket端口，默认读取listen_port')
+    parser.add_argument('--http-port', type=int, default=None, help='历史数据接口端口，默认读取[API配置]base_url')
+    parser.add_argument('--device-id', default=None, help='设备ID，默认读取[设备配置]')
+    parser.add_argument('--analog-rate', type=float, default=DEFAULT_RATES['analog_data'], help='analog_data频率（帧/秒）')
+    parser.add_argument('--status-rate', type=float, default=DEFAULT_RATES['system_status'], help='system_status频率（帧/秒）')
+    parser.add_argument('--fault-rate', type=float, default=DEFAULT_RATES['fault'], help='fault频率（帧/秒）')
+    parser.add_argument('--snapshot-interval', type=float, default=30, help='full_snapshot间隔（秒），0为不推送')
+    parser.add_argument('--ring-size', type=int, default=10000, help='补推缓存帧数')
+    parser.add_argument('--encodings', default=','.join(BINARY_ENCODERS), help='可协商的二进制编码，留空为只使用JSON')
+    parser.add_argument('--fault-batch-delay', type=float, default=0.05, help='故障录波每批读取耗时（秒）')
+    parser.add_argument('--stats-interval', type=float, default=10, help='统计日志输出间隔（秒）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        asyncio.run(_run_from_args(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+故障录波分块组装模块
+Fault Record Chunk Assembler Module
+
+故障录波详情按批分块传输，每块到达时解析到按总点数预先分配的列数组中，不再等待
+整条记录（3907个寄存器，数MB的JSON）在一帧内到达后才开始处理；读取进度按实际收到的字节数计算。
+
+协议消息：
+- fault_record_read：请求中带chunked=true时后端分块发送，不支持分块的后端仍在fault_record_complete中发送全部数据点
+- fault_record_read_start：total_points为记录的数据点数，total_bytes（可选）为全部分块帧的总字节数
+- fault_record_chunk：{'chunk_index': 3, 'total_chunks': 32, 'point_offset': 28, 'data_points': [...]}，
+  每读取一批寄存器发送该批凑齐的数据点
+- fault_record_complete：分块传输时只带fault_info和total_points，不再重复data_points
+"""
+# flake8: noqa
+import logging
+import math
+from array import array
+from typing import Any, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# 按request_id交给组装器的消息类型
+ASSEMBLER_MESSAGE_TYPES = ('fault_record_read_start', 'fault_record_chunk', 'fault_record_complete')
+
+
+def _fields(message: Mapping) -> Mapping:
+    """兼容字段在消息根级别或data中的两种格式"""
+    data = message.get('data')
+    return data if isinstance(data, Mapping) else message
+
+
+def _new_column(value: Any, size: int):
+    """按第一个值的类型创建列：整数和浮点数使用数组，其余（状态字字符串、列表）使用列表"""
+    if type(value) is int:
+        return array('q', bytes(8 * size))
+    if type(value) is float:
+        return array('d', [math.nan]) * size
+    return [None] * size
+
+
+class FaultRecordAssembler:
+    """将故障录波的分块数据点解析到预先分配的列数组中
+
+    每个字段一列，数据点按分块的point_offset定位，重复或乱序到达的分块不会重复计数。
+    """
+
+    def __init__(self, total_points: int = 0):
+        self.total_points = 0
+        self.total_bytes: Optional[int] = None
+        self.total_chunks: Optional[int] = None
+        self.columns: Dict[str, Any] = {}
+        self._filled = bytearray()  # 每个数据点是否已收到
+        self.points_received = 0
+        self.bytes_received = 0
+        self.chunks_received = 0
+        self.duplicate_points = 0
+        self.fault_info: Dict[str, Any] = {}
+        self.complete = False
+        self._allocate(total_points)
+
+    def _allocate(self, total_points: int) -> None:
+        """按总点数分配（或扩大）各列"""
+        grow = int(total_points) - self.total_points
+        if grow <= 0:
+            return
+        self._filled.extend(bytes(grow))
+        for name, column in self.columns.items():
+            if isinstance(column, array):
+                column.extend(array(column.typecode, [math.nan if column.typecode == 'd' else 0]) * grow)
+            else:
+                column.extend([None] * grow)
+        self.total_points = int(total_points)
+
+    def feed(self, message: Mapping, frame_bytes: Optional[int] = None) -> bool:
+        """处理一条读取消息，frame_bytes为该帧的实际字节数
+
+        Returns:
+            bool: 消息类型属于故障录波读取时返回True
+        """
+        message_type = message.get('type')
+        if message_type == 'fault_record_chunk':
+            self.add_chunk(message, frame_bytes)
+        elif message_type == 'fault_record_read_start':
+            self.start(message)
+        elif message_type == 'fault_record_complete':
+            self.finish(message, frame_bytes)
+        else:
+            return False
+        return True
+
+    def start(self, message: Mapping) -> None:
+        """读取开始：按记录的数据点数预先分配列数组"""
+        fields = _fields(message)
+        total_bytes = fields.get('total_bytes')
+        self.total_bytes = total_bytes if isinstance(total_bytes, int) and total_bytes > 0 else None
+        total_points = fields.get('total_points')
+        if isinstance(total_points, int):
+            self._allocate(total_points)
+
+    def add_chunk(self, message: Mapping, frame_bytes: Optional[int] = None) -> int:
+        """解析一个分块的数据点，返回新收到的数据点数"""
+        fields = _fields(message)
+        self.chunks_received += 1
+        if frame_bytes:
+            self.bytes_received += frame_bytes
+        if isinstance(fields.get('total_chunks'), int):
+            self.total_chunks = fields['total_chunks']
+        return self._store_points(fields.get('data_points') or (), fields.get('point_offset', 0))
+
+    def finish(self, message: Mapping, frame_bytes: Optional[int] = None) -> None:
+        """读取完成：保存故障信息，未分块的应答中的数据点也在这里解析"""
+        fields = _fields(message)
+        self.fault_info = dict(fields.get('fault_info') or {})
+        total_points = fields.get('total_points')
+        if isinstance(total_points, int):
+            self._allocate(total_points)
+        data_points = fields.get('data_points')
+        if data_points:
+            if frame_bytes:
+                self.bytes_received += frame_bytes
+            self._store_points(data_points, 0)
+        self.complete = True
+
+    def _store_points(self, data_points, offset: Any) -> int:
+        offset = offset if isinstance(offset, int) and offset >= 0 else 0
+        end = offset + len(data_points)
+        if end > self.total_points:
+            # 后端未声明点数或实际点数更多
+            self._allocate(end)
+        added = 0
+        filled = self._filled
+        for index, point in enumerate(data_points, offset):
+            if not isinstance(point, Mapping):
+                continue
+            if filled[index]:
+                self.duplicate_points += 1
+                continue
+            for name, value in point.items():
+                self._set(name, index, value)
+            filled[index] = 1
+            added += 1
+        self.points_received += added
+        return added
+
+    def _set(self, name: str, index: int, value: Any) -> None:
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = _new_column(value, self.total_points)
+        try:
+            column[index] = value
+        except (TypeError, OverflowError):
+            # 整数列遇到浮点数时改为浮点数组，其他类型改为列表
+            if isinstance(column, array) and column.typecode == 'q' and type(value) is float:
+                column = array('d', column)
+            else:
+                column = list(column)
+            self.columns[name] = column
+            column[index] = value
+
+    @property
+    def missing_points(self) -> int:
+        return self.total_points - self.points_received
+
+    @property
+    def progress(self) -> float:
+        """按实际收到的字节数计算的读取进度（0~1）
+
+        后端声明了total_bytes时按总字节数计算，否则按已收到数据点的平均字节数估计总字节数。
+        """
+        if self.complete:
+            return 1.0
+        if self.total_bytes:
+            return min(1.0, self.bytes_received / self.total_bytes)
+        expected = self.expected_bytes
+        return min(1.0, self.bytes_received / expected) if expected else 0.0
+
+    @property
+    def expected_bytes(self) -> Optional[int]:
+        if self.total_bytes:
+            return self.total_bytes
+        if self.points_received and self.total_points:
+            return round(self.bytes_received / self.points_received * self.total_points)
+        return None
+
+    def get_column(self, name: str, default: Any = None) -> List[Any]:
+        """获取一个字段在所有数据点上的值，未收到的数据点为default"""
+        column = self.columns.get(name)
+        if column is None:
+            # 所有数据点都缺少该字段
+            return [default] * self.total_points
+        return [value if filled else default for value, filled in zip(column, self._filled)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'total_points': self.total_points,
+            'points_received': self.points_received,
+            'duplicate_points': self.duplicate_points,
+            'chunks_received': self.chunks_received,
+            'bytes_received': self.bytes_received,
+            'expected_bytes': self.expected_bytes,
+            'progress': round(self.progress, 4),
+            'complete': self.complete,
+        }
@@ -0,0 +1,276 @@
+"""
+WebSocket帧录制模块
+WebSocket Frame Recorder Module
+
+录制文件格式（追加写入）：
+    数据文件: 文件头 b'RPLDREC1'，之后为若干压缩块
+        块头  <IIqq  压缩后长度, 帧数, 第一帧时间戳(ns), 最后一帧时间戳(ns)
+        块体  zlib压缩的帧序列，每帧 <qBBI 时间戳(ns), 方向, 类型, 长度 + 帧内容
+    索引文件（数据文件名 + '.idx'）: 每个块一条 <qqQI 第一帧时间戳, 最后一帧时间戳, 块偏移, 帧数
+
+时间戳为time.monotonic_ns()；每次开始录制时写入一帧DIRECTION_MARKER标记帧，
+内容为录制开始时的墙上时间和单调时钟（JSON），用于换算实际时间。
+单调时钟在重启后重新计数，按时间定位只适用于同一次开机内录制的文件。
+"""
+# flake8: noqa
+import json
+import logging
+import queue
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from collections import namedtuple
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+FILE_MAGIC = b'RPLDREC1'
+INDEX_SUFFIX = '.idx'
+
+DIRECTION_INBOUND = 0
+DIRECTION_OUTBOUND = 1
+DIRECTION_MARKER = 2
+
+KIND_TEXT = 0
+KIND_BINARY = 1
+
+_BLOCK_HEADER = struct.Struct('<IIqq')
+_FRAME_HEADER = struct.Struct('<qBBI')
+_INDEX_ENTRY = struct.Struct('<qqQI')
+
+RecordedFrame = namedtuple('RecordedFrame', ['timestamp_ns', 'direction', 'payload'])
+
+_STOP = object()
+
+
+class FrameRecorder:
+    """WebSocket帧录制器
+
+    record_inbound()/record_outbound()只把帧放入有界的线程安全队列，压缩和文件写入在后台线程中完成，
+    不阻塞事件循环。磁盘写入跟不上时队列满，丢弃最旧的一帧并计数，内存占用不随录制时长增长。
+    帧按块压缩，每写完一块同时追加一条时间索引。
+    """
+
+    def __init__(self, path: Union[str, Path], block_frames: int = 256, block_seconds: float = 1.0,
+                 compress_level: int = 6, queue_size: int = 10000):
+        self.path = Path(path)
+        self.index_path = Path(str(self.path) + INDEX_SUFFIX)
+        self.block_frames = max(1, int(block_frames))
+        self.block_seconds = max(0.01, float(block_seconds))
+        self.compress_level = compress_level
+        self.frames_recorded = 0
+        self.frames_dropped = 0
+        self.blocks_written = 0
+        self.bytes_written = 0
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_recording(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, after: Optional['FrameRecorder'] = None) -> None:
+        """开始录制（追加到已有文件）
+
+        Args:
+            after: 刚停止、可能仍在写入剩余帧的录制器，其写入线程退出后才打开文件（两者可能是同一文件）
+        """
+        if self.is_recording:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        marker = json.dumps({'wall_time': time.time(), 'monotonic_ns': time.monotonic_ns()})
+        self._enqueue(DIRECTION_MARKER, marker)
+        previous = after._thread if after is not None else None
+        self._thread = threading.Thread(target=self._writer, args=(previous,), name='frame-recorder', daemon=True)
+        self._thread.start()
+        logger.info(f"开始录制WebSocket帧: {self.path}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止录制，写完队列中剩余的帧（阻塞，事件循环中应在线程池中调用）"""
+        if not self.is_recording:
+            return
+        # 停止标记不能丢弃：队列满时等待写入线程取走帧，写入线程已退出时不再等待
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self._thread.join(timeout)
+        logger.info(f"停止录制WebSocket帧: 共 {self.frames_recorded} 帧，{self.blocks_written} 块，"
+                    f"丢弃 {self.frames_dropped} 帧")
+
+    def record_inbound(self, payload: Union[str, bytes]) -> None:
+        """记录一帧接收的帧（仅入队，可在事件循环中调用）"""
+        self._enqueue(DIRECTION_INBOUND, payload)
+
+    def record_outbound(self, payload: Union[str, bytes]) -> None:
+        """记录一帧发送的帧（仅入队，可在事件循环中调用）"""
+        self._enqueue(DIRECTION_OUTBOUND, payload)
+
+    def _enqueue(self, direction: int, payload: Union[str, bytes]) -> bool:
+        """放入写入队列，不等待
+
+        Returns:
+            bool: 未发生丢帧返回True，队列已满并丢弃了最旧的一帧返回False
+        """
+        item = (time.monotonic_ns(), direction, payload)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        try:
+            self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.frames_dropped += 1
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # 写入线程之外的线程同时入队时可能再次满，丢弃本帧
+            self.frames_dropped += 1
+        return False
+
+    def _writer(self, previous: Optional[threading.Thread]) -> None:
+        """后台写入线程：按帧数或时间切分块，压缩后追加写入"""
+        if previous is not None:
+            previous.join()
+        try:
+            with open(self.path, 'ab') as data_file, open(self.index_path, 'ab') as index_file:
+                if data_file.tell() == 0:
+                    data_file.write(FILE_MAGIC)
+                block: List[Tuple[int, int, Union[str, bytes]]] = []
+                deadline = None
+                stopping = False
+                while not stopping:
+                    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        item = None
+                    if item is _STOP:
+                        stopping = True
+                    elif item is not None:
+                        if not block:
+                            deadline = time.monotonic() + self.block_seconds
+                        block.append(item)
+                    if block and (stopping or item is None or len(block) >= self.block_frames):
+                        self._write_block(data_file, index_file, block)
+                        block = []
+                        deadline = None
+        except Exception as e:
+            logger.error(f"WebSocket帧录制写入失败: {e}")
+
+    def _write_block(self, data_file, index_file, block) -> None:
+        parts = []
+        for timestamp_ns, direction, payload in block:
+            if isinstance(payload, str):
+                kind = KIND_TEXT
+                payload = payload.encode('utf-8')
+            else:
+                kind = KIND_BINARY
+            parts.append(_FRAME_HEADER.pack(timestamp_ns, direction, kind, len(payload)))
+            parts.append(payload)
+        compressed = zlib.compress(b''.join(parts), self.compress_level)
+
+        offset = data_file.tell()
+        first_ts, last_ts = block[0][0], block[-1][0]
+        data_file.write(_BLOCK_HEADER.pack(len(compressed), len(block), first_ts, last_ts))
+        data_file.write(compressed)
+        data_file.flush()
+        # 数据写入后再写索引，索引不会指向不完整的块
+        index_file.write(_INDEX_ENTRY.pack(first_ts, last_ts, offset, len(block)))
+        index_file.flush()
+
+        self.frames_recorded += len(block)
+        self.blocks_written += 1
+        self.bytes_written += _BLOCK_HEADER.size + len(compressed)
+
+    def get_stats(self) -> dict:
+        """获取录制统计"""
+        return {
+            'recording': self.is_recording,
+            'path': str(self.path),
+            'frames': self.frames_recorded,
+            'dropped': self.frames_dropped,
+            'queue_depth': self._queue.qsize(),
+            'blocks': self.blocks_written,
+            'bytes': self.bytes_written,
+        }
+
+
+class FrameReader:
+    """读取FrameRecorder录制的文件，按时间索引定位"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.index_path = Path(str(self.path) + INDEX_SUFFIX)
+        self._index = self._load_index()
+        self._last_ts = [entry[1] for entry in self._index]
+
+    def _load_index(self) -> List[Tuple[int, int, int, int]]:
+        if not self.index_path.exists():
+            return []
+        raw = self.index_path.read_bytes()
+        usable = len(raw) - len(raw) % _INDEX_ENTRY.size
+        return [entry for entry in _INDEX_ENTRY.iter_unpack(raw[:usable])]
+
+    @property
+    def block_count(self) -> int:
+        return len(self._index)
+
+    @property
+    def frame_count(self) -> int:
+        return sum(entry[3] for entry in self._index)
+
+    def get_time_range(self) -> Optional[Tuple[int, int]]:
+        """获取录制的时间范围（ns）"""
+        if not self._index:
+            return None
+        return self._index[0][0], max(self._last_ts)
+
+    def _read_block(self, data_file, offset: int) -> Iterator[RecordedFrame]:
+        data_file.seek(offset)
+        compressed_length, frame_count, _, _ = _BLOCK_HEADER.unpack(data_file.read(_BLOCK_HEADER.size))
+        raw = zlib.decompress(data_file.read(compressed_length))
+        position = 0
+        for _ in range(frame_count):
+            timestamp_ns, direction, kind, length = _FRAME_HEADER.unpack_from(raw, position)
+            position += _FRAME_HEADER.size
+            payload = raw[position:position + length]
+            position += length
+            yield RecordedFrame(timestamp_ns, direction, payload.decode('utf-8') if kind == KIND_TEXT else payload)
+
+    def iter_frames(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                    directions: Optional[Tuple[int, ...]] = None) -> Iterator[RecordedFrame]:
+        """按时间顺序读取帧
+
+        Args:
+            start_ns: 起始时间戳，通过索引直接定位到所在的块
+            end_ns: 结束时间戳（不含）
+            directions: 只返回指定方向的帧，为None时返回全部
+        """
+        first_block = 0
+        if start_ns is not None:
+            # 块按时间追加，最后一帧时间戳单调递增（同一次开机内），二分查找第一个可能包含start_ns的块
+            first_block = bisect_left(self._last_ts, start_ns)
+        with open(self.path, 'rb') as data_file:
+            for first_ts, last_ts, offset, _ in self._index[first_block:]:
+                if end_ns is not None and first_ts >= end_ns:
+                    break
+                for frame in self._read_block(data_file, offset):
+                    if start_ns is not None and frame.timestamp_ns < start_ns:
+                        continue
+                    if end_ns is not None and frame.timestamp_ns >= end_ns:
+                        return
+                    if directions is not None and frame.direction not in directions:
+                        continue
+                    yield frame
+
+    def seek(self, timestamp_ns: int) -> Optional[RecordedFrame]:
+        """获取时间戳不早于timestamp_ns的第一帧"""
+        return next(self.iter_frames(start_ns=timestamp_ns), None)
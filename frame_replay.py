@@ -0,0 +1,113 @@
+"""
+WebSocket帧回放模块
+WebSocket Frame Replay Module
+"""
+# flake8: noqa
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from frame_recorder import FrameReader, DIRECTION_INBOUND
+from message_dispatcher import CoalescingSubscription
+
+logger = logging.getLogger(__name__)
+
+
+class FrameReplayer:
+    """将录制的接收帧按原始节奏、N倍速或尽可能快地送入WebSocketClient
+
+    回放帧经WebSocketClient.process_frame进入与实际接收相同的解码和分发路径，
+    页面回调无需任何修改。回放结束后汇总实际吞吐量、调度滞后和各回调的耗时。
+    """
+
+    def __init__(self, client, path: Union[str, Path], speed: Optional[float] = 1.0):
+        """
+        Args:
+            client: WebSocketClient（无需连接服务器）
+            path: FrameRecorder录制的文件
+            speed: 回放倍速，1为原始节奏，N为N倍速，0或None为尽可能快
+        """
+        self.client = client
+        self.reader = FrameReader(path)
+        self.speed = speed if speed and speed > 0 else None
+
+    async def run(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Dict[str, Any]:
+        """回放指定时间范围内的接收帧，返回回放报告"""
+        client = self.client
+        # 回放期间不检测序列号缺失，避免向（未连接的）服务器请求补推
+        sequence_tracker, client.sequence_tracker = client.sequence_tracker, None
+        client.reset_message_metrics()
+
+        fed = 0
+        rejected = 0
+        max_lag = 0.0
+        first_ts = None
+        last_ts = None
+        dropped_before = sum(stats['dropped'] for stats in client.get_dispatch_stats().values())
+        started = time.monotonic()
+        try:
+            for frame in self.reader.iter_frames(start_ns, end_ns, directions=(DIRECTION_INBOUND,)):
+                if first_ts is None:
+                    first_ts = frame.timestamp_ns
+                last_ts = frame.timestamp_ns
+
+                if self.speed is not None:
+                    # 按录制时间戳计算该帧的计划送入时刻
+                    due = started + (frame.timestamp_ns - first_ts) / 1e9 / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        max_lag = max(max_lag, -delay)
+                        await asyncio.sleep(0)
+                else:
+                    # 每帧让出一次事件循环，使分发工作协程和页面回调得以执行
+                    await asyncio.sleep(0)
+
+                if client.process_frame(frame.payload):
+                    fed += 1
+                else:
+                    rejected += 1
+
+            await client.dispatcher.join()
+            await self._join_coalesced()
+        finally:
+            client.sequence_tracker = sequence_tracker
+
+        elapsed = time.monotonic() - started
+        recorded_seconds = (last_ts - first_ts) / 1e9 if first_ts is not None else 0.0
+        dispatch_stats = client.get_dispatch_stats()
+        metrics = client.get_message_metrics()
+        report = {
+            'frames': fed,
+            'rejected': rejected,
+            'elapsed_seconds': round(elapsed, 3),
+            'recorded_seconds': round(recorded_seconds, 3),
+            'target_speed': self.speed or 'max',
+            'achieved_speed': round(recorded_seconds / elapsed, 2) if elapsed > 0 else None,
+            'throughput_fps': round(fed / elapsed, 1) if elapsed > 0 else None,
+            'max_lag_ms': round(max_lag * 1000, 3),
+            'dropped': sum(stats['dropped'] for stats in dispatch_stats.values()) - dropped_before,
+            'message_types': {
+                message_type: {
+                    'count': entry['count'],
+                    'decode_ms': entry['decode_ms'],
+                    'callbacks': entry['callbacks'],
+                }
+                for message_type, entry in metrics.items()
+            },
+        }
+        logger.info(f"回放完成: {fed} 帧，耗时 {report['elapsed_seconds']} 秒，"
+                    f"吞吐量 {report['throughput_fps']} 帧/秒，丢帧 {report['dropped']}")
+        return report
+
+    async def _join_coalesced(self) -> None:
+        """合并投递的订阅在分发队列之后执行，等待其投递完成（typed=True的订阅登记在消息回调表中）"""
+        client = self.client
+        for registry in (client.data_callbacks, client.message_callbacks):
+            for callbacks in list(registry.values()):
+                for callback in callbacks:
+                    if isinstance(callback, CoalescingSubscription):
+                        await callback.join()
@@ -0,0 +1,701 @@
+"""
+独立接收进程模块
+Out-of-Process Ingest Worker Module
+
+ingest_mode = process 时，由独立的接收进程持有与后端的WebSocket连接，负责解码、序列号检查、
+心跳和重连；模拟量采样和状态字写入共享内存环形缓冲区（shared_ring），其余消息经管道转发。
+界面进程中的IngestClient与WebSocketClient接口相同，按固定间隔读取环形缓冲区，
+每个新行复制为一个float数组，包装为只读消息（RingMessage）交给原有的分发队列：
+类型化回调直接由列构建消息对象，只有按字典读取data的回调才还原data（每行一次）。
+管道事件由后台线程接收和反序列化，再交给事件循环按顺序处理。
+
+说明：
+- 还原消息的timestamp为接收进程收到该帧的时间；
+- 不符合固定布局的analog_data/system_status帧（通道数超出、状态位不连续等）按原样经管道转发；
+- 接收进程以spawn方式启动，主程序入口须放在 ``if __name__ in {"__main__", "__mp_main__"}`` 之下
+  （NiceGUI在子进程中调用ui.run时直接返回）。
+"""
+# flake8: noqa
+import asyncio
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config_manager import ConfigManager
+from message_codec import freeze
+from protocol_messages import AnalogData, AnalogMessage, BitGroup, ProtocolMessage, SystemStatus
+from shared_ring import SharedRing
+from websocket_client import WebSocketClient
+
+logger = logging.getLogger(__name__)
+
+# 写入环形缓冲区的状态字分组（每组为bit0~bitN的开关量）
+STATUS_GROUPS = ('system_status', 'switch_input', 'switch_output', 'fault_status', 'igbt_fiber_status')
+
+# 每行的公共列：接收时间、seq_num（无则为NaN）、布局版本
+_ROW_TIME, _ROW_SEQ, _ROW_LAYOUT = range(3)
+_ROW_HEADER = 3
+
+# float64可精确表示的最大位数
+_MAX_STATUS_BITS = 53
+
+# 模拟量数值的类型标记：''表示该字段不存在
+_KIND_INT, _KIND_FLOAT = 'i', 'f'
+
+# 每种消息最多记录的布局数，超出后按原样转发
+_MAX_LAYOUTS = 256
+
+# 接收进程上报状态的间隔（秒）
+_STATUS_INTERVAL = 1.0
+
+
+def create_websocket_client(config_manager, **kwargs) -> WebSocketClient:
+    """按[Web Socket配置]的ingest_mode创建客户端
+
+    inline（默认）在界面进程内直连；process使用独立接收进程和共享内存环形缓冲区。
+    """
+    mode = str(config_manager.get_websocket_config().get('ingest_mode', 'inline')).lower()
+    if mode == 'process':
+        return IngestClient(config_manager, **kwargs)
+    if mode != 'inline':
+        logger.warning(f"未知的ingest_mode: {mode}，使用inline")
+    return WebSocketClient(config_manager, **kwargs)
+
+
+# ----------------------------------------------------------------------
+# 行布局：消息中不随帧变化的部分（名称、单位、设备ID等）只经管道发送一次
+# ----------------------------------------------------------------------
+
+def _header_pairs(message: Dict[str, Any]) -> Tuple[tuple, bool]:
+    pairs = tuple((key, value) for key, value in message.items()
+                  if key not in ('data', 'seq_num', 'timestamp'))
+    return pairs, 'timestamp' in message
+
+
+def _value_kind(value: Any) -> Optional[str]:
+    """数值字段的类型标记，非数值返回None"""
+    if value is None:
+        return ''
+    value_type = type(value)
+    if value_type is int:
+        return _KIND_INT if abs(value) < 2 ** _MAX_STATUS_BITS else None
+    if value_type is float:
+        return _KIND_FLOAT
+    return None
+
+
+def _encode_analog(message: Dict[str, Any], channels: int) -> Optional[Tuple[tuple, List[float]]]:
+    """analog_data -> (布局, [物理值..., 原始值...])，不符合固定布局时返回None"""
+    data = message.get('data')
+    if not isinstance(data, list) or len(data) > channels:
+        return None
+    items = []
+    physical = [math.nan] * channels
+    raw = [math.nan] * channels
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            return None
+        physical_kind = _value_kind(item.get('physical_value'))
+        raw_kind = _value_kind(item.get('raw_value'))
+        if physical_kind is None or raw_kind is None:
+            return None
+        if physical_kind:
+            physical[index] = item['physical_value']
+        if raw_kind:
+            raw[index] = item['raw_value']
+        pairs = tuple((key, value) for key, value in item.items() if key not in ('physical_value', 'raw_value'))
+        items.append((pairs, physical_kind, raw_kind))
+    return (_header_pairs(message), tuple(items)), physical + raw
+
+
+def _decode_analog(layout: tuple, row, channels: int) -> Dict[str, Any]:
+    (header, has_timestamp), items = layout
+    return _build_message(header, has_timestamp, row, _decode_analog_data(items, row, channels))
+
+
+def _decode_analog_data(items: tuple, row, channels: int) -> List[Dict[str, Any]]:
+    data = []
+    for index, (pairs, physical_kind, raw_kind) in enumerate(items):
+        item = dict(pairs)
+        if physical_kind:
+            item['physical_value'] = _restore(physical_kind, row[_ROW_HEADER + index])
+        if raw_kind:
+            item['raw_value'] = _restore(raw_kind, row[_ROW_HEADER + channels + index])
+        data.append(item)
+    return data
+
+
+def _typed_analog(layout: '_RowLayout', message: 'RingMessage', row) -> ProtocolMessage:
+    count = len(layout.body)
+    raw_start = _ROW_HEADER + layout.channels
+    analog = AnalogData(layout.analog, row[_ROW_HEADER:_ROW_HEADER + count], row[raw_start:raw_start + count])
+    return AnalogMessage.from_fields(message, analog=analog)
+
+
+def _encode_status(message: Dict[str, Any], channels: int) -> Optional[Tuple[tuple, List[float]]]:
+    """system_status -> (布局, [各分组状态字...])，不符合固定布局时返回None"""
+    data = message.get('data')
+    if not isinstance(data, dict) or not data:
+        return None
+    groups = []
+    words = [math.nan] * len(STATUS_GROUPS)
+    for group, bits in data.items():
+        if group not in STATUS_GROUPS or not isinstance(bits, dict) or len(bits) > _MAX_STATUS_BITS:
+            return None
+        word = 0
+        for bit in range(len(bits)):
+            value = bits.get(f'bit{bit}')
+            if value not in (0, 1) or type(value) is not int:
+                return None
+            word |= value << bit
+        words[STATUS_GROUPS.index(group)] = word
+        groups.append((group, len(bits)))
+    return (_header_pairs(message), tuple(groups)), words
+
+
+def _decode_status(layout: tuple, row, channels: int) -> Dict[str, Any]:
+    (header, has_timestamp), groups = layout
+    return _build_message(header, has_timestamp, row, _decode_status_data(groups, row, channels))
+
+
+def _decode_status_data(groups: tuple, row, channels: int) -> Dict[str, Dict[str, int]]:
+    data = {}
+    for group, bit_count in groups:
+        word = int(row[_ROW_HEADER + STATUS_GROUPS.index(group)])
+        data[group] = {f'bit{bit}': (word >> bit) & 1 for bit in range(bit_count)}
+    return data
+
+
+def _typed_status(layout: '_RowLayout', message: 'RingMessage', row) -> ProtocolMessage:
+    groups = {group: BitGroup(int(row[_ROW_HEADER + STATUS_GROUPS.index(group)]), (1 << bit_count) - 1)
+              for group, bit_count in layout.body}
+    return SystemStatus.from_fields(message, **groups)
+
+
+def _restore(kind: str, value: float) -> Any:
+    return int(value) if kind == _KIND_INT and not math.isnan(value) else value
+
+
+def _build_message(header: tuple, has_timestamp: bool, row, data: Any) -> Dict[str, Any]:
+    message = dict(header)
+    if has_timestamp:
+        message['timestamp'] = datetime.fromtimestamp(row[_ROW_TIME]).isoformat()
+    if not math.isnan(row[_ROW_SEQ]):
+        message['seq_num'] = int(row[_ROW_SEQ])
+    message['data'] = data
+    return message
+
+
+# 消息类型 -> (编码函数, data还原函数, 消息对象构建函数)
+_RING_CODECS = {
+    'analog_data': (_encode_analog, _decode_analog_data, _typed_analog),
+    'system_status': (_encode_status, _decode_status_data, _typed_status),
+}
+
+
+def _ring_widths(channels: int) -> Dict[str, int]:
+    return {
+        'analog_data': _ROW_HEADER + 2 * channels,
+        'system_status': _ROW_HEADER + len(STATUS_GROUPS),
+    }
+
+
+class _RowLayout:
+    """界面进程中的一种行布局：消息头和每列的含义，在同一布局的所有行之间共享"""
+    __slots__ = ('header', 'has_timestamp', 'body', 'channels', 'analog', 'decode_data', 'to_typed')
+
+    def __init__(self, message_type: str, layout: tuple, channels: int):
+        (header, has_timestamp), body = layout
+        self.header = dict(header)
+        self.has_timestamp = has_timestamp
+        self.body = body
+        self.channels = channels
+        _, self.decode_data, self.to_typed = _RING_CODECS[message_type]
+        self.analog = None
+        if message_type == 'analog_data':
+            items = [dict(pairs) for pairs, _, _ in body]
+            self.analog = AnalogData.shared_layout(tuple([item.get('reg_addr', '') for item in items]),
+                                                   tuple([item.get('name', '') for item in items]),
+                                                   tuple([item.get('unit', '') for item in items]))
+
+
+class RingMessage(Mapping):
+    """环形缓冲区中一行对应的只读消息，内容与直连时解码得到的消息相同
+
+    行复制为float数组后即释放共享内存。data在数据回调首次读取时按布局还原为只读结构并缓存；
+    类型化回调经to_typed()直接由列构建消息对象，不创建中间字典。
+    """
+    __slots__ = ('_layout', '_row', '_data', '_timestamp')
+
+    def __init__(self, layout: _RowLayout, row: array):
+        self._layout = layout
+        self._row = row
+        self._data = None
+        self._timestamp = None
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'data':
+            if self._data is None:
+                layout = self._layout
+                self._data = freeze(layout.decode_data(layout.body, self._row, layout.channels))
+            return self._data
+        if key == 'seq_num':
+            seq = self._row[_ROW_SEQ]
+            if math.isnan(seq):
+                raise KeyError(key)
+            return int(seq)
+        if key == 'timestamp' and self._layout.has_timestamp:
+            if self._timestamp is None:
+                self._timestamp = datetime.fromtimestamp(self._row[_ROW_TIME]).isoformat()
+            return self._timestamp
+        return self._layout.header[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: Any) -> bool:
+        if key == 'data' or key in self._layout.header:
+            return True
+        if key == 'seq_num':
+            return not math.isnan(self._row[_ROW_SEQ])
+        return key == 'timestamp' and self._layout.has_timestamp
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._layout.header
+        if self._layout.has_timestamp:
+            yield 'timestamp'
+        if not math.isnan(self._row[_ROW_SEQ]):
+            yield 'seq_num'
+        yield 'data'
+
+    def __len__(self) -> int:
+        return len(self._layout.header) + self._layout.has_timestamp + (not math.isnan(self._row[_ROW_SEQ])) + 1
+
+    def to_typed(self) -> ProtocolMessage:
+        """直接由列构建消息对象（protocol_messages.to_typed调用）"""
+        return self._layout.to_typed(self._layout, self, self._row)
+
+    def __repr__(self) -> str:
+        return f"RingMessage({dict(self)!r})"
+
+
+# ----------------------------------------------------------------------
+# 接收进程
+# ----------------------------------------------------------------------
+
+class _IngestSource(WebSocketClient):
+    """接收进程中的WebSocket客户端：解码后的帧写入环形缓冲区或经管道转发，不在本进程分发"""
+
+    def __init__(self, config_manager, events, rings: Dict[str, SharedRing], channels: int, **kwargs):
+        super().__init__(config_manager, **kwargs)
+        self._events = events
+        self._rings = rings
+        self._channels = channels
+        self._layouts: Dict[str, Dict[tuple, int]] = {message_type: {} for message_type in rings}
+        self.forwarded = 0
+        # 全量快照由界面进程在连接后请求并暂存增量推送
+        self.snapshot_bootstrap = False
+
+    def _submit(self, data: Dict[str, Any]) -> None:
+        message_type = data.get('type')
+        ring = self._rings.get(message_type)
+        if ring is not None:
+            encoded = _RING_CODECS[message_type][0](data, self._channels)
+            if encoded is not None:
+                layout, values = encoded
+                version = self._layout_version(message_type, layout)
+                if version is not None:
+                    seq = data.get('seq_num')
+                    ring.write([time.time(), seq if type(seq) is int else math.nan, version] + values)
+                    return
+        self.forwarded += 1
+        # 附带帧的字节数，界面进程按实际字节数计算分块应答的进度
+        self._send_event(('message', data, self._frame_bytes))
+
+    async def forward(self, message_type: str, payload) -> None:
+        """发送界面进程转来的已编码帧"""
+        try:
+            if not await self.outbound.put(message_type, payload):
+                logger.warning(f"消息未发送，发送队列已停止: {message_type}")
+        except Exception as e:
+            logger.error(f"发送消息失败 ({message_type}): {e}")
+
+    def _layout_version(self, message_type: str, layout: tuple) -> Optional[int]:
+        """布局对应的版本号，新布局先经管道发给界面进程"""
+        layouts = self._layouts[message_type]
+        try:
+            version = layouts.get(layout)
+        except TypeError:
+            # 字段值不可哈希（嵌套结构），按原样转发
+            return None
+        if version is None:
+            if len(layouts) >= _MAX_LAYOUTS:
+                # 每帧都在变化的字段不适合固定布局
+                return None
+            version = len(layouts)
+            layouts[layout] = version
+            self._send_event(('layout', message_type, version, layout))
+        return version
+
+    def _send_event(self, event: tuple) -> None:
+        try:
+            self._events.send(event)
+        except (OSError, ValueError) as e:
+            logger.error(f"向界面进程发送失败: {e}")
+
+    async def on_connection_changed(self, connected: bool) -> None:
+        self._send_event(('connection', connected))
+
+    async def report_status(self) -> None:
+        """定期上报连接状态和统计"""
+        while True:
+            self._send_event(('status', {
+                'connection': self.get_connection_status(),
+                'sequence': self.get_sequence_stats(),
+                'metrics': self.get_message_metrics(),
+                'recording': self.get_recording_stats(),
+                'forwarded': self.forwarded,
+            }))
+            await asyncio.sleep(_STATUS_INTERVAL)
+
+
+def _worker_main(config_path: str, device_id: str, websocket_url: str, ring_names: Dict[str, str],
+                 channels: int, commands, events, log_level: int) -> None:
+    """接收进程入口"""
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_run_worker(config_path, device_id, websocket_url, ring_names, channels, commands, events))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_worker(config_path: str, device_id: str, websocket_url: str, ring_names: Dict[str, str],
+                      channels: int, commands, events) -> None:
+    config = ConfigManager(config_path)
+    await config.load_config()
+    rings = {message_type: SharedRing.attach(name) for message_type, name in ring_names.items()}
+    source = _IngestSource(config, events, rings, channels, device_id=device_id, websocket_url=websocket_url)
+    source.register_connection_callback(source.on_connection_changed)
+    status_task = asyncio.create_task(source.report_status())
+    loop = asyncio.get_running_loop()
+    logger.info(f"接收进程已启动: {device_id} {websocket_url}")
+    try:
+        await source.connect()
+        while True:
+            try:
+                command = await loop.run_in_executor(None, commands.recv)
+            except (EOFError, OSError):
+                logger.warning("界面进程已退出，接收进程停止")
+                break
+            action = command[0]
+            if action == 'send':
+                # 不等待发送完成，后续命令继续入队，发送队列按优先级排序并合并心跳
+                source._run_in_background(source.forward(command[1], command[2]))
+            elif action == 'start_recording':
+                source.start_recording(command[1])
+            elif action == 'stop_recording':
+                source.stop_recording()
+            elif action == 'stop':
+                break
+    finally:
+        status_task.cancel()
+        await source.disconnect()
+        for ring in rings.values():
+            ring.close()
+        logger.info("接收进程已停止")
+
+
+# ----------------------------------------------------------------------
+# 界面进程
+# ----------------------------------------------------------------------
+
+class IngestClient(WebSocketClient):
+    """界面进程侧的客户端：连接和解码在独立的接收进程中进行
+
+    注册回调、request()、send_message()等接口与WebSocketClient相同。
+    """
+
+    def __init__(self, config_manager, device_id: Optional[str] = None, websocket_url: Optional[str] = None,
+                 **kwargs):
+        # 基类初始化时可能按配置开始录制，录制在接收进程中进行
+        self._commands = None
+        super().__init__(config_manager, device_id=device_id, websocket_url=websocket_url, **kwargs)
+        ws_config = self.config.get_websocket_config()
+        self.ring_slots = int(ws_config.get('ingest_ring_slots', 4096))
+        self.poll_interval = float(ws_config.get('ingest_poll_interval', 0.02))
+        self.analog_channels = int(ws_config.get('ingest_analog_channels', 32))
+        # 序列号在接收进程中检查，统计随状态上报
+        self.sequence_tracker = None
+
+        self._process = None
+        self._events = None
+        self._rings: Dict[str, SharedRing] = {}
+        self._cursors: Dict[str, int] = {}
+        self._layouts: Dict[str, Dict[int, _RowLayout]] = {}
+        self._ingest_task = None
+        self._event_task = None
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._event_thread: Optional[threading.Thread] = None
+        self._first_connection: Optional[asyncio.Future] = None
+        self._worker_status: Dict[str, Any] = {}
+        self.ring_stats = {message_type: {'rows': 0, 'lost': 0} for message_type in _RING_CODECS}
+        self.forwarded = 0
+
+    async def connect(self) -> bool:
+        """启动接收进程并等待其首次连接结果"""
+        if self._process is not None and self._process.is_alive():
+            return self.is_connected
+
+        self._closing = False
+        widths = _ring_widths(self.analog_channels)
+        self._rings = {message_type: SharedRing.create(self.ring_slots, width)
+                       for message_type, width in widths.items()}
+        self._cursors = {message_type: 0 for message_type in self._rings}
+        self._layouts = {message_type: {} for message_type in self._rings}
+
+        context = multiprocessing.get_context('spawn')
+        command_reader, self._commands = context.Pipe(duplex=False)
+        self._events, event_writer = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_worker_main, name=f'ingest-{self.device_id}', daemon=True,
+            args=(str(self.config.config_file), self.device_id, self.websocket_url,
+                  {message_type: ring.name for message_type, ring in self._rings.items()},
+                  self.analog_channels, command_reader, event_writer, logging.getLogger().getEffectiveLevel()))
+        self._process.start()
+        # 关闭本进程持有的另一端，接收进程退出时能读到EOF
+        command_reader.close()
+        event_writer.close()
+        logger.info(f"接收进程已启动: pid={self._process.pid}")
+
+        loop = asyncio.get_running_loop()
+        self._first_connection = loop.create_future()
+        self._event_queue = asyncio.Queue()
+        self._event_thread = threading.Thread(target=self._read_events, args=(loop, self._events, self._event_queue),
+                                              name=f'ingest-events-{self.device_id}', daemon=True)
+        self._event_thread.start()
+        self._event_task = asyncio.create_task(self._event_loop())
+        self._ingest_task = asyncio.create_task(self._ingest_loop())
+        return await asyncio.shield(self._first_connection)
+
+    async def disconnect(self) -> None:
+        """停止接收进程并释放共享内存"""
+        self._closing = True
+        self._send_command(('stop',))
+        if self._process is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._process.join, 5)
+            if self._process.is_alive():
+                logger.warning("接收进程未按时退出，强制结束")
+                self._process.terminate()
+                self._process.join()
+            self._process = None
+
+        for task in (self._ingest_task, self._event_task):
+            if task and task is not asyncio.current_task():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._ingest_task = self._event_task = None
+        if self._event_thread is not None:
+            # 接收进程退出后管道读到EOF，读取线程随之结束
+            await asyncio.get_running_loop().run_in_executor(None, self._event_thread.join, 1)
+            self._event_thread = None
+
+        for connection in (self._commands, self._events):
+            if connection is not None:
+                connection.close()
+        self._commands = self._events = None
+        for ring in self._rings.values():
+            ring.close()
+        self._rings = {}
+
+        await self._set_connected(False, "WebSocket连接已断开")
+        if self._owns_dispatcher:
+            self.dispatcher.stop()
+        logger.info("WebSocket连接已断开")
+
+    async def _put_outbound(self, message_type: str, payload) -> bool:
+        """出站帧连同消息类型交给接收进程，由其发送队列按优先级发送并合并心跳"""
+        if not self._send_command(('send', message_type, payload)):
+            raise ConnectionError("接收进程未运行")
+        return True
+
+    def _send_command(self, command: tuple) -> bool:
+        if self._commands is None:
+            return False
+        try:
+            self._commands.send(command)
+            return True
+        except (OSError, ValueError) as e:
+            logger.error(f"向接收进程发送命令失败: {e}")
+            return False
+
+    def _submit(self, data: Dict[str, Any]) -> None:
+        # 心跳在接收进程中发送，本进程不估计时钟偏差：环形缓冲区中的消息以接收进程收到的时间计算延迟
+        if self.latency is not None:
+            self.latency.on_receipt(data, time.time())
+        super()._submit(data)
+
+    def _submit_row(self, message: RingMessage) -> None:
+        """环形缓冲区中的行只有推送数据，不会是请求的应答，直接放入分发队列"""
+        if self.latency is not None:
+            self.latency.on_receipt(message, time.time(), include_data=False)
+        self._queue_message(message)
+
+    async def _set_connected(self, connected: bool, reason: str = "WebSocket连接已关闭") -> None:
+        if self._first_connection is not None and not self._first_connection.done():
+            self._first_connection.set_result(connected)
+        if connected == self.is_connected:
+            return
+        self.is_connected = connected
+        if not connected:
+            self._held_frames = None
+            self._fail_pending_requests(reason)
+        else:
+            # 接收进程每次建立连接后重新订阅推送主题并请求全量快照
+            self._subscribed_topics = None
+            self._schedule_topic_sync()
+            self._start_snapshot_bootstrap()
+        await self._notify_connection_status(connected)
+
+    async def _ingest_loop(self) -> None:
+        """按固定间隔读取环形缓冲区"""
+        try:
+            while True:
+                for message_type in self._rings:
+                    self._drain_ring(message_type)
+                await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"读取接收进程数据失败: {e}")
+
+    @staticmethod
+    def _read_events(loop: asyncio.AbstractEventLoop, events, event_queue: asyncio.Queue) -> None:
+        """管道读取线程：阻塞接收并反序列化事件，按到达顺序交给事件循环，接收进程退出时放入None"""
+        while True:
+            try:
+                event = events.recv()
+            except (EOFError, OSError):
+                event = None
+            try:
+                loop.call_soon_threadsafe(event_queue.put_nowait, event)
+            except RuntimeError:
+                # 事件循环已关闭
+                return
+            if event is None:
+                return
+
+    async def _event_loop(self) -> None:
+        """按顺序处理管道事件，接收进程退出时断开"""
+        while True:
+            event = await self._event_queue.get()
+            if event is None:
+                break
+            try:
+                await self._handle_event(event)
+            except Exception as e:
+                logger.error(f"处理接收进程事件失败: {e}")
+        if not self._closing:
+            logger.error("接收进程已退出")
+            await self._set_connected(False, "接收进程已退出")
+
+    async def _handle_event(self, event: tuple) -> None:
+        kind = event[0]
+        if kind == 'message':
+            self.forwarded += 1
+            self._frame_bytes = event[2]
+            self._submit(event[1])
+        elif kind == 'layout':
+            self._layouts[event[1]][event[2]] = _RowLayout(event[1], event[3], self.analog_channels)
+        elif kind == 'connection':
+            await self._set_connected(event[1])
+        elif kind == 'status':
+            self._worker_status = event[1]
+
+    def _drain_ring(self, message_type: str) -> None:
+        """读取环形缓冲区的新行，每行复制为float数组后包装为只读消息"""
+        ring = self._rings[message_type]
+        layouts = self._layouts[message_type]
+        start, _, rows, lost = ring.read(self._cursors[message_type])
+        messages = []
+        for row in rows:
+            layout = layouts.get(int(row[_ROW_LAYOUT]))
+            if layout is None:
+                # 布局事件尚未到达，下次再读
+                break
+            values = array('d')
+            values.frombytes(row.cast('B'))
+            messages.append(RingMessage(layout, values))
+        # 释放行视图，避免关闭共享内存时仍有引用
+        for row in rows:
+            row.release()
+        self._cursors[message_type] = start + len(messages)
+
+        # 读取期间被写者覆盖（或正在覆盖）的行作废
+        overwritten = min(len(messages), ring.safe_from() - start)
+        if overwritten > 0:
+            messages = messages[overwritten:]
+            lost += overwritten
+        stats = self.ring_stats[message_type]
+        stats['rows'] += len(messages)
+        if lost:
+            stats['lost'] += lost
+            logger.warning(f"{message_type} 环形缓冲区溢出，丢失 {lost} 行")
+        for message in messages:
+            self._submit_row(message)
+
+    def start_recording(self, path: Optional[str] = None) -> None:
+        """开始录制（在接收进程中进行）"""
+        self._send_command(('start_recording', path))
+
+    def stop_recording(self) -> None:
+        """停止录制"""
+        self._send_command(('stop_recording',))
+
+    def get_recording_stats(self) -> Dict[str, Any]:
+        return self._worker_status.get('recording', {})
+
+    def get_connection_status(self) -> Dict[str, Any]:
+        """获取连接状态信息（重连和编码信息来自接收进程）"""
+        status = super().get_connection_status()
+        worker = self._worker_status.get('connection', {})
+        for key in ('reconnect_attempts', 'reconnect_count', 'last_reconnect_seconds', 'frame_encoding'):
+            if key in worker:
+                status[key] = worker[key]
+        status['ingest'] = self.get_ingest_stats()
+        return status
+
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        """获取接收进程和环形缓冲区的统计"""
+        return {
+            'mode': 'process',
+            'pid': self._process.pid if self._process is not None else None,
+            'alive': self._process is not None and self._process.is_alive(),
+            'ring_slots': self.ring_slots,
+            'rings': {message_type: dict(stats) for message_type, stats in self.ring_stats.items()},
+            'forwarded': self.forwarded,
+            'worker_send_queue_depth': self._worker_status.get('connection', {}).get('send_queue_depth'),
+        }
+
+    def get_sequence_stats(self) -> Dict[str, Dict[str, int]]:
+        return self._worker_status.get('sequence', {})
+
+    def get_message_metrics(self, include_buckets: bool = False) -> Dict[str, Dict[str, Any]]:
+        """接收速率、帧大小和解码耗时来自接收进程，回调耗时在本进程统计"""
+        stats = {message_type: dict(entry) for message_type, entry in self._worker_status.get('metrics', {}).items()}
+        for message_type, entry in super().get_message_metrics(include_buckets).items():
+            merged = stats.setdefault(message_type, entry)
+            merged['callback_ms'] = entry['callback_ms']
+            merged['callbacks'] = entry['callbacks']
+        return stats
@@ -0,0 +1,186 @@
+"""
+端到端延迟统计模块
+End-to-End Latency Tracking Module
+
+按消息类型统计三段延迟：
+- network：设备时间戳（按时钟偏差换算到本地时钟）-> 收到帧
+- dispatch：收到帧 -> 分发队列取出并开始执行回调
+- render：设备时间戳 -> 回调执行完成（合并投递时为实际投递完成）
+
+时钟偏差按心跳往返估计（NTP方式）：offset = 服务器时间 - (发送时间 + 收到应答时间) / 2，
+取最近若干次心跳中往返时间最短的样本。
+"""
+# flake8: noqa
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from message_metrics import Histogram
+
+# 延迟直方图分桶上限（毫秒）
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+LATENCY_STAGES = ('network', 'dispatch', 'render')
+
+# 用于合并投递查找设备时间的最近帧数
+_RECENT_FRAMES = 64
+
+# 每种消息类型保留的最近render样本上限（按时间窗口计算p99）
+_RECENT_SAMPLES = 2000
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """解析消息中的timestamp（'2024-09-29 14:30:00.123'或ISO格式），返回epoch秒"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class ClockOffsetEstimator:
+    """按心跳往返估计服务器时钟相对本地时钟的偏差"""
+
+    def __init__(self, samples: int = 8):
+        self._samples = deque(maxlen=max(1, int(samples)))  # (往返时间, 偏差)
+        self.offset = 0.0
+        self.rtt: Optional[float] = None
+
+    @property
+    def synced(self) -> bool:
+        return bool(self._samples)
+
+    def add_sample(self, sent_at: float, server_time: float, received_at: float) -> None:
+        """记录一次心跳往返（均为epoch秒）"""
+        rtt = received_at - sent_at
+        if rtt < 0:
+            return
+        self._samples.append((rtt, server_time - (sent_at + received_at) / 2))
+        # 往返时间最短的样本受排队影响最小
+        self.rtt, self.offset = min(self._samples)
+
+    def to_local(self, server_time: float) -> float:
+        """服务器时间换算为本地时钟"""
+        return server_time - self.offset
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'synced': self.synced,
+            'offset_ms': round(self.offset * 1000, 3),
+            'rtt_ms': round(self.rtt * 1000, 3) if self.rtt is not None else None,
+            'samples': len(self._samples),
+        }
+
+
+class _TypeLatency:
+    __slots__ = ('histograms', 'recent')
+
+    def __init__(self):
+        self.histograms = {stage: Histogram(LATENCY_BUCKETS_MS) for stage in LATENCY_STAGES}
+        self.recent = deque(maxlen=_RECENT_SAMPLES)  # (本地时间, render毫秒)
+
+
+class LatencyTracker:
+    """按消息类型统计端到端延迟"""
+
+    def __init__(self, window: float = 10, clock_samples: int = 8):
+        """
+        Args:
+            window: 计算最近p99的时间窗口（秒）
+            clock_samples: 估计时钟偏差使用的最近心跳样本数
+        """
+        self.window = window
+        self.clock = ClockOffsetEstimator(clock_samples)
+        self._types: Dict[str, _TypeLatency] = {}
+        # id(消息或data) -> (对象, 设备时间)，合并投递时按投递的对象查找
+        self._device_times: Dict[int, tuple] = {}
+
+    def _get(self, message_type: str) -> _TypeLatency:
+        latency = self._types.get(message_type)
+        if latency is None:
+            latency = self._types[message_type] = _TypeLatency()
+        return latency
+
+    def observe_heartbeat(self, sent_at: float, message: Dict[str, Any], received_at: float) -> None:
+        """收到heartbeat_ack时调用，sent_at为发送心跳的本地时间"""
+        server_time = parse_timestamp(message.get('timestamp'))
+        if server_time is not None:
+            self.clock.add_sample(sent_at, server_time, received_at)
+
+    def on_receipt(self, message: Dict[str, Any], received_at: float, include_data: bool = True) -> None:
+        """收到并解码一帧后调用
+
+        Args:
+            include_data: 是否同时登记data（合并投递的数据回调收到的是data）；
+                data按需还原的消息（接收进程环形缓冲区中的行）传False，只登记整条消息
+        """
+        server_time = parse_timestamp(message.get('timestamp'))
+        if server_time is None:
+            return
+        device_time = self.clock.to_local(server_time)
+        self._get(message.get('type', 'unknown')).histograms['network'].observe(
+            max(0.0, (received_at - device_time) * 1000))
+        self._remember(message, device_time)
+        if not include_data:
+            return
+        data = message.get('data')
+        if isinstance(data, (dict, list)):
+            self._remember(data, device_time)
+
+    def _remember(self, obj: Any, device_time: float) -> None:
+        device_times = self._device_times
+        if len(device_times) >= _RECENT_FRAMES:
+            del device_times[next(iter(device_times))]
+        device_times[id(obj)] = (obj, device_time)
+
+    def on_dispatch(self, message_type: str, seconds: float) -> None:
+        """分发队列取出一帧时调用，seconds为排队时间"""
+        self._get(message_type).histograms['dispatch'].observe(seconds * 1000)
+
+    def on_render(self, message_type: str, payload: Any, now: Optional[float] = None) -> None:
+        """一帧的回调执行完成时调用，payload为整条消息或投递给回调的data"""
+        entry = self._device_times.get(id(payload))
+        if entry is None or entry[0] is not payload:
+            return
+        now = time.time() if now is None else now
+        elapsed_ms = max(0.0, (now - entry[1]) * 1000)
+        latency = self._get(message_type)
+        latency.histograms['render'].observe(elapsed_ms)
+        latency.recent.append((now, elapsed_ms))
+
+    def recent_p99(self, message_type: str, now: Optional[float] = None) -> Optional[float]:
+        """最近window秒内render延迟的p99（毫秒），没有样本时返回None"""
+        latency = self._types.get(message_type)
+        if latency is None:
+            return None
+        since = (time.time() if now is None else now) - self.window
+        samples = sorted(elapsed for at, elapsed in latency.recent if at >= since)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+    def get_stale_types(self, budget_ms: float, now: Optional[float] = None) -> Dict[str, float]:
+        """最近p99超出预算的消息类型 -> p99（毫秒）"""
+        stale = {}
+        for message_type in self._types:
+            p99 = self.recent_p99(message_type, now)
+            if p99 is not None and p99 > budget_ms:
+                stale[message_type] = round(p99, 1)
+        return stale
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取时钟偏差和各消息类型的延迟统计（可直接序列化为JSON）"""
+        types = {}
+        for message_type, latency in self._types.items():
+            entry = {f'{stage}_ms': histogram.get_stats(1) for stage, histogram in latency.histograms.items()}
+            p99 = self.recent_p99(message_type)
+            entry['recent_render_p99_ms'] = round(p99, 1) if p99 is not None else None
+            types[message_type] = entry
+        return {'clock': self.clock.get_stats(), 'types': types}
+
+    def reset(self) -> None:
+        """清空延迟统计（保留时钟偏差估计）"""
+        self._types.clear()
+        self._device_times.clear()
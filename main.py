@@ -10,7 +10,7 @@ import logging
 from pathlib import Path
 from nicegui import ui, app
 from config_manager import ConfigManager
-from websocket_client import WebSocketClient
+from device_connection_manager import DeviceConnectionManager
 from ui_components import UIComponents
 from pages.page_manager import PageManager
 from pages.login_page import LoginPage
@@ -29,6 +29,10 @@ class RPLDeviceHMI:
     
     def __init__(self):
         self.config = ConfigManager()
+        self.device_manager = None
+        # 设备ID -> (页面管理器, UI组件)，站点的每台柜各一套，页面只订阅该设备的连接
+        self.device_views = {}
+        self.default_device = None
         self.websocket_client = None
         self.page_manager = None
         self.ui_components = None
@@ -49,31 +53,19 @@ class RPLDeviceHMI:
             # 初始化登录页面
             self.login_page = LoginPage(self.config, self._on_login_success)
             
-            # 初始化WebSocket客户端
-            self.websocket_client = WebSocketClient(self.config)
+            # 初始化站点设备连接（[站点设备配置]中的每台柜一个WebSocket客户端，共享编解码器和分发工作协程），
+            # 各浏览器会话共用，只在首次初始化时创建
+            if self.device_manager is None:
+                self._setup_devices()
             
-            # 初始化页面管理器
-            self.page_manager = PageManager(self.config, self.websocket_client)
-            
-            # 初始化UI组件（需要在页面管理器之后）
-            self.ui_components = UIComponents(self.config, self.page_manager)
+            # 默认显示第一台设备
+            self.websocket_client = self.device_manager.get_client(self.default_device)
+            self.page_manager, self.ui_components = self.device_views[self.default_device]
             
             # 设置UI主题和样式
             self._setup_ui_theme()
             
             # 不再在这里创建登录界面，由页面路由函数根据登录状态决定
-
-            # ⭐ 注册 WebSocket 连接状态回调
-            self.websocket_client.register_connection_callback(
-                self._on_websocket_connection_changed)
-            
-            # ⭐ 注册 connection_status 消息回调（串口状态现在通过connection_status发送）
-            self.websocket_client.register_data_callback(
-                'connection_status', self._on_connection_status_received)
-            
-            # 保留serial_status回调以兼容旧版本
-            self.websocket_client.register_data_callback(
-                'serial_status', self._on_serial_status_received)
             
             # 不需要在这里注册故障录波消息回调，页面内部已经注册
             
@@ -85,6 +77,42 @@ class RPLDeviceHMI:
             logger.error(f"应用初始化失败: {e}")
             raise
     
+    def _setup_devices(self) -> None:
+        """创建站点设备连接，每台设备一套页面管理器和UI组件"""
+        self.device_manager = DeviceConnectionManager(self.config)
+        self.default_device = self.device_manager.device_ids[0]
+        
+        # ⭐ 注册 WebSocket 连接状态回调（参数为设备ID和连接状态）
+        self.device_manager.register_connection_callback(self._on_websocket_connection_changed)
+        
+        for device_id, client in self.device_manager.clients.items():
+            # 页面管理器（页面回调注册在该设备的连接上）
+            page_manager = PageManager(self.config, client)
+            # UI组件（需要在页面管理器之后），多台设备时顶部栏显示设备切换
+            ui_components = UIComponents(self.config, page_manager, device_id=device_id,
+                                         station_devices=self.device_manager.device_ids)
+            self.device_views[device_id] = (page_manager, ui_components)
+            self._register_device_callbacks(device_id, client)
+        logger.info(f"站点设备: {', '.join(self.device_manager.device_ids)}")
+    
+    def _register_device_callbacks(self, device_id: str, client) -> None:
+        """注册设备连接的状态消息回调，更新该设备界面的状态栏"""
+        async def on_connection_status(data: dict):
+            await self._on_connection_status_received(data, device_id)
+        
+        async def on_serial_status(data: dict):
+            await self._on_serial_status_received(data, device_id)
+        
+        # ⭐ 注册 connection_status 消息回调（串口状态现在通过connection_status发送）
+        client.register_data_callback('connection_status', on_connection_status)
+        # 保留serial_status回调以兼容旧版本
+        client.register_data_callback('serial_status', on_serial_status)
+    
+    def _get_ui_components(self, device_id: str = None):
+        """获取设备的UI组件，未指定时为默认设备"""
+        view = self.device_views.get(device_id or self.default_device)
+        return view[1] if view else self.ui_components
+    
     def _setup_ui_theme(self):
         """设置UI主题"""
         # 获取字体配置
@@ -221,28 +249,45 @@ class RPLDeviceHMI:
         """创建登录页面"""
         self.login_page.create_login_page()
 
-    def _create_main_layout(self):
-        """创建主界面布局"""
+    def _create_main_layout(self, device_id: str = None):
+        """创建主界面布局
+        
+        Args:
+            device_id: 显示的设备，未指定或未配置时为默认设备
+        """
+        if device_id not in self.device_views:
+            device_id = self.default_device
+        page_manager, ui_components = self.device_views[device_id]
+        
         # 设置页面管理器的当前用户和登出回调
-        self.page_manager.current_user = self.current_user
-        self.page_manager.set_logout_callback(self._on_logout)
+        page_manager.current_user = self.current_user
+        page_manager.set_logout_callback(self._on_logout)
         
         # 设置UI组件的当前用户和登出回调
-        self.ui_components.current_user = self.current_user
-        self.ui_components.set_logout_callback(self._on_logout)
+        ui_components.current_user = self.current_user
+        ui_components.set_logout_callback(self._on_logout)
         
         # 创建顶部栏
-        self.ui_components.create_header()
+        ui_components.create_header()
         
         # 创建左侧导航栏
-        self.ui_components.create_left_drawer()
+        ui_components.create_left_drawer()
         
         # 创建主内容区域
-        self.page_manager.setup_pages()
+        page_manager.setup_pages()
         
         # 创建底部状态栏
-        self.ui_components.create_footer()
-    
+        ui_components.create_footer()
+        # 定时检查数据延迟，最近p99超出预算时在底部状态栏显示警告
+        ui.timer(1.0, lambda: self._check_data_latency(device_id))
+
+        # 浏览器会话结束时释放该会话占用的页面资源（短暂断线重连不释放），各会话共用的页面订阅保留
+        client = ui.context.client
+        if hasattr(client, 'on_delete'):
+            client.on_delete(page_manager.cleanup)
+        else:
+            client.on_disconnect(page_manager.cleanup)
+
     def _on_login_success(self, user_info: dict):
         """登录成功回调"""
         try:
@@ -261,7 +306,7 @@ class RPLDeviceHMI:
                 self._create_main_layout()
             
             # 启动WebSocket连接
-            ui.timer(0.5, self.start_websocket, once=True)
+            ui.timer(0.1, self.start_websocket, once=True)
             
             # 显示欢迎消息
             ui.notify(f'欢迎 {user_info["display_name"]} 登录系统！', type='positive')
@@ -275,9 +320,10 @@ class RPLDeviceHMI:
         try:
             logger.info(f"用户登出: {self.current_user['username'] if self.current_user else '未知用户'}")
             
-            # 停止WebSocket连接
-            if self.websocket_client:
-                asyncio.create_task(self.websocket_client.disconnect())
+            # 停止所有设备的WebSocket连接
+            if self.device_manager:
+                for client in self.device_manager.clients.values():
+                    asyncio.create_task(client.disconnect())
             
             # 清除用户信息
             self.current_user = None
@@ -292,17 +338,25 @@ class RPLDeviceHMI:
             logger.error(f"登出处理失败: {e}")
             ui.notify(f'登出失败: {str(e)}', type='negative')
 
-    async def _on_websocket_connection_changed(self, connected: bool):
+    async def _on_websocket_connection_changed(self, device_id: str, connected: bool):
         """WebSocket 连接状态变化回调"""
         # if connected:
         #     logger.info("WebSocket连接成功")
         # else:
         #     logger.warning("WebSocket连接断开")
-        if self.ui_components:
+        ui_components = self._get_ui_components(device_id)
+        if ui_components:
             # 更新 UI 显示
-            self.ui_components.update_connection_status(connected, 'websocket')
+            ui_components.update_connection_status(connected, 'websocket')
+    
+    def _check_data_latency(self, device_id: str = None):
+        """检查设备各消息类型的最近p99延迟"""
+        ui_components = self._get_ui_components(device_id)
+        client = self.device_manager.get_client(device_id or self.default_device) if self.device_manager else None
+        if ui_components and client and client.is_connected:
+            ui_components.update_latency_status(client.get_stale_message_types())
     
-    async def _on_connection_status_received(self, data: dict):
+    async def _on_connection_status_received(self, data: dict, device_id: str = None):
         """处理连接状态消息回调（包含串口状态）"""
         try:
             websocket_connected = data.get('websocket_connected', False)
@@ -312,18 +366,19 @@ class RPLDeviceHMI:
             # logger.info(f"收到连接状态消息 - WebSocket: {websocket_connected}, HMI串口: {hmi_serial_available}, SCADA串口: {scada_serial_available}")
             # logger.info(f"完整数据: {data}")
             
-            if self.ui_components:
+            ui_components = self._get_ui_components(device_id)
+            if ui_components:
                 # 控制板串口状态直接使用HMI串口状态（它们是同一个串口）
-                self.ui_components.update_connection_status(hmi_serial_available, 'control_board')
+                ui_components.update_connection_status(hmi_serial_available, 'control_board')
                 # 更新PSCADA串口状态（SCADA串口）
-                self.ui_components.update_connection_status(scada_serial_available, 'pscada')
+                ui_components.update_connection_status(scada_serial_available, 'pscada')
                 # 更新WebSocket连接状态
-                self.ui_components.update_connection_status(websocket_connected, 'websocket')
+                ui_components.update_connection_status(websocket_connected, 'websocket')
                 
         except Exception as e:
             logger.error(f"处理连接状态消息失败: {e}")
     
-    async def _on_serial_status_received(self, data: dict):
+    async def _on_serial_status_received(self, data: dict, device_id: str = None):
         """处理串口状态消息回调（兼容旧版本）"""
         pass
         try:
@@ -334,35 +389,37 @@ class RPLDeviceHMI:
             logger.info(f"收到串口状态消息（旧版本） - HMI: {hmi_serial_available}, SCADA: {scada_serial_available}, control_board: {control_board_serial_available}")
             logger.info(f"完整数据: {data}")
             
-            if self.ui_components:
+            ui_components = self._get_ui_components(device_id)
+            if ui_components:
                 # 更新控制板串口状态（HMI串口）
-                self.ui_components.update_connection_status(hmi_serial_available, 'control_board')
+                ui_components.update_connection_status(hmi_serial_available, 'control_board')
                 # 更新PSCADA串口状态（SCADA串口）
-                self.ui_components.update_connection_status(scada_serial_available, 'pscada')
+                ui_components.update_connection_status(scada_serial_available, 'pscada')
                 
         except Exception as e:
             logger.error(f"处理串口状态消息失败: {e}")
     
     def cleanup(self):
         """清理资源"""
-        if self.websocket_client:
-            self.websocket_client.close()
+        if self.device_manager:
+            for client in self.device_manager.clients.values():
+                client.close()
     
     async def start_websocket(self):
-        """启动WebSocket连接"""
-        if self.websocket_client:
+        """启动所有设备的WebSocket连接（已连接的设备不重复连接）"""
+        if self.device_manager:
             logger.info("开始连接WebSocket服务器")
-            result = await self.websocket_client.connect()
-            logger.info(f"WebSocket连接结果: {result}")
+            results = await self.device_manager.connect_all()
+            logger.info(f"WebSocket连接结果: {results}")
             
             # 获取连接状态
-            status = self.websocket_client.get_connection_status()
+            status = self.device_manager.get_status()
             logger.info(f"WebSocket连接状态: {status}")
     
     async def shutdown(self):
         """关闭应用"""
-        if self.websocket_client:
-            await self.websocket_client.disconnect()
+        if self.device_manager:
+            await self.device_manager.disconnect_all()
         logger.info("应用已关闭")
 
 # 全局应用实例
@@ -377,8 +434,8 @@ async def index():
     if hmi_app.current_user:
         # 已登录，显示主界面
         hmi_app._create_main_layout()
-        # 确保WebSocket连接在页面加载完成后建立
-        ui.timer(1.0, hmi_app.start_websocket, once=True)
+        # 确保WebSocket连接在页面加载完成后建立（定时器在浏览器连接后才开始计时，无需再等待）
+        ui.timer(0.1, hmi_app.start_websocket, once=True)
         # 显示欢迎消息
         ui.notify(f'欢迎 {hmi_app.current_user["display_name"]} 登录系统！', type='positive')
     else:
@@ -386,16 +443,16 @@ async def index():
         hmi_app._create_login_page()
 
 @ui.page('/main')
-async def main_page():
-    """主界面页面"""
+async def main_page(device: str = ''):
+    """主界面页面（device为显示的设备ID，多台设备时由顶部栏切换）"""
     if not hmi_app.current_user:
         ui.navigate.to('/')
         return
     
     # 创建主界面
-    hmi_app._create_main_layout()
-    # 确保WebSocket连接在页面加载完成后建立
-    ui.timer(1.0, hmi_app.start_websocket, once=True)
+    hmi_app._create_main_layout(device or None)
+    # 确保WebSocket连接在页面加载完成后建立（定时器在浏览器连接后才开始计时，无需再等待）
+    ui.timer(0.1, hmi_app.start_websocket, once=True)
     # 显示欢迎消息
     ui.notify(f'欢迎 {hmi_app.current_user["display_name"]} 登录系统！', type='positive')
 
@@ -0,0 +1,273 @@
+"""
+消息编解码模块
+Message Codec Module
+"""
+# flake8: noqa
+import json
+import logging
+from itertools import chain
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 可选的高性能JSON库，未安装时回退到标准库
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于运行环境
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - 取决于运行环境
+    msgspec = None
+
+# 可选的二进制帧编码库，与服务器协商后使用
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - 取决于运行环境
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - 取决于运行环境
+    cbor2 = None
+
+
+class FrozenDict(dict):
+    """只读字典：解码后的消息在所有回调之间共享，禁止就地修改
+
+    需要修改时请先复制: ``dict(data)``
+    """
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("消息数据为只读，请先复制再修改")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """只读列表：与FrozenDict配合，保证整条消息不可修改"""
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("消息数据为只读，请先复制再修改")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __iadd__ = _readonly
+    __imul__ = _readonly
+    append = _readonly
+    extend = _readonly
+    insert = _readonly
+    pop = _readonly
+    remove = _readonly
+    clear = _readonly
+    sort = _readonly
+    reverse = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+_CONTAINER_TYPE_SET = frozenset((dict, list))
+_DICT_TYPE_SET = frozenset((dict,))
+
+
+def _freeze_dict(value: dict) -> FrozenDict:
+    frozen = FrozenDict(value)
+    # 只对容器类型的值递归，标量值随FrozenDict(value)一次性复制；
+    # 用isdisjoint在C层面判断是否含有容器，纯标量字典（如数据点）无需逐项检查
+    if _CONTAINER_TYPE_SET.isdisjoint(map(type, value.values())):
+        return frozen
+    for key, item in value.items():
+        item_type = type(item)
+        if item_type is dict:
+            dict.__setitem__(frozen, key, _freeze_dict(item))
+        elif item_type is list:
+            dict.__setitem__(frozen, key, _freeze_list(item))
+    return frozen
+
+
+def _freeze_list(value: list) -> FrozenList:
+    item_types = set(map(type, value))
+    if _CONTAINER_TYPE_SET.isdisjoint(item_types):
+        return FrozenList(value)
+    # 数据点列表等"字典列表且字典内全是标量"的情况，全部在C层面完成转换
+    if item_types == _DICT_TYPE_SET and _CONTAINER_TYPE_SET.isdisjoint(
+            map(type, chain.from_iterable(map(dict.values, value)))):
+        return FrozenList(map(FrozenDict, value))
+    return FrozenList([freeze(item) for item in value])
+
+
+def freeze(value: Any) -> Any:
+    """将解码结果递归转换为只读结构"""
+    value_type = type(value)
+    if value_type is dict:
+        return _freeze_dict(value)
+    if value_type is list:
+        return _freeze_list(value)
+    return value
+
+
+class JsonCodec:
+    """JSON编解码器
+
+    Attributes:
+        name: 实际使用的实现（orjson / msgspec / json）
+    """
+
+    def __init__(self, name: str, loads: Callable[[Union[str, bytes]], Any], dumps: Callable[[Any], str],
+                 fallback_errors: Tuple[type, ...] = ()):
+        """
+        Args:
+            fallback_errors: 解码时抛出这些异常则改用标准库重新解码
+                （orjson/msgspec不接受标准库允许的NaN、Infinity）
+        """
+        self.name = name
+        self._loads = loads
+        self._dumps = dumps
+        self._fallback_errors = fallback_errors
+
+    def loads(self, payload: Union[str, bytes]) -> Any:
+        """解码为普通Python对象"""
+        try:
+            return self._loads(payload)
+        except self._fallback_errors:
+            return json.loads(payload)
+
+    def dumps(self, message: Any) -> str:
+        """编码为UTF-8文本，中文不转义
+
+        各实现的输出解码后相同，但不逐字节相同：orjson/msgspec不加分隔空格，NaN/Infinity编码为null
+        （标准库输出NaN/Infinity），非字符串键统一转为字符串。帧录制保存的是实际发送的文本，
+        需要逐字节比较时应比较录制的帧，而不是重新编码的结果。
+        """
+        return self._dumps(message)
+
+    def decode_frame(self, payload: Union[str, bytes]) -> Any:
+        """解码一帧消息，只解码一次，返回可在所有回调间共享的只读结构"""
+        return freeze(self.loads(payload))
+
+    def __repr__(self) -> str:
+        return f"JsonCodec({self.name})"
+
+
+def _orjson_dumps(message: Any) -> str:
+    # 与标准库一致，接受整数等非字符串键
+    return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+def _stdlib_dumps(message: Any) -> str:
+    return json.dumps(message, ensure_ascii=False)
+
+
+def _build_codecs() -> Dict[str, JsonCodec]:
+    """构建当前环境可用的编解码器"""
+    codecs = {'json': JsonCodec('json', json.loads, _stdlib_dumps)}
+    if msgspec is not None:
+        encoder = msgspec.json.Encoder()
+        codecs['msgspec'] = JsonCodec(
+            'msgspec',
+            msgspec.json.decode,
+            lambda message: encoder.encode(message).decode('utf-8'),
+            (msgspec.DecodeError,),
+        )
+    if orjson is not None:
+        codecs['orjson'] = JsonCodec('orjson', orjson.loads, _orjson_dumps, (orjson.JSONDecodeError,))
+    return codecs
+
+
+AVAILABLE_CODECS = _build_codecs()
+
+# 各实现解码失败时抛出的异常类型（orjson.JSONDecodeError继承自ValueError）
+DECODE_ERRORS = (ValueError,) + tuple(
+    error for error in (
+        msgspec.DecodeError if msgspec is not None else None,
+        msgpack.UnpackException if msgpack is not None else None,
+        cbor2.CBORDecodeError if cbor2 is not None else None,
+    ) if error is not None
+)
+
+# 自动选择时的优先顺序
+CODEC_PREFERENCE = ('orjson', 'msgspec', 'json')
+
+
+def get_codec(name: str = 'auto') -> JsonCodec:
+    """获取JSON编解码器
+
+    Args:
+        name: auto / orjson / msgspec / json，指定的库未安装时回退到自动选择
+    """
+    name = (name or 'auto').lower()
+    if name in AVAILABLE_CODECS:
+        return AVAILABLE_CODECS[name]
+    if name != 'auto':
+        logger.warning(f"JSON编解码器 {name} 不可用，改为自动选择")
+    for candidate in CODEC_PREFERENCE:
+        if candidate in AVAILABLE_CODECS:
+            return AVAILABLE_CODECS[candidate]
+    return AVAILABLE_CODECS['json']
+
+
+class BinaryCodec:
+    """二进制帧解码器（MessagePack / CBOR）
+
+    与设备注册时协商的编码一致；JSON文本帧仍由JsonCodec处理。
+    """
+
+    def __init__(self, name: str, loads: Callable[[bytes], Any]):
+        self.name = name
+        self._loads = loads
+
+    def loads(self, payload: bytes) -> Any:
+        """解码为普通Python对象"""
+        return self._loads(payload)
+
+    def decode_frame(self, payload: bytes) -> Any:
+        """解码一帧二进制消息，返回与JSON路径相同的只读结构"""
+        return freeze(self._loads(payload))
+
+    def __repr__(self) -> str:
+        return f"BinaryCodec({self.name})"
+
+
+def _build_binary_codecs() -> Dict[str, BinaryCodec]:
+    """构建当前环境可用的二进制解码器"""
+    codecs = {}
+    if msgpack is not None:
+        codecs['msgpack'] = BinaryCodec('msgpack', lambda payload: msgpack.unpackb(payload, raw=False))
+    if cbor2 is not None:
+        codecs['cbor'] = BinaryCodec('cbor', cbor2.loads)
+    return codecs
+
+
+AVAILABLE_BINARY_CODECS = _build_binary_codecs()
+
+
+def available_binary_encodings(preferred: Optional[List[str]] = None) -> List[str]:
+    """获取可向服务器声明的二进制编码列表
+
+    Args:
+        preferred: 配置中指定的编码顺序，为None时返回全部可用编码
+    """
+    if preferred is None:
+        return list(AVAILABLE_BINARY_CODECS)
+    return [name for name in preferred if name in AVAILABLE_BINARY_CODECS]
+
+
+def get_binary_codec(name: Optional[str]) -> Optional[BinaryCodec]:
+    """根据协商结果获取二进制解码器，json或未知编码返回None"""
+    if not name:
+        return None
+    return AVAILABLE_BINARY_CODECS.get(name.lower())
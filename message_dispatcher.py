@@ -0,0 +1,206 @@
+"""
+消息分发模块
+Message Dispatch Module
+"""
+# flake8: noqa
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDispatcher:
+    """按消息类型分发的非阻塞消息队列
+
+    每种消息类型拥有一个有界asyncio队列和一个工作协程。接收循环只负责入队，
+    不会等待任何回调执行完成；某个类型的回调变慢只会让该类型的队列积压，
+    队列满时丢弃最旧的一帧并计数，不影响其他类型的消息。
+    故障事件、请求应答等不能丢弃的类型使用不限长度的队列。
+    """
+
+    def __init__(self, queue_size: int = 100,
+                 on_dispatch: Optional[Callable[[str, float, Callable], None]] = None,
+                 lossless_types: Iterable[str] = ()):
+        """
+        Args:
+            queue_size: 每种消息类型的队列长度
+            lossless_types: 不丢帧的消息类型，队列不限长度（capacity统计为0）
+            on_dispatch: 每取出一帧时以(消息类型, 排队时间秒, 处理函数)调用，用于延迟统计
+                （多台设备共享分发器时按处理函数所属的连接区分设备）
+        """
+        self.queue_size = max(1, int(queue_size))
+        self.on_dispatch = on_dispatch
+        self.lossless_types = frozenset(lossless_types)
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._dropped: Dict[str, int] = {}
+        self._processed: Dict[str, int] = {}
+        self._max_depth: Dict[str, int] = {}
+
+    def submit(self, message_type: str, handler: Callable[[Any], Awaitable[None]], message: Any) -> bool:
+        """将消息放入对应类型的队列（不等待处理）
+
+        Returns:
+            bool: 未发生丢帧返回True，队列已满并丢弃了最旧的一帧返回False
+        """
+        queue = self._queues.get(message_type)
+        if queue is None:
+            queue = self._create_queue(message_type)
+
+        accepted = True
+        if queue.full():
+            try:
+                queue.get_nowait()
+                queue.task_done()
+            except asyncio.QueueEmpty:
+                pass
+            self._dropped[message_type] += 1
+            accepted = False
+
+        queue.put_nowait((handler, message, time.perf_counter()))
+
+        depth = queue.qsize()
+        if depth > self._max_depth[message_type]:
+            self._max_depth[message_type] = depth
+        return accepted
+
+    def _create_queue(self, message_type: str) -> asyncio.Queue:
+        """创建消息类型的队列并启动工作协程"""
+        queue = asyncio.Queue(maxsize=0 if message_type in self.lossless_types else self.queue_size)
+        self._queues[message_type] = queue
+        self._dropped.setdefault(message_type, 0)
+        self._processed.setdefault(message_type, 0)
+        self._max_depth.setdefault(message_type, 0)
+        self._workers[message_type] = asyncio.create_task(self._worker(message_type, queue))
+        logger.debug(f"创建消息分发队列: {message_type}")
+        return queue
+
+    async def _worker(self, message_type: str, queue: asyncio.Queue) -> None:
+        """工作协程：按顺序处理同一类型的消息"""
+        while True:
+            handler, message, enqueued_at = await queue.get()
+            if self.on_dispatch is not None:
+                self.on_dispatch(message_type, time.perf_counter() - enqueued_at, handler)
+            try:
+                await handler(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"分发消息失败 ({message_type}): {e}")
+            finally:
+                self._processed[message_type] += 1
+                queue.task_done()
+
+    async def join(self) -> None:
+        """等待所有队列中的消息处理完成"""
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    def stop(self) -> None:
+        """停止所有工作协程并清空队列"""
+        for task in self._workers.values():
+            task.cancel()
+        self._workers.clear()
+        self._queues.clear()
+
+    def get_queue_depth(self, message_type: str) -> int:
+        """获取某个消息类型当前的队列深度"""
+        queue = self._queues.get(message_type)
+        return queue.qsize() if queue else 0
+
+    def get_dropped_count(self, message_type: str) -> int:
+        """获取某个消息类型的丢帧数"""
+        return self._dropped.get(message_type, 0)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取各消息类型的队列统计信息"""
+        stats = {}
+        for message_type in self._dropped:
+            stats[message_type] = {
+                'depth': self.get_queue_depth(message_type),
+                'max_depth': self._max_depth.get(message_type, 0),
+                'capacity': self._queues[message_type].maxsize if message_type in self._queues else self.queue_size,
+                'processed': self._processed.get(message_type, 0),
+                'dropped': self._dropped.get(message_type, 0),
+            }
+        return stats
+
+
+class CoalescingSubscription:
+    """最新值合并订阅
+
+    订阅者处理不过来时，只投递最新的一帧，中间被覆盖的帧计入skipped。
+    适用于analog_data、system_status、full_snapshot等只关心最新值的高频消息。
+    """
+
+    def __init__(self, message_type: str, callback: Callable[[Any], Awaitable[None]],
+                 on_delivered: Optional[Callable[[float, Any], None]] = None):
+        """
+        Args:
+            message_type: 消息类型
+            callback: 订阅者回调
+            on_delivered: 每次投递完成后以(回调耗时秒, 投递的帧)调用，用于统计
+        """
+        self.message_type = message_type
+        self.callback = callback
+        self.on_delivered = on_delivered
+        self.delivered = 0
+        self.skipped = 0
+        self._pending = None
+        self._has_pending = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def __call__(self, data: Any) -> None:
+        """作为普通数据回调被调用时，只登记最新帧，不等待订阅者处理"""
+        self.offer(data)
+
+    def offer(self, data: Any) -> None:
+        """登记最新一帧，订阅者空闲时立即投递"""
+        if self._has_pending:
+            self.skipped += 1
+        self._pending = data
+        self._has_pending = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._deliver())
+
+    async def _deliver(self) -> None:
+        """投递循环：每次取出当前最新帧交给订阅者"""
+        while self._has_pending:
+            data = self._pending
+            self._pending = None
+            self._has_pending = False
+            started = time.perf_counter()
+            try:
+                await self.callback(data)
+            except Exception as e:
+                logger.error(f"合并订阅回调执行失败 ({self.message_type}): {e}")
+            self.delivered += 1
+            if self.on_delivered is not None:
+                self.on_delivered(time.perf_counter() - started, data)
+
+    async def join(self) -> None:
+        """等待已登记的帧投递完成"""
+        while self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+
+    def matches(self, callback: Callable) -> bool:
+        """判断是否为指定回调函数的订阅"""
+        return self.callback == callback
+
+    def cancel(self) -> None:
+        """取消订阅，丢弃尚未投递的帧"""
+        self._pending = None
+        self._has_pending = False
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取投递和跳帧统计"""
+        return {
+            'callback': getattr(self.callback, '__qualname__', repr(self.callback)),
+            'delivered': self.delivered,
+            'skipped': self.skipped,
+            'pending': self._has_pending,
+        }
@@ -0,0 +1,173 @@
+"""
+消息统计模块
+Message Metrics Module
+"""
+# flake8: noqa
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+# 默认直方图分桶上限
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288, 1048576)
+TIME_BUCKETS_MS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """固定分桶直方图，记录次数、总和、最小/最大值，并按分桶估算分位数"""
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # 最后一个桶记录超过上限的值
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float) -> None:
+        """记录一个值"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """估算分位数（返回所在分桶的上限，超出最大分桶时返回最大值）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def get_stats(self, digits: int = 3) -> Dict[str, Any]:
+        """获取统计摘要"""
+        if not self.count:
+            return {'count': 0, 'avg': None, 'min': None, 'max': None, 'p50': None, 'p95': None, 'p99': None}
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, digits),
+            'min': round(self.min, digits),
+            'max': round(self.max, digits),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+    def get_buckets(self) -> List[List[Any]]:
+        """获取分桶计数 [[上限, 次数], ...]，上限为None表示超过最大分桶"""
+        bounds = list(self.bounds) + [None]
+        return [[bound, count] for bound, count in zip(bounds, self.counts)]
+
+
+class RateMeter:
+    """按秒分桶的速率计，统计最近window秒内每秒的平均次数"""
+    __slots__ = ('window', '_buckets')
+
+    def __init__(self, window: int = 10):
+        self.window = max(1, int(window))
+        self._buckets = deque()  # [秒, 次数]
+
+    def mark(self, now: Optional[float] = None) -> None:
+        """记录一次事件"""
+        second = int(time.monotonic() if now is None else now)
+        buckets = self._buckets
+        if buckets and buckets[-1][0] == second:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([second, 1])
+            while buckets and buckets[0][0] <= second - self.window - 1:
+                buckets.popleft()
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """最近window个完整秒内的平均速率（次/秒）"""
+        current = int(time.monotonic() if now is None else now)
+        start = current - self.window
+        total = sum(count for second, count in self._buckets if start <= second < current)
+        return total / self.window
+
+
+class MessageTypeMetrics:
+    """单个消息类型的统计"""
+    __slots__ = ('count', 'bytes', 'rate', 'size', 'decode_ms', 'callback_ms', 'callbacks')
+
+    def __init__(self, rate_window: int):
+        self.count = 0
+        self.bytes = 0
+        self.rate = RateMeter(rate_window)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.decode_ms = Histogram(TIME_BUCKETS_MS)
+        self.callback_ms = Histogram(TIME_BUCKETS_MS)
+        self.callbacks: Dict[str, Histogram] = {}
+
+
+class MessageMetrics:
+    """按消息类型统计接收速率、帧大小、解码耗时和回调耗时"""
+
+    def __init__(self, rate_window: int = 10):
+        self.rate_window = rate_window
+        self.started_at = time.time()
+        self._types: Dict[str, MessageTypeMetrics] = {}
+
+    def _get(self, message_type: str) -> MessageTypeMetrics:
+        metrics = self._types.get(message_type)
+        if metrics is None:
+            metrics = self._types[message_type] = MessageTypeMetrics(self.rate_window)
+        return metrics
+
+    def record_frame(self, message_type: str, size: int, decode_seconds: float) -> None:
+        """记录收到的一帧（字节数与解码耗时）"""
+        metrics = self._get(message_type)
+        metrics.count += 1
+        metrics.bytes += size
+        metrics.rate.mark()
+        metrics.size.observe(size)
+        metrics.decode_ms.observe(decode_seconds * 1000)
+
+    def record_callback(self, message_type: str, callback_name: str, seconds: float) -> None:
+        """记录一次回调执行耗时"""
+        metrics = self._get(message_type)
+        elapsed_ms = seconds * 1000
+        metrics.callback_ms.observe(elapsed_ms)
+        histogram = metrics.callbacks.get(callback_name)
+        if histogram is None:
+            histogram = metrics.callbacks[callback_name] = Histogram(TIME_BUCKETS_MS)
+        histogram.observe(elapsed_ms)
+
+    def reset(self) -> None:
+        """清空所有统计"""
+        self._types.clear()
+        self.started_at = time.time()
+
+    def get_stats(self, include_buckets: bool = False) -> Dict[str, Dict[str, Any]]:
+        """获取各消息类型的统计（可直接序列化为JSON导出）
+
+        Args:
+            include_buckets: 是否包含直方图分桶计数
+        """
+        stats = {}
+        for message_type, metrics in self._types.items():
+            entry = {
+                'count': metrics.count,
+                'rate_per_sec': round(metrics.rate.rate(), 2),
+                'bytes_total': metrics.bytes,
+                'size_bytes': metrics.size.get_stats(1),
+                'decode_ms': metrics.decode_ms.get_stats(),
+                'callback_ms': metrics.callback_ms.get_stats(),
+                'callbacks': {name: histogram.get_stats() for name, histogram in metrics.callbacks.items()},
+            }
+            if include_buckets:
+                entry['buckets'] = {
+                    'size_bytes': metrics.size.get_buckets(),
+                    'decode_ms': metrics.decode_ms.get_buckets(),
+                    'callback_ms': metrics.callback_ms.get_buckets(),
+                }
+            stats[message_type] = entry
+        return stats
@@ -0,0 +1,200 @@
+"""
+消息发送模块
+Message Sender Module
+"""
+# flake8: noqa
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 发送优先级（数值越小越先发送）
+PRIORITY_CONTROL = 0    # 控制命令、参数写入
+PRIORITY_READ = 1       # 参数读取、故障录波查询等
+PRIORITY_HEARTBEAT = 2  # 心跳
+
+PRIORITY_NAMES = {
+    PRIORITY_CONTROL: 'control',
+    PRIORITY_READ: 'read',
+    PRIORITY_HEARTBEAT: 'heartbeat',
+}
+
+# 未列出的消息类型按PRIORITY_READ发送
+MESSAGE_PRIORITIES = {
+    'control_cmd': PRIORITY_CONTROL,
+    'param_write': PRIORITY_CONTROL,
+    'fault_record_cancel': PRIORITY_CONTROL,
+    'heartbeat': PRIORITY_HEARTBEAT,
+}
+
+
+def get_priority(message_type: str) -> int:
+    """获取消息类型的发送优先级"""
+    return MESSAGE_PRIORITIES.get(message_type, PRIORITY_READ)
+
+
+class _OutboundItem:
+    """发送队列中的一条消息"""
+    __slots__ = ('message_type', 'payload', 'future', 'enqueued_at')
+
+    def __init__(self, message_type: str, payload: Any, future: asyncio.Future):
+        self.message_type = message_type
+        self.payload = payload
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class OutboundQueue:
+    """按优先级发送的出站消息队列
+
+    控制命令和参数写入最先发送，读取请求其次，心跳最后；尚未发送的心跳只保留
+    最新一条。由单个发送协程按顺序写入连接，每次唤醒连续发送所有已就绪的消息。
+    websocket.send在发送缓冲区超过高水位时会等待，此时队列积压，
+    队列满后put()等待空位，从而将背压传递给调用方。
+    """
+
+    def __init__(self, max_size: int = 1000, log_sample: int = 100):
+        self.max_size = max(1, int(max_size))
+        self.log_sample = max(1, int(log_sample))
+        self._lanes = {priority: deque() for priority in PRIORITY_NAMES}
+        self._size = 0
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._send: Optional[Callable[[Any], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self._sent = {priority: 0 for priority in PRIORITY_NAMES}
+        self._failed = {priority: 0 for priority in PRIORITY_NAMES}
+        self._latency_total = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self._latency_max = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.coalesced_heartbeats = 0
+        self.backpressure_waits = 0
+        self._sent_total = 0
+
+    def start(self, send: Callable[[Any], Awaitable[None]]) -> None:
+        """使用新连接的发送函数启动发送协程"""
+        self.stop()
+        self._send = send
+        self._task = asyncio.create_task(self._sender())
+
+    def stop(self) -> None:
+        """停止发送协程，尚未发送的消息返回发送失败"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        for lane in self._lanes.values():
+            while lane:
+                item = lane.popleft()
+                if not item.future.done():
+                    item.future.set_result(False)
+        self._size = 0
+        self._not_empty.clear()
+        self._not_full.set()
+
+    async def put(self, message_type: str, payload: Any) -> bool:
+        """将已编码的消息放入队列，并等待其写入连接
+
+        Returns:
+            bool: 写入成功返回True，队列停止时返回False
+
+        Raises:
+            Exception: 写入连接失败时抛出发送时的异常
+        """
+        if self._task is None:
+            return False
+        priority = get_priority(message_type)
+        lane = self._lanes[priority]
+
+        if priority == PRIORITY_HEARTBEAT and lane:
+            # 尚未发送的心跳只保留最新一条，调用方共享同一发送结果
+            item = lane[-1]
+            item.payload = payload
+            self.coalesced_heartbeats += 1
+            return await asyncio.shield(item.future)
+
+        while self._size >= self.max_size:
+            self.backpressure_waits += 1
+            self._not_full.clear()
+            await self._not_full.wait()
+            if self._task is None:
+                return False
+
+        item = _OutboundItem(message_type, payload, asyncio.get_running_loop().create_future())
+        lane.append(item)
+        self._size += 1
+        self._not_empty.set()
+        return await asyncio.shield(item.future)
+
+    def _pop(self) -> _OutboundItem:
+        """取出优先级最高的一条消息"""
+        for lane in self._lanes.values():
+            if lane:
+                self._size -= 1
+                if self._size < self.max_size:
+                    self._not_full.set()
+                return lane.popleft()
+        raise IndexError("发送队列为空")
+
+    async def _sender(self) -> None:
+        """发送协程：按优先级顺序写入连接"""
+        while True:
+            await self._not_empty.wait()
+            # 一次唤醒内连续发送所有已就绪的消息
+            while self._size:
+                item = self._pop()
+                priority = get_priority(item.message_type)
+                try:
+                    await self._send(item.payload)
+                except asyncio.CancelledError:
+                    if not item.future.done():
+                        item.future.set_result(False)
+                    raise
+                except Exception as e:
+                    self._failed[priority] += 1
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                    continue
+
+                latency = time.perf_counter() - item.enqueued_at
+                self._sent[priority] += 1
+                self._latency_total[priority] += latency
+                if latency > self._latency_max[priority]:
+                    self._latency_max[priority] = latency
+                if not item.future.done():
+                    item.future.set_result(True)
+
+                # 日志采样：每log_sample条消息输出一次汇总，避免在发送路径上逐条记录
+                self._sent_total += 1
+                if self._sent_total % self.log_sample == 0:
+                    logger.info(f"已发送 {self._sent_total} 条消息，队列深度 {self._size}，"
+                                f"合并心跳 {self.coalesced_heartbeats} 次，背压等待 {self.backpressure_waits} 次")
+            self._not_empty.clear()
+
+    def get_depth(self) -> int:
+        """获取当前排队的消息数"""
+        return self._size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各优先级的发送统计（延迟单位：毫秒）"""
+        lanes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            sent = self._sent[priority]
+            lanes[name] = {
+                'depth': len(self._lanes[priority]),
+                'sent': sent,
+                'failed': self._failed[priority],
+                'avg_latency_ms': round(self._latency_total[priority] / sent * 1000, 3) if sent else 0.0,
+                'max_latency_ms': round(self._latency_max[priority] * 1000, 3),
+            }
+        return {
+            'lanes': lanes,
+            'depth': self._size,
+            'capacity': self.max_size,
+            'coalesced_heartbeats': self.coalesced_heartbeats,
+            'backpressure_waits': self.backpressure_waits,
+        }
@@ -3,8 +3,10 @@
 Fault Record Page
 """
 import logging
-from datetime import datetime
 from nicegui import ui
+from websocket_client import RequestError, RequestTimeoutError
+from subscription import SubscriptionScope
+from fault_record_assembler import FaultRecordAssembler
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,9 @@ logger = logging.getLogger(__name__)
 class FaultRecordPage:
     """故障录波查询页面"""
 
+    # 读取一条故障录波需分批传输，等待完成应答的超时时间（秒）
+    FAULT_READ_TIMEOUT = 120
+
     def __init__(self, config_manager, websocket_client):
         self.config = config_manager
         self.websocket_client = websocket_client
@@ -38,6 +43,9 @@ class FaultRecordPage:
         self.total_records = 0  # 总记录数
         self.current_record = 0  # 当前记录
         self.current_progress = 0  # 当前进度
+        # 当前读取的分块组装器，分块在接收循环中解析到预先分配的列数组
+        self.assembler = None
+        self.chunked_read = self.config.get_websocket_config().get('fault_record_chunked', True)
         
         # 获取配置
         self.analog_mapping = self._load_analog_mapping()
@@ -45,36 +53,26 @@ class FaultRecordPage:
         # self.input_bits = self._load_input_bits()
         # self.output_bits = self._load_output_bits()
         
-        # 注册WebSocket回调
+        # 注册WebSocket回调：目录、读取结果和清除结果通过websocket_client.request按request_id等待，
+        # 这里只订阅读取过程中的开始和进度通知（各会话共用，程序退出时由页面管理器关闭）
+        self.subscriptions = SubscriptionScope('故障录波')
+        self._setup_websocket_callbacks()
+
+    def _setup_websocket_callbacks(self):
+        """注册读取开始、进度和分块通知的回调"""
         if self.websocket_client:
-            self.websocket_client.register_message_callback(
-                'fault_record_list_ack', 
-                self._handle_directory_response
-            )
-            self.websocket_client.register_message_callback(
+            self.subscriptions.add(self.websocket_client.register_message_callback(
                 'fault_record_read_start', 
                 self._handle_read_start
-            )
-            self.websocket_client.register_message_callback(
+            ))
+            self.subscriptions.add(self.websocket_client.register_message_callback(
                 'fault_record_progress', 
                 self._handle_read_progress
-            )
-            self.websocket_client.register_message_callback(
-                'fault_record_complete', 
-                self._handle_read_complete
-            )
-            self.websocket_client.register_message_callback(
-                'fault_record_error', 
-                self._handle_read_error
-            )
-            self.websocket_client.register_message_callback(
-                'fault_record_cancelled', 
-                self._handle_read_cancelled
-            )
-            self.websocket_client.register_message_callback(
-                'control_ack', 
-                self._handle_clear_response
-            )
+            ))
+            self.subscriptions.add(self.websocket_client.register_message_callback(
+                'fault_record_chunk', 
+                self._handle_read_chunk
+            ))
 
     def _load_analog_mapping(self):
         """加载模拟量映射配置"""
@@ -117,6 +115,9 @@ class FaultRecordPage:
 
     def create_page(self):
         """创建页面"""
+        # 订阅已关闭时重新注册
+        if not self.subscriptions:
+            self._setup_websocket_callbacks()
         with ui.card().classes('w-full h-full') as main_card:
             self.main_container = main_card  # 保存主容器引用
             # 顶部控制面板
@@ -223,23 +224,27 @@ class FaultRecordPage:
             ui.notify('WebSocket未连接，请检查网络连接', type='negative')
             return
         
-        # 从配置文件获取设备ID
-        device_id = self.config.get('设备配置', '设备ID', 'HYP_RPLD_001')
+        # 本页面所属设备的ID（每台设备一套页面）
+        device_id = self.websocket_client.device_id
         
-        # 发送WebSocket请求
+        # 发送WebSocket请求并等待目录应答
         message = {
             'type': 'fault_record_list',
-            'device_id': device_id,
-            'request_id': f'req_dir_{datetime.now().timestamp()}'
+            'device_id': device_id
         }
         
-        result = await self.websocket_client.send_message(message['type'], message)
-        logger.info(f"消息发送结果: {result}")
+        try:
+            response = await self.websocket_client.request(message['type'], message)
+        except RequestTimeoutError as e:
+            logger.error(f"查询故障录波目录超时: {e}")
+            ui.notify('查询故障录波目录超时，未收到设备应答', type='negative')
+            return
+        except RequestError as e:
+            logger.error(f"查询故障录波目录失败: {e}")
+            ui.notify(f'查询故障录波目录失败: {e}', type='negative')
+            return
         
-        # if result:
-        #     ui.notify('正在查询故障录波目录...', type='info')
-        # else:
-        #     ui.notify('发送查询请求失败，请检查网络连接', type='negative')
+        await self._handle_directory_response(response)
 
     async def _query_detail(self):
         """查询故障录波详情"""
@@ -255,13 +260,14 @@ class FaultRecordPage:
         record_id = self.record_select.value
         
         self.is_reading = True
-        self.current_request_id = f'req_fault_read_{datetime.now().timestamp()}'
+        self.current_request_id = self.websocket_client.new_request_id('req_fault_read')
+        self.assembler = FaultRecordAssembler()
         
         # 先显示进度对话框，再发送请求
         self._show_progress_dialog()
         
-        # 从配置文件获取设备ID
-        device_id = self.config.get('设备配置', '设备ID', 'HYP_RPLD_001')
+        # 本页面所属设备的ID（每台设备一套页面）
+        device_id = self.websocket_client.device_id
         
         # 发送WebSocket请求
         message = {
@@ -270,16 +276,38 @@ class FaultRecordPage:
             'record_id': record_id,
             'request_id': self.current_request_id
         }
+        if self.chunked_read:
+            message['chunked'] = True
         
-        result = await self.websocket_client.send_message(message['type'], message)
-        logger.info(f"故障录波详情消息发送结果: {result}")
-        
-        # 如果发送失败，立即关闭进度对话框并显示错误
-        if not result:
+        try:
+            response = await self.websocket_client.request(
+                message['type'], message, timeout=self.FAULT_READ_TIMEOUT, assembler=self.assembler)
+        except RequestTimeoutError as e:
+            logger.error(f"读取故障录波超时: {e}")
             self.is_reading = False
             if self.progress_dialog:
                 self.progress_dialog.close()
-            ui.notify('发送查询请求失败，请检查网络连接', type='negative')
+            ui.notify('读取故障录波超时，未收到设备应答', type='negative')
+            return
+        except RequestError as e:
+            # 根据错误应答类型交给对应的处理函数
+            response_type = e.response.get('type') if e.response else None
+            if response_type == 'fault_record_cancelled':
+                await self._handle_read_cancelled(e.response)
+            elif response_type == 'fault_record_error':
+                await self._handle_read_error(e.response)
+            elif response_type == 'error':
+                await self._handle_general_error(e.response)
+            else:
+                # 发送失败或连接断开，立即关闭进度对话框并显示错误
+                logger.error(f"故障录波详情请求失败: {e}")
+                self.is_reading = False
+                if self.progress_dialog:
+                    self.progress_dialog.close()
+                ui.notify('发送查询请求失败，请检查网络连接', type='negative')
+            return
+        
+        await self._handle_read_complete(response)
 
     async def _cancel_reading(self):
         """取消读取"""
@@ -292,8 +320,8 @@ class FaultRecordPage:
         self.is_cancelling = True
         self.is_reading = False
         
-        # 从配置文件获取设备ID
-        device_id = self.config.get('设备配置', '设备ID', 'HYP_RPLD_001')
+        # 本页面所属设备的ID（每台设备一套页面）
+        device_id = self.websocket_client.device_id
         
         # 发送取消请求
         message = {
@@ -327,23 +355,28 @@ class FaultRecordPage:
         """清除故障录波记录"""
         logger.info("清除故障录波记录")
         
-        # 生成请求ID
-        import uuid
-        request_id = str(uuid.uuid4())
-        
         # 发送控制命令 - 只发送数据部分，不包含type字段
         message_data = {
             'cmd': 'fault_record_clear',
-            'request_id': request_id,
             'cmd_param': {
                 'coil_addr': '0x0110',
                 'confirm': True
             }
         }
         
-        await self.websocket_client.send_message('control_cmd', message_data)
         dialog.close()
-        # ui.notify('正在清除故障录波记录...', type='info')
+        try:
+            response = await self.websocket_client.request('control_cmd', message_data)
+        except RequestTimeoutError as e:
+            logger.error(f"清除故障录波记录超时: {e}")
+            ui.notify('清除故障录波记录超时，未收到设备应答', type='negative')
+            return
+        except RequestError as e:
+            logger.error(f"清除故障录波记录失败: {e}")
+            ui.notify(f'清除故障记录失败: {e}', type='negative')
+            return
+        
+        await self._handle_clear_response(response)
 
     def _show_progress_dialog(self):
         """显示进度对话框"""
@@ -433,6 +466,8 @@ class FaultRecordPage:
             await self._handle_read_start(message)
         elif msg_type == 'fault_record_progress':
             await self._handle_read_progress(message)
+        elif msg_type == 'fault_record_chunk':
+            await self._handle_read_chunk(message)
         elif msg_type == 'fault_record_complete':
             await self._handle_read_complete(message)
         elif msg_type == 'fault_record_error':
@@ -504,11 +539,22 @@ class FaultRecordPage:
         except Exception as e:
             logger.error(f"处理目录查询响应失败: {e}")
 
+    def _is_current_read(self, message):
+        """判断开始/进度通知是否属于当前的读取请求（未携带request_id时视为属于）"""
+        request_id = message.get('request_id')
+        if request_id is None and isinstance(message.get('data'), dict):
+            request_id = message['data'].get('request_id')
+        return request_id is None or request_id == self.current_request_id
+
     async def _handle_read_start(self, message):
         """处理读取开始响应"""
 
         logger.info(f"收到读取开始响应: {message}")
 
+        # 只处理当前读取请求的通知
+        if not self._is_current_read(message):
+            return
+
         # 如果正在取消，忽略开始消息
         if self.is_cancelling:
             logger.info("收到开始消息但正在取消中，忽略")
@@ -564,10 +610,18 @@ class FaultRecordPage:
 
     async def _handle_read_progress(self, message):
         """处理读取进度"""
+        # 只处理当前读取请求的通知
+        if not self._is_current_read(message):
+            return
+
         # 如果正在取消，忽略进度消息
         if self.is_cancelling:
             # logger.info("收到进度消息但正在取消中，忽略")
             return
+        
+        # 分块传输时进度按实际收到的字节数计算
+        if self.assembler is not None and self.assembler.chunks_received:
+            return
             
         try:
             # 适配后端实际发送的数据格式
@@ -599,6 +653,26 @@ class FaultRecordPage:
         except Exception as e:
             logger.error(f"处理读取进度失败: {e}")
     
+    async def _handle_read_chunk(self, message):
+        """处理读取分块：数据点已在接收循环中解析到组装器，这里只更新进度"""
+        if not self._is_current_read(message) or self.is_cancelling or self.assembler is None:
+            return
+        try:
+            self.current_progress = round(self.assembler.progress * 100, 1)
+            self.current_record = message.get('chunk_index', 0) + 1
+            self.total_records = message.get('total_chunks', self.total_records)
+            self._update_progress_ui()
+        except Exception as e:
+            logger.error(f"处理读取分块失败: {e}")
+
+    def _progress_text(self):
+        """进度文字：分块传输时显示已收到的字节数"""
+        if self.assembler is not None and self.assembler.bytes_received:
+            expected = self.assembler.expected_bytes or self.assembler.bytes_received
+            return (f"{self.current_progress}% "
+                    f"({self.assembler.bytes_received / 1024:.1f}/{expected / 1024:.1f} KB)")
+        return f"{self.current_progress}% ({self.current_record}/{self.total_records})"
+
     def _update_progress_ui(self):
         """更新进度条UI"""
         try:
@@ -609,14 +683,14 @@ class FaultRecordPage:
                         self.progress_bar.value = self.current_progress
                     
                     if hasattr(self, 'progress_text') and self.progress_text:
-                        self.progress_text.text = f"{self.current_progress}% ({self.current_record}/{self.total_records})"
+                        self.progress_text.text = self._progress_text()
             else:
                 # 如果没有主容器，直接更新UI
                 if hasattr(self, 'progress_bar') and self.progress_bar:
                     self.progress_bar.value = self.current_progress
                 
                 if hasattr(self, 'progress_text') and self.progress_text:
-                    self.progress_text.text = f"{self.current_progress}% ({self.current_record}/{self.total_records})"
+                    self.progress_text.text = self._progress_text()
         except Exception as e:
             logger.error(f"更新进度UI失败: {e}")
 
@@ -643,19 +717,26 @@ class FaultRecordPage:
                 data = message.get('data', {})
                 # logger.info("检测到读取完成标准格式")
             
+            # 分块传输的数据点已在接收过程中解析到组装器，未分块的完成消息在这里解析
+            record = self.assembler
+            if record is None or not record.complete:
+                record = FaultRecordAssembler()
+                record.feed(message)
+            if record.missing_points:
+                logger.warning(f"故障录波数据点不完整: 收到 {record.points_received}/{record.total_points}")
+            
             # 确保在主UI上下文中处理响应
             if self.main_container is not None:
                 with self.main_container:
                     if data:  # 检查是否有数据
                         # 获取故障记录数据
                         fault_info = data.get('fault_info', {})
-                        data_points = data.get('data_points', [])
                         
                         # 更新故障信息
                         self._update_fault_info(fault_info)
                         
                         # 更新数据表格
-                        self._update_data_table(data_points)
+                        self._update_data_table(record)
                         
                         # 更新进度条到100% - 确保完成时总是显示100%
                         self.current_progress = 100
@@ -687,19 +768,15 @@ class FaultRecordPage:
                 if data:  # 检查是否有数据
                     # 获取故障记录数据
                     fault_info = data.get('fault_info', {})
-                    data_points = data.get('data_points', [])
                     
                     # 记录数据点数量用于调试
-                    # logger.info(f"从完成响应中提取到 {len(data_points)} 个数据点")
-                    if len(data_points) > 0:
-                        logger.info(f"第一个数据点示例: {data_points[0] if data_points else '无'}")
-                        logger.info(f"最后一个数据点示例: {data_points[-1] if data_points else '无'}")
+                    logger.info(f"故障录波解析完成: {record.get_stats()}")
                     
                     # 更新故障信息
                     self._update_fault_info(fault_info)
                     
                     # 更新数据表格
-                    self._update_data_table(data_points)
+                    self._update_data_table(record)
                     
                     # 更新进度条到100% - 确保完成时总是显示100%
                     self.current_progress = 100
@@ -1055,51 +1132,39 @@ class FaultRecordPage:
             logger.error(f"解析故障码失败: {fault_bits}, 错误: {e}")
             return f'故障码解析错误: {fault_bits}'
 
-    def _update_data_table(self, data_points):
+    def _build_table_rows(self, record):
+        """按列数组生成表格行"""
+        system_status = record.get_column('system_status', '0x0000')
+        sv1 = record.get_column('channel3_sv1', 0)      # SV1: 通道3轨地电压
+        sa1 = record.get_column('channel1_sa1', 0)      # SA1: 通道1轨地电流
+        sa2 = record.get_column('channel2_sa2', 0)      # SA2: 通道2轨地电流
+        # 移除switch_input和switch_output，后端4寄存器格式不包含这些数据
+        return [
+            {
+                'index': i,
+                'system_status': system_status[i],
+                'sv1': f"{sv1[i]} V",
+                'sa1': f"{sa1[i]} A",
+                'sa2': f"{sa2[i]} A",
+            }
+            for i in range(record.total_points)
+        ]
+
+    def _update_data_table(self, record):
         """更新数据表格"""
         try:
             if not self.data_table:
                 return
             
-            # 记录实际数据点数量
-            # actual_count = len(data_points)
-            # logger.info(f"收到 {actual_count} 个数据点用于更新表格")
-            
             # 确保在主UI上下文中更新UI
             if self.main_container is not None:
                 with self.main_container:
-                    rows = []
-                    for i, point in enumerate(data_points):
-                        row = {
-                        'index': i,
-                        'system_status': point.get('system_status', '0x0000'),
-                        # 移除switch_input和switch_output，后端4寄存器格式不包含这些数据
-                        'sv1': f"{point.get('channel3_sv1', 0)} V",      # SV1: 通道3轨地电压
-                        'sa1': f"{point.get('channel1_sa1', 0)} A",      # SA1: 通道1轨地电流
-                        'sa2': f"{point.get('channel2_sa2', 0)} A",      # SA2: 通道2轨地电流
-                    }
-                        rows.append(row)
-                    
-                    # logger.info(f"生成表格行数: {len(rows)}")
-                    self.data_table.rows = rows
+                    self.data_table.rows = self._build_table_rows(record)
                     self.data_table.update()
                     logger.info(f"表格更新完成，显示 {len(self.data_table.rows)} 行")
             else:
                 # 如果没有主容器，直接更新UI
-                rows = []
-                for i, point in enumerate(data_points):
-                    row = {
-                        'index': i,
-                        'system_status': point.get('system_status', '0x0000'),
-                        # 移除switch_input和switch_output，后端4寄存器格式不包含这些数据
-                        'sv1': f"{point.get('channel3_sv1', 0)} V",      # SV1: 通道3轨地电压
-                        'sa1': f"{point.get('channel1_sa1', 0)} A",      # SA1: 通道1轨地电流
-                        'sa2': f"{point.get('channel2_sa2', 0)} A",      # SA2: 通道2轨地电流
-                    }
-                    rows.append(row)
-                
-                # logger.info(f"生成表格行数: {len(rows)}")
-                self.data_table.rows = rows
+                self.data_table.rows = self._build_table_rows(record)
                 self.data_table.update()
                 logger.info(f"表格更新完成，显示 {len(self.data_table.rows)} 行")
         except Exception as e:
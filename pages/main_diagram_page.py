@@ -4,9 +4,11 @@ Main Diagram Page
 """
 # flake8: noqa
 import logging
+import math
 from datetime import datetime
 from nicegui import ui
 from svg_display_utils import create_svg_display  # 导入SVG显示工具函数
+from subscription import SubscriptionScope
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,9 @@ logger = logging.getLogger(__name__)
 class MainDiagramPage:
     """主接线图页面类"""
     
+    # 显示期间需要的推送主题 -> 频率（帧/秒，0为设备原始频率）；SVG每0.1秒刷新一次，模拟量无需更高频率
+    PUSH_TOPICS = {'analog_data': 10, 'system_status': 0}
+    
     def __init__(self, config_manager, websocket_client):
         self.config = config_manager
         self.websocket_client = websocket_client
@@ -24,11 +29,14 @@ class MainDiagramPage:
         # 加载模拟量通道配置
         self.analog_channel_config = self.config.get_analog_channel_config()
         self.channel_id_map = {}  # 通道号到SVG控件ID的映射
+        # 模拟量通道布局 -> [(通道下标, SVG控件ID, 单位)]，通道不变时只匹配一次
+        self._analog_targets = (None, [])
         
         # 解析模拟量通道配置
         self._parse_analog_channel_config()
         
-        # 立即注册WebSocket回调
+        # 立即注册WebSocket回调（各会话共用，程序退出时由页面管理器关闭）
+        self.subscriptions = SubscriptionScope('主接线图')
         self._setup_svg_updater()
     
     def _parse_analog_channel_config(self):
@@ -52,6 +60,10 @@ class MainDiagramPage:
         
     def create_page(self) -> ui.column:
         """创建主接线图页面"""
+        # 订阅已关闭时重新注册
+        if not self.subscriptions:
+            self._setup_svg_updater()
+
         # 获取字体配置
         font_config = self.config.get_font_config()
         enable_responsive = font_config.get('enable_responsive_font', True)
@@ -137,9 +149,15 @@ class MainDiagramPage:
         """设置SVG控件更新器"""
         if self.websocket_client:
             # 注册数据回调
-            self.websocket_client.register_data_callback('analog_data', self._handle_analog_data_callback)
+            # 模拟量和系统状态只关心最新值，使用合并投递避免处理积压
+            self.subscriptions.add(self.websocket_client.register_data_callback(
+                'analog_data', self._handle_analog_data_callback, coalesce=True, typed=True))
             # switch_io数据类型已合并到system_status中，改为注册system_status回调
-            self.websocket_client.register_data_callback('system_status', self._handle_system_status_callback)
+            self.subscriptions.add(self.websocket_client.register_data_callback(
+                'system_status', self._handle_system_status_callback, coalesce=True, typed=True))
+            # 全量快照（连接后立即请求）同时包含模拟量和开关量，用于首屏显示
+            self.subscriptions.add(self.websocket_client.register_data_callback(
+                'full_snapshot', self._handle_full_snapshot_callback, coalesce=True, typed=True))
             # logger.info("已注册WebSocket数据回调")
         else:
             logger.warning("WebSocket客户端未初始化")
@@ -271,77 +289,55 @@ class MainDiagramPage:
         except Exception as e:
             logger.error(f"更新SVG控件失败: {e}")
     
-    async def _handle_analog_data_callback(self, data):
-        """处理模拟量数据回调"""
+    def _get_analog_targets(self, analog):
+        """按通道名称匹配SVG控件（通道名称包含配置的显示名称），结果随通道布局缓存"""
+        layout, targets = self._analog_targets
+        if layout is analog.layout:
+            return targets
+        targets = []
+        for index, name in enumerate(analog.names):
+            # 遍历通道配置，查找匹配的通道
+            for channel_num, channel_info in self.channel_id_map.items():
+                # SVG控件ID为空的是保留通道，跳过更新
+                if channel_info['display_name'] in name and channel_info['svg_id']:
+                    targets.append((index, channel_info['svg_id'], channel_info['unit']))
+                    break
+        self._analog_targets = (analog.layout, targets)
+        return targets
+    
+    async def _handle_analog_data_callback(self, message):
+        """处理模拟量数据回调（AnalogMessage消息对象）"""
         try:
-            # logger.info(f"主接线图页面收到模拟量数据: {data}")
-            
-            if isinstance(data, list):
-                for item in data:
-                    if not isinstance(item, dict):
-                        continue
-                        
-                    name = item.get('name', '')
-                    value = item.get('physical_value')
-                    unit = item.get('unit', '')
-                    
-                    # logger.info(f"处理模拟量项: name={name}, value={value}, unit={unit}")
-                    
-                    # 使用通用通道名称处理模拟量数据
-                    # 遍历通道配置，查找匹配的通道
-                    for channel_num, channel_info in self.channel_id_map.items():
-                        display_name = channel_info['display_name']
-                        svg_id = channel_info['svg_id']  # 直接使用配置文件中的SVG控件ID
-                        channel_unit = channel_info['unit']
-                        
-                        # 检查是否匹配当前通道
-                        if display_name in name:
-                            # 检查SVG控件ID是否为空，为空则跳过更新（保留通道）
-                            if not svg_id:
-                                # logger.info(f"通道{channel_num}({display_name})为保留通道，跳过更新")
-                                continue
-                                
-                            display_value = f"{value:.1f}{channel_unit}" if value is not None else f"0{channel_unit}"
-                            # logger.info(f"更新通道{channel_num}({svg_id}): {display_value}")
-                            # 直接传递SVG控件ID，不再需要转换
-                            self.queue_svg_update(svg_id, display_value, True)
-                            break
-            else:
-                logger.warning(f"模拟量数据格式不正确，期望列表，实际: {type(data)}")
+            analog = message.analog
+            values = analog.values
+            for index, svg_id, unit in self._get_analog_targets(analog):
+                value = values[index]
+                display_value = f"{value:.1f}{unit}" if not math.isnan(value) else f"0{unit}"
+                self.queue_svg_update(svg_id, display_value, True)
         except Exception as e:
             logger.error(f"处理模拟量数据失败: {e}")
             import traceback
             logger.error(f"详细错误信息: {traceback.format_exc()}")
 
-    async def _handle_system_status_callback(self, data: dict):
-        """处理系统状态数据回调（包含开关量信息）"""
+    async def _handle_system_status_callback(self, message):
+        """处理系统状态数据回调（SystemStatus消息对象，包含开关量信息）"""
         try:
-            # logger.info(f"主接线图页面收到系统状态数据: {data}")
-            
-            if isinstance(data, dict):
-                # 从system_status数据中提取KM1状态信息
-                # 根据配置文件，KM1状态在开关量输入点表(地址=0x0002)的bit0中定义
-                switch_input = data.get('switch_input', {})
-                
-                # logger.info(f"开关量输入: {switch_input}")
-                
-                if 'bit0' in switch_input:
-                    km1_value = switch_input['bit0']
-                    # 根据配置文件，bit0: 0=短接接触器分位(KM1分闸), 1=短接接触器合位(KM1合闸)
-                    state_text = '合位' if km1_value == 1 else '分位'  # 1表示合位，0表示分位
-                    # logger.info(f"KM1状态更新: bit0={km1_value} -> {state_text}")
-                    self.queue_svg_update('km1', state_text, True)
-                else:
-                    # 没有KM1状态数据时，设置为默认状态"分位"
-                    # logger.debug("开关量输入中未找到bit0 (KM1)，使用默认状态")
-                    self.queue_svg_update('km1', '分位', True)
-            else:
-                logger.warning(f"系统状态数据格式不正确，期望字典，实际: {type(data)}")
+            # 根据配置文件，KM1状态在开关量输入点表(地址=0x0002)的bit0中定义
+            # bit0: 0=短接接触器分位(KM1分闸), 1=短接接触器合位(KM1合闸)，没有数据时显示分位
+            switch_input = message.switch_input
+            km1_value = switch_input.get(0) if switch_input is not None else None
+            self.queue_svg_update('km1', '合位' if km1_value == 1 else '分位', True)
         except Exception as e:
             logger.error(f"处理系统状态数据失败: {e}")
             import traceback
             logger.error(f"详细错误信息: {traceback.format_exc()}")
 
+    async def _handle_full_snapshot_callback(self, message):
+        """处理全量快照回调（FullSnapshot消息对象，开关量分组同system_status，analog为模拟量）"""
+        await self._handle_system_status_callback(message)
+        if len(message.analog.names):
+            await self._handle_analog_data_callback(message)
+
     async def _handle_digital_data_callback(self, data: dict):
         """处理开关量数据回调（已废弃，保留用于兼容性）"""
         logger.warning("_handle_digital_data_callback方法已废弃，switch_io数据类型已合并到system_status中")
@@ -26,6 +26,9 @@ class PageManager:
         self.current_page = None
         self.pages = {}
         self.main_content_area = None
+        # 所有浏览器会话共用同一个页面管理器，各会话显示的页面和内容区域分别记录
+        self.session_pages = {}  # 会话ID -> 当前显示的页面键
+        self.content_areas = {}  # 会话ID -> 主内容区域
         self.current_user = None  # 添加当前用户信息
         self.logout_callback = None  # 添加登出回调
         
@@ -39,6 +42,16 @@ class PageManager:
         self.fault_record_page = FaultRecordPage(config_manager, websocket_client)
         # 用户管理页面在需要时动态创建
         self.user_management_page = None
+        # 页面键 -> 页面实例（用于查找页面需要的推送主题）
+        self.page_objects = {
+            'show_main_diagram': self.main_diagram_page,
+            'show_system_status': self.system_status_page,
+            'show_event_record': self.event_record_page,
+            'show_parameter_settings': self.parameter_settings_page,
+            'show_real_time_curve': self.real_time_curve_page,
+            'show_history_curve': self.history_curve_page,
+            'show_fault_record': self.fault_record_page,
+        }
 
     def set_logout_callback(self, callback) -> None:
         """设置登出回调函数"""
@@ -48,8 +61,11 @@ class PageManager:
         """设置页面"""
         enabled_pages = self.config.get_enabled_pages()
 
+        session_id = ui.context.client.id
+
         # 创建页面容器
         self.main_content_area = ui.column().classes('w-full h-full')
+        self.content_areas[session_id] = self.main_content_area
 
         with self.main_content_area:
             # 默认显示主接线图页面
@@ -66,6 +82,26 @@ class PageManager:
                     self.current_page = 'default'
                     self._create_placeholder_page("系统")
 
+        self.session_pages[session_id] = self.current_page
+        self._update_push_topics(session_id, self.current_page)
+
+    def _update_push_topics(self, session_id: str, page_key: str) -> None:
+        """按会话当前显示的页面登记该会话需要的推送主题，所有会话汇总后由客户端向服务器订阅"""
+        if not self.websocket_client:
+            return
+        page = self.page_objects.get(page_key)
+        self.websocket_client.set_topic_demand(session_id, getattr(page, 'PUSH_TOPICS', {}))
+
+    def _leave_page(self, client, page_key: str) -> None:
+        """会话离开页面（切换页面或会话结束），页面对象由各会话共用，只释放该会话占用的资源"""
+        # 系统状态页面只在显示期间订阅，没有其他会话显示时关闭，再次显示时create_page重新注册
+        if page_key == 'show_system_status' and not any(
+                key == page_key for session_id, key in self.session_pages.items() if session_id != client.id):
+            self.system_status_page.subscriptions.close()
+        # 实时曲线页面移除该会话（采样继续写入缓冲区），没有会话查看时停止绘图
+        if page_key == 'show_real_time_curve':
+            self.real_time_curve_page.cleanup(client)
+
     def _create_placeholder_page(self, page_name: str) -> None:
         """创建占位页面"""
         with ui.card().classes('w-full h-full'):
@@ -77,20 +113,25 @@ class PageManager:
                 ui.label('该页面将在后续任务中实现').classes('text-body2 text-grey-5')
 
     def switch_page(self, page_key: str) -> None:
-        """切换页面"""
-        if page_key == self.current_page:
+        """切换当前会话显示的页面"""
+        client = ui.context.client
+        current_page = self.session_pages.get(client.id, self.current_page)
+        if page_key == current_page:
             return  # 已经是当前页面，无需切换
 
         logger.info(f"切换到页面: {page_key}")
 
+        self._leave_page(client, current_page)
+
         # 清空当前内容
-        if self.main_content_area:
-            self.main_content_area.clear()
+        content_area = self.content_areas.get(client.id, self.main_content_area)
+        if content_area:
+            content_area.clear()
 
         # 根据页面键创建对应页面
         enabled_pages = self.config.get_enabled_pages()
 
-        with self.main_content_area:
+        with content_area:
             if page_key == 'show_main_diagram':
                 self.main_diagram_page.create_page()
             elif page_key == 'show_system_status':
@@ -117,6 +158,8 @@ class PageManager:
                 self._create_placeholder_page("未知页面")
 
         self.current_page = page_key
+        self.session_pages[client.id] = page_key
+        self._update_push_topics(client.id, page_key)
         page_name = enabled_pages.get(page_key, page_key)
         # ui.notify(f'已切换到: {page_name}', type='positive')
         
@@ -139,10 +182,30 @@ class PageManager:
             logger.error(f"创建用户管理页面失败: {e}")
             ui.notify(f'显示用户管理失败: {str(e)}', type='negative')
 
-    def cleanup(self):
-        """清理页面资源"""
-        if hasattr(self, 'real_time_curve_page'):
-            self.real_time_curve_page.cleanup()
-        if hasattr(self, 'history_curve_page'):
-            self.history_curve_page.cleanup()
-        logger.info("页面管理器已清理")
\ No newline at end of file
+    def cleanup(self, client=None):
+        """清理页面资源
+
+        Args:
+            client: 结束的浏览器会话，只释放该会话的推送主题和页面资源，
+                各会话共用的页面订阅（主接线图、故障录波）保留；为None时（程序退出）关闭所有页面的订阅
+        """
+        if client is not None:
+            page_key = self.session_pages.pop(client.id, None)
+            self.content_areas.pop(client.id, None)
+            if self.websocket_client:
+                self.websocket_client.release_topic_demand(client.id)
+            self._leave_page(client, page_key)
+            logger.info(f"浏览器会话已清理: {client.id}，剩余 {len(self.session_pages)} 个")
+            return
+
+        if self.websocket_client:
+            for session_id in self.session_pages:
+                self.websocket_client.release_topic_demand(session_id)
+        self.session_pages.clear()
+        self.content_areas.clear()
+        self.main_diagram_page.subscriptions.close()
+        self.system_status_page.subscriptions.close()
+        self.fault_record_page.subscriptions.close()
+        self.real_time_curve_page.cleanup()
+        self.history_curve_page.cleanup()
+        logger.info("页面管理器已清理")
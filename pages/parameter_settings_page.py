@@ -7,6 +7,7 @@ import logging
 import asyncio
 from nicegui import ui
 from typing import Dict, List
+from websocket_client import RequestError, RequestTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -20,17 +21,7 @@ class ParameterSettingsPage:
         self.param_inputs = {}  # 存储所有参数输入框的引用
         self.param_mapping = {}  # 存储参数地址到名称的映射
         self.main_container = None  # 保存主容器引用，用于UI上下文
-
-        # 注册WebSocket回调
-        if self.websocket_client:
-            self.websocket_client.register_data_callback(
-                'param_read_ack', 
-                self._handle_param_read_response
-            )
-            self.websocket_client.register_data_callback(
-                'param_write_ack', 
-                self._handle_param_write_response
-            )
+        # 参数读写应答通过websocket_client.request按request_id等待，无需注册全局回调
 
     async def _handle_param_read_response(self, data):
         """处理参数读取响应"""
@@ -346,13 +337,6 @@ class ParameterSettingsPage:
                 ui.notify('WebSocket未连接', type='warning')
                 return
             
-            # 发送读取参数请求
-            await self.websocket_client.send_message('param_read', {
-                'read_type': 'control_params',
-                'start_address': '0x2200',
-                'count': len(self.param_mapping)
-            })
-            
             # 使用run_javascript来安全地显示通知
             await ui.run_javascript('''
                 Quasar.Notify.create({
@@ -363,6 +347,17 @@ class ParameterSettingsPage:
                 })
             ''')
             
+            # 发送读取参数请求并等待对应的应答
+            response = await self.websocket_client.request('param_read', {
+                'read_type': 'control_params',
+                'start_address': '0x2200',
+                'count': len(self.param_mapping)
+            })
+            await self._handle_param_read_response(response)
+            
+        except RequestTimeoutError as e:
+            logger.error(f"读取参数超时: {e}")
+            ui.notify('读取参数超时，未收到设备应答', type='negative')
         except Exception as e:
             logger.error(f"读取参数失败: {e}")
             # 使用run_javascript来安全地显示错误通知
@@ -420,14 +415,6 @@ class ParameterSettingsPage:
             
             logger.info(f"发送写入参数请求: {len(param_values)} 个参数")
             
-            # 发送写入参数请求
-            await self.websocket_client.send_message(
-                'param_write', 
-                {
-                    'write_type': 'control_params',
-                    'params': param_values
-                })
-            
             # 使用run_javascript来安全地显示通知
             await ui.run_javascript('''
                 Quasar.Notify.create({
@@ -438,6 +425,28 @@ class ParameterSettingsPage:
                 })
             ''')
             
+            # 发送写入参数请求并等待对应的应答
+            response = await self.websocket_client.request(
+                'param_write', 
+                {
+                    'write_type': 'control_params',
+                    'params': param_values
+                })
+            
+            # exec_status和exec_msg在应答的根级别，合并到数据中
+            result = dict(response.get('data') or {})
+            for key in ('exec_status', 'exec_msg'):
+                if key in response:
+                    result[key] = response[key]
+            await self._handle_param_write_response(result)
+            
+        except RequestTimeoutError as e:
+            logger.error(f"写入参数超时: {e}")
+            ui.notify('写入参数超时，未收到设备应答', type='negative')
+        except RequestError as e:
+            # 服务器返回错误应答时按写入失败处理
+            logger.error(f"写入参数失败: {e}")
+            await self._handle_param_write_response(dict(e.response or {}, exec_status='failed', exec_msg=str(e)))
         except Exception as e:
             logger.error(f"写入参数失败: {e}")
             # 使用run_javascript来安全地显示错误通知
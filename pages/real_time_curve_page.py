@@ -5,25 +5,186 @@ Real-time Curve Page - Fixed Version
 import asyncio
 import json
 import logging
+import math
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from nicegui import ui
-from collections import deque
+from chart_broadcast import ChartBroadcaster
+from decimation import decimate
+from protocol_messages import AnalogMessage
+from render_scheduler import RenderScheduler
+from sample_ring import SampleRing
+from subscription import SubscriptionScope
 
 logger = logging.getLogger(__name__)
 
 
+def _format_duration(seconds: float) -> str:
+    """时长的显示文字（分钟或小时）"""
+    if seconds >= 3600:
+        return f'{seconds / 3600:.1f}小时'
+    return f'{max(1, int(seconds // 60))}分钟'
+
+# 浏览器端图表控制器：每个客户端只注册一次，之后每帧只发送新的时间标签和各曲线的一个值，
+# 不再重新序列化全部标签和带样式的数据集；Chart.js加载完成之前到达的数据点先追加到配置中。
+# 时间标签为毫秒时间戳，显示时格式化为HH:MM:SS，超出时间窗口的数据点从头部裁剪；
+# 抽稀后的长时间窗口由replace整体替换
+CHART_CONTROLLER_JS = '''
+window.realtimeChart = window.realtimeChart || (function () {
+    const charts = {};
+    let chartJsCallbacks = null;
+
+    function formatTime(ms) {
+        const time = new Date(Number(ms));
+        return [time.getHours(), time.getMinutes(), time.getSeconds()]
+            .map(function (n) { return String(n).padStart(2, '0'); }).join(':');
+    }
+
+    function installFormatters(config) {
+        const options = config.options = config.options || {};
+        const scales = options.scales = options.scales || {};
+        const x = scales.x = scales.x || {};
+        x.ticks = Object.assign({}, x.ticks, {
+            callback: function (value) { return formatTime(this.getLabelForValue(value)); }
+        });
+        const plugins = options.plugins = options.plugins || {};
+        const tooltip = plugins.tooltip = plugins.tooltip || {};
+        tooltip.callbacks = Object.assign({}, tooltip.callbacks, {
+            title: function (items) { return items.length ? formatTime(items[0].label) : ''; }
+        });
+    }
+
+    function whenChartJsLoaded(callback) {
+        if (typeof Chart !== 'undefined') {
+            callback();
+            return;
+        }
+        if (!chartJsCallbacks) {
+            chartJsCallbacks = [];
+            const script = document.createElement('script');
+            script.src = 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js';
+            script.onload = function () {
+                chartJsCallbacks.forEach(function (callback) { callback(); });
+                chartJsCallbacks = null;
+            };
+            script.onerror = function () { console.error('Failed to load Chart.js'); };
+            document.head.appendChild(script);
+        }
+        chartJsCallbacks.push(callback);
+    }
+
+    function push(entry, label, values) {
+        const data = entry.chart ? entry.chart.data : entry.config.data;
+        data.labels.push(label);
+        data.datasets.forEach(function (dataset, i) {
+            dataset.data.push(i < values.length ? values[i] : null);
+        });
+        while (data.labels.length > 1 && data.labels[0] < label - entry.windowMs) {
+            data.labels.shift();
+            data.datasets.forEach(function (dataset) { dataset.data.shift(); });
+        }
+    }
+
+    function build(id, entry, attempts) {
+        if (charts[id] !== entry) {
+            return;  // 已被重建或销毁
+        }
+        const canvas = document.getElementById(id);
+        if (!canvas) {
+            if (attempts > 0) {
+                requestAnimationFrame(function () { build(id, entry, attempts - 1); });
+            } else {
+                console.error('Canvas not found: ' + id);
+            }
+            return;
+        }
+        try {
+            entry.chart = new Chart(canvas, entry.config);
+            entry.config = null;
+        } catch (e) {
+            console.error('Chart creation error:', e);
+        }
+    }
+
+    return {
+        create: function (id, config, windowMs) {
+            this.destroy(id);
+            installFormatters(config);
+            const entry = {chart: null, config: config, windowMs: windowMs};
+            charts[id] = entry;
+            whenChartJsLoaded(function () { build(id, entry, 60); });
+        },
+        append: function (id, label, values) {
+            const entry = charts[id];
+            if (!entry) {
+                return;
+            }
+            push(entry, label, values);
+            if (entry.chart) {
+                entry.chart.update('none');
+            }
+        },
+        extend: function (id, labels, series) {
+            const entry = charts[id];
+            if (!entry) {
+                return;
+            }
+            labels.forEach(function (label, j) {
+                push(entry, label, series.map(function (data) { return data[j]; }));
+            });
+            if (entry.chart) {
+                entry.chart.update('none');
+            }
+        },
+        replace: function (id, labels, series) {
+            const entry = charts[id];
+            if (!entry) {
+                return;
+            }
+            const data = entry.chart ? entry.chart.data : entry.config.data;
+            data.labels = labels;
+            data.datasets.forEach(function (dataset, i) {
+                dataset.data = i < series.length ? series[i] : [];
+            });
+            if (entry.chart) {
+                entry.chart.update('none');
+            }
+        },
+        destroy: function (id) {
+            const entry = charts[id];
+            if (entry && entry.chart) {
+                entry.chart.destroy();
+            }
+            delete charts[id];
+        }
+    };
+})();
+'''
+
+
+def _json_value(value) -> Optional[float]:
+    """采样值转换为JSON数值：缺失（NaN）为null，float32按最短表示还原（25.7而不是25.700000762939453）"""
+    if value is None or math.isnan(value):
+        return None
+    return float(str(value))
+
+
 class RealTimeCurvePage:
     """实时曲线页面类"""
     
+    # 显示期间需要的推送主题 -> 频率（帧/秒，0为设备原始频率）
+    PUSH_TOPICS = {'analog_data': 0}
+    
+    # 可选的时间窗口：秒 -> 显示名称
+    WINDOW_OPTIONS = {60: '1分钟', 120: '2分钟', 300: '5分钟', 900: '15分钟',
+                      3600: '1小时', 21600: '6小时', 86400: '24小时'}
+    
     def __init__(self, config_manager, websocket_client):
         self.config = config_manager
         self.websocket_client = websocket_client
         
-        # 曲线数据管理
-        self.curve_data: Dict[str, deque] = {}  # 参数名 -> 数据队列
-        self.time_stamps: deque = deque(maxlen=120)  # 时间戳队列，2分钟数据（每秒1个点）
-        
         # 参数配置 - 根据配置文件中的SA1/SA2/SV1/SV2模拟量
         self.available_parameters = [
             {"name": "轨地电流SA1", "unit": "A", "color": "#FF6B6B"},
@@ -35,67 +196,98 @@ class RealTimeCurvePage:
         # 选中的参数 - 默认选择SA1和SV1
         self.selected_parameters: List[str] = ["轨地电流SA1", "轨地电压SV1"]
         
-        # 图表相关
-        self.chart = None
-        self.chart_container = None
+        # 曲线显示：时间窗口内的采样超过chart_points时在服务端抽稀后整体替换（间隔refresh_interval秒）
+        curve_config = self.config.get_section('实时曲线配置')
+        self.window_seconds = int(curve_config.get('window_seconds', 120))
+        self.chart_points = int(curve_config.get('chart_points', 600))
+        self.decimation = str(curve_config.get('decimation', 'minmax'))
+        self.refresh_interval = float(curve_config.get('refresh_interval', 1.0))
+        self.last_refresh = 0.0
+        self.rendered_written = 0  # 已发送到图表的采样（按累计写入数计）
+        
+        # 绘图调度：数据接收只写入缓冲区，图表按固定帧率更新，事件循环滞后时自动降低帧率
+        self.render_scheduler = RenderScheduler(
+            self._render,
+            fps=float(curve_config.get('render_fps', 5)),
+            min_fps=float(curve_config.get('render_min_fps', 1)),
+            name='实时曲线')
+        
+        # 曲线数据管理：按全速推送保存的采样（int64毫秒时间戳 + 每个参数一列float32），
+        # 容量按配置的缓存时长和每秒采样数预先分配，不超过max_memory_mb
+        names = [p['name'] for p in self.available_parameters]
+        self.sample_rate = float(curve_config.get('sample_rate', 10))
+        capacity = int(curve_config.get('history_seconds', 86400) * self.sample_rate)
+        max_bytes = float(curve_config.get('max_memory_mb', 16)) * 1024 * 1024
+        max_samples = int(max_bytes // SampleRing.bytes_per_sample(len(names)))
+        if capacity > max_samples:
+            logger.info(f"实时曲线缓存受max_memory_mb限制: {max_samples} 个采样"
+                        f"（每秒{self.sample_rate:g}个时约{_format_duration(max_samples / self.sample_rate)}）")
+            capacity = max_samples
+        self.samples = SampleRing(max(capacity, self.chart_points), names)
+        
+        # 图表相关：页面为单例，所有查看的会话共用同一个图表ID，更新脚本生成一次后广播
+        self.chart_id = f"chart_{id(self)}"
+        self.viewers = ChartBroadcaster('实时曲线')
+        self.viewer_controls: Dict[str, Dict] = {}  # 会话ID -> 该会话的时间窗口选择框和参数复选框
         self.is_running = False
         self.update_timer = None
         self.chart_initialized = False
         
-        # UI客户端引用 - 用于后台任务中的UI更新
-        self.ui_client = None
-        
         # 数据接收状态
         self.last_data_time = None
         self.data_count = 0
         
         # 注册WebSocket回调
+        self.subscriptions = SubscriptionScope('实时曲线')
         self._setup_data_callbacks()
         
     def _setup_data_callbacks(self):
         """设置数据回调"""
         if self.websocket_client:
-            self.websocket_client.register_data_callback('analog_data', self._handle_analog_data)
+            # 每帧都写入采样缓冲区（写入开销固定，不合并），绘图由调度器按帧率执行；
+            # 接收消息对象，独立接收进程模式下由环形缓冲区的列直接构建，不还原data字典
+            self.subscriptions.add(self.websocket_client.register_data_callback(
+                'analog_data', self._handle_analog_data, typed=True))
             # logger.info("已注册模拟量数据回调")
         else:
             logger.warning("WebSocket客户端未初始化")
     
-    async def _handle_analog_data(self, data: List[Dict]):
-        """处理模拟量数据"""
+    async def _handle_analog_data(self, data):
+        """处理模拟量数据（AnalogMessage消息对象，或data列表）"""
         try:
-            if not isinstance(data, list):
-                logger.warning(f"接收到非列表数据: {type(data)}")
-                return
-                
             current_time = datetime.now()
-            
-            # 更新时间戳
-            self.time_stamps.append(current_time)
+            frame_values = {}
             
             # 第一次接收数据时打印结构
             if self.data_count == 0:
                 # logger.info(f"首次接收数据，样例: {data[0] if data else 'empty'}")
                 pass
             
-            # 处理每个参数
-            for param_data in data:
-                param_name = param_data.get('name', '')
-                value = param_data.get('physical_value')
-                
-                # 如果physical_value不存在，尝试其他字段
-                if value is None:
-                    value = param_data.get('value', 0)
-                
-                if not param_name:
-                    continue
-                
-                # 初始化所有参数的数据队列（即使未选中，也要保持数据同步）
-                if param_name not in self.curve_data:
-                    self.curve_data[param_name] = deque(maxlen=120)
-                    # logger.info(f"初始化参数队列: {param_name}")
-                
-                # 添加数据点
-                self.curve_data[param_name].append(float(value))
+            if isinstance(data, AnalogMessage):
+                # 缺失的物理值为NaN，与未给出的通道相同
+                frame_values = dict(zip(data.analog.names, data.analog.values))
+                frame_values.pop('', None)
+            elif isinstance(data, list):
+                # 处理每个参数
+                for param_data in data:
+                    param_name = param_data.get('name', '')
+                    value = param_data.get('physical_value')
+                    
+                    # 如果physical_value不存在，尝试其他字段
+                    if value is None:
+                        value = param_data.get('value', 0)
+                    
+                    if not param_name:
+                        continue
+                    
+                    frame_values[param_name] = float(value)
+            else:
+                logger.warning(f"接收到非列表数据: {type(data)}")
+                return
+            
+            # 写入所有参数的采样（即使未选中，也要保持数据同步），未配置的通道忽略
+            self.samples.append(int(current_time.timestamp() * 1000), frame_values)
+            self.render_scheduler.mark_dirty()
             
             # 更新最后数据时间
             self.last_data_time = current_time
@@ -103,36 +295,63 @@ class RealTimeCurvePage:
             
             # 每10个数据点打印一次调试信息
             if self.data_count % 10 == 0:
-                sample_values = {k: list(v)[-1] if v else None for k, v in self.curve_data.items()}
                 # logger.info(f"数据更新 #{self.data_count} - 选中: {self.selected_parameters}, "
-                          # f"最新值: {sample_values}")
-            
-            # 等待图表初始化完成再更新
-            if self.chart_initialized:
-                await self._update_chart()
+                          # f"缓存: {self.samples.get_stats()}")
+                pass
             
         except Exception as e:
             logger.error(f"处理模拟量数据失败: {e}", exc_info=True)
     
+    async def _render(self):
+        """绘图调度器每帧调用"""
+        self._render_frame()
+    
+    def _render_frame(self):
+        """向所有会话追加上一帧之后的新采样，时间窗口需要抽稀时按固定间隔整体替换"""
+        # 等待图表初始化完成再更新
+        if not self.chart_initialized or not self.viewers:
+            return
+        written = self.samples.written
+        if written == self.rendered_written:
+            return
+        if self._window_size() <= self.chart_points:
+            count = min(written - self.rendered_written, self.chart_points)
+            self.rendered_written = written
+            self.viewers.broadcast(lambda: self._build_extend_script(self.chart_id, count))
+            return
+        # 抽稀后的点数固定（约为图表宽度），更新开销与窗口长度无关
+        now = time.monotonic()
+        if now - self.last_refresh < self.refresh_interval:
+            # 下一帧再检查，数据停止推送时最后的采样也会显示
+            self.render_scheduler.mark_dirty()
+            return
+        self.last_refresh = now
+        self.rendered_written = written
+        self.viewers.broadcast(lambda: self._build_replace_script(self.chart_id))
+    
     def create_page(self) -> ui.column:
-        """创建实时曲线页面"""
-        # 保存当前客户端引用
+        """创建实时曲线页面（每个查看的会话各创建一次）"""
         from nicegui import context
-        self.ui_client = context.client
+        client = context.client
+        controls = {'window': None, 'checkboxes': {}}
+        
+        # 全部会话离开后订阅已关闭时重新注册
+        if not self.subscriptions:
+            self._setup_data_callbacks()
         
         with ui.column().classes('w-full h-full p-2'):
             with ui.card().classes('w-full p-2'):
                 # 标题和控制区域
                 with ui.row().classes('w-full items-center justify-between mb-2'):
                     ui.label('实时曲线').classes('text-h6')
+                    window_options = self._window_options()
+                    controls['window'] = ui.select(window_options, value=self.window_seconds, label='时间窗口',
+                                                   on_change=lambda e: self._set_window(e.value)).classes('w-32')
                     
                 # 参数选择
                 with ui.row().classes('items-center gap-2'):
                     ui.label('显示参数:').classes('text-subtitle2')
                     
-                    # 保存复选框引用
-                    self.param_checkboxes = {}
-                    
                     for param in self.available_parameters:
                         is_selected = param['name'] in self.selected_parameters
                         with ui.row().classes('items-center gap-2 p-2 rounded-lg').style(f'background-color: {param["color"]}20;'):
@@ -140,7 +359,7 @@ class RealTimeCurvePage:
                                 param['name'], 
                                 value=is_selected
                             )
-                            self.param_checkboxes[param['name']] = checkbox
+                            controls['checkboxes'][param['name']] = checkbox
                         
                         def make_handler(param_name, checkbox_ref):
                             def on_param_toggle():
@@ -171,152 +390,206 @@ class RealTimeCurvePage:
                 #     self.data_count_label = ui.label('数据点: 0').classes('text-sm text-grey-7')
                 #     self.last_time_label = ui.label('最后数据: --').classes('text-sm text-grey-7')
             
-            # 图表容器
-            self.chart_container = ui.card().classes('w-full p-4').style('height: 520px;')
+            # 图表容器 - 使用div包裹canvas
+            with ui.card().classes('w-full p-4').style('height: 520px;'):
+                with ui.element('div').style('height: 450px; width: 100%; position: relative;'):
+                    ui.element('canvas').props(f'id="{self.chart_id}"')
             
-            # 创建图表
-            self._create_chart()
+            # 登记会话并在该会话中创建图表
+            self._add_viewer(client, controls)
             
             # 启动数据更新
             self.is_running = True
+            self.render_scheduler.start()
             # self.update_timer = ui.timer(1.0, self._update_status_display)  # 状态显示已注释掉 - 不需要
     
-    def _create_chart(self):
-        """创建图表"""
-        try:
-            self.chart_container.clear()
-            
-            with self.chart_container:
-                chart_id = f"chart_{id(self)}"
-                
-                # 创建canvas容器 - 使用div包裹canvas
-                with ui.element('div').style('height: 450px; width: 100%; position: relative;'):
-                    ui.element('canvas').props(f'id="{chart_id}"')
-                
-                # 构建图表配置 - 只包含选中的参数
-                datasets = []
-                for param_name in self.selected_parameters:
-                    param_info = next((p for p in self.available_parameters if p['name'] == param_name), None)
-                    if param_info:
-                        dataset = {
-                            'label': f"{param_name} ({param_info['unit']})",
-                            'data': [],
-                            'borderColor': param_info['color'],
-                            'backgroundColor': param_info['color'] + '20',
-                            'borderWidth': 2,
-                            'fill': False,
-                            'tension': 0.4,
-                            'pointRadius': 2,
-                            'pointHoverRadius': 5
+    def _selected_channels(self) -> List[str]:
+        """选中且已配置的参数，按选中顺序"""
+        return [param_name for param_name in self.selected_parameters if param_name in self.samples.channels]
+    
+    def _window_size(self) -> int:
+        """当前时间窗口内的采样数"""
+        latest = self.samples.latest()
+        if latest is None:
+            return 0
+        return len(self.samples.between(latest[0] - self.window_seconds * 1000)[0])
+    
+    def _window_series(self) -> Tuple[np.ndarray, np.ndarray]:
+        """当前时间窗口内选中参数的采样：(毫秒时间戳, 形状为(选中参数数, n)的数组)，超过chart_points时抽稀"""
+        rows = [self.samples.channels[param_name] for param_name in self._selected_channels()]
+        latest = self.samples.latest()
+        if latest is None:
+            return np.empty(0, dtype=np.int64), np.empty((len(rows), 0), dtype=np.float32)
+        timestamps, values = self.samples.between(latest[0] - self.window_seconds * 1000)
+        values = values[rows]
+        if len(timestamps) > self.chart_points:
+            timestamps, values = decimate(timestamps, values, self.chart_points, self.decimation)
+        return timestamps, values
+    
+    def _build_datasets(self, values: np.ndarray) -> List[Dict]:
+        """构建选中参数的数据集（带样式和当前窗口内的数据），只在创建图表时发送"""
+        datasets = []
+        for row, param_name in zip(values, self._selected_channels()):
+            param_info = next(p for p in self.available_parameters if p['name'] == param_name)
+            dataset = {
+                'label': f"{param_name} ({param_info['unit']})",
+                'data': [_json_value(v) for v in row],
+                'borderColor': param_info['color'],
+                'backgroundColor': param_info['color'] + '20',
+                'borderWidth': 2,
+                'fill': False,
+                # 抽稀后的最小值/最大值包络不做平滑，点数接近图表宽度时不绘制数据点
+                'tension': 0,
+                'pointRadius': 0,
+                'pointHoverRadius': 4
+            }
+            datasets.append(dataset)
+        return datasets
+    
+    def _build_chart_config(self) -> Dict:
+        """构建图表配置，包含当前窗口内的时间标签（毫秒时间戳，浏览器端格式化）和数据"""
+        timestamps, values = self._window_series()
+        return {
+            'type': 'line',
+            'data': {
+                'labels': timestamps.tolist(),
+                'datasets': self._build_datasets(values)
+            },
+            'options': {
+                'responsive': True,
+                'maintainAspectRatio': False,
+                'animation': {
+                    'duration': 0
+                },
+                'scales': {
+                    'x': {
+                        'title': {
+                            'display': True,
+                            'text': '时间'
+                        },
+                        'ticks': {
+                            'maxRotation': 45,
+                            'minRotation': 45,
+                            'maxTicksLimit': 10
                         }
-                        datasets.append(dataset)
-                
-                logger.info(f"创建图表，选中参数: {self.selected_parameters}, 数据集数量: {len(datasets)}")
-                
-                chart_config = {
-                    'type': 'line',
-                    'data': {
-                        'labels': [],
-                        'datasets': datasets
                     },
-                    'options': {
-                        'responsive': True,
-                        'maintainAspectRatio': False,
-                        'animation': {
-                            'duration': 0
+                    'y': {
+                        'title': {
+                            'display': True,
+                            'text': '数值'
                         },
-                        'scales': {
-                            'x': {
-                                'title': {
-                                    'display': True,
-                                    'text': '时间'
-                                },
-                                'ticks': {
-                                    'maxRotation': 45,
-                                    'minRotation': 45,
-                                    'maxTicksLimit': 10
-                                }
-                            },
-                            'y': {
-                                'title': {
-                                    'display': True,
-                                    'text': '数值'
-                                },
-                                'beginAtZero': False
-                            }
-                        },
-                        'plugins': {
-                            'legend': {
-                                'display': True,
-                                'position': 'top'
-                            },
-                            'tooltip': {
-                                'mode': 'index',
-                                'intersect': False
-                            }
-                        },
-                        'interaction': {
-                            'mode': 'nearest',
-                            'axis': 'x',
-                            'intersect': False
-                        }
+                        'beginAtZero': False
                     }
+                },
+                'plugins': {
+                    'legend': {
+                        'display': True,
+                        'position': 'top'
+                    },
+                    'tooltip': {
+                        'mode': 'index',
+                        'intersect': False
+                    }
+                },
+                'interaction': {
+                    'mode': 'nearest',
+                    'axis': 'x',
+                    'intersect': False
                 }
-                
-                # 初始化Chart.js
-                ui.run_javascript(f'''
-                    (function() {{
-                        function initChart() {{
-                            const ctx = document.getElementById('{chart_id}');
-                            if (!ctx) {{
-                                console.error('Canvas not found: {chart_id}');
-                                return;
-                            }}
-                            
-                            // 销毁旧图表
-                            if (window.chart_{chart_id}) {{
-                                window.chart_{chart_id}.destroy();
-                            }}
-                            
-                            // 创建新图表
-                            try {{
-                                window.chart_{chart_id} = new Chart(ctx, {json.dumps(chart_config)});
-                                console.log('Chart created successfully');
-                            }} catch (e) {{
-                                console.error('Chart creation error:', e);
-                            }}
-                        }}
-                        
-                        // 检查Chart.js是否已加载
-                        if (typeof Chart === 'undefined') {{
-                            const script = document.createElement('script');
-                            script.src = 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js';
-                            script.onload = initChart;
-                            script.onerror = function() {{
-                                console.error('Failed to load Chart.js');
-                            }};
-                            document.head.appendChild(script);
-                        }} else {{
-                            initChart();
-                        }}
-                    }})();
-                ''')
-                
-                # 保存图表ID
-                self.chart = type('ChartWrapper', (), {'id': chart_id})()
-                
-                # 延迟设置初始化标志
-                async def mark_initialized():
-                    await asyncio.sleep(0.5)
-                    self.chart_initialized = True
-                    logger.info("图表初始化完成")
-                
-                asyncio.create_task(mark_initialized())
-                
+            }
+        }
+    
+    def _build_append_script(self, chart_id: str, timestamp_ms: int, frame_values: Dict[str, float]) -> str:
+        """构建增量更新调用：只包含新的时间标签和每条曲线的一个值（本帧缺少的参数为null）"""
+        values = [_json_value(frame_values.get(param_name)) for param_name in self._selected_channels()]
+        return f"realtimeChart.append({json.dumps(chart_id)},{int(timestamp_ms)},{json.dumps(values)})"
+    
+    def _build_extend_script(self, chart_id: str, count: int) -> str:
+        """构建批量追加调用：最近count个采样的时间标签和各曲线的值，只有一个采样时同append"""
+        latest = self.samples.latest()
+        if count == 1 and latest is not None:
+            return self._build_append_script(chart_id, latest[0], latest[1])
+        timestamps, values = self.samples.window(count)
+        series = [[_json_value(v) for v in values[self.samples.channels[param_name]]]
+                  for param_name in self._selected_channels()]
+        return (f"realtimeChart.extend({json.dumps(chart_id)},"
+                f"{json.dumps(timestamps.tolist())},{json.dumps(series)})")
+    
+    def _build_replace_script(self, chart_id: str) -> str:
+        """构建整体替换调用：当前时间窗口抽稀后的时间标签和各曲线数据"""
+        timestamps, values = self._window_series()
+        series = [[_json_value(v) for v in row] for row in values]
+        return (f"realtimeChart.replace({json.dumps(chart_id)},"
+                f"{json.dumps(timestamps.tolist())},{json.dumps(series)})")
+    
+    def _add_viewer(self, client, controls: Dict):
+        """登记查看的会话：先把新采样发给已有会话，再在新会话中创建包含当前窗口的图表"""
+        self._render_frame()
+        self.viewer_controls[client.id] = controls
+        self.viewers.add(client)
+        # 注册浏览器端图表控制器（浏览器中已注册时不重复创建），与之后的更新经同一发送队列，保证先于图表创建
+        self.viewers.send(client, CHART_CONTROLLER_JS)
+        self._create_chart(client)
+    
+    def _create_chart(self, client=None):
+        """创建图表：指定会话时只在该会话中创建，否则在所有会话中重新创建"""
+        try:
+            # 构建图表配置 - 只包含选中的参数
+            chart_config = self._build_chart_config()
+            self.rendered_written = self.samples.written
+            logger.info(f"创建图表，选中参数: {self.selected_parameters}, "
+                        f"数据集数量: {len(chart_config['data']['datasets'])}, 会话数: {len(self.viewers)}")
+            
+            # 由浏览器端控制器创建图表（Chart.js未加载时先加载），之后只发送增量
+            script = (f"realtimeChart.create({json.dumps(self.chart_id)}, "
+                      f"{json.dumps(chart_config)}, {self.window_seconds * 1000})")
+            if client is None:
+                self.viewers.broadcast(lambda: script)
+            else:
+                self.viewers.send(client, script)
+            
+            # 图表创建完成之前追加的数据点由控制器补入配置，可以立即开始更新
+            self.chart_initialized = True
+            
         except Exception as e:
             logger.error(f"创建图表失败: {e}", exc_info=True)
-            with self.chart_container:
-                ui.label(f'创建图表失败: {str(e)}').classes('text-negative')
+    
+    def _sync_controls(self):
+        """选中参数和时间窗口为所有会话共用，变化后同步各会话的选择框和复选框"""
+        for controls in self.viewer_controls.values():
+            try:
+                if controls['window'] is not None:
+                    controls['window'].value = self.window_seconds
+                for param_name, checkbox in controls['checkboxes'].items():
+                    checkbox.value = param_name in self.selected_parameters
+            except Exception as e:
+                logger.error(f"同步曲线控件失败: {e}")
+    
+    def retained_seconds(self) -> float:
+        """采样缓冲区能保存的时长：按已缓存采样的实际推送频率计算，采样不足时按配置的sample_rate估计"""
+        timestamps, _ = self.samples.window()
+        rate = self.sample_rate
+        if len(timestamps) > 1 and timestamps[-1] > timestamps[0]:
+            rate = (len(timestamps) - 1) * 1000 / float(timestamps[-1] - timestamps[0])
+        return self.samples.capacity / rate
+
+    def _window_options(self) -> Dict[int, str]:
+        """时间窗口选择项：超出缓存时长的窗口标明实际只能显示的时长"""
+        options = dict(self.WINDOW_OPTIONS)
+        options.setdefault(self.window_seconds, f'{self.window_seconds}秒')
+        retained = self.retained_seconds()
+        for seconds, name in options.items():
+            if seconds > retained:
+                options[seconds] = f'{name}（仅最近{_format_duration(retained)}）'
+        return options
+
+    def _set_window(self, seconds: int):
+        """切换时间窗口"""
+        if int(seconds) == self.window_seconds:
+            return  # 同步其他会话的选择框时触发
+        self.window_seconds = int(seconds)
+        logger.info(f"实时曲线时间窗口: {self.WINDOW_OPTIONS.get(self.window_seconds, self.window_seconds)}")
+        self._recreate_chart()
     
     def _recreate_chart(self):
         """重新创建图表"""
@@ -324,6 +597,7 @@ class RealTimeCurvePage:
         
         # 暂停图表更新
         self.chart_initialized = False
+        self._sync_controls()
         
         # 延迟一点再重建，避免竞态条件
         async def rebuild():
@@ -332,72 +606,6 @@ class RealTimeCurvePage:
         
         asyncio.create_task(rebuild())
     
-    async def _update_chart(self):
-        """更新图表数据"""
-        try:
-            if not self.chart or not self.chart_initialized or not self.ui_client:
-                return
-            
-            # 准备时间标签（只显示最近的时间点）
-            time_labels = [t.strftime('%H:%M:%S') for t in self.time_stamps]
-            
-            # 构建新的数据集 - 只包含选中的参数
-            datasets = []
-            for param_name in self.selected_parameters:
-                param_info = next((p for p in self.available_parameters if p['name'] == param_name), None)
-                if param_info and param_name in self.curve_data:
-                    values = list(self.curve_data[param_name])
-                    
-                    # 确保数据长度一致
-                    if len(values) < len(time_labels):
-                        values = [None] * (len(time_labels) - len(values)) + values
-                    elif len(values) > len(time_labels):
-                        values = values[-len(time_labels):]
-                    
-                    dataset = {
-                        'label': f"{param_name} ({param_info['unit']})",
-                        'data': values,
-                        'borderColor': param_info['color'],
-                        'backgroundColor': param_info['color'] + '20',
-                        'borderWidth': 2,
-                        'fill': False,
-                        'tension': 0.4,
-                        'pointRadius': 2,
-                        'pointHoverRadius': 5
-                    }
-                    datasets.append(dataset)
-                    
-                    # 调试：第一次更新时打印数据样本
-                    if self.data_count == 1:
-                        logger.info(f"参数 {param_name} 数据样本: {values[:5]}...")
-            
-            # 只有在有数据集时才更新
-            if not datasets:
-                logger.warning(f"没有可显示的数据集，选中参数: {self.selected_parameters}, "
-                             f"可用数据: {list(self.curve_data.keys())}")
-                return
-            
-            # 更新图表 - 使用保存的客户端上下文
-            chart_id = self.chart.id
-            update_code = f'''
-                (function() {{
-                    const chart = window.chart_{chart_id};
-                    if (chart) {{
-                        chart.data.labels = {json.dumps(time_labels)};
-                        chart.data.datasets = {json.dumps(datasets)};
-                        chart.update('none');
-                    }} else {{
-                        console.warn('Chart not found: {chart_id}');
-                    }}
-                }})();
-            '''
-            
-            # 使用客户端上下文执行JavaScript
-            self.ui_client.run_javascript(update_code)
-            
-        except Exception as e:
-            logger.error(f"更新图表失败: {e}", exc_info=True)
-    
     async def _update_status_display(self):
         """更新状态显示"""
         try:
@@ -427,24 +635,37 @@ class RealTimeCurvePage:
         except Exception as e:
             logger.error(f"更新状态显示失败: {e}")
     
-    def cleanup(self):
-        """清理资源"""
+    def cleanup(self, client=None):
+        """清理资源
+
+        Args:
+            client: 离开页面或结束的会话，只移除该会话，没有会话查看时停止绘图；为None时清理全部并注销回调
+        """
+        destroy = f"window.realtimeChart && realtimeChart.destroy({json.dumps(self.chart_id)})"
+        if client is not None:
+            self.viewer_controls.pop(client.id, None)
+            if client in self.viewers:
+                self.viewers.send(client, destroy)
+                self.viewers.remove(client)
+            if self.viewers:
+                return
+            self.is_running = False
+            self.render_scheduler.stop()
+            return
+        
         self.is_running = False
         if self.update_timer:
             self.update_timer.cancel()
+        self.render_scheduler.stop()
         
-        # 销毁图表
-        if self.chart:
-            chart_id = self.chart.id
-            ui.run_javascript(f'''
-                if (window.chart_{chart_id}) {{
-                    window.chart_{chart_id}.destroy();
-                    delete window.chart_{chart_id};
-                }}
-            ''')
+        # 销毁所有会话中的图表
+        self.viewers.broadcast(lambda: destroy)
+        for viewer in self.viewers.clients:
+            self.viewers.remove(viewer)
+        self.viewer_controls.clear()
+        self.chart_initialized = False
         
         # 注销回调
-        if self.websocket_client:
-            self.websocket_client.unregister_data_callback('analog_data', self._handle_analog_data)
+        self.subscriptions.close()
         
         logger.info("实时曲线页面已清理")
\ No newline at end of file
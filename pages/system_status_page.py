@@ -5,16 +5,31 @@ System Status Page
 # flake8: noqa
 import logging
 from nicegui import ui
+from subscription import SubscriptionScope
 
 logger = logging.getLogger(__name__)
 
+# 消息中的开关量分组 -> 页面状态分组
+STATUS_GROUP_TITLES = {
+    'system_status': '系统状态',
+    'igbt_fiber_status': 'IGBT光纤状态',
+    'switch_input': '开关量输入',
+    'switch_output': '开关量输出',
+    'fault_status': '故障信息',
+}
+
 
 class SystemStatusPage:
     """系统状态页面类"""
     
+    # 显示期间需要的推送主题 -> 频率（帧/秒，0为设备原始频率）
+    PUSH_TOPICS = {'system_status': 0}
+    
     def __init__(self, config_manager, websocket_client):
         self.config = config_manager
         self.websocket_client = websocket_client
+        # 只在页面显示期间订阅，离开页面时由页面管理器关闭
+        self.subscriptions = SubscriptionScope('系统状态')
         self.status_groups = {}
         self._load_status_config()
         
@@ -261,74 +276,26 @@ class SystemStatusPage:
         return ui.column()  # 返回一个空的column作为占位符
     
     def _register_websocket_callbacks(self):
-        """注册WebSocket数据回调函数"""
+        """注册WebSocket数据回调函数（每次显示页面时调用，先关闭上一次的订阅）"""
+        self.subscriptions.close()
         if self.websocket_client:
             # 注册系统状态数据回调
-            self.websocket_client.register_data_callback('system_status', self._handle_system_status)
+            self.subscriptions.add(self.websocket_client.register_data_callback(
+                'system_status', self._handle_system_status, coalesce=True, typed=True))
             # switch_io数据类型已合并到system_status中，不再单独注册
             # self.websocket_client.register_data_callback('switch_io', self._handle_switch_io)
             # 注册故障数据回调
-            self.websocket_client.register_data_callback('fault', self._handle_fault_data)
+            self.subscriptions.add(self.websocket_client.register_data_callback('fault', self._handle_fault_data))
             # 注册全量快照数据回调
-            self.websocket_client.register_data_callback('full_snapshot', self._handle_full_snapshot)
+            self.subscriptions.add(self.websocket_client.register_data_callback(
+                'full_snapshot', self._handle_full_snapshot, coalesce=True, typed=True))
             # logger.info("WebSocket数据回调函数注册成功")
     
-    async def _handle_system_status(self, data):
-        """处理系统状态数据"""
+    async def _handle_system_status(self, message):
+        """处理系统状态数据（SystemStatus消息对象，各分组为整数状态字）"""
         try:
-            # logger.info(f"收到系统状态数据: {data}")
-            status_data = {}
-            
-            # 如果data中包含data字段，则提取data字段
-            if 'data' in data:
-                data = data['data']
-                # logger.info(f"提取后的系统状态数据: {data}")
-            
-            # 处理系统状态
-            if 'system_status' in data:
-                status_data['系统状态'] = {}
-                for key, value in data['system_status'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['系统状态'][bit_num] = value
-            
-            # 处理IGBT光纤状态
-            if 'igbt_fiber_status' in data:
-                logger.debug(f"IGBT光纤状态数据: {data['igbt_fiber_status']}")
-                status_data['IGBT光纤状态'] = {}
-                for key, value in data['igbt_fiber_status'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['IGBT光纤状态'][bit_num] = value
-                logger.debug(f"处理后的IGBT光纤状态: {status_data['IGBT光纤状态']}")
-            else:
-                logger.debug("全量快照数据中未找到IGBT光纤状态")
-            
-            # 处理开关量输入（switch_input）
-            if 'switch_input' in data:
-                status_data['开关量输入'] = {}
-                for key, value in data['switch_input'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['开关量输入'][bit_num] = value
-            
-            # 处理开关量输出（switch_output）
-            if 'switch_output' in data:
-                status_data['开关量输出'] = {}
-                for key, value in data['switch_output'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['开关量输出'][bit_num] = value
-            
-            # 处理故障状态
-            if 'fault_status' in data:
-                status_data['故障信息'] = {}
-                for key, value in data['fault_status'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['故障信息'][bit_num] = value
-            
-            # logger.info(f"处理后的状态数据: {status_data}")
+            # BitGroup.items()按位号返回(位号, 值)，可直接交给update_status_data
+            status_data = {STATUS_GROUP_TITLES[group]: bits for group, bits in message.groups()}
             if status_data:
                 self.update_status_data(status_data)
         except Exception as e:
@@ -352,53 +319,11 @@ class SystemStatusPage:
         except Exception as e:
             logger.error(f"处理故障数据失败: {e}")
     
-    async def _handle_full_snapshot(self, data):
-        """处理全量快照数据"""
+    async def _handle_full_snapshot(self, message):
+        """处理全量快照数据（FullSnapshot消息对象）"""
         try:
-            logger.debug(f"收到全量快照数据: {data}")
-            status_data = {}
-            
-            # 处理系统状态
-            if 'system_status' in data:
-                status_data['系统状态'] = {}
-                for key, value in data['system_status'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['系统状态'][bit_num] = value
-            
-            # 处理开关量输入
-            if 'switch_input' in data:
-                status_data['开关量输入'] = {}
-                for key, value in data['switch_input'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['开关量输入'][bit_num] = value
-            
-            # 处理开关量输出
-            if 'switch_output' in data:
-                status_data['开关量输出'] = {}
-                for key, value in data['switch_output'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['开关量输出'][bit_num] = value
-            
-            # 处理故障信息
-            if 'fault_info' in data:
-                status_data['故障信息'] = {}
-                for key, value in data['fault_info'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['故障信息'][bit_num] = value
-            
-            # 处理IGBT光纤状态
-            if 'igbt_fiber_status' in data:
-                status_data['IGBT光纤状态'] = {}
-                for key, value in data['igbt_fiber_status'].items():
-                    if key.startswith('bit'):
-                        bit_num = int(key[3:])
-                        status_data['IGBT光纤状态'][bit_num] = value
-            
-            self.update_status_data(status_data)
+            logger.debug(f"收到全量快照数据: {message}")
+            self.update_status_data({STATUS_GROUP_TITLES[group]: bits for group, bits in message.groups()})
             # logger.info("全量快照数据更新完成")
         except Exception as e:
             logger.error(f"处理全量快照数据失败: {e}")
@@ -530,7 +455,7 @@ class SystemStatusPage:
         """更新状态数据显示
         
         Args:
-            status_data: 包含各组状态数据的字典
+            status_data: 包含各组状态数据的字典（各组也可以是BitGroup）
                 格式: {
                     '系统状态': {0: 1, 1: 0, ...},
                     '开关量输入': {0: 0, 1: 1, ...},
@@ -0,0 +1,371 @@
+"""
+协议消息类型模块
+Typed Protocol Message Module
+
+按《WebSocket及API接口协议》为每种消息类型生成使用__slots__的消息类，
+开关量分组转换为整数状态字（BitGroup），模拟量转换为float数组（AnalogData）。
+注册回调时指定typed=True即可接收消息对象，同一帧只转换一次，由所有类型化回调共享。
+"""
+# flake8: noqa
+import math
+from array import array
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+# bitN键 -> 位号，避免每帧重复解析字符串
+_BIT_INDEX = {f'bit{bit}': bit for bit in range(64)}
+
+# 开关量分组（消息data中的键）
+STATUS_GROUP_NAMES = ('system_status', 'switch_input', 'switch_output', 'fault_status', 'igbt_fiber_status')
+
+
+class BitGroup:
+    """一组开关量：word为状态字，mask标记消息中出现过的位"""
+    __slots__ = ('word', 'mask')
+
+    def __init__(self, word: int = 0, mask: int = 0):
+        self.word = word
+        self.mask = mask
+
+    @classmethod
+    def from_bits(cls, bits: Any) -> Optional['BitGroup']:
+        """从{'bit0': 1, ...}或十六进制字符串（如故障录波中的"0x0104"）构建"""
+        if isinstance(bits, Mapping):
+            word = mask = 0
+            for key, value in bits.items():
+                bit = _BIT_INDEX.get(key)
+                if bit is None:
+                    continue
+                mask |= 1 << bit
+                if value:
+                    word |= 1 << bit
+            return cls(word, mask)
+        if isinstance(bits, str):
+            try:
+                return cls(int(bits, 16), 0xFFFF)
+            except ValueError:
+                return None
+        if isinstance(bits, int):
+            return cls(bits, 0xFFFF)
+        return None
+
+    def __contains__(self, bit: int) -> bool:
+        return bool(self.mask >> bit & 1)
+
+    def __getitem__(self, bit: int) -> int:
+        if not self.mask >> bit & 1:
+            raise KeyError(bit)
+        return self.word >> bit & 1
+
+    def get(self, bit: int, default: Any = None) -> Any:
+        return self.word >> bit & 1 if self.mask >> bit & 1 else default
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        """按位号顺序返回消息中出现过的(位号, 值)"""
+        mask, word, bit = self.mask, self.word, 0
+        while mask:
+            if mask & 1:
+                yield bit, word & 1
+            mask >>= 1
+            word >>= 1
+            bit += 1
+
+    def to_dict(self) -> Dict[int, int]:
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, BitGroup) and self.word == other.word and self.mask == other.mask
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"BitGroup(word=0x{self.word:04x}, mask=0x{self.mask:04x})"
+
+
+class _AnalogLayout:
+    """一组模拟量通道的名称、地址和单位，通道不变时在各帧之间共享"""
+    __slots__ = ('reg_addrs', 'names', 'units', 'index')
+
+    def __init__(self, reg_addrs: tuple, names: tuple, units: tuple):
+        self.reg_addrs = reg_addrs
+        self.names = names
+        self.units = units
+        self.index = {name: i for i, name in enumerate(names)}
+
+
+# 通道布局缓存，键为通道名称元组
+_ANALOG_LAYOUTS: Dict[tuple, _AnalogLayout] = {}
+_MAX_ANALOG_LAYOUTS = 64
+
+
+class AnalogData:
+    """模拟量：名称、地址、单位在各帧之间共享，数值为float数组（缺失为NaN）"""
+    __slots__ = ('layout', 'values', 'raw_values')
+
+    def __init__(self, layout: _AnalogLayout, values: array, raw_values: array):
+        self.layout = layout
+        self.values = values
+        self.raw_values = raw_values
+
+    @classmethod
+    def from_items(cls, items: Any, value_key: str = 'physical_value') -> 'AnalogData':
+        """从[{'reg_addr', 'name', 'physical_value'/'value', 'raw_value', 'unit'}, ...]构建"""
+        if not isinstance(items, list):
+            items = []
+        items = [item for item in items if isinstance(item, Mapping)]
+        names = tuple([item.get('name', '') for item in items])
+        layout = _ANALOG_LAYOUTS.get(names)
+        if layout is None:
+            layout = cls.shared_layout(tuple([item.get('reg_addr', '') for item in items]), names,
+                                       tuple([item.get('unit', '') for item in items]))
+        return cls(layout, array('d', [_number(item.get(value_key)) for item in items]),
+                   array('d', [_number(item.get('raw_value')) for item in items]))
+
+    @staticmethod
+    def shared_layout(reg_addrs: tuple, names: tuple, units: tuple) -> _AnalogLayout:
+        """按通道名称取得（或登记）共享的通道布局，数值已按列保存时直接构建AnalogData"""
+        layout = _ANALOG_LAYOUTS.get(names)
+        if layout is None:
+            layout = _AnalogLayout(reg_addrs, names, units)
+            if len(_ANALOG_LAYOUTS) >= _MAX_ANALOG_LAYOUTS:
+                _ANALOG_LAYOUTS.clear()
+            _ANALOG_LAYOUTS[names] = layout
+        return layout
+
+    @property
+    def names(self) -> tuple:
+        return self.layout.names
+
+    @property
+    def units(self) -> tuple:
+        return self.layout.units
+
+    @property
+    def reg_addrs(self) -> tuple:
+        return self.layout.reg_addrs
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """按通道名称取物理值"""
+        index = self.layout.index.get(name)
+        if index is None:
+            return default
+        value = self.values[index]
+        return default if math.isnan(value) else value
+
+    def items(self) -> Iterator[Tuple[str, float, str]]:
+        """按通道顺序返回(名称, 物理值, 单位)"""
+        return zip(self.layout.names, self.values, self.layout.units)
+
+    def __repr__(self) -> str:
+        return f"AnalogData({dict(zip(self.layout.names, self.values))})"
+
+
+def _number(value: Any) -> float:
+    if value is None or isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class ProtocolMessage:
+    """协议消息基类：公共字段 + 按消息类型生成的字段
+
+    raw保留原始只读消息，未在协议文档中列出的字段仍可从raw读取。
+    """
+    __slots__ = ('type', 'device_id', 'timestamp', 'seq_num', 'raw')
+    MESSAGE_TYPE = None
+    FIELDS: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_message(cls, message: Mapping) -> 'ProtocolMessage':
+        obj = cls._from_header(message)
+        data = message.get('data')
+        obj._load(message, data if isinstance(data, Mapping) else {})
+        return obj
+
+    @classmethod
+    def from_fields(cls, message: Mapping, **fields: Any) -> 'ProtocolMessage':
+        """由已解析的字段构建，不读取message中的data（如接收进程环形缓冲区中按列保存的行）"""
+        obj = cls._from_header(message)
+        for field in cls.FIELDS:
+            setattr(obj, field, fields.get(field))
+        return obj
+
+    @classmethod
+    def _from_header(cls, message: Mapping) -> 'ProtocolMessage':
+        obj = cls.__new__(cls)
+        obj.type = message.get('type')
+        obj.device_id = message.get('device_id')
+        obj.timestamp = message.get('timestamp')
+        obj.seq_num = message.get('seq_num')
+        obj.raw = message
+        return obj
+
+    def _load(self, message: Mapping, data: Mapping) -> None:
+        # 字段优先取消息根级别（应答类消息），其次取data（推送类消息）
+        for field in self.FIELDS:
+            setattr(self, field, message[field] if field in message else data.get(field))
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class SystemStatus(ProtocolMessage):
+    """system_status：各开关量分组为BitGroup，未出现的分组为None
+
+    协议文档中的扁平格式（data直接为bitN）按system_status分组处理。
+    """
+    __slots__ = STATUS_GROUP_NAMES
+    MESSAGE_TYPE = 'system_status'
+    FIELDS = STATUS_GROUP_NAMES
+
+    def _load(self, message: Mapping, data: Mapping) -> None:
+        for group in STATUS_GROUP_NAMES:
+            bits = data.get(group)
+            setattr(self, group, BitGroup.from_bits(bits) if bits is not None else None)
+        if self.system_status is None and any(key in _BIT_INDEX for key in data):
+            self.system_status = BitGroup.from_bits(data)
+
+    def groups(self) -> Iterator[Tuple[str, BitGroup]]:
+        """返回消息中出现的(分组名, BitGroup)"""
+        for group in STATUS_GROUP_NAMES:
+            bits = getattr(self, group)
+            if bits is not None:
+                yield group, bits
+
+
+class FullSnapshot(SystemStatus):
+    """full_snapshot：开关量分组同system_status，analog为AnalogData"""
+    __slots__ = ('analog',)
+    MESSAGE_TYPE = 'full_snapshot'
+    FIELDS = STATUS_GROUP_NAMES + ('analog',)
+
+    def _load(self, message: Mapping, data: Mapping) -> None:
+        super()._load(message, data)
+        # 部分后端以fault_info发送故障分组
+        if self.fault_status is None and data.get('fault_info') is not None:
+            self.fault_status = BitGroup.from_bits(data['fault_info'])
+        self.analog = AnalogData.from_items(data.get('analog_data'), 'value')
+
+
+class SwitchIO(ProtocolMessage):
+    """switch_io（已合并到system_status，保留兼容）"""
+    __slots__ = ('input', 'output')
+    MESSAGE_TYPE = 'switch_io'
+    FIELDS = ('input', 'output')
+
+    def _load(self, message: Mapping, data: Mapping) -> None:
+        self.input = BitGroup.from_bits(data['input']) if data.get('input') is not None else None
+        self.output = BitGroup.from_bits(data['output']) if data.get('output') is not None else None
+
+
+class AnalogMessage(ProtocolMessage):
+    """analog_data：analog为AnalogData"""
+    __slots__ = ('analog',)
+    MESSAGE_TYPE = 'analog_data'
+    FIELDS = ('analog',)
+
+    def _load(self, message: Mapping, data: Mapping) -> None:
+        self.analog = AnalogData.from_items(message.get('data'))
+
+
+# 其余消息类型：消息类型 -> (类名, 字段)，字段按协议文档列出
+MESSAGE_SPEC = {
+    'connect_ack': ('ConnectAck', ('status', 'connection_id')),
+    'connect_fail': ('ConnectFail', ('status', 'error_code', 'error_msg')),
+    'heartbeat_ack': ('HeartbeatAck', ('summary',)),
+    'fault': ('Fault', ('fault_bit', 'fault_code', 'fault_desc', 'fault_status', 'recovery_method')),
+    'control_ack': ('ControlAck', ('request_id', 'cmd', 'exec_status', 'exec_msg', 'error_code',
+                                   'current_mode', 'cleared_count')),
+    'param_write_ack': ('ParamWriteAck', ('request_id', 'exec_status', 'exec_msg', 'success_count',
+                                          'total_count', 'params')),
+    'param_read_ack': ('ParamReadAck', ('request_id', 'params', 'sensor_down', 'sensor_up', 'reg_addr',
+                                        'param_name', 'current_value', 'unit')),
+    'fault_record_list_ack': ('FaultRecordListAck', ('request_id', 'total_records', 'max_capacity',
+                                                     'record_length', 'records')),
+    'fault_record_read_start': ('FaultRecordReadStart', ('request_id', 'total_registers', 'batch_size',
+                                                         'total_batches', 'estimated_time', 'total_points',
+                                                         'total_bytes')),
+    'fault_record_progress': ('FaultRecordProgress', ('request_id', 'current_batch', 'total_batches', 'percentage')),
+    'fault_record_chunk': ('FaultRecordChunk', ('request_id', 'chunk_index', 'total_chunks', 'point_offset',
+                                                'data_points')),
+    'fault_record_complete': ('FaultRecordComplete', ('request_id', 'fault_info', 'data_points', 'total_points')),
+    'fault_record_error': ('FaultRecordError', ('request_id', 'error_code', 'error_msg', 'current_batch')),
+    'fault_record_cancelled': ('FaultRecordCancelled', ('request_id', 'cancelled_at_batch')),
+    'data_recovery': ('DataRecovery', ('data',)),
+    'connection_lost': ('ConnectionLost', ('reason',)),
+    'serial_error': ('SerialError', ('error_code', 'error_msg')),
+    'error': ('Error', ('request_id', 'error_code', 'error_msg')),
+}
+
+
+def _compile_message_class(message_type: str, name: str, fields: Tuple[str, ...]) -> type:
+    return type(name, (ProtocolMessage,), {
+        '__slots__': fields,
+        '__doc__': f"{message_type}消息",
+        'MESSAGE_TYPE': message_type,
+        'FIELDS': fields,
+    })
+
+
+# 消息类型 -> 消息类
+MESSAGE_CLASSES: Dict[str, type] = {
+    message_type: _compile_message_class(message_type, name, fields)
+    for message_type, (name, fields) in MESSAGE_SPEC.items()
+}
+MESSAGE_CLASSES.update({cls.MESSAGE_TYPE: cls for cls in (SystemStatus, FullSnapshot, SwitchIO, AnalogMessage)})
+
+
+def to_typed(message: Mapping) -> ProtocolMessage:
+    """将解码后的消息转换为对应的消息对象，未列出的类型使用ProtocolMessage
+
+    自带to_typed()的消息（如接收进程环形缓冲区中的行）由其自身直接构建，不经过data字典。
+    """
+    convert = getattr(message, 'to_typed', None)
+    if convert is not None:
+        return convert()
+    return MESSAGE_CLASSES.get(message.get('type'), ProtocolMessage).from_message(message)
+
+
+class TypedMessageCache:
+    """每种消息类型缓存最近一帧的转换结果，同一帧的多个类型化回调共享一个对象"""
+    __slots__ = ('_latest',)
+
+    def __init__(self):
+        self._latest: Dict[Any, Tuple[Mapping, ProtocolMessage]] = {}
+
+    def convert(self, message: Mapping) -> ProtocolMessage:
+        key = message.get('type')
+        cached = self._latest.get(key)
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        typed = to_typed(message)
+        self._latest[key] = (message, typed)
+        return typed
+
+
+class TypedCallback:
+    """接收整条消息、以消息对象调用订阅者的回调包装"""
+
+    def __init__(self, callback: Callable, convert: Callable[[Mapping], ProtocolMessage]):
+        self.callback = callback
+        self._convert = convert
+        self.__qualname__ = getattr(callback, '__qualname__', repr(callback))
+
+    async def __call__(self, message: Mapping) -> None:
+        await self.callback(self._convert(message))
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, TypedCallback):
+            return self.callback == other.callback
+        return self.callback == other
+
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return f"<TypedCallback {self.__qualname__}>"
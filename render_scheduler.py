@@ -0,0 +1,135 @@
+"""
+绘图调度模块
+Render Scheduler Module
+
+数据接收只写入缓冲区并标记有新数据，绘图由调度器按固定帧率执行：每一帧如果有新数据就调用一次绘图，
+接收频率再高也不会超过设定的帧率。事件循环滞后（定时器唤醒延迟超过帧间隔的一定比例）时帧率减半，
+直到不低于最低帧率；连续一段时间按时唤醒后逐步恢复到设定的帧率。
+"""
+# flake8: noqa
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RenderScheduler:
+    """固定帧率的绘图调度器，事件循环滞后时自动降低帧率"""
+
+    def __init__(self, render: Callable[[], Awaitable[None]], fps: float = 5.0, min_fps: float = 1.0,
+                 lag_threshold: float = 0.5, recover_seconds: float = 2.0, name: str = ''):
+        """
+        Args:
+            render: 绘图协程，每帧最多调用一次
+            fps: 设定的帧率
+            min_fps: 降低帧率的下限
+            lag_threshold: 唤醒延迟超过帧间隔的该比例时认为事件循环滞后
+            recover_seconds: 连续按时唤醒该时长后帧率提高一档
+            name: 日志中显示的名称
+        """
+        if fps <= 0:
+            raise ValueError(f"绘图帧率无效: {fps}")
+        self.render = render
+        self.target_fps = float(fps)
+        self.min_fps = min(float(min_fps), self.target_fps)
+        self.lag_threshold = lag_threshold
+        self.recover_seconds = recover_seconds
+        self.name = name
+        self.fps = self.target_fps
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._on_time_since: Optional[float] = None
+
+        # 统计信息
+        self.frames = 0
+        self.idle_ticks = 0
+        self.marks = 0
+        self.slowdowns = 0
+        self.lag_max = 0.0
+        self.render_time_total = 0.0
+        self.render_time_max = 0.0
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def mark_dirty(self) -> None:
+        """登记有新数据，下一帧绘图"""
+        self._dirty = True
+        self.marks += 1
+
+    def start(self) -> None:
+        """启动调度协程（需要在事件循环中调用）"""
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self) -> None:
+        """停止调度协程"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _loop(self) -> None:
+        """调度循环：按帧间隔唤醒，有新数据时绘图"""
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        while True:
+            due += self.interval
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            now = loop.time()
+            self._observe_lag(now - due, now)
+            if now - due > self.interval:
+                # 滞后超过一帧时不补帧，从当前时间重新计时
+                due = now
+            if not self._dirty:
+                self.idle_ticks += 1
+                continue
+            self._dirty = False
+            started = time.perf_counter()
+            try:
+                await self.render()
+            except Exception as e:
+                logger.error(f"绘图失败 ({self.name}): {e}")
+            elapsed = time.perf_counter() - started
+            self.frames += 1
+            self.render_time_total += elapsed
+            self.render_time_max = max(self.render_time_max, elapsed)
+
+    def _observe_lag(self, lag: float, now: float) -> None:
+        """按唤醒延迟调整帧率"""
+        self.lag_max = max(self.lag_max, lag)
+        if lag > self.interval * self.lag_threshold:
+            self._on_time_since = None
+            if self.fps > self.min_fps:
+                self.fps = max(self.min_fps, self.fps / 2)
+                self.slowdowns += 1
+                logger.warning(f"事件循环滞后 {lag * 1000:.0f}ms，绘图帧率降至 {self.fps:g} ({self.name})")
+            return
+        if self.fps >= self.target_fps:
+            return
+        if self._on_time_since is None:
+            self._on_time_since = now
+        elif now - self._on_time_since >= self.recover_seconds:
+            self.fps = min(self.target_fps, self.fps * 2)
+            self._on_time_since = now
+            logger.info(f"绘图帧率恢复至 {self.fps:g} ({self.name})")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取帧率、绘图次数和滞后统计"""
+        return {
+            'fps': self.fps,
+            'target_fps': self.target_fps,
+            'frames': self.frames,
+            'idle_ticks': self.idle_ticks,
+            'marks': self.marks,
+            'slowdowns': self.slowdowns,
+            'lag_max_ms': self.lag_max * 1000,
+            'render_avg_ms': self.render_time_total * 1000 / self.frames if self.frames else 0.0,
+            'render_max_ms': self.render_time_max * 1000,
+        }
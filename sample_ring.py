@@ -0,0 +1,150 @@
+"""
+采样环形缓冲区模块
+Columnar Sample Ring Buffer Module
+
+实时曲线的采样按列保存在预先分配的NumPy数组中：时间戳为int64毫秒（Unix纪元），每个通道一列float32，
+不再为每个采样创建float和datetime对象，按全速推送保存数小时的数据也只占用固定的内存。
+
+每个采样同时写入下标i和i+capacity两处（镜像存储），任意最近N个采样在内存中都是连续的，
+window()/between()返回的是数组视图（不复制）；视图在继续写入capacity个采样后会被覆盖，
+需要长期保留时应自行复制。
+"""
+# flake8: noqa
+import logging
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _read_only(view: np.ndarray) -> np.ndarray:
+    view.setflags(write=False)
+    return view
+
+
+class SampleRing:
+    """按列存储的定长采样环形缓冲区（单线程写入）
+
+    时间戳应单调不减，between()按时间戳二分查找窗口边界。
+    """
+
+    def __init__(self, capacity: int, channels: Iterable[str] = ()):
+        """
+        Args:
+            capacity: 保留的采样数，写满后覆盖最旧的采样
+            channels: 通道名称，之后也可用add_channel()增加
+        """
+        if capacity <= 0:
+            raise ValueError(f"采样环形缓冲区容量无效: {capacity}")
+        self.capacity = int(capacity)
+        self.channels: Dict[str, int] = {}
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._values = np.full((0, 2 * self.capacity), np.nan, dtype=np.float32)
+        self._written = 0  # 累计写入的采样数
+        for name in channels:
+            self.add_channel(name)
+
+    @staticmethod
+    def bytes_per_sample(channels: int) -> int:
+        """每个采样占用的内存（时间戳和各通道数值，镜像存储各两份）"""
+        return 2 * (8 + 4 * channels)
+
+    def add_channel(self, name: str) -> int:
+        """增加一个通道（已写入的采样在该通道上为NaN），返回通道的行号"""
+        index = self.channels.get(name)
+        if index is None:
+            index = self.channels[name] = len(self.channels)
+            row = np.full((1, 2 * self.capacity), np.nan, dtype=np.float32)
+            self._values = np.concatenate((self._values, row))
+        return index
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    @property
+    def written(self) -> int:
+        """累计写入的采样数（含已被覆盖的），可用于判断上次读取之后新增了多少采样"""
+        return self._written
+
+    @property
+    def nbytes(self) -> int:
+        return self._timestamps.nbytes + self._values.nbytes
+
+    def append(self, timestamp_ms: int, values: Mapping[str, float]) -> None:
+        """写入一个采样，values为通道名称 -> 数值，未给出的通道为NaN，未登记的通道忽略"""
+        slot = self._written % self.capacity
+        mirror = slot + self.capacity
+        self._timestamps[slot] = self._timestamps[mirror] = timestamp_ms
+        column = self._values[:, slot]
+        column.fill(np.nan)
+        for name, value in values.items():
+            index = self.channels.get(name)
+            if index is not None:
+                column[index] = value
+        self._values[:, mirror] = column
+        self._written += 1
+
+    def extend(self, timestamps_ms: Sequence[int], values: np.ndarray) -> None:
+        """批量写入采样
+
+        Args:
+            timestamps_ms: k个时间戳（毫秒）
+            values: 形状为(通道数, k)的数组，按通道行号排列
+        """
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32).reshape(len(self.channels), len(timestamps_ms))
+        count = len(timestamps_ms)
+        if count > self.capacity:
+            # 只有最后capacity个采样会保留
+            skipped = count - self.capacity
+            self._written += skipped
+            timestamps_ms, values, count = timestamps_ms[skipped:], values[:, skipped:], self.capacity
+        slots = (self._written + np.arange(count)) % self.capacity
+        for offset in (0, self.capacity):
+            self._timestamps[slots + offset] = timestamps_ms
+            self._values[:, slots + offset] = values
+        self._written += count
+
+    def window(self, count: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """最近count个采样（默认全部）的只读视图
+
+        Returns:
+            (时间戳数组, 形状为(通道数, n)的数值数组)，均为缓冲区的视图
+        """
+        size = len(self) if count is None else max(0, min(int(count), len(self)))
+        end = self._written % self.capacity + self.capacity
+        return (_read_only(self._timestamps[end - size:end]),
+                _read_only(self._values[:, end - size:end]))
+
+    def between(self, start_ms: int, end_ms: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """时间戳在[start_ms, end_ms]之间的采样的只读视图"""
+        timestamps, values = self.window()
+        lo = int(np.searchsorted(timestamps, start_ms, side='left'))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='right'))
+        return timestamps[lo:hi], values[:, lo:hi]
+
+    def column(self, name: str, count: Optional[int] = None) -> np.ndarray:
+        """一个通道最近count个采样的只读视图"""
+        return self.window(count)[1][self.channels[name]]
+
+    def latest(self) -> Optional[Tuple[int, Dict[str, float]]]:
+        """最新的采样：(时间戳, 通道名称 -> 数值)，没有采样时返回None"""
+        if not self._written:
+            return None
+        slot = (self._written - 1) % self.capacity
+        row = self._values[:, slot]
+        return int(self._timestamps[slot]), {name: row[index] for name, index in self.channels.items()}
+
+    def clear(self) -> None:
+        self._written = 0
+        self._values.fill(np.nan)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'channels': len(self.channels),
+            'capacity': self.capacity,
+            'samples': len(self),
+            'written': self._written,
+            'memory_bytes': self.nbytes,
+        }
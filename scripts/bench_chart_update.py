@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+实时曲线更新开销测试脚本
+Real-time Chart Update Benchmark
+
+用法: python scripts/bench_chart_update.py [--series 4] [--updates 500]
+对比实时曲线页面每帧更新的两种方式：重新序列化全部120个时间标签和带样式的数据集
+（原方式），与只发送新的时间标签和每条曲线一个值的增量调用（浏览器端控制器只注册一次）。
+统计每次更新的字节数、服务端生成耗时，安装了Node.js时另外按NiceGUI执行run_javascript的方式（eval）
+统计脚本解析和编译的耗时（每次更新的脚本内容不同，无法复用编译缓存）。
+"""
+# flake8: noqa
+import argparse
+import asyncio
+import json
+import logging
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config_manager import ConfigManager
+from pages.real_time_curve_page import RealTimeCurvePage
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+# 图表窗口内的数据点数（2分钟窗口，每秒1个点）
+WINDOW_POINTS = 120
+
+# 在Node.js中按NiceGUI执行run_javascript的方式（eval）逐个执行脚本，输出总耗时（毫秒）；
+# 图表对象和控制器替换为空实现，只统计脚本解析、编译和数据字面量构建
+_NODE_EVAL = '''
+const scripts = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+globalThis.window = globalThis;
+const chart = {data: {}, update: function () {}};
+window.realtimeChart = {append: function (id, label, values) { chart.data.last = values; }};
+for (const code of scripts.slice(0, 1)) {
+    const match = code.match(/window\\.(chart_[0-9]+)/);
+    if (match) window[match[1]] = chart;
+}
+const started = process.hrtime.bigint();
+for (const code of scripts) {
+    eval(code);
+}
+console.log(Number(process.hrtime.bigint() - started) / 1e6);
+'''
+
+
+def legacy_update_script(page: RealTimeCurvePage, chart_id: str) -> str:
+    """原方式：每帧重新序列化全部标签和带样式的数据集"""
+    data = page._build_chart_config()['data']
+    return f'''
+                (function() {{
+                    const chart = window.chart_{chart_id};
+                    if (chart) {{
+                        chart.data.labels = {json.dumps(data['labels'])};
+                        chart.data.datasets = {json.dumps(data['datasets'])};
+                        chart.update('none');
+                    }} else {{
+                        console.warn('Chart not found: {chart_id}');
+                    }}
+                }})();
+            '''
+
+
+def build_frame(page: RealTimeCurvePage, i: int) -> list:
+    return [{'name': p['name'], 'physical_value': round(20 + (i * 7 + n * 13) % 50 * 0.37, 2), 'unit': p['unit']}
+            for n, p in enumerate(page.available_parameters)]
+
+
+def node_eval_ms(scripts: list) -> float:
+    node = shutil.which('node')
+    if node is None:
+        return float('nan')
+    output = subprocess.run([node, '-e', _NODE_EVAL], input=json.dumps(scripts),
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='实时曲线更新开销测试')
+    parser.add_argument('--series', type=int, default=4, help='选中的曲线数（1~4）')
+    parser.add_argument('--updates', type=int, default=500, help='窗口填满后测量的更新次数')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    page = RealTimeCurvePage(config, None)
+    page.selected_parameters = [p['name'] for p in page.available_parameters[:max(1, min(4, args.series))]]
+    chart_id = f"chart_{id(page)}"
+    page.chart_points = WINDOW_POINTS  # 全量更新保持120个点（超过时抽稀）
+
+    async def feed(count: int, offset: int = 0) -> None:
+        for i in range(count):
+            await page._handle_analog_data(build_frame(page, offset + i))
+
+    asyncio.run(feed(WINDOW_POINTS))
+
+    legacy, incremental = [], []
+    legacy_seconds = incremental_seconds = 0.0
+    now = int(time.time() * 1000)
+    for i in range(args.updates):
+        asyncio.run(feed(1, WINDOW_POINTS + i))
+        started = time.perf_counter()
+        legacy.append(legacy_update_script(page, chart_id))
+        legacy_seconds += time.perf_counter() - started
+        frame_values = {item['name']: item['physical_value'] for item in build_frame(page, WINDOW_POINTS + i)}
+        started = time.perf_counter()
+        incremental.append(page._build_append_script(chart_id, now + i * 1000, frame_values))
+        incremental_seconds += time.perf_counter() - started
+
+    print(f"曲线数: {len(page.selected_parameters)}，窗口: {WINDOW_POINTS} 点，更新次数: {args.updates}")
+    print(f"{'方式':<10}{'字节/次':>12}{'生成(us/次)':>14}{'浏览器执行(us/次)':>14}")
+    rows = []
+    for name, scripts, seconds in (('全量更新', legacy, legacy_seconds), ('增量追加', incremental, incremental_seconds)):
+        size = sum(len(code.encode('utf-8')) for code in scripts) / len(scripts)
+        eval_us = node_eval_ms(scripts) * 1000 / len(scripts)
+        rows.append((size, eval_us))
+        print(f"{name:<10}{size:>12.0f}{seconds * 1e6 / len(scripts):>14.1f}{eval_us:>14.1f}")
+    print(f"字节数降低: {rows[0][0] / rows[1][0]:.0f}x，浏览器执行耗时降低: {rows[0][1] / rows[1][1]:.0f}x"
+          if shutil.which('node') else f"字节数降低: {rows[0][0] / rows[1][0]:.0f}x（未安装Node.js，跳过浏览器执行耗时）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+JSON编解码器性能测试脚本
+JSON Codec Micro-benchmark
+
+用法: python scripts/bench_codec.py [--seconds 1.0]
+对比各可用编解码器解码 analog_data 与 fault_record_complete 帧的每秒帧数，
+decode_frame 包含只读结构转换（所有回调共享同一份解码结果），
+倍数以原接收循环使用的 json.loads 为基准。
+"""
+# flake8: noqa
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from message_codec import AVAILABLE_CODECS, get_codec
+
+
+def build_analog_data_frame() -> str:
+    """构建与后端格式一致的analog_data帧"""
+    channels = [
+        ('0x0006', '轨地电流SA1', 'A'), ('0x0007', '可控硅电流SA2', 'A'),
+        ('0x0008', '保留', 'A'), ('0x0009', '保留', 'V'),
+        ('0x000a', '保留', 'V'), ('0x000b', '保留', 'A'),
+        ('0x000c', '轨地电压SV1', 'V'), ('0x000d', '轨地电压SV2', 'V'),
+    ]
+    message = {
+        'type': 'analog_data',
+        'device_id': 'HYP_RPLD_001',
+        'timestamp': '2024-09-29 14:30:10.789',
+        'seq_num': 1003,
+        'data': [
+            {'reg_addr': addr, 'name': name, 'raw_value': 255 + i,
+             'physical_value': 25.5 + i / 10, 'unit': unit}
+            for i, (addr, name, unit) in enumerate(channels)
+        ],
+        'status': 'success',
+    }
+    return json.dumps(message, ensure_ascii=False)
+
+
+def build_fault_record_complete_frame(points: int = 300) -> str:
+    """构建与后端格式一致的fault_record_complete帧（默认300个数据点）"""
+    message = {
+        'type': 'fault_record_complete',
+        'device_id': 'HYP_RPLD_001',
+        'request_id': 'req_fault_read_001',
+        'data': {
+            'fault_info': {
+                'fault_time': '2024-09-29 13:45:12.345',
+                'fault_bits': '0x0001',
+                'fault_point': points // 2,
+                'record_cycle': 100,
+            },
+            'data_points': [
+                {
+                    'point_index': i,
+                    'system_status': f'0x{(0x0104 + i) & 0xFFFF:04x}',
+                    'channel1_sa1': round(12.0 + (i % 17) * 0.3, 1),
+                    'channel2_sa2': round(3.0 + (i % 11) * 0.2, 1),
+                    'channel3_sv1': round(60.0 + (i % 23) * 1.5, 1),
+                }
+                for i in range(points)
+            ],
+        },
+        'timestamp': '2024-09-29 14:30:15.123',
+    }
+    return json.dumps(message, ensure_ascii=False)
+
+
+def measure(func, payload, seconds: float) -> float:
+    """在指定时间内重复执行，返回每秒执行次数"""
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            func(payload)
+        count += 50
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='JSON编解码器性能测试')
+    parser.add_argument('--seconds', type=float, default=1.0, help='每项测试时长（秒）')
+    args = parser.parse_args()
+
+    frames = {
+        'analog_data': build_analog_data_frame(),
+        'fault_record_complete': build_fault_record_complete_frame(),
+    }
+    print(f"可用编解码器: {', '.join(AVAILABLE_CODECS)}，自动选择: {get_codec().name}")
+
+    for frame_type, payload in frames.items():
+        print(f"\n{frame_type} ({len(payload.encode('utf-8'))} 字节)")
+        baseline = measure(json.loads, payload, args.seconds)
+        for name, codec in AVAILABLE_CODECS.items():
+            loads_fps = measure(codec.loads, payload, args.seconds)
+            frame_fps = measure(codec.decode_frame, payload, args.seconds)
+            print(f"  {name:8s} loads: {loads_fps:12,.0f} 帧/秒  "
+                  f"decode_frame: {frame_fps:12,.0f} 帧/秒  "
+                  f"相对json.loads: {frame_fps / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+实时曲线抽稀开销测试脚本
+Real-time Curve Decimation Benchmark
+
+用法: python scripts/bench_decimation.py [--series 2] [--method minmax] [--runs 5]
+在缓存中写入24小时的全速采样（每秒sample_rate个），对每个可选的时间窗口统计：
+窗口内的采样数、抽稀后整体替换一次的字节数和服务端耗时（切片、抽稀、序列化），
+以及不抽稀时需要发送的字节数（按每个采样约相同的字节数估算）。
+"""
+# flake8: noqa
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config_manager import ConfigManager
+from pages.real_time_curve_page import RealTimeCurvePage
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='实时曲线抽稀开销测试')
+    parser.add_argument('--series', type=int, default=2, help='选中的曲线数（1~4）')
+    parser.add_argument('--method', default=None, help='抽稀方法：minmax或lttb（默认使用配置）')
+    parser.add_argument('--runs', type=int, default=5, help='每个窗口测量的次数')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    page = RealTimeCurvePage(config, None)
+    page.selected_parameters = [p['name'] for p in page.available_parameters[:max(1, min(4, args.series))]]
+    if args.method:
+        page.decimation = args.method
+
+    # 填满缓存：正弦波加噪声，每10分钟一个单采样尖峰
+    count = page.samples.capacity
+    rate = config.get_section('实时曲线配置').get('sample_rate', 10)
+    timestamps = int(time.time() * 1000) - count * 1000 // rate + np.arange(count, dtype=np.int64) * 1000 // rate
+    rng = np.random.default_rng(1)
+    values = (np.sin(np.arange(count) / (rate * 60.0)) * 10 + 50 + rng.normal(0, 0.5, (len(page.samples.channels), count)))
+    values[:, ::rate * 600] += 40
+    page.samples.extend(timestamps, values)
+
+    print(f"曲线数: {len(page.selected_parameters)}，抽稀方法: {page.decimation}，图表点数: {page.chart_points}，"
+          f"缓存: {page.samples.nbytes / 1e6:.1f} MB")
+    print(f"{'窗口':<8}{'采样数':>10}{'发送点数':>10}{'字节/次':>10}{'耗时(ms)':>10}{'不抽稀字节':>14}")
+    for seconds, name in page.WINDOW_OPTIONS.items():
+        page.window_seconds = seconds
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            script = page._build_replace_script('chart_1')
+        elapsed_ms = (time.perf_counter() - started) * 1000 / args.runs
+        samples = page._window_size()
+        sent = len(page._window_series()[0])
+        size = len(script.encode('utf-8'))
+        print(f"{name:<8}{samples:>10}{sent:>10}{size:>10}{elapsed_ms:>10.1f}{size * samples // max(sent, 1):>14}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
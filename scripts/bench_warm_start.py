@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+首屏数据就绪时间测试脚本
+Warm Start Benchmark
+
+用法: python scripts/bench_warm_start.py [--runs 10] [--status-rate 1] [--target-ms 1000]
+启动本地设备模拟器（推送频率同协议默认值：模拟量10帧/秒、状态字1帧/秒、全量快照每30秒），
+每轮新建客户端并连接，统计从connect()到主接线图和系统状态页面所需数据全部到达
+（全部模拟量通道和四个开关量分组）的耗时，对比连接后请求快照与只等待增量推送两种方式。
+"""
+# flake8: noqa
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+# 页面显示所需的开关量分组
+REQUIRED_GROUPS = ('system_status', 'switch_input', 'switch_output', 'fault_status')
+
+
+class _Screen:
+    """模拟主接线图和系统状态页面：记录各项数据首次到达的时间"""
+
+    def __init__(self, client: WebSocketClient):
+        self.analog = False
+        self.groups = set()
+        self.ready = asyncio.Event()
+        client.register_data_callback('analog_data', self.on_analog, coalesce=True, typed=True)
+        client.register_data_callback('system_status', self.on_status, coalesce=True, typed=True)
+        client.register_data_callback('full_snapshot', self.on_snapshot, coalesce=True, typed=True)
+
+    async def on_analog(self, message):
+        self.analog = self.analog or len(message.analog.names) > 0
+        self._check()
+
+    async def on_status(self, message):
+        self.groups.update(name for name, _ in message.groups())
+        self._check()
+
+    async def on_snapshot(self, message):
+        await self.on_status(message)
+        await self.on_analog(message)
+
+    def _check(self):
+        if self.analog and self.groups.issuperset(REQUIRED_GROUPS):
+            self.ready.set()
+
+
+async def _measure(config, url: str, bootstrap: bool, timeout: float) -> float:
+    client = WebSocketClient(config, websocket_url=url)
+    client.snapshot_bootstrap = bootstrap
+    screen = _Screen(client)
+    started = time.perf_counter()
+    try:
+        await client.connect()
+        await asyncio.wait_for(screen.ready.wait(), timeout)
+        return time.perf_counter() - started
+    except asyncio.TimeoutError:
+        return float('inf')
+    finally:
+        await client.disconnect()
+
+
+async def run(args) -> bool:
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    simulator = DeviceSimulator(config, rates={'analog_data': args.analog_rate, 'system_status': args.status_rate})
+    await simulator.start()
+    passed = True
+    try:
+        print(f"{'方式':<16}{'中位数(ms)':>12}{'p95(ms)':>12}{'最大(ms)':>12}")
+        for name, bootstrap in (('连接后请求快照', True), ('只等待增量推送', False)):
+            samples = sorted([await _measure(config, simulator.url, bootstrap, args.timeout) for _ in range(args.runs)])
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(f"{name:<16}{statistics.median(samples) * 1000:>12.1f}{p95 * 1000:>12.1f}{samples[-1] * 1000:>12.1f}")
+            if bootstrap:
+                passed = samples[-1] * 1000 < args.target_ms
+    finally:
+        await simulator.stop()
+    print(f"目标: 连接后请求快照的最大耗时 < {args.target_ms} ms —— {'达到' if passed else '未达到'}")
+    return passed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='首屏数据就绪时间测试')
+    parser.add_argument('--runs', type=int, default=10, help='每种方式的连接次数')
+    parser.add_argument('--analog-rate', type=float, default=10.0, help='模拟量推送频率（帧/秒）')
+    parser.add_argument('--status-rate', type=float, default=1.0, help='状态字推送频率（帧/秒）')
+    parser.add_argument('--timeout', type=float, default=35.0, help='单次等待数据就绪的超时时间（秒）')
+    parser.add_argument('--target-ms', type=float, default=1000.0, help='连接后请求快照方式的目标耗时（毫秒）')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    return 0 if asyncio.run(run(args)) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+WebSocket录制回放性能测试脚本
+WebSocket Recording Replay Benchmark
+
+用法: python scripts/replay_frames.py recordings/ws_frames.rec [--speed 10] [--json report.json]
+将录制的接收帧送入WebSocketClient，驱动主接线图、系统状态和实时曲线页面的数据回调
+（不打开浏览器，只测量后端回调路径），结束后输出实际吞吐量和各回调耗时。
+--speed 1 为按原始节奏回放，N 为N倍速，0 为尽可能快。
+"""
+# flake8: noqa
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from config_manager import ConfigManager
+from frame_replay import FrameReplayer
+from websocket_client import WebSocketClient
+
+
+def attach_pages(config, client):
+    """创建页面对象并注册其数据回调（不创建界面）"""
+    from pages.main_diagram_page import MainDiagramPage
+    from pages.real_time_curve_page import RealTimeCurvePage
+    from pages.system_status_page import SystemStatusPage
+
+    pages = [MainDiagramPage(config, client), RealTimeCurvePage(config, client)]
+    status_page = SystemStatusPage(config, client)
+    status_page._register_websocket_callbacks()
+    pages.append(status_page)
+    return pages
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='WebSocket录制回放性能测试')
+    parser.add_argument('recording', help='FrameRecorder录制的文件')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，0为尽可能快')
+    parser.add_argument('--config', default=str(ROOT / 'config.ini'), help='配置文件路径')
+    parser.add_argument('--json', help='将回放报告保存为JSON文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = ConfigManager(args.config)
+    config.load_config_sync()
+    client = WebSocketClient(config)
+    pages = attach_pages(config, client)
+
+    report = await FrameReplayer(client, args.recording, args.speed).run()
+    client.dispatcher.stop()
+
+    print(f"回放 {report['frames']} 帧（录制时长 {report['recorded_seconds']} 秒），"
+          f"耗时 {report['elapsed_seconds']} 秒，实际倍速 {report['achieved_speed']}x")
+    print(f"吞吐量 {report['throughput_fps']} 帧/秒，最大调度滞后 {report['max_lag_ms']} ms，丢帧 {report['dropped']}")
+    for message_type, entry in report['message_types'].items():
+        print(f"\n{message_type}: {entry['count']} 帧，解码 avg {entry['decode_ms']['avg']} ms / p95 {entry['decode_ms']['p95']} ms")
+        for name, stats in entry['callbacks'].items():
+            print(f"  {name:60s} {stats['count']:8d} 次  avg {stats['avg']} ms  p95 {stats['p95']} ms  max {stats['max']} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"\n回放报告已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
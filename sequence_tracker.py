@@ -0,0 +1,200 @@
+"""
+序列号跟踪模块
+Sequence Tracker Module
+"""
+# flake8: noqa
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# observe() 的返回状态
+SEQ_ACCEPTED = 'accepted'    # 新的帧（可能同时发现了缺失的序列号）
+SEQ_RECOVERED = 'recovered'  # 补回之前缺失的帧
+SEQ_DUPLICATE = 'duplicate'  # 重复帧，应丢弃
+SEQ_RESET = 'reset'          # 序列号回退过大，视为后台重启后重新计数
+
+
+class _StreamState:
+    """单个推送流的序列号状态"""
+    __slots__ = ('last_seq', 'missing', 'gaps', 'requested', 'recovered', 'duplicates', 'lost', 'resets', 'filtered',
+                 'rewind_next', 'rewind_run', 'reconnected')
+
+    def __init__(self, seq: int):
+        self.last_seq = seq
+        self.missing = OrderedDict()  # 尚未补回的序列号（按发现顺序）
+        self.gaps = 0
+        self.requested = 0
+        self.recovered = 0
+        self.duplicates = 0
+        self.lost = 0
+        self.resets = 0
+        self.filtered = 0
+        self.rewind_next = None  # 连续回退的帧的下一个序列号
+        self.rewind_run = 0      # 连续递增的回退帧数
+        self.reconnected = False  # 重连后尚未收到实时推送（服务器不报告纪元）
+
+
+class SequenceTracker:
+    """按推送流（设备）跟踪seq_num，检测缺失、重复和补回的帧
+
+    同一设备的system_status、analog_data、fault、full_snapshot等推送共用一个递增序列号。
+    后台重启后序列号从头计数：注册应答报告的序列号纪元变化时清除所有推送流的状态；
+    服务器不报告纪元时，实时推送的序列号回退超过max_rewind、重连后的第一帧实时推送回退，
+    或小幅回退后连续rewind_frames帧都在回退后的位置递增，视为重启（补推帧只按max_gap判断）。
+    """
+
+    def __init__(self, max_gap: int = 1000, max_missing: int = 5000, max_rewind: int = 64, rewind_frames: int = 3):
+        self.max_gap = max(1, int(max_gap))
+        self.max_missing = max(1, int(max_missing))
+        self.max_rewind = max(0, int(max_rewind))
+        self.rewind_frames = max(1, int(rewind_frames))
+        self.epoch = None
+        self._streams: Dict[str, _StreamState] = {}
+
+    def set_epoch(self, epoch) -> bool:
+        """登记服务器报告的序列号纪元（后台每次启动时生成）
+
+        Returns:
+            bool: 纪元与之前不同（后台已重启），所有推送流的状态已清除
+        """
+        if epoch is None:
+            return False
+        # 服务器报告了纪元，重连后是否重启由纪元判断
+        for state in self._streams.values():
+            state.reconnected = False
+        if epoch == self.epoch:
+            return False
+        previous, self.epoch = self.epoch, epoch
+        if previous is None:
+            return False
+        if self._streams:
+            logger.warning(f"序列号纪元从 {previous} 变为 {epoch}，后台已重启，重新开始跟踪 {len(self._streams)} 个推送流")
+            self._streams.clear()
+        return True
+
+    def expect_restart(self) -> None:
+        """重连且服务器不报告纪元时调用：之后第一帧实时推送的序列号回退即视为后台已重启
+        
+        重连后请求从最后收到的序列号之后续传，服务器未重启时不会再推送更旧的实时帧。
+        """
+        for state in self._streams.values():
+            state.reconnected = True
+
+    def observe(self, stream: str, seq: int, prev_seq: Optional[int] = None,
+                recovery: bool = False) -> Tuple[str, List[int]]:
+        """登记收到的序列号
+
+        Args:
+            stream: 推送流（设备ID）
+            seq: 序列号
+            prev_seq: 服务器按订阅过滤推送时，发给本连接的上一帧序列号（之间的帧被过滤，不计为缺失）
+            recovery: 是否为补推帧（data_recovery），补推帧可能比最新的帧旧很多，不按max_rewind判断重启
+
+        Returns:
+            Tuple[str, List[int]]: (状态, 本次新发现的缺失序列号)
+        """
+        state = self._streams.get(stream)
+        if state is None:
+            self._streams[stream] = _StreamState(seq)
+            return SEQ_ACCEPTED, []
+
+        last_seq = state.last_seq
+        reconnected = state.reconnected
+        if not recovery:
+            state.reconnected = False
+        if seq > last_seq:
+            state.rewind_run = 0
+        if seq == last_seq + 1:
+            state.last_seq = seq
+            return SEQ_ACCEPTED, []
+
+        if prev_seq is not None and last_seq <= prev_seq < seq:
+            state.filtered += seq - prev_seq - 1
+            state.last_seq = seq
+            if prev_seq == last_seq:
+                return SEQ_ACCEPTED, []
+            # 只能确定prev_seq这一帧丢失，更早的帧是否被过滤无法判断
+            state.gaps += 1
+            state.missing[prev_seq] = None
+            state.requested += 1
+            return SEQ_ACCEPTED, [prev_seq]
+
+        if seq > last_seq:
+            state.last_seq = seq
+            state.gaps += 1
+            gap = seq - last_seq - 1
+            if gap > self.max_gap:
+                # 缺口过大时不再逐个补推，等待全量快照恢复状态
+                state.lost += gap
+                logger.warning(f"推送流 {stream} 序列号从 {last_seq} 跳到 {seq}，缺失 {gap} 帧，超过补推上限")
+                return SEQ_ACCEPTED, []
+            missing = list(range(last_seq + 1, seq))
+            for missing_seq in missing:
+                state.missing[missing_seq] = None
+            while len(state.missing) > self.max_missing:
+                state.missing.popitem(last=False)
+                state.lost += 1
+            state.requested += len(missing)
+            return SEQ_ACCEPTED, missing
+
+        if seq in state.missing:
+            del state.missing[seq]
+            state.recovered += 1
+            return SEQ_RECOVERED, []
+
+        rewind = last_seq - seq
+        if not recovery:
+            state.rewind_run = state.rewind_run + 1 if seq == state.rewind_next else 1
+            state.rewind_next = seq + 1
+        if rewind > self.max_gap or (not recovery and (
+                rewind > self.max_rewind or reconnected or state.rewind_run >= self.rewind_frames)):
+            # 序列号大幅回退（实时推送不会比最新的帧旧很多）、重连后回退或持续在回退后的位置递增，
+            # 视为后台重启，重新开始计数；之前当作重复帧丢弃的连续回退帧请求补推
+            logger.warning(f"推送流 {stream} 序列号从 {last_seq} 回退到 {seq}，重新开始跟踪")
+            dropped = list(range(seq - state.rewind_run + 1, seq)) if not recovery else []
+            state.last_seq = seq
+            state.lost += len(state.missing)
+            state.missing.clear()
+            state.resets += 1
+            state.rewind_run = 0
+            state.duplicates -= len(dropped)
+            for missing_seq in dropped:
+                state.missing[missing_seq] = None
+            state.requested += len(dropped)
+            return SEQ_RESET, dropped
+
+        state.duplicates += 1
+        return SEQ_DUPLICATE, []
+
+    def get_last_seq(self, stream: str) -> int:
+        """获取推送流最后收到的序列号，未收到过返回-1"""
+        state = self._streams.get(stream)
+        return state.last_seq if state else -1
+
+    def get_offsets(self) -> Dict[str, int]:
+        """获取所有推送流最后收到的序列号，用于重连后请求续传"""
+        return {stream: state.last_seq for stream, state in self._streams.items()}
+
+    def get_missing(self, stream: str) -> List[int]:
+        """获取推送流尚未补回的序列号"""
+        state = self._streams.get(stream)
+        return list(state.missing) if state else []
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取各推送流的序列号统计"""
+        return {
+            stream: {
+                'last_seq': state.last_seq,
+                'gaps': state.gaps,
+                'requested': state.requested,
+                'recovered': state.recovered,
+                'missing': len(state.missing),
+                'duplicates': state.duplicates,
+                'lost': state.lost,
+                'resets': state.resets,
+                'filtered': state.filtered,
+            }
+            for stream, state in self._streams.items()
+        }
@@ -0,0 +1,132 @@
+"""
+共享内存环形缓冲区模块
+Shared Memory Ring Buffer Module
+
+单写者、多读者的定长行环形缓冲区，用于接收进程向界面进程传递模拟量采样和状态字。
+每行为width个float64，读者按写入计数的游标读取新行，得到的是共享内存上的视图（不复制）。
+"""
+# flake8: noqa
+import logging
+import math
+from array import array
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+RING_MAGIC = 0x52504C4452494E47  # 'RPLDRING'
+
+# 头部：magic、行数、每行列数、写入计数（均为uint64）
+_HEADER_FIELDS = 4
+_HEADER_SIZE = _HEADER_FIELDS * 8
+_MAGIC, _SLOT_COUNT, _WIDTH, _WRITE_COUNT = range(_HEADER_FIELDS)
+
+
+class SharedRing:
+    """共享内存环形缓冲区
+
+    写者每写一行后递增写入计数；读者记录已读到的计数作为游标，写入计数超过游标+行数时，
+    中间被覆盖的行计为丢失。读取返回的行视图在写者绕回一圈后会被覆盖，
+    读者应在处理完后调用valid_from()确认这些行没有被覆盖。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._header = shm.buf[:_HEADER_SIZE].cast('Q')
+        if self._header[_MAGIC] != RING_MAGIC:
+            self._header.release()
+            raise ValueError(f"共享内存 {shm.name} 不是环形缓冲区")
+        self.slot_count = self._header[_SLOT_COUNT]
+        self.width = self._header[_WIDTH]
+        self._data = shm.buf[_HEADER_SIZE:_HEADER_SIZE + self.slot_count * self.width * 8].cast('d')
+        self._nan_row = [math.nan] * self.width
+
+    @classmethod
+    def create(cls, slot_count: int, width: int, name: Optional[str] = None) -> 'SharedRing':
+        """创建环形缓冲区（由拥有者负责unlink）"""
+        if slot_count <= 0 or width <= 0:
+            raise ValueError(f"环形缓冲区尺寸无效: {slot_count}x{width}")
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER_SIZE + slot_count * width * 8)
+        header = shm.buf[:_HEADER_SIZE].cast('Q')
+        header[_SLOT_COUNT] = slot_count
+        header[_WIDTH] = width
+        header[_WRITE_COUNT] = 0
+        header[_MAGIC] = RING_MAGIC
+        header.release()
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedRing':
+        """连接到已存在的环形缓冲区"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def write_count(self) -> int:
+        """累计写入的行数"""
+        return self._header[_WRITE_COUNT]
+
+    def valid_from(self) -> int:
+        """当前仍未被覆盖的最早一行的写入序号"""
+        return max(0, self._header[_WRITE_COUNT] - self.slot_count)
+
+    def safe_from(self) -> int:
+        """复制完成后仍可信的最早一行的写入序号
+
+        写者在发布写入计数之前就开始覆盖valid_from()所在的槽位，该行可能已被写了一半。
+        """
+        return max(0, self._header[_WRITE_COUNT] - self.slot_count + 1)
+
+    def write(self, values: Sequence[float]) -> None:
+        """写入一行，不足width的列补NaN（仅写者调用）"""
+        count = self._header[_WRITE_COUNT]
+        start = (count % self.slot_count) * self.width
+        row = list(values)
+        if len(row) < self.width:
+            row.extend(self._nan_row[len(row):])
+        elif len(row) > self.width:
+            raise ValueError(f"行长度 {len(row)} 超过环形缓冲区宽度 {self.width}")
+        self._data[start:start + self.width] = memoryview(array('d', row))
+        # 行内容写完后再发布写入计数
+        self._header[_WRITE_COUNT] = count + 1
+
+    def read(self, cursor: int) -> Tuple[int, int, List[memoryview], int]:
+        """读取游标之后写入的行
+
+        Args:
+            cursor: 上次读取返回的新游标，首次读取传0（或write_count只读新数据）
+
+        Returns:
+            (首行序号, 新游标, 行视图列表, 被覆盖而丢失的行数)
+        """
+        count = self._header[_WRITE_COUNT]
+        if cursor > count:
+            # 写者重建了缓冲区，从头读取
+            cursor = 0
+        start = max(cursor, count - self.slot_count)
+        rows = []
+        for index in range(start, count):
+            offset = (index % self.slot_count) * self.width
+            rows.append(self._data[offset:offset + self.width])
+        return start, count, rows, start - cursor
+
+    def close(self) -> None:
+        """释放本进程的映射，拥有者同时删除共享内存"""
+        if self._shm is None:
+            return
+        self._data.release()
+        self._header.release()
+        try:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        except BufferError:
+            logger.error(f"共享内存 {self._shm.name} 仍有未释放的行视图")
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
@@ -0,0 +1,124 @@
+"""
+回调订阅句柄模块
+Callback Subscription Handle Module
+"""
+# flake8: noqa
+import inspect
+import logging
+import weakref
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WeakCallback:
+    """弱引用的绑定方法回调
+
+    页面对象被回收（浏览器会话关闭）后回调自动失效，不会因为注册了回调而让页面一直存活。
+    与原绑定方法比较相等，unregister_*按原方法取消注册时仍能匹配。
+    """
+
+    def __init__(self, method: Callable, on_dead: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            method: 绑定方法
+            on_dead: 方法所属对象被回收时调用（用于从注册表中移除）
+        """
+        self._ref = weakref.WeakMethod(method, (lambda _: on_dead()) if on_dead else None)
+        self.__qualname__ = method.__qualname__
+
+    @property
+    def alive(self) -> bool:
+        return self._ref() is not None
+
+    async def __call__(self, *args: Any) -> None:
+        method = self._ref()
+        if method is not None:
+            await method(*args)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, WeakCallback):
+            return self._ref == other._ref
+        method = self._ref()
+        return method is not None and method == other
+
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return f"<WeakCallback {self.__qualname__}{'' if self.alive else ' (dead)'}>"
+
+
+def weak_callback(callback: Callable, on_dead: Optional[Callable[[], None]] = None) -> Callable:
+    """绑定方法包装为弱引用回调，普通函数和闭包保持强引用（否则注册后会立即失效）"""
+    if inspect.ismethod(callback):
+        return WeakCallback(callback, on_dead)
+    return callback
+
+
+class Subscription:
+    """一次回调注册的句柄
+
+    close()取消注册（可重复调用），也可作为上下文管理器使用：
+
+        with client.register_data_callback('analog_data', handler):
+            ...
+    """
+    __slots__ = ('message_type', 'callback_name', '_unsubscribe', '__weakref__')
+
+    def __init__(self, message_type: str, callback_name: str, unsubscribe: Callable[[], None]):
+        self.message_type = message_type
+        self.callback_name = callback_name
+        self._unsubscribe = unsubscribe
+
+    @property
+    def active(self) -> bool:
+        return self._unsubscribe is not None
+
+    def close(self) -> None:
+        """取消注册"""
+        unsubscribe, self._unsubscribe = self._unsubscribe, None
+        if unsubscribe is not None:
+            try:
+                unsubscribe()
+            except Exception as e:
+                logger.error(f"取消订阅失败 ({self.message_type} {self.callback_name}): {e}")
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<Subscription {self.message_type} {self.callback_name}{'' if self.active else ' (closed)'}>"
+
+
+class SubscriptionScope:
+    """一组订阅，随页面显示周期或浏览器会话一起关闭"""
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._subscriptions: List[Subscription] = []
+
+    def add(self, subscription: Optional[Subscription]) -> Optional[Subscription]:
+        """登记订阅，返回原句柄便于链式使用"""
+        if subscription is not None:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def close(self) -> None:
+        """关闭所有已登记的订阅"""
+        subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.close()
+        if subscriptions:
+            logger.debug(f"关闭订阅: {self.name or '未命名'} {len(subscriptions)} 个")
+
+    def __len__(self) -> int:
+        return sum(1 for subscription in self._subscriptions if subscription.active)
+
+    def __enter__(self) -> 'SubscriptionScope':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
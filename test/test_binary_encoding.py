@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+二进制帧编码协商测试脚本
+Binary Frame Encoding Negotiation Test Script
+
+本地启动一个模拟服务器，分别以JSON、MessagePack、CBOR发送同一组消息，
+验证客户端各条路径解码得到的消息完全一致。
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from message_codec import available_binary_encodings
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+SAMPLE_MESSAGES = [
+    {
+        'type': 'analog_data',
+        'device_id': 'HYP_RPLD_001',
+        'timestamp': '2024-09-29 14:30:10.789',
+        'seq_num': 1003,
+        'data': [
+            {'reg_addr': '0x0006', 'name': '轨地电流SA1', 'raw_value': 255, 'physical_value': 25.5, 'unit': 'A'},
+            {'reg_addr': '0x000c', 'name': '轨地电压SV1', 'raw_value': 120, 'physical_value': 12.0, 'unit': 'V'},
+        ],
+    },
+    {
+        'type': 'fault_record_complete',
+        'device_id': 'HYP_RPLD_001',
+        'request_id': 'req_fault_read_001',
+        'data': {
+            'fault_info': {'fault_time': '2024-09-29 13:45:12.345', 'fault_bits': '0x0001'},
+            'data_points': [
+                {'point_index': i, 'system_status': '0x0104', 'channel1_sa1': 12.5,
+                 'channel2_sa2': 3.0, 'channel3_sv1': 61.5}
+                for i in range(300)
+            ],
+        },
+    },
+]
+
+
+def _encode(message, encoding):
+    """按指定编码序列化一条消息"""
+    if encoding == 'msgpack':
+        import msgpack
+        return msgpack.packb(message, use_bin_type=True)
+    if encoding == 'cbor':
+        import cbor2
+        return cbor2.dumps(message)
+    return json.dumps(message, ensure_ascii=False)
+
+
+async def _run_session(encoding):
+    """启动模拟服务器并以指定编码推送消息，返回客户端收到的消息"""
+    registrations = []
+
+    async def handler(websocket):
+        registration = json.loads(await websocket.recv())
+        registrations.append(registration)
+        chosen = encoding if encoding in registration.get('supported_encodings', []) else 'json'
+        await websocket.send(json.dumps({'type': 'device_register_ack', 'encoding': chosen}))
+        for message in SAMPLE_MESSAGES:
+            await websocket.send(_encode(message, chosen))
+        await websocket.wait_closed()
+
+    async with websockets.serve(handler, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        client = WebSocketClient(config)
+        client.websocket_url = f"ws://127.0.0.1:{port}"
+        client.snapshot_bootstrap = False  # 模拟服务器不应答snapshot_request
+
+        received = []
+        done = asyncio.Event()
+
+        async def on_message(message):
+            received.append(message)
+            if len(received) == len(SAMPLE_MESSAGES):
+                done.set()
+
+        for message in SAMPLE_MESSAGES:
+            client.register_message_callback(message['type'], on_message)
+
+        assert await client.connect()
+        await asyncio.wait_for(done.wait(), timeout=5)
+        status = client.get_connection_status()
+        await client.disconnect()
+
+    assert 'json' in registrations[0]['supported_encodings']
+    return received, status['frame_encoding']
+
+
+def test_binary_and_json_paths_produce_same_messages():
+    """JSON与各二进制编码路径得到的消息完全一致"""
+    async def run():
+        json_messages, json_encoding = await _run_session('json')
+        assert json_encoding == 'json'
+        assert json_messages == SAMPLE_MESSAGES
+
+        for encoding in available_binary_encodings():
+            messages, negotiated = await _run_session(encoding)
+            assert negotiated == encoding
+            assert messages == json_messages, encoding
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_binary_and_json_paths_produce_same_messages()
+    print("✓ 二进制帧编码协商测试通过")
+    sys.exit(0)
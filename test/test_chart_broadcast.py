@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+实时曲线广播测试脚本
+Real-time Curve Broadcast Test Script
+
+验证多个浏览器会话同时查看实时曲线时，每次更新的脚本只生成一次、同一个字符串发送给所有会话，
+新加入的会话只收到自己的图表创建、已有会话先收到之前的新采样，会话离开后不再发送且最后一个会话离开时停止绘图，
+已删除和发送失败的会话自动移除，以及20个会话时每次更新仍只生成一次脚本。
+"""
+# flake8: noqa
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from chart_broadcast import ChartBroadcaster
+from config_manager import ConfigManager
+from pages.real_time_curve_page import RealTimeCurvePage
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+class _FakeClient:
+    def __init__(self, client_id, fail=False):
+        self.id = client_id
+        self.is_deleted = False
+        self.fail = fail
+        self.scripts = []
+
+    def run_javascript(self, code):
+        if self.fail:
+            raise RuntimeError('连接已关闭')
+        self.scripts.append(code)
+
+
+def test_broadcaster_builds_once_and_drops_dead_clients():
+    """脚本只生成一次；没有会话时不生成；已删除和发送失败的会话被移除"""
+    broadcaster = ChartBroadcaster('test')
+    builds = []
+
+    def build():
+        builds.append(1)
+        return 'realtimeChart.append("c",1,[1])'
+
+    assert broadcaster.broadcast(build) == 0 and builds == []
+    clients = [_FakeClient(f'c{i}') for i in range(5)]
+    for client in clients:
+        assert broadcaster.add(client)
+    assert not broadcaster.add(clients[0]) and len(broadcaster) == 5
+
+    assert broadcaster.broadcast(build) == 5 and len(builds) == 1
+    assert all(client.scripts[0] is clients[0].scripts[0] for client in clients)
+
+    clients[1].is_deleted = True
+    clients[2].fail = True
+    assert broadcaster.broadcast(build) == 3 and len(builds) == 2
+    assert len(broadcaster) == 3 and clients[1] not in broadcaster and clients[2] not in broadcaster
+    assert broadcaster.broadcast(lambda: None) == 0
+    stats = broadcaster.get_stats()
+    assert stats['broadcasts'] == 2 and stats['deliveries'] == 8 and stats['failures'] == 1
+
+
+def _scripts(client):
+    """会话中已入队的脚本"""
+    return [data['code'] for _, message_type, data in client.outbox.messages if message_type == 'run_javascript']
+
+
+def test_twenty_sessions_share_each_update():
+    """20个NiceGUI会话同时查看：每帧只生成一次脚本，所有会话收到同一个字符串"""
+    from nicegui import Client, core
+    from nicegui.page import page as nicegui_page
+
+    async def run():
+        core.loop = asyncio.get_running_loop()
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        page = RealTimeCurvePage(config, None)
+        builds = []
+        build_extend = page._build_extend_script
+
+        def counting_build(chart_id, count):
+            builds.append(count)
+            return build_extend(chart_id, count)
+
+        page._build_extend_script = counting_build
+
+        async def feed(count):
+            for i in range(count):
+                await page._handle_analog_data([{'name': '轨地电流SA1', 'physical_value': i},
+                                                {'name': '轨地电压SV1', 'physical_value': i * 0.5}])
+
+        clients = [Client(nicegui_page('/'), request=None) for _ in range(20)]
+        for client in clients[:19]:
+            with client:
+                page.create_page()
+        await feed(3)
+        with clients[19]:
+            page.create_page()
+        await asyncio.sleep(0.01)
+        # 已有会话先收到之前的3个新采样（只生成一次），新会话只收到图表创建
+        assert builds == [3] and len(page.viewers) == 20
+        registered, created = _scripts(clients[19])
+        assert registered.lstrip().startswith('window.realtimeChart = ')
+        assert created.startswith(f'realtimeChart.create("{page.chart_id}"')
+        flushed = _scripts(clients[0])[-1]
+        assert flushed.startswith('realtimeChart.extend(')
+        assert all(_scripts(client)[-1] is flushed for client in clients[:19])
+
+        for _ in range(10):
+            await feed(1)
+            page._render_frame()
+        await asyncio.sleep(0.01)
+        assert builds == [3] + [1] * 10
+        latest = _scripts(clients[0])[-1]
+        assert latest.startswith('realtimeChart.append(')
+        assert all(_scripts(client)[-1] is latest for client in clients)
+        assert page.viewers.get_stats()['deliveries'] == 19 + 20 * 10
+
+        # 会话离开：该会话销毁图表且不再收到更新，最后一个会话离开时停止绘图
+        assert page.render_scheduler.running
+        page.cleanup(clients[5])
+        await asyncio.sleep(0.01)
+        assert _scripts(clients[5])[-1].startswith('window.realtimeChart && realtimeChart.destroy(')
+        before = len(_scripts(clients[5]))
+        await feed(1)
+        page._render_frame()
+        await asyncio.sleep(0.01)
+        assert len(_scripts(clients[5])) == before and len(page.viewers) == 19
+        for client in clients:
+            page.cleanup(client)
+        assert not page.viewers and not page.render_scheduler.running and page.viewer_controls == {}
+        page.cleanup()
+        for client in clients:
+            client.delete()
+
+    logging.disable(logging.ERROR)
+    try:
+        asyncio.run(run())
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def test_extra_viewers_share_each_build():
+    """抽稀后整体替换（1小时窗口）：20个NiceGUI会话时每次更新仍只生成一次脚本，每个会话发送一次同一个字符串"""
+    from nicegui import Client, core
+    from nicegui.page import page as nicegui_page
+
+    async def run():
+        core.loop = asyncio.get_running_loop()
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        page = RealTimeCurvePage(config, None)
+        page.window_seconds = 3600
+        page.refresh_interval = 0
+        page.chart_initialized = True
+        count = 3600 * 10
+        timestamps = 1727568000000 + np.arange(count, dtype=np.int64) * 100
+        page.samples.extend(timestamps, np.random.default_rng(1).normal(50, 5, (len(page.samples.channels), count)))
+        clients = [Client(nicegui_page('/'), request=None) for _ in range(20)]
+        builds = []
+        build_replace = page._build_replace_script
+
+        def counting_build(*args):
+            builds.append(1)
+            return build_replace(*args)
+
+        page._build_replace_script = counting_build
+        page.viewers = ChartBroadcaster('test')
+        for client in clients:
+            page.viewers.add(client)
+        runs = 5
+        for i in range(runs):
+            page.samples.append(int(timestamps[-1]) + 100 * (i + 1), {'轨地电流SA1': 1.0})
+            page._render_frame()
+            await asyncio.sleep(0.01)
+            latest = _scripts(clients[0])[-1]
+            assert latest.startswith('realtimeChart.replace(')
+            assert all(_scripts(client)[-1] is latest for client in clients)
+        assert len(builds) == runs
+        stats = page.viewers.get_stats()
+        assert stats['broadcasts'] == runs and stats['deliveries'] == runs * len(clients)
+        assert all(len(_scripts(client)) == runs for client in clients)
+        for client in clients:
+            client.delete()
+
+    logging.disable(logging.ERROR)
+    try:
+        asyncio.run(run())
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_broadcaster_builds_once_and_drops_dead_clients()
+    test_twenty_sessions_share_each_update()
+    test_extra_viewers_share_each_build()
+    print("✓ 实时曲线广播测试通过")
+    sys.exit(0)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+实时曲线增量更新测试脚本
+Real-time Chart Incremental Update Test Script
+
+验证实时曲线页面每帧只发送新的时间标签和各选中曲线的一个值（本帧缺少的参数为null），
+单次更新的字节数比重新发送全部标签和数据集小一个数量级以上；安装了Node.js时
+用模拟的Chart类执行浏览器端控制器，验证追加、窗口裁剪和Chart.js加载前的数据暂存。
+"""
+# flake8: noqa
+import asyncio
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from config_manager import ConfigManager
+from pages.real_time_curve_page import CHART_CONTROLLER_JS, RealTimeCurvePage
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _frame(i):
+    return [
+        {'name': '轨地电流SA1', 'physical_value': 12.5 + i % 7, 'unit': 'A'},
+        {'name': '可控硅电流SA2', 'physical_value': 0.5, 'unit': 'A'},
+        {'name': '轨地电压SV1', 'physical_value': 60.25 + i % 5, 'unit': 'V'},
+    ]
+
+
+def _legacy_update_script(page, chart_id):
+    """原方式：每帧重新序列化全部标签和带样式的数据集"""
+    data = page._build_chart_config()['data']
+    return f'''
+                (function() {{
+                    const chart = window.chart_{chart_id};
+                    if (chart) {{
+                        chart.data.labels = {json.dumps(data['labels'])};
+                        chart.data.datasets = {json.dumps(data['datasets'])};
+                        chart.update('none');
+                    }} else {{
+                        console.warn('Chart not found: {chart_id}');
+                    }}
+                }})();
+            '''
+
+
+def test_append_script_carries_only_new_values():
+    """增量更新只包含时间标签和选中曲线的值，字节数小于全量更新的十分之一"""
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    page = RealTimeCurvePage(config, None)
+    page.selected_parameters = ['轨地电流SA1', '轨地电压SV1', '轨地电压SV2']
+
+    async def feed():
+        for i in range(130):
+            await page._handle_analog_data(_frame(i))
+
+    asyncio.run(feed())
+    assert len(page.samples) == 130
+    config = page._build_chart_config()
+    assert len(config['data']['labels']) == 130 and isinstance(config['data']['labels'][0], int)
+    datasets = config['data']['datasets']
+    assert [len(d['data']) for d in datasets] == [130, 130, 130] and datasets[2]['data'][0] is None
+
+    script = page._build_append_script('chart_1', 1727591401000, {'轨地电流SA1': 12.5, '轨地电压SV1': 60.25})
+    assert script == 'realtimeChart.append("chart_1",1727591401000,[12.5, 60.25, null])'
+    legacy = _legacy_update_script(page, 'chart_1')
+    assert len(script.encode('utf-8')) * 10 < len(legacy.encode('utf-8'))
+
+
+def test_controller_appends_and_trims():
+    """浏览器端控制器：创建前到达的数据点补入配置，超出时间窗口的数据点从头部裁剪，批量追加，整体替换抽稀后的数据"""
+    node = shutil.which('node')
+    if node is None:
+        return  # 未安装Node.js时只验证Python端
+    harness = '''
+        globalThis.window = globalThis;
+        globalThis.document = {
+            getElementById: function (id) { return {id: id}; },
+            createElement: function () { return {}; },
+            head: {appendChild: function (script) { globalThis.chartScript = script; }},
+        };
+        globalThis.requestAnimationFrame = function (callback) { callback(); };
+    ''' + CHART_CONTROLLER_JS + '''
+        const results = {};
+        const config = {data: {labels: [1000], datasets: [{data: [1]}, {data: [2]}]}};
+        realtimeChart.create('c1', config, 2000);
+        realtimeChart.append('c1', 2000, [3, 4]);  // Chart.js尚未加载
+        globalThis.Chart = class {
+            constructor(canvas, config) { this.data = config.data; }
+            update() { results.updates = (results.updates || 0) + 1; }
+            destroy() { results.destroyed = true; }
+        };
+        chartScript.onload();
+        realtimeChart.append('c1', 3000, [5, null]);
+        realtimeChart.append('c1', 4100, [7]);
+        realtimeChart.append('missing', 9000, [1]);
+        realtimeChart.extend('c1', [4500, 6000], [[8, 9], [1, 2]]);
+        results.labels = config.data.labels.slice();
+        results.data = config.data.datasets.map(function (dataset) { return dataset.data; });
+        results.tick = config.options.scales.x.ticks.callback.call({getLabelForValue: function () { return 4100; }}, 0);
+        realtimeChart.replace('c1', [0, 5000], [[1, 2]]);
+        results.replaced = [config.data.labels, config.data.datasets.map(function (dataset) { return dataset.data; })];
+        realtimeChart.destroy('c1');
+        realtimeChart.append('c1', 9999, [9, 9]);
+        realtimeChart.replace('c1', [1], [[1]]);
+        console.log(JSON.stringify(results));
+    '''
+    output = subprocess.run([node, '-e', harness],
+                            capture_output=True, text=True, timeout=30, check=True).stdout
+    results = json.loads(output)
+    assert results['labels'] == [4100, 4500, 6000]
+    assert results['data'] == [[7, 8, 9], [None, 1, 2]]
+    assert len(results['tick']) == 8 and results['tick'].count(':') == 2
+    assert results['replaced'] == [[0, 5000], [[1, 2], []]]
+    assert results['updates'] == 4 and results['destroyed'] is True
+
+
+if __name__ == "__main__":
+    test_append_script_carries_only_new_values()
+    test_controller_appends_and_trims()
+    print("✓ 实时曲线增量更新测试通过")
+    sys.exit(0)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+曲线抽稀测试脚本
+Curve Decimation Test Script
+
+验证minmax和lttb抽稀的点数不超过图表点数且与窗口长度无关、单个采样的尖峰保留在结果中、
+缺失的通道保持为NaN，以及实时曲线页面在1分钟到24小时的时间窗口下发送的数据点数固定，
+窗口内采样较少时逐帧追加、需要抽稀时按固定间隔整体替换。
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from config_manager import ConfigManager
+from decimation import decimate, lttb_decimate, minmax_decimate
+from pages.real_time_curve_page import RealTimeCurvePage
+from sample_ring import SampleRing
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _signal(count, spike_at):
+    timestamps = np.arange(count, dtype=np.int64) * 100
+    values = np.vstack((np.sin(np.arange(count) / 500.0), np.full(count, 60.0), np.full(count, np.nan))).astype(np.float32)
+    values[1, spike_at] = 95.0  # SV1单个采样的尖峰
+    values[1, spike_at + 1] = 20.0
+    return timestamps, values
+
+
+def test_point_count_and_spikes():
+    """抽稀后的点数与采样数无关，尖峰（最大值和最小值）都保留，缺失通道为NaN"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        for count in (601, 6000, 864000):
+            timestamps, values = _signal(count, count // 3)
+            for method in ('minmax', 'lttb'):
+                result_timestamps, result = decimate(timestamps, values, 600, method)
+                assert len(result_timestamps) <= 600 and result.shape == (3, len(result_timestamps))
+                assert (np.diff(result_timestamps) >= 0).all()
+                assert result_timestamps[0] == 0 and result_timestamps[-1] == timestamps[-1]
+                assert np.isnan(result[2]).all()
+                # lttb每个桶只选一个采样，相邻的正负尖峰至少保留偏离较大的一个
+                assert result[1].min() == 20.0
+                if method == 'minmax':
+                    assert result[1].max() == 95.0
+                    # 每个桶两个点，最小值和最大值按出现的先后顺序
+                    spike = int(np.argmax(result[1]))
+                    assert result[1][spike + 1] == 20.0
+
+
+def test_short_window_unchanged():
+    """采样数不超过点数时原样返回（视图，不复制）"""
+    timestamps, values = _signal(500, 100)
+    for function in (minmax_decimate, lttb_decimate):
+        result_timestamps, result = function(timestamps, values, 600)
+        assert result_timestamps is timestamps and result is values
+    try:
+        decimate(timestamps, values, 100, 'average')
+        assert False, '不支持的抽稀方法应抛出ValueError'
+    except ValueError:
+        pass
+
+
+class _FakeClient:
+    def __init__(self, client_id='client_1'):
+        self.id = client_id
+        self.scripts = []
+
+    def run_javascript(self, code):
+        self.scripts.append(code)
+
+
+def test_curve_page_windows():
+    """24小时的全速采样：各时间窗口发送的数据点数固定，短窗口逐帧追加，长窗口按间隔整体替换"""
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    page = RealTimeCurvePage(config, None)
+    page.selected_parameters = ['轨地电流SA1', '轨地电压SV1']
+    names = list(page.samples.channels)
+    count = 86400 * 10
+    page.samples = SampleRing(count, names)  # 默认的max_memory_mb不足以保存24小时
+    timestamps = 1727568000000 + np.arange(count, dtype=np.int64) * 100
+    values = np.zeros((len(names), count), dtype=np.float32)
+    values[names.index('轨地电压SV1'), count - 3610 * 10] = 180.0  # 1小时前的单个采样
+    page.samples.extend(timestamps, values)
+
+    for seconds in page.WINDOW_OPTIONS:
+        page.window_seconds = seconds
+        data = page._build_chart_config()['data']
+        assert len(data['labels']) <= page.chart_points
+        assert data['labels'][-1] == int(timestamps[-1])
+        assert data['labels'][0] >= int(timestamps[-1]) - seconds * 1000
+        sv1 = data['datasets'][1]['data']
+        assert len(sv1) == len(data['labels']) and (max(sv1) == 180.0) == (seconds > 3600)
+
+    page.chart_id = 'chart_1'
+    page.chart_initialized = True
+    viewer = _FakeClient()
+    page.viewers.add(viewer)
+    page.refresh_interval = 60
+
+    async def render():
+        page.window_seconds = 30  # 301个采样，不需要抽稀
+        page.rendered_written = page.samples.written - 1
+        await page._render()
+        page.window_seconds = 86400
+        page.samples.append(int(timestamps[-1]) + 100, {})
+        for _ in range(3):
+            await page._render()
+
+    asyncio.run(render())
+    appended, replaced = viewer.scripts
+    assert appended.startswith('realtimeChart.append("chart_1",')
+    assert replaced.startswith('realtimeChart.replace("chart_1",')
+    labels = json.loads(replaced[len('realtimeChart.replace("chart_1",'):].split(',[[')[0])
+    assert len(labels) <= page.chart_points
+
+
+if __name__ == "__main__":
+    test_point_count_and_spikes()
+    test_short_window_unchanged()
+    test_curve_page_windows()
+    print("✓ 曲线抽稀测试通过")
+    sys.exit(0)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+多设备连接管理测试脚本
+Device Connection Manager Test Script
+
+为多台设备各启动一个模拟服务器，验证连接管理器按device_id路由消息、
+共享分发工作协程（分发排队时间记录到各设备的延迟统计）、按设备发送请求，主程序按[站点设备配置]为每台设备创建一套页面，
+以及各设备页面发出的请求带有该设备的device_id。
+"""
+# flake8: noqa
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from device_connection_manager import DeviceConnectionManager
+from device_simulator import DeviceSimulator
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+DEVICE_COUNT = 12
+FRAMES_PER_DEVICE = 5
+
+
+def _make_handler(registrations):
+    async def handler(websocket):
+        registration = json.loads(await websocket.recv())
+        device_id = registration['device_id']
+        registrations.append(device_id)
+        for i in range(FRAMES_PER_DEVICE):
+            await websocket.send(json.dumps({
+                'type': 'analog_data', 'device_id': device_id, 'seq_num': i + 1,
+                'data': [{'physical_value': i}],
+            }))
+        async for raw in websocket:
+            message = json.loads(raw)
+            if message['type'] == 'param_read':
+                await websocket.send(json.dumps({
+                    'type': 'param_read_ack', 'device_id': device_id,
+                    'request_id': message['data']['request_id'], 'data': {'params': []},
+                }))
+    return handler
+
+
+def test_routes_messages_per_device_with_shared_workers():
+    """消息按设备路由，所有设备共享同一组分发工作协程"""
+    async def run():
+        registrations = []
+        servers = [await websockets.serve(_make_handler(registrations), '127.0.0.1', 0) for _ in range(DEVICE_COUNT)]
+        devices = {f'RPLD_{i:03d}': f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+                   for i, server in enumerate(servers)}
+
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        manager = DeviceConnectionManager(config, devices)
+        for client in manager.clients.values():
+            client.snapshot_bootstrap = False  # 模拟服务器不应答snapshot_request
+
+        per_device = {device_id: [] for device_id in devices}
+        station = []
+        for device_id in devices:
+            async def on_analog(data, device_id=device_id):
+                per_device[device_id].append(data[0]['physical_value'])
+            manager.register_data_callback(device_id, 'analog_data', on_analog)
+
+        async def on_any(message):
+            station.append(message['device_id'])
+        manager.register_message_callback(None, 'analog_data', on_any)
+
+        results = await manager.connect_all()
+        assert all(results.values())
+        assert sorted(registrations) == sorted(devices)
+
+        for _ in range(300):
+            if len(station) == DEVICE_COUNT * FRAMES_PER_DEVICE:
+                break
+            await asyncio.sleep(0.01)
+
+        assert all(values == list(range(FRAMES_PER_DEVICE)) for values in per_device.values())
+        assert sorted(set(station)) == sorted(devices)
+
+        # 每种消息类型只有一个分发队列和工作协程，与设备数量无关
+        stats = manager.get_dispatch_stats()
+        assert stats['analog_data']['processed'] == DEVICE_COUNT * FRAMES_PER_DEVICE
+        workers = [t for t in asyncio.all_tasks() if t.get_coro().__qualname__.endswith('MessageDispatcher._worker')]
+        assert len(workers) == len(stats)
+
+        # 共享分发器的排队时间记录到提交该帧的设备连接
+        for client in manager.clients.values():
+            dispatch = client.get_latency_stats()['types']['analog_data']['dispatch_ms']
+            assert dispatch['count'] == FRAMES_PER_DEVICE
+
+        response = await manager.request('RPLD_003', 'param_read', {'read_type': 'control_params'})
+        assert response['device_id'] == 'RPLD_003'
+
+        await manager.disconnect_all()
+        assert not any(status['connected'] for status in manager.get_status().values())
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+
+
+def test_hmi_wires_a_view_per_station_device():
+    """主程序按[站点设备配置]连接每台设备，每台设备的页面只接收该设备的推送"""
+    from nicegui import Client, core
+    from nicegui.page import page
+    import main
+
+    async def run():
+        core.loop = asyncio.get_running_loop()
+        rates = {'analog_data': 50, 'system_status': 0, 'full_snapshot': 0}
+        simulators = [DeviceSimulator(device_id=device_id, rates=rates) for device_id in ('RPLD_A', 'RPLD_B')]
+        for simulator in simulators:
+            await simulator.start()
+        with tempfile.TemporaryDirectory() as tmp:
+            text = CONFIG_PATH.read_text(encoding='utf-8').replace('[站点设备配置]\n', '[站点设备配置]\n' + ''.join(
+                f'{simulator.device_id} = {simulator.url}\n' for simulator in simulators))
+            config_path = Path(tmp) / 'config.ini'
+            config_path.write_text(text, encoding='utf-8')
+
+            hmi = main.RPLDeviceHMI()
+            hmi.config = ConfigManager(str(config_path))
+            hmi.current_user = {'username': 'test', 'role': 'admin', 'display_name': '测试'}
+            sessions = [Client(page('/'), request=None) for _ in range(2)]
+            with sessions[0]:
+                await hmi.initialize()
+                hmi._create_main_layout()
+            with sessions[1]:
+                await hmi.initialize()  # 再次初始化复用已有的设备连接
+                hmi._create_main_layout('RPLD_B')
+            assert list(hmi.device_views) == ['RPLD_A', 'RPLD_B'] and hmi.default_device == 'RPLD_A'
+            views = {device_id: view[0] for device_id, view in hmi.device_views.items()}
+            for device_id, page_manager in views.items():
+                assert page_manager.websocket_client is hmi.device_manager.get_client(device_id)
+            assert views['RPLD_A'].session_pages == {sessions[0].id: 'show_main_diagram'}
+            assert views['RPLD_B'].session_pages == {sessions[1].id: 'show_main_diagram'}
+
+            for client in hmi.device_manager.clients.values():
+                client.snapshot_bootstrap = False
+            await hmi.start_websocket()
+            await hmi.start_websocket()  # 已连接的设备不重复连接
+            assert all(status['connected'] for status in hmi.device_manager.get_status().values())
+            assert all(simulator.get_stats()['connections'] == 1 for simulator in simulators)
+            for _ in range(300):
+                if all(view.main_diagram_page.pending_svg_updates for view in views.values()):
+                    break
+                await asyncio.sleep(0.01)
+            assert all(view.main_diagram_page.pending_svg_updates for view in views.values())
+            for device_id, client in hmi.device_manager.clients.items():
+                assert client.get_sequence_stats().keys() == {device_id}
+
+            await hmi.shutdown()
+            for session in sessions:
+                session.delete()
+            for view in views.values():
+                view.cleanup()
+        for simulator in simulators:
+            await simulator.stop()
+
+    logging.disable(logging.ERROR)
+    try:
+        asyncio.run(run())
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def test_fault_record_requests_use_the_page_device():
+    """第二台设备的故障录波页面：目录、读取和取消请求中的device_id均为该设备"""
+    from nicegui import Client, core
+    from nicegui.page import page
+    from pages.fault_record_page import FaultRecordPage
+
+    frames = {}
+
+    async def handler(websocket):
+        registration = json.loads(await websocket.recv())
+        device_id = registration['device_id']
+        async for raw in websocket:
+            message = json.loads(raw)
+            frames.setdefault(device_id, []).append(message)
+            data = message.get('data') or {}
+            if message['type'] == 'fault_record_list':
+                await websocket.send(json.dumps({
+                    'type': 'fault_record_list_ack', 'device_id': device_id, 'request_id': data['request_id'],
+                    'data': {'total_records': 1, 'max_capacity': 100, 'record_length': 3907,
+                             'records': [{'record_id': 0, 'fault_time': '2024-09-29 13:45:12.345'}]},
+                }))
+            elif message['type'] == 'fault_record_read':
+                await websocket.send(json.dumps({
+                    'type': 'fault_record_read_start', 'device_id': device_id, 'request_id': data['request_id'],
+                    'total_batches': 32, 'total_points': 300,
+                }))
+
+    async def run():
+        core.loop = asyncio.get_running_loop()
+        servers = [await websockets.serve(handler, '127.0.0.1', 0) for _ in range(2)]
+        devices = {device_id: f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+                   for device_id, server in zip(('RPLD_A', 'RPLD_B'), servers)}
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        manager = DeviceConnectionManager(config, devices)
+        for client in manager.clients.values():
+            client.snapshot_bootstrap = False
+            client.topics = None
+        assert all((await manager.connect_all()).values())
+
+        session = Client(page('/'), request=None)
+        with session:
+            fault_page = FaultRecordPage(config, manager.get_client('RPLD_B'))
+            fault_page.create_page()
+            await fault_page._query_directory()
+            assert fault_page.available_records == 1
+
+            async def read():
+                with session:  # 界面上下文按任务区分
+                    await fault_page._query_detail()
+
+            reading = asyncio.create_task(read())
+            for _ in range(300):
+                if any(m['type'] == 'fault_record_read' for m in frames.get('RPLD_B', [])):
+                    break
+                await asyncio.sleep(0.01)
+            await fault_page._cancel_reading()
+            reading.cancel()
+            for _ in range(300):
+                if any(m['type'] == 'fault_record_cancel' for m in frames.get('RPLD_B', [])):
+                    break
+                await asyncio.sleep(0.01)
+
+        sent = [m for m in frames['RPLD_B'] if m['type'].startswith('fault_record')]
+        assert [m['type'] for m in sent] == ['fault_record_list', 'fault_record_read', 'fault_record_cancel']
+        assert all(m['data']['device_id'] == 'RPLD_B' for m in sent)
+        assert not any(m['type'].startswith('fault_record') for m in frames.get('RPLD_A', []))
+
+        fault_page.subscriptions.close()
+        await manager.disconnect_all()
+        session.delete()
+        for server in servers:
+            server.close()
+            await server.wait_closed()
+
+    logging.disable(logging.ERROR)
+    try:
+        asyncio.run(run())
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_routes_messages_per_device_with_shared_workers()
+    test_hmi_wires_a_view_per_station_device()
+    test_fault_record_requests_use_the_page_device()
+    print("✓ 多设备连接管理测试通过")
+    sys.exit(0)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+设备模拟器测试脚本
+Device Simulator Test Script
+
+启动本地设备模拟器，验证WebSocketClient能以高频率接收推送、完成参数读写和
+故障录波请求、从补推缓存恢复丢失的帧，并验证历史数据接口。
+"""
+# flake8: noqa
+import asyncio
+import sys
+from pathlib import Path
+
+import aiohttp
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator, BINARY_ENCODERS
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _load_config():
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    return config
+
+
+async def _wait_for(predicate, timeout=3):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("等待超时")
+
+
+def test_client_streams_and_requests_against_simulator():
+    """高频推送、请求应答和丢帧补推"""
+    async def run():
+        config = _load_config()
+        simulator = DeviceSimulator(config, rates={'analog_data': 1000, 'system_status': 20, 'full_snapshot': 0},
+                                    fault_batch_delay=0.001)
+        await simulator.start()
+        client = WebSocketClient(config, websocket_url=simulator.url)
+        frames = []
+
+        async def on_analog(data):
+            frames.append(data)
+
+        client.register_data_callback('analog_data', on_analog)
+        try:
+            assert await client.connect()
+            await asyncio.sleep(0.5)
+            # 约500帧，留出调度余量
+            assert len(frames) > 250, len(frames)
+            assert frames[0][0]['name'] == '轨地电流SA1'
+            expected_encoding = next(iter(BINARY_ENCODERS), 'json')
+            assert client.get_connection_status()['frame_encoding'] == expected_encoding
+
+            response = await client.request('param_read', {'read_type': 'control_params'})
+            assert len(response['data']['params']) == len(config.get_control_parameters_mapping())
+            response = await client.request('param_write', {'params': {'0x2200': 321}})
+            assert response['exec_status'] == 'success'
+            assert simulator.params['0x2200'] == 321
+
+            response = await client.request('fault_record_list', {})
+            assert response['data']['total_records'] == 15
+            response = await client.request('fault_record_read', {'record_id': 0})
+            assert len(response['data']['data_points']) == 300
+            response = await client.request('control_cmd', {'cmd': 'fault_record_clear', 'cmd_param': {'confirm': True}})
+            assert response['cleared_count'] == 15
+
+            # 丢弃5帧，客户端检测到缺失后从补推缓存恢复
+            simulator.drop_next(5)
+            await _wait_for(lambda: simulator.frames_recovered >= 5)
+            await _wait_for(lambda: client.get_sequence_stats()[simulator.device_id]['recovered'] >= 5)
+            assert client.get_sequence_stats()[simulator.device_id]['lost'] == 0
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+def test_history_api():
+    """历史数据接口分页、全量查询和参数错误"""
+    async def run():
+        simulator = DeviceSimulator(http_port=0, rates={name: 0 for name in ('analog_data', 'system_status', 'full_snapshot')})
+        await simulator.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                params = {'start_time': '2024-09-29 00:00:00', 'end_time': '2024-09-29 01:00:00',
+                          'param_name': '轨地电压SV1', 'page': 2, 'page_size': 20}
+                async with session.get(f"{simulator.http_url}/api/v1/history/analog", params=params) as response:
+                    result = await response.json()
+                assert result['code'] == 200
+                assert result['data']['total'] == 61
+                assert len(result['data']['list']) == 20
+                assert result['data']['list'][0]['timestamp'].startswith('2024-09-29 00:20:00')
+
+                params['page_size'] = 0
+                async with session.get(f"{simulator.http_url}/api/v1/history/analog", params=params) as response:
+                    assert len((await response.json())['data']['list']) == 61
+
+                params = {'start_time': '2024-09-29T00:00:00', 'end_time': '2024-09-29T23:59:59', 'page_size': 100}
+                async with session.get(f"{simulator.http_url}/api/v1/history/events", params=params) as response:
+                    assert (await response.json())['data']['total'] == 24
+                async with session.get(f"{simulator.http_url}/api/v1/history/status", params=params) as response:
+                    assert (await response.json())['data']['total'] == 96
+
+                async with session.get(f"{simulator.http_url}/api/v1/history/status") as response:
+                    assert response.status == 400
+        finally:
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_client_streams_and_requests_against_simulator()
+    test_history_api()
+    print("✓ 设备模拟器测试通过")
+    sys.exit(0)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+故障录波分块组装测试脚本
+Fault Record Chunk Assembler Test Script
+
+验证分块数据点按point_offset解析到预先分配的列数组（乱序和重复分块不重复计数，
+整数列遇到浮点数时改为浮点数组）、进度按实际收到的字节数计算、未分块的完成应答同样可以解析，
+以及客户端从本地设备模拟器分块读取故障录波时，单帧大小远小于整条记录且结果与未分块读取一致。
+"""
+# flake8: noqa
+import asyncio
+import math
+import sys
+from pathlib import Path
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator
+from fault_record_assembler import FaultRecordAssembler
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _points(start, count):
+    return [{'point_index': i, 'system_status': f'0x{i:04x}', 'sa1': i, 'sv1': i * 0.5} for i in range(start, start + count)]
+
+
+def test_chunks_fill_preallocated_columns():
+    """乱序、重复的分块按偏移写入列数组，进度按字节数计算"""
+    assembler = FaultRecordAssembler()
+    assembler.feed({'type': 'fault_record_read_start', 'total_points': 10, 'total_bytes': 1400})
+    assert assembler.total_points == 10 and assembler.progress == 0.0
+
+    assert assembler.add_chunk({'type': 'fault_record_chunk', 'point_offset': 4, 'data_points': _points(4, 4)}, 400) == 4
+    assert assembler.add_chunk({'type': 'fault_record_chunk', 'point_offset': 0, 'data_points': _points(0, 4)}, 400) == 4
+    assert assembler.add_chunk({'type': 'fault_record_chunk', 'point_offset': 4, 'data_points': _points(4, 4)}, 400) == 0
+    assert assembler.duplicate_points == 4 and assembler.missing_points == 2
+    assert assembler.columns['sa1'].typecode == 'q' and assembler.columns['sv1'].typecode == 'd'
+    assert assembler.get_column('sa1', -1) == [0, 1, 2, 3, 4, 5, 6, 7, -1, -1]
+    assert assembler.get_column('unknown', '--') == ['--'] * 10
+    assert 0 < assembler.progress < 1
+
+    # 整数列遇到浮点数时改为浮点数组
+    assembler.add_chunk({'type': 'fault_record_chunk', 'point_offset': 8,
+                         'data_points': [{'sa1': 8.5, 'sv1': 4.0}, {'sa1': 9, 'sv1': 4.5}]}, 200)
+    assert assembler.columns['sa1'].typecode == 'd' and assembler.get_column('sa1')[8:] == [8.5, 9.0]
+    assert assembler.progress == 1.0 and assembler.missing_points == 0
+
+    assembler.feed({'type': 'fault_record_complete', 'data': {'fault_info': {'fault_bits': '0x0001'}, 'total_points': 10}})
+    assert assembler.complete and assembler.fault_info == {'fault_bits': '0x0001'}
+
+
+def test_unchunked_complete_and_estimated_progress():
+    """未声明总字节数时按平均字节数估计；未分块的完成应答在finish中解析"""
+    assembler = FaultRecordAssembler()
+    assembler.feed({'type': 'fault_record_read_start', 'total_points': 8})
+    assembler.add_chunk({'type': 'fault_record_chunk', 'point_offset': 0, 'data_points': _points(0, 2)}, 100)
+    assert assembler.expected_bytes == 400 and assembler.progress == 0.25
+
+    legacy = FaultRecordAssembler()
+    legacy.feed({'type': 'fault_record_complete', 'data': {'fault_info': {}, 'data_points': _points(0, 300)}}, 30000)
+    assert legacy.total_points == 300 and legacy.points_received == 300 and legacy.progress == 1.0
+    assert legacy.get_column('system_status')[299] == '0x012b'
+    assert math.isclose(legacy.get_column('sv1')[3], 1.5)
+
+
+def test_chunked_read_against_simulator():
+    """分块读取：逐批解析，收到的字节数等于声明的总字节数，结果与未分块读取一致"""
+    async def run():
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        simulator = DeviceSimulator(config, fault_batch_delay=0.005, encodings=[])
+        await simulator.start()
+        client = WebSocketClient(config, websocket_url=simulator.url)
+        client.snapshot_bootstrap = False
+        progress = []
+
+        async def on_chunk(message):
+            progress.append(assembler.progress)
+
+        client.register_message_callback('fault_record_chunk', on_chunk)
+        try:
+            assert await client.connect()
+            assembler = FaultRecordAssembler()
+            response = await client.request('fault_record_read', {'record_id': 1, 'chunked': True},
+                                            timeout=10, assembler=assembler)
+            assert 'data_points' not in response['data']
+            assert assembler.complete and assembler.points_received == assembler.total_points == 300
+            assert assembler.chunks_received == 32 and assembler.duplicate_points == 0
+            assert assembler.bytes_received == assembler.total_bytes
+            await asyncio.sleep(0.05)
+            assert progress == sorted(progress) and progress[-1] == 1.0
+
+            whole = FaultRecordAssembler()
+            response = await client.request('fault_record_read', {'record_id': 1}, timeout=10, assembler=whole)
+            assert whole.complete and whole.chunks_received == 0 and whole.points_received == 300
+            for name in ('system_status', 'rail_potential_max', 'branch_currents'):
+                assert whole.get_column(name) == assembler.get_column(name)
+            # 分块帧的最大大小不到整条记录的十分之一
+            metrics = client.get_message_metrics()
+            assert metrics['fault_record_chunk']['bytes_total'] == assembler.bytes_received
+            assert metrics['fault_record_chunk']['size_bytes']['max'] * 10 < whole.bytes_received
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_chunks_fill_preallocated_columns()
+    test_unchunked_complete_and_estimated_progress()
+    test_chunked_read_against_simulator()
+    print("✓ 故障录波分块组装测试通过")
+    sys.exit(0)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+WebSocket帧录制测试脚本
+WebSocket Frame Recorder Test Script
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from frame_recorder import FrameRecorder, FrameReader, DIRECTION_INBOUND, DIRECTION_OUTBOUND, DIRECTION_MARKER
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def test_recorder_writes_blocks_and_seeks_by_time():
+    """帧按块压缩写入，可按时间索引定位，追加录制不覆盖已有内容"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'frames.rec'
+        recorder = FrameRecorder(path, block_frames=10)
+        recorder.start()
+        stamps = []
+        for i in range(35):
+            recorder.record_inbound(json.dumps({'type': 'analog_data', 'seq_num': i}))
+            stamps.append(time.monotonic_ns())
+        recorder.record_outbound(b'\x81\xa4type\xa9heartbeat')
+        recorder.stop()
+
+        reader = FrameReader(path)
+        assert reader.frame_count == 37  # 标记帧 + 35帧接收 + 1帧发送
+        assert reader.block_count == 4
+        frames = list(reader.iter_frames())
+        assert frames[0].direction == DIRECTION_MARKER
+        assert [json.loads(f.payload)['seq_num'] for f in frames if f.direction == DIRECTION_INBOUND] == list(range(35))
+        assert frames[-1].direction == DIRECTION_OUTBOUND and frames[-1].payload == b'\x81\xa4type\xa9heartbeat'
+        timestamps = [f.timestamp_ns for f in frames]
+        assert timestamps == sorted(timestamps)
+
+        # 定位到第20帧记录之后的时刻
+        frame = reader.seek(stamps[19])
+        assert json.loads(frame.payload)['seq_num'] == 20
+        window = list(reader.iter_frames(stamps[9], stamps[14], directions=(DIRECTION_INBOUND,)))
+        assert [json.loads(f.payload)['seq_num'] for f in window] == [10, 11, 12, 13, 14]
+
+        # 再次录制追加到同一文件
+        recorder = FrameRecorder(path)
+        recorder.start()
+        recorder.record_inbound('{"type":"heartbeat_ack"}')
+        recorder.stop()
+        assert FrameReader(path).frame_count == 39
+
+
+def test_client_records_inbound_and_outbound_frames():
+    """客户端录制收发的帧（与服务器收到的文本逐字节相同，与所用编码器无关），并可在运行时开关"""
+    sent = []
+
+    async def handler(websocket):
+        sent.append(await websocket.recv())  # device_register
+        await websocket.send(json.dumps({'type': 'system_status', 'data': {'bit5': 0}}))
+        await websocket.wait_closed()
+
+    async def run(path):
+        async with websockets.serve(handler, '127.0.0.1', 0) as server:
+            config = ConfigManager(str(CONFIG_PATH))
+            config.load_config_sync()
+            client = WebSocketClient(config)
+            client.websocket_url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            client.snapshot_bootstrap = False  # 模拟服务器不应答snapshot_request
+            client.start_recording(str(path))
+            received = asyncio.Event()
+
+            async def on_status(data):
+                received.set()
+
+            client.register_data_callback('system_status', on_status)
+            assert await client.connect()
+            await asyncio.wait_for(received.wait(), timeout=5)
+            assert client.get_recording_stats()['recording']
+            client.stop_recording()
+            assert client.get_recording_stats() == {'recording': False}
+            await client.disconnect()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'client.rec'
+        asyncio.run(run(path))
+        frames = list(FrameReader(path).iter_frames(directions=(DIRECTION_INBOUND, DIRECTION_OUTBOUND)))
+        assert json.loads(frames[0].payload)['type'] == 'device_register'
+        assert frames[0].direction == DIRECTION_OUTBOUND and frames[0].payload == sent[0]
+        assert any(f.direction == DIRECTION_INBOUND and json.loads(f.payload)['type'] == 'system_status' for f in frames)
+
+
+def test_slow_disk_drops_oldest_frames():
+    """磁盘写入跟不上时队列长度不超过上限，丢弃最旧的帧并计数，保留最新的帧"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'frames.rec'
+        recorder = FrameRecorder(path, block_frames=1, queue_size=8)
+        write_block = recorder._write_block
+
+        def slow_write_block(*args):
+            time.sleep(0.05)
+            write_block(*args)
+
+        recorder._write_block = slow_write_block
+        recorder.start()
+        depths = []
+        for i in range(200):
+            recorder.record_inbound(json.dumps({'type': 'analog_data', 'seq_num': i}))
+            depths.append(recorder.get_stats()['queue_depth'])
+        recorder.stop()
+
+        assert max(depths) <= 8 and recorder.frames_dropped > 0
+        assert recorder.frames_recorded + recorder.frames_dropped == 201  # 含标记帧
+        reader = FrameReader(path)
+        assert reader.frame_count == recorder.frames_recorded
+        seqs = [json.loads(f.payload)['seq_num'] for f in reader.iter_frames(directions=(DIRECTION_INBOUND,))]
+        assert seqs == sorted(seqs) and seqs[-1] == 199
+        assert recorder.get_stats()['dropped'] == recorder.frames_dropped
+
+
+def test_client_stops_recording_off_the_event_loop():
+    """事件循环中停止录制不等待写入线程；随即重新录制同一文件时，新的写入线程等上一个写完再追加"""
+    async def run(path):
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        client = WebSocketClient(config)
+        client.start_recording(str(path))
+        write_block = client.recorder._write_block
+
+        def slow_write_block(*args):
+            time.sleep(0.02)
+            write_block(*args)
+
+        client.recorder.block_frames = 1
+        client.recorder._write_block = slow_write_block
+        for i in range(20):
+            client.recorder.record_inbound(json.dumps({'type': 'analog_data', 'seq_num': i}))
+        started = time.perf_counter()
+        client.start_recording(str(path))
+        client.recorder.record_inbound(json.dumps({'type': 'analog_data', 'seq_num': 20}))
+        client.stop_recording()
+        assert time.perf_counter() - started < 0.2  # 剩余20块约需0.4秒
+        client.dispatcher.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'client.rec'
+        asyncio.run(run(path))  # 退出时等待线程池中的停止完成
+        frames = list(FrameReader(path).iter_frames())
+        assert [f.direction for f in frames].count(DIRECTION_MARKER) == 2
+        seqs = [json.loads(f.payload)['seq_num'] for f in frames if f.direction == DIRECTION_INBOUND]
+        assert seqs == list(range(21))
+
+
+if __name__ == "__main__":
+    test_recorder_writes_blocks_and_seeks_by_time()
+    test_client_records_inbound_and_outbound_frames()
+    test_slow_disk_drops_oldest_frames()
+    test_client_stops_recording_off_the_event_loop()
+    print("✓ WebSocket帧录制测试通过")
+    sys.exit(0)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+WebSocket帧回放测试脚本
+WebSocket Frame Replay Test Script
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from config_manager import ConfigManager
+from frame_recorder import FrameRecorder
+from frame_replay import FrameReplayer
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _record(path, count, interval):
+    """录制count帧analog_data，每帧间隔interval秒，另加一帧发送帧"""
+    recorder = FrameRecorder(path)
+    recorder.start()
+    recorder.record_outbound(json.dumps({'type': 'device_register'}))
+    for i in range(count):
+        recorder.record_inbound(json.dumps({'type': 'analog_data', 'seq_num': i + 1, 'data': [{'name': 'SV1', 'physical_value': i}]}))
+        time.sleep(interval)
+    recorder.record_inbound('not json')
+    recorder.stop()
+
+
+def _create_client():
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    return WebSocketClient(config)
+
+
+def test_replay_feeds_handlers_at_requested_speed():
+    """按倍速回放接收帧，回调收到全部帧并输出吞吐量和回调耗时"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'frames.rec'
+        _record(path, 20, 0.01)
+
+        async def run():
+            client = _create_client()
+            received = []
+
+            async def on_analog(data):
+                received.append(data[0]['physical_value'])
+
+            client.register_data_callback('analog_data', on_analog)
+
+            report = await FrameReplayer(client, path, speed=4).run()
+            assert received == list(range(20))
+            assert report['frames'] == 20
+            assert report['rejected'] == 1
+            # 录制约0.2秒，4倍速约0.05秒
+            assert 0.04 <= report['elapsed_seconds'] < 0.5
+            callbacks = report['message_types']['analog_data']['callbacks']
+            assert any(name.endswith('on_analog') and stats['count'] == 20 for name, stats in callbacks.items())
+
+            # 尽可能快回放，合并投递的订阅至少收到最后一帧
+            latest = []
+
+            async def on_latest(data):
+                latest.append(data[0]['physical_value'])
+
+            client.unregister_data_callback('analog_data', on_analog)
+            client.register_data_callback('analog_data', on_latest, coalesce=True)
+            report = await FrameReplayer(client, path, speed=0).run()
+            assert report['target_speed'] == 'max'
+            assert latest[-1] == 19
+            assert client.sequence_tracker is not None
+
+            # 消息对象+合并投递的订阅登记在消息回调表中，回放返回前也已投递完最后一帧
+            typed = []
+
+            async def on_typed(message):
+                await asyncio.sleep(0.05)
+                typed.append(message.seq_num)
+
+            client.unregister_data_callback('analog_data', on_latest)
+            client.register_data_callback('analog_data', on_typed, coalesce=True, typed=True)
+            report = await FrameReplayer(client, path, speed=0).run()
+            assert typed[-1] == 20
+            callbacks = report['message_types']['analog_data']['callbacks']
+            assert any(name.endswith('on_typed') and stats['count'] == len(typed) for name, stats in callbacks.items())
+            client.dispatcher.stop()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_replay_feeds_handlers_at_requested_speed()
+    print("✓ WebSocket帧回放测试通过")
+    sys.exit(0)
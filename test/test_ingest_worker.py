@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+独立接收进程测试脚本
+Out-of-Process Ingest Worker Test Script
+
+验证共享内存环形缓冲区的读写和溢出计数，以及IngestClient经接收进程连接本地设备模拟器时，
+模拟量和状态字经环形缓冲区还原为与直连相同的消息（类型化回调直接由列构建消息对象，不还原data），
+请求应答和故障录波经管道正常往返，出站帧带着消息类型交给接收进程的发送队列。
+"""
+# flake8: noqa
+import asyncio
+import math
+import multiprocessing
+import sys
+from array import array
+from pathlib import Path
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator
+from ingest_worker import IngestClient, RingMessage, create_websocket_client, _encode_analog, _decode_analog, \
+    _encode_status, _decode_status, _RowLayout
+from protocol_messages import AnalogMessage, SystemStatus, to_typed
+from shared_ring import SharedRing
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _load_config():
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    return config
+
+
+async def _wait_for(predicate, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("等待超时")
+
+
+def test_shared_ring_and_row_layout():
+    """环形缓冲区读写、溢出计数，以及消息与行之间的往返转换"""
+    writer = SharedRing.create(4, 5)
+    reader = SharedRing.attach(writer.name)
+    try:
+        for i in range(6):
+            writer.write([i, i * 0.5])
+        start, cursor, rows, lost = reader.read(0)
+        assert (start, cursor, lost) == (2, 6, 2)
+        assert [row[0] for row in rows] == [2, 3, 4, 5]
+        # 写者下一次写入覆盖的槽位中的行在复制期间可能被写了一半
+        assert (reader.valid_from(), reader.safe_from()) == (2, 3)
+        assert rows[0][1] == 1.0 and rows[0][4] != rows[0][4]  # 未写的列为NaN
+        for row in rows:
+            row.release()
+        assert reader.read(cursor)[2] == []
+    finally:
+        reader.close()
+        writer.close()
+
+    message = {'type': 'analog_data', 'device_id': 'HYP_RPLD_001', 'seq_num': 7, 'timestamp': '2024-09-29T00:00:00',
+               'data': [{'reg_addr': '0x0006', 'name': '轨地电流SA1', 'raw_value': 123, 'physical_value': 12.3, 'unit': 'A'},
+                        {'reg_addr': '0x0007', 'name': '轨地电压SV1', 'physical_value': -5, 'unit': 'V'}]}
+    layout, values = _encode_analog(message, 4)
+    decoded = _decode_analog(layout, [0.0, 7.0, 0.0] + values, 4)
+    assert decoded['data'] == message['data'] and decoded['seq_num'] == 7
+    assert _encode_analog(dict(message, data=message['data'] * 3), 4) is None  # 通道数超出
+
+    status = {'type': 'system_status', 'data': {'system_status': {f'bit{i}': i % 2 for i in range(16)},
+                                                'fault_status': {'bit0': 1, 'bit1': 0}}}
+    layout, values = _encode_status(status, 0)
+    decoded = _decode_status(layout, [0.0, float('nan'), 0.0] + values, 0)
+    assert decoded['data'] == status['data'] and 'seq_num' not in decoded
+    assert _encode_status({'type': 'system_status', 'data': {'system_status': {'bit1': 1}}}, 0) is None
+
+
+def test_ring_message_views_columns():
+    """行包装为只读消息：内容与直连相同，类型化转换直接读列，data只在按字典读取时还原"""
+    message = {'type': 'analog_data', 'device_id': 'HYP_RPLD_001', 'timestamp': '2024-09-29T00:00:00',
+               'data': [{'reg_addr': '0x0006', 'name': '轨地电流SA1', 'raw_value': 123, 'physical_value': 12.3, 'unit': 'A'},
+                        {'reg_addr': '0x0007', 'name': '轨地电压SV1', 'physical_value': -5, 'unit': 'V'}]}
+    layout, values = _encode_analog(message, 4)
+    ring_message = RingMessage(_RowLayout('analog_data', layout, 4), array('d', [0.0, 7.0, 0.0] + values))
+    typed = to_typed(ring_message)
+    assert isinstance(typed, AnalogMessage) and typed.raw is ring_message and typed.seq_num == 7
+    assert list(typed.analog.values) == [12.3, -5.0] and typed.analog.raw_values[0] == 123
+    assert math.isnan(typed.analog.raw_values[1]) and typed.analog.units == ('A', 'V')
+    assert ring_message._data is None  # 类型化转换不还原data
+    assert 'seq_num' in ring_message and 'request_id' not in ring_message and ring_message.get('request_id') is None
+    expected = dict(message, seq_num=7)
+    expected['timestamp'] = ring_message['timestamp']
+    assert dict(ring_message) == expected and list(ring_message) == list(_decode_analog(layout, ring_message._row, 4))
+    assert ring_message['data'] is ring_message['data']  # 还原一次后缓存
+    try:
+        ring_message['data'][0]['name'] = 'x'
+        raise AssertionError("data应为只读")
+    except TypeError:
+        pass
+
+    status = {'type': 'system_status', 'data': {'system_status': {f'bit{i}': i % 2 for i in range(16)}}}
+    layout, values = _encode_status(status, 0)
+    ring_message = RingMessage(_RowLayout('system_status', layout, 0), array('d', [0.0, math.nan, 0.0] + values))
+    typed = to_typed(ring_message)
+    assert isinstance(typed, SystemStatus) and typed.seq_num is None and 'seq_num' not in ring_message
+    assert typed.system_status == to_typed(status).system_status and typed.fault_status is None
+    assert ring_message._data is None and ring_message['data'] == status['data']
+
+
+def test_ingest_client_against_simulator():
+    """经接收进程接收推送、发送请求并接收故障录波"""
+    async def run():
+        config = _load_config()
+        simulator = DeviceSimulator(config, rates={'analog_data': 500, 'system_status': 50, 'full_snapshot': 0},
+                                    fault_batch_delay=0.001)
+        await simulator.start()
+        client = IngestClient(config, websocket_url=simulator.url)
+        analog, status, typed = [], [], []
+
+        async def on_analog(data):
+            analog.append(data)
+
+        async def on_status(data):
+            status.append(data)
+
+        async def on_typed(message):
+            typed.append(message)
+
+        client.register_data_callback('analog_data', on_analog)
+        client.register_data_callback('system_status', on_status)
+        typed_subscription = client.register_data_callback('system_status', on_typed, typed=True)
+        try:
+            assert await client.connect()
+            await _wait_for(lambda: len(analog) > 100 and len(status) > 10)
+            assert isinstance(typed[-1], SystemStatus) and typed[-1].system_status.get(7) == 1
+            # 只有类型化回调时不还原data
+            client.unregister_data_callback('system_status', on_status)
+            count = len(typed)
+            await _wait_for(lambda: len(typed) > count + 5)
+            assert isinstance(typed[-1].raw, RingMessage) and typed[-1].raw._data is None
+            typed_subscription.close()
+            assert analog[-1][0]['name'] == '轨地电流SA1'
+            assert isinstance(analog[-1][0]['raw_value'], int)
+            assert status[-1]['system_status']['bit7'] == 1
+            assert status[-1]['switch_output']['bit8'] == 1
+
+            response = await client.request('param_write', {'params': {'0x2200': 321}})
+            assert response['exec_status'] == 'success'
+            assert simulator.params['0x2200'] == 321
+            response = await client.request('fault_record_read', {'record_id': 0})
+            assert len(response['data']['data_points']) == 300
+
+            stats = client.get_ingest_stats()
+            assert stats['alive'] and stats['rings']['analog_data']['rows'] > 100
+            assert stats['rings']['analog_data']['lost'] == 0
+            await _wait_for(lambda: 'analog_data' in client.get_message_metrics())
+            assert client.get_connection_status()['ingest']['mode'] == 'process'
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+        assert not client.is_connected
+        assert client.get_ingest_stats()['pid'] is None
+
+    asyncio.run(run())
+
+
+def test_outbound_frames_keep_their_message_type():
+    """发给接收进程的出站帧带有消息类型，由接收进程的发送队列按优先级发送"""
+    async def run():
+        client = IngestClient(_load_config())
+        client._commands, worker_end = multiprocessing.Pipe()
+        client.is_connected = True
+        try:
+            assert await client.send_message('control_cmd', {'cmd': 'reset'})
+            assert await client.send_message('heartbeat', {})
+            commands = [worker_end.recv() for _ in range(2)]
+            assert [command[:2] for command in commands] == [('send', 'control_cmd'), ('send', 'heartbeat')]
+            assert client.codec.loads(commands[0][2])['data'] == {'cmd': 'reset'}
+        finally:
+            client._commands.close()
+            worker_end.close()
+            client.dispatcher.stop()
+
+    asyncio.run(run())
+
+
+def test_ingest_mode_selection():
+    """ingest_mode默认在界面进程内直连"""
+    config = _load_config()
+    client = create_websocket_client(config)
+    assert type(client) is WebSocketClient
+    client.dispatcher.stop()
+
+
+if __name__ == "__main__":
+    test_shared_ring_and_row_layout()
+    test_ring_message_views_columns()
+    test_ingest_client_against_simulator()
+    test_outbound_frames_keep_their_message_type()
+    test_ingest_mode_selection()
+    print("✓ 独立接收进程测试通过")
+    sys.exit(0)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+端到端延迟统计测试脚本
+End-to-End Latency Tracking Test Script
+
+验证按心跳往返估计时钟偏差（取往返最短的样本）、network/dispatch/render三段延迟统计、
+合并投递按投递对象计算render延迟、最近p99超出预算的消息类型检测，
+以及客户端连接本地设备模拟器时heartbeat_ack产生时钟样本并统计模拟量延迟。
+"""
+# flake8: noqa
+import asyncio
+import sys
+from pathlib import Path
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator
+from latency_tracker import ClockOffsetEstimator, LatencyTracker, parse_timestamp
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+T0 = parse_timestamp('2024-09-29 14:30:00.000')
+
+
+def test_clock_offset_uses_fastest_round_trip():
+    """偏差取往返时间最短的样本，换算后的设备时间落在本地时钟上"""
+    assert parse_timestamp('2024-09-29T14:30:00.500') == T0 + 0.5
+    assert parse_timestamp('') is None and parse_timestamp(None) is None
+
+    clock = ClockOffsetEstimator(samples=3)
+    assert not clock.synced
+    clock.add_sample(T0, T0 + 5.2, T0 + 0.4)   # 往返400ms，偏差5.0s
+    clock.add_sample(T0, T0 + 5.03, T0 + 0.04)  # 往返40ms，偏差5.01s
+    clock.add_sample(T0, T0 + 1, T0 - 1)        # 本地时钟回拨，丢弃
+    assert clock.synced and round(clock.rtt, 3) == 0.04 and round(clock.offset, 3) == 5.01
+    assert round(clock.to_local(T0 + 5.01), 6) == round(T0, 6)
+    assert clock.get_stats()['samples'] == 2
+
+
+def test_stage_latency_and_stale_detection():
+    """三段延迟按消息类型统计，合并投递的data可查到设备时间，最近p99超预算时报告"""
+    tracker = LatencyTracker(window=10)
+    tracker.observe_heartbeat(T0, {'timestamp': '2024-09-29 14:30:02.000'}, T0 + 0.002)
+    assert round(tracker.clock.offset, 3) == 1.999
+
+    for i in range(100):
+        message = {'type': 'analog_data', 'timestamp': '2024-09-29 14:30:02.000', 'data': [i]}
+        local_device_time = T0 + 0.001
+        tracker.on_receipt(message, local_device_time + 0.005)
+        tracker.on_dispatch('analog_data', 0.001)
+        # 整条消息和data都能查到设备时间，其他对象不计入
+        tracker.on_render('analog_data', message['data'] if i % 2 else message, now=local_device_time + 0.02)
+        tracker.on_render('analog_data', [i], now=local_device_time + 5)
+
+    stats = tracker.get_stats()['types']['analog_data']
+    assert stats['network_ms']['count'] == 100 and stats['network_ms']['p50'] <= 10  # 分桶上限
+    assert stats['dispatch_ms']['count'] == 100
+    assert stats['render_ms']['count'] == 100 and stats['render_ms']['max'] <= 20
+
+    now = T0 + 1
+    assert 19 < tracker.recent_p99('analog_data', now=now) <= 20.1
+    assert tracker.get_stale_types(1000, now=now) == {}
+    assert list(tracker.get_stale_types(10, now=now)) == ['analog_data']
+    # 超出时间窗口的样本不再计入最近p99
+    assert tracker.recent_p99('analog_data', now=now + 60) is None
+
+    tracker.reset()
+    assert tracker.get_stats()['types'] == {} and tracker.clock.synced
+
+
+def test_client_latency_against_simulator():
+    """心跳应答产生时钟样本，模拟量推送统计三段延迟"""
+    async def run():
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        simulator = DeviceSimulator(config, rates={'analog_data': 200, 'system_status': 20, 'full_snapshot': 0})
+        await simulator.start()
+        client = WebSocketClient(config, websocket_url=simulator.url)
+        received = []
+
+        async def on_analog(data):
+            received.append(data)
+
+        client.register_data_callback('analog_data', on_analog)
+        client.register_data_callback('system_status', on_analog, coalesce=True)
+        try:
+            assert await client.connect()
+            await client._send_heartbeat()
+            for _ in range(500):
+                if client.latency.clock.synced and len(received) > 50:
+                    break
+                await asyncio.sleep(0.01)
+            stats = client.get_latency_stats()
+            assert stats['clock']['synced'] and stats['clock']['rtt_ms'] < 1000
+            analog = stats['types']['analog_data']
+            assert analog['network_ms']['count'] > 0 and analog['render_ms']['count'] > 0
+            assert analog['dispatch_ms']['count'] > 0
+            assert stats['types']['system_status']['render_ms']['count'] > 0
+            assert client.get_stale_message_types() == {}
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_clock_offset_uses_fastest_round_trip()
+    test_stage_latency_and_stale_detection()
+    test_client_latency_against_simulator()
+    print("✓ 端到端延迟统计测试通过")
+    sys.exit(0)
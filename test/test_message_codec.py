@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+消息编解码测试脚本
+Message Codec Test Script
+"""
+# flake8: noqa
+import json
+import math
+import sys
+from message_codec import AVAILABLE_CODECS, FrozenDict, FrozenList, get_codec
+
+SAMPLE_FRAME = json.dumps({
+    'type': 'fault_record_complete',
+    'request_id': 'req_fault_read_001',
+    'data': {
+        'fault_info': {'fault_time': '2024-09-29 13:45:12.345', 'fault_bits': '0x0001'},
+        'data_points': [
+            {'point_index': i, 'system_status': '0x0104', 'channel1_sa1': 12.5}
+            for i in range(3)
+        ],
+        'branch_currents': [12, 13, [11, 10]],
+    },
+}, ensure_ascii=False)
+
+
+def test_all_codecs_decode_identically():
+    """所有可用编解码器的解码结果一致"""
+    expected = json.loads(SAMPLE_FRAME)
+    for name, codec in AVAILABLE_CODECS.items():
+        assert codec.decode_frame(SAMPLE_FRAME) == expected, name
+        assert codec.decode_frame(SAMPLE_FRAME.encode('utf-8')) == expected, name
+        assert json.loads(codec.dumps(expected)) == expected, name
+        # 中文不转义
+        assert '故障' in codec.dumps({'msg': '故障'}), name
+
+
+def test_codecs_agree_on_values_not_bytes():
+    """各编码器的输出解码后相同（浮点数往返不失真），文本只保证语义一致"""
+    message = {'type': 'param_write', 'data': {'params': {'0x2200': 321, '比例': 0.1, 'tiny': 1e-7,
+                                                          'big': 12345678901234, 'neg': -2.5e10}},
+               'timestamp': '2024-09-29T13:45:12.345', 'flags': [True, False, None]}
+    outputs = {name: codec.dumps(message) for name, codec in AVAILABLE_CODECS.items()}
+    for name, text in outputs.items():
+        assert json.loads(text) == message, name
+    assert outputs['json'] == json.dumps(message, ensure_ascii=False)
+
+
+def test_codecs_accept_what_the_stdlib_accepts():
+    """设备发送的NaN/Infinity和非字符串键在所有编解码器下都能处理"""
+    frame = '{"type": "analog_data", "data": [{"physical_value": NaN}, {"physical_value": -Infinity}]}'
+    for name, codec in AVAILABLE_CODECS.items():
+        values = [point['physical_value'] for point in codec.decode_frame(frame)['data']]
+        assert math.isnan(values[0]) and values[1] == float('-inf'), name
+        assert json.loads(codec.dumps({'data': {1: 'a'}})) == {'data': {'1': 'a'}}, name
+
+
+def test_decoded_frame_is_read_only():
+    """解码结果在所有层级都是只读的"""
+    message = get_codec().decode_frame(SAMPLE_FRAME)
+    assert isinstance(message, FrozenDict)
+    assert isinstance(message['data']['data_points'], FrozenList)
+    assert isinstance(message['data']['data_points'][0], FrozenDict)
+    assert isinstance(message['data']['branch_currents'][2], FrozenList)
+
+    mutations = [
+        lambda: message.__setitem__('type', 'x'),
+        lambda: message['data'].pop('fault_info'),
+        lambda: message['data']['data_points'].append({}),
+        lambda: message['data']['data_points'][0].update(point_index=9),
+        lambda: message['data']['branch_currents'][2].sort(),
+    ]
+    for mutate in mutations:
+        try:
+            mutate()
+        except TypeError:
+            continue
+        raise AssertionError("只读消息被修改")
+
+    # 复制后可以修改，且可被标准库序列化
+    copied = dict(message['data']['fault_info'])
+    copied['fault_bits'] = '0x0002'
+    assert json.loads(json.dumps(message))['type'] == 'fault_record_complete'
+
+
+def test_unknown_codec_falls_back():
+    """指定的编解码器不可用时回退到自动选择"""
+    assert get_codec('not-installed').name == get_codec('auto').name
+    assert get_codec('json').name == 'json'
+
+
+if __name__ == "__main__":
+    test_all_codecs_decode_identically()
+    test_codecs_agree_on_values_not_bytes()
+    test_codecs_accept_what_the_stdlib_accepts()
+    test_decoded_frame_is_read_only()
+    test_unknown_codec_falls_back()
+    print("✓ 消息编解码测试通过")
+    sys.exit(0)
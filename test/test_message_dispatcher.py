@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+消息分发队列测试脚本
+Message Dispatcher Test Script
+"""
+# flake8: noqa
+import asyncio
+import sys
+from message_dispatcher import MessageDispatcher, CoalescingSubscription
+from websocket_client import LOSSLESS_TYPES
+
+
+def test_slow_consumer_does_not_block_other_types():
+    """慢回调只阻塞自身类型的队列"""
+    async def run():
+        dispatcher = MessageDispatcher(queue_size=10)
+        received = []
+        release = asyncio.Event()
+
+        async def slow_handler(message):
+            await release.wait()
+            received.append(message['type'])
+
+        async def fast_handler(message):
+            received.append(message['type'])
+
+        dispatcher.submit('fault_record_complete', slow_handler, {'type': 'fault_record_complete'})
+        for _ in range(5):
+            dispatcher.submit('analog_data', fast_handler, {'type': 'analog_data'})
+
+        await asyncio.sleep(0.05)
+        assert received == ['analog_data'] * 5
+        assert dispatcher.get_queue_depth('fault_record_complete') == 0
+
+        release.set()
+        await dispatcher.join()
+        assert received[-1] == 'fault_record_complete'
+        dispatcher.stop()
+
+    asyncio.run(run())
+
+
+def test_full_queue_drops_oldest_frame():
+    """队列满时丢弃最旧的帧并计数"""
+    async def run():
+        dispatcher = MessageDispatcher(queue_size=3)
+        received = []
+        release = asyncio.Event()
+
+        async def handler(message):
+            await release.wait()
+            received.append(message['seq'])
+
+        # 第一帧被工作协程取走并阻塞，其余帧在队列中积压
+        dispatcher.submit('analog_data', handler, {'seq': 0})
+        await asyncio.sleep(0)
+        results = [dispatcher.submit('analog_data', handler, {'seq': i}) for i in range(1, 7)]
+
+        assert results == [True, True, True, False, False, False]
+        assert dispatcher.get_queue_depth('analog_data') == 3
+        assert dispatcher.get_dropped_count('analog_data') == 3
+
+        release.set()
+        await dispatcher.join()
+        assert received == [0, 4, 5, 6]
+
+        stats = dispatcher.get_stats()['analog_data']
+        assert stats['dropped'] == 3
+        assert stats['processed'] == 4
+        assert stats['max_depth'] == 3
+        dispatcher.stop()
+
+    asyncio.run(run())
+
+
+def test_lossless_types_are_never_dropped():
+    """故障事件和请求应答的队列不限长度，回调变慢时积压而不丢弃"""
+    async def run():
+        dispatcher = MessageDispatcher(queue_size=3, lossless_types=LOSSLESS_TYPES)
+        received = []
+        release = asyncio.Event()
+
+        async def handler(message):
+            await release.wait()
+            received.append(message['seq'])
+
+        results = [dispatcher.submit('fault', handler, {'seq': i}) for i in range(10)]
+        assert all(results) and dispatcher.get_dropped_count('fault') == 0
+        release.set()
+        await dispatcher.join()
+        assert received == list(range(10))
+        assert dispatcher.get_stats()['fault']['capacity'] == 0
+        assert {'fault', 'control_ack', 'param_write_ack', 'error'} <= dispatcher.lossless_types
+        dispatcher.stop()
+
+    asyncio.run(run())
+
+
+def test_coalescing_subscription_delivers_latest_frame():
+    """合并订阅在订阅者忙时只投递最新帧"""
+    async def run():
+        received = []
+        release = asyncio.Event()
+
+        async def slow_callback(data):
+            await release.wait()
+            received.append(data)
+
+        subscription = CoalescingSubscription('analog_data', slow_callback)
+        # 第一帧立即投递并阻塞，其后的帧只保留最新一帧
+        await subscription(0)
+        await asyncio.sleep(0)
+        for i in range(1, 10):
+            await subscription(i)
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert received == [0, 9]
+        assert subscription.skipped == 8
+        assert subscription.delivered == 2
+        assert subscription.matches(slow_callback)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_slow_consumer_does_not_block_other_types()
+    test_full_queue_drops_oldest_frame()
+    test_lossless_types_are_never_dropped()
+    test_coalescing_subscription_delivers_latest_frame()
+    print("✓ 消息分发队列测试通过")
+    sys.exit(0)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+消息统计测试脚本
+Message Metrics Test Script
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from message_metrics import Histogram, RateMeter
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def test_histogram_and_rate_meter():
+    """直方图分位数与速率计"""
+    histogram = Histogram((1, 2, 5, 10))
+    for value in (0.5, 1.5, 1.5, 3, 20):
+        histogram.observe(value)
+    stats = histogram.get_stats()
+    assert stats['count'] == 5
+    assert stats['min'] == 0.5 and stats['max'] == 20
+    assert stats['p50'] == 2
+    assert stats['p99'] == 20
+    assert histogram.get_buckets()[-1] == [None, 1]
+
+    meter = RateMeter(window=2)
+    for second in (100.1, 100.5, 101.2, 101.3, 101.4, 102.0):
+        meter.mark(second)
+    assert meter.rate(102.5) == 2.5
+
+
+def test_client_records_per_type_metrics():
+    """客户端按消息类型统计帧数、字节数、解码耗时和回调耗时"""
+    analog = json.dumps({'type': 'analog_data', 'device_id': 'HYP_RPLD_001', 'data': [{'name': '轨地电压SV1', 'physical_value': 1.0}]}, ensure_ascii=False)
+    fault = json.dumps({'type': 'fault_record_complete', 'data': {'data_points': [{'point_index': i} for i in range(300)]}})
+
+    async def handler(websocket):
+        await websocket.recv()  # device_register
+        for _ in range(10):
+            await websocket.send(analog)
+        await websocket.send(fault)
+        await websocket.wait_closed()
+
+    async def run():
+        async with websockets.serve(handler, '127.0.0.1', 0) as server:
+            config = ConfigManager(str(CONFIG_PATH))
+            config.load_config_sync()
+            client = WebSocketClient(config)
+            client.websocket_url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            client.snapshot_bootstrap = False  # 模拟服务器不应答snapshot_request
+            done = asyncio.Event()
+
+            async def slow_fault_callback(data):
+                await asyncio.sleep(0.02)
+                done.set()
+
+            async def analog_callback(data):
+                pass
+
+            client.register_data_callback('fault_record_complete', slow_fault_callback)
+            client.register_data_callback('analog_data', analog_callback, coalesce=True)
+            assert await client.connect()
+            await asyncio.wait_for(done.wait(), timeout=5)
+            await asyncio.sleep(0.05)
+
+            metrics = client.get_message_metrics(include_buckets=True)
+            json.dumps(metrics)  # 可直接导出为JSON
+
+            assert metrics['analog_data']['count'] == 10
+            assert metrics['analog_data']['bytes_total'] == 10 * len(analog.encode('utf-8'))
+            assert metrics['analog_data']['decode_ms']['count'] == 10
+            assert any(name.endswith('analog_callback') for name in metrics['analog_data']['callbacks'])
+
+            fault_metrics = metrics['fault_record_complete']
+            assert fault_metrics['size_bytes']['max'] == len(fault)
+            assert fault_metrics['callback_ms']['max'] >= 20
+            assert sum(count for _, count in fault_metrics['buckets']['size_bytes']) == 1
+
+            client.reset_message_metrics()
+            assert client.get_message_metrics() == {}
+            await client.disconnect()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_histogram_and_rate_meter()
+    test_client_records_per_type_metrics()
+    print("✓ 消息统计测试通过")
+    sys.exit(0)
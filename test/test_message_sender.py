@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+出站发送队列测试脚本
+Outbound Send Queue Test Script
+"""
+# flake8: noqa
+import asyncio
+import sys
+from message_sender import OutboundQueue
+
+
+def test_priority_order_and_heartbeat_coalescing():
+    """控制命令优先发送，排队中的心跳只保留最新一条"""
+    async def run():
+        sent = []
+        release = asyncio.Event()
+
+        async def send(payload):
+            await release.wait()
+            sent.append(payload)
+
+        queue = OutboundQueue(max_size=10)
+        queue.start(send)
+
+        # 第一条消息被发送协程取走并阻塞，其余消息在队列中按优先级排队
+        first = asyncio.create_task(queue.put('param_read', 'read-0'))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(queue.put('heartbeat', 'hb-1')),
+            asyncio.create_task(queue.put('param_read', 'read-1')),
+            asyncio.create_task(queue.put('heartbeat', 'hb-2')),
+            asyncio.create_task(queue.put('control_cmd', 'cmd-1')),
+        ]
+        await asyncio.sleep(0)
+        assert queue.get_depth() == 3
+
+        release.set()
+        results = await asyncio.gather(first, *tasks)
+        assert results == [True] * 5
+        assert sent == ['read-0', 'cmd-1', 'read-1', 'hb-2']
+
+        stats = queue.get_stats()
+        assert stats['coalesced_heartbeats'] == 1
+        assert stats['lanes']['control']['sent'] == 1
+        assert stats['lanes']['read']['sent'] == 2
+        assert stats['lanes']['heartbeat']['sent'] == 1
+        queue.stop()
+
+    asyncio.run(run())
+
+
+def test_full_queue_applies_backpressure():
+    """队列满时发送方等待空位，发送失败时异常返回给调用方"""
+    async def run():
+        release = asyncio.Event()
+
+        async def send(payload):
+            await release.wait()
+            if payload == 'bad':
+                raise ConnectionError("连接已关闭")
+
+        queue = OutboundQueue(max_size=2)
+        queue.start(send)
+
+        tasks = [asyncio.create_task(queue.put('param_read', f'read-{i}')) for i in range(4)]
+        await asyncio.sleep(0.01)
+        # 一条正在发送，两条排队，最后一条等待空位
+        assert queue.get_depth() == 2
+        assert queue.get_stats()['backpressure_waits'] >= 1
+
+        release.set()
+        assert await asyncio.gather(*tasks) == [True] * 4
+
+        try:
+            await queue.put('control_cmd', 'bad')
+            assert False, "发送失败应抛出异常"
+        except ConnectionError:
+            pass
+        assert queue.get_stats()['lanes']['control']['failed'] == 1
+
+        queue.stop()
+        assert await queue.put('param_read', 'after-stop') is False
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_priority_order_and_heartbeat_coalescing()
+    test_full_queue_applies_backpressure()
+    print("✓ 出站发送队列测试通过")
+    sys.exit(0)
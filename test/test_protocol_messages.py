@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+协议消息类型测试脚本
+Typed Protocol Message Test Script
+
+验证开关量分组转换为整数状态字、模拟量转换为float数组并共享通道布局、
+各消息类型的字段提取，以及typed=True回调在同一帧的多个订阅者之间共享同一个消息对象。
+"""
+# flake8: noqa
+import asyncio
+import math
+import sys
+from pathlib import Path
+
+from config_manager import ConfigManager
+from message_codec import freeze
+from protocol_messages import BitGroup, AnalogMessage, FullSnapshot, SystemStatus, MESSAGE_CLASSES, \
+    ProtocolMessage, to_typed
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+ANALOG_MESSAGE = freeze({
+    'type': 'analog_data', 'device_id': 'HYP_RPLD_001', 'seq_num': 1003,
+    'data': [
+        {'reg_addr': '0x0006', 'name': '最大极化电位', 'raw_value': 255, 'physical_value': 25.5, 'unit': 'V'},
+        {'reg_addr': '0x0008', 'name': '支路1电流', 'raw_value': 120, 'physical_value': None, 'unit': 'A'},
+    ],
+})
+
+
+def test_bit_groups_and_analog_arrays():
+    """状态字、出现位掩码和模拟量数组"""
+    status = to_typed(freeze({'type': 'system_status', 'data': {
+        'system_status': {'bit7': 1, 'bit9': 1, 'bit5': 0},
+        'switch_input': {'bit0': 1},
+    }}))
+    assert isinstance(status, SystemStatus)
+    assert status.system_status.word == (1 << 7) | (1 << 9)
+    assert list(status.system_status.items()) == [(5, 0), (7, 1), (9, 1)]
+    assert status.switch_input[0] == 1 and status.switch_input.get(1) is None and 1 not in status.switch_input
+    assert status.switch_output is None
+    assert [group for group, _ in status.groups()] == ['system_status', 'switch_input']
+    # 协议文档中的扁平格式
+    flat = to_typed({'type': 'system_status', 'data': {'bit5': 0, 'bit7': 1}})
+    assert flat.system_status == BitGroup(1 << 7, (1 << 5) | (1 << 7))
+    assert BitGroup.from_bits('0x0104').word == 0x0104
+
+    analog = to_typed(ANALOG_MESSAGE)
+    assert isinstance(analog, AnalogMessage) and analog.seq_num == 1003
+    assert analog.analog.names == ('最大极化电位', '支路1电流')
+    assert analog.analog.get('最大极化电位') == 25.5 and analog.analog.get('支路1电流') is None
+    assert math.isnan(analog.analog.values[1]) and analog.analog.raw_values[1] == 120
+    # 通道不变时布局在各帧之间共享
+    assert to_typed(ANALOG_MESSAGE).analog.layout is analog.analog.layout
+    assert not hasattr(analog, '__dict__')
+
+    snapshot = to_typed({'type': 'full_snapshot', 'data': {
+        'fault_info': {'bit2': 1}, 'analog_data': [{'name': '最大极化电位', 'value': 1.5, 'unit': 'V'}]}})
+    assert isinstance(snapshot, FullSnapshot)
+    assert snapshot.fault_status[2] == 1 and snapshot.analog.get('最大极化电位') == 1.5
+
+
+def test_message_fields_from_spec():
+    """应答类消息取根级别字段，推送类消息取data字段，未列出的类型使用基类"""
+    ack = to_typed({'type': 'control_ack', 'request_id': 'req_1', 'cmd': 'fault_record_clear',
+                    'exec_status': 'success', 'cleared_count': 15})
+    assert type(ack).__name__ == 'ControlAck' and ack.cleared_count == 15 and ack.error_code is None
+    fault = to_typed({'type': 'fault', 'data': {'fault_bit': 3, 'fault_status': 1}})
+    assert fault.fault_bit == 3 and fault.fault_status == 1
+    listing = to_typed({'type': 'fault_record_list_ack', 'data': {'total_records': 2, 'records': []}})
+    assert listing.total_records == 2
+    assert all(not hasattr(cls.__new__(cls), '__dict__') for cls in MESSAGE_CLASSES.values())
+    unknown = to_typed({'type': 'custom', 'data': {'x': 1}})
+    assert type(unknown) is ProtocolMessage and unknown.raw['data']['x'] == 1
+
+
+def test_typed_callbacks_share_one_object_per_frame():
+    """同一帧的多个typed回调共享一个消息对象，取消注册和data回调不受影响"""
+    async def run():
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        client = WebSocketClient(config)
+        received = []
+
+        async def first(message):
+            received.append(('first', message))
+
+        async def second(message):
+            received.append(('second', message))
+
+        async def plain(data):
+            received.append(('plain', data))
+
+        client.register_data_callback('analog_data', first, typed=True)
+        coalesced = client.register_data_callback('analog_data', second, coalesce=True, typed=True)
+        client.register_data_callback('analog_data', plain)
+        assert client.get_callback_counts() == {'analog_data': 3}
+
+        await client._handle_message(ANALOG_MESSAGE)
+        await asyncio.sleep(0)
+        assert [name for name, _ in received] == ['plain', 'first', 'second']
+        assert received[1][1] is received[2][1]
+        assert received[0][1] is ANALOG_MESSAGE['data']
+        assert len(client.get_coalescing_stats()['analog_data']) == 1
+
+        client.unregister_data_callback('analog_data', first)
+        coalesced.close()
+        assert client.get_callback_counts() == {'analog_data': 1}
+        client.dispatcher.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_bit_groups_and_analog_arrays()
+    test_message_fields_from_spec()
+    test_typed_callbacks_share_one_object_per_frame()
+    print("✓ 协议消息类型测试通过")
+    sys.exit(0)
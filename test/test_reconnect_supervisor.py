@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+重连监督任务测试脚本
+Reconnect Supervisor Test Script
+
+本地启动一个模拟服务器并多次主动断开连接，验证客户端由单个监督任务重连，
+始终只有一个接收任务和一个心跳任务，并记录重连耗时。
+"""
+# flake8: noqa
+import asyncio
+import sys
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _create_client(port):
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    client = WebSocketClient(config)
+    client.websocket_url = f"ws://127.0.0.1:{port}"
+    client.reconnect_base_delay = 0.01
+    client.reconnect_max_delay = 0.05
+    return client
+
+
+def _count_tasks(name):
+    return sum(1 for task in asyncio.all_tasks() if task.get_coro().__qualname__.endswith(name))
+
+
+def test_backoff_delay_grows_with_jitter_and_cap():
+    """退避时间按指数增长、带抖动且不超过上限"""
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    client = WebSocketClient(config)
+    client.reconnect_base_delay = 1
+    client.reconnect_max_delay = 30
+    for attempt, expected in [(1, 1), (2, 2), (3, 4), (5, 16), (6, 30), (20, 30)]:
+        for _ in range(20):
+            delay = client._get_reconnect_delay(attempt)
+            assert expected / 2 <= delay <= expected, (attempt, delay)
+
+
+def test_supervisor_reconnects_without_duplicate_tasks():
+    """服务器多次断开后客户端自动重连，接收和心跳任务各只有一个"""
+    async def run():
+        connections = []
+
+        async def handler(websocket):
+            connections.append(websocket)
+            await websocket.recv()  # device_register
+            if len(connections) <= 3:
+                await websocket.close()
+            else:
+                await websocket.wait_closed()
+
+        async with websockets.serve(handler, '127.0.0.1', 0) as server:
+            client = _create_client(server.sockets[0].getsockname()[1])
+            assert await client.connect()
+
+            for _ in range(200):
+                if len(connections) >= 4 and client.is_connected:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert len(connections) == 4
+            assert client.is_connected
+            assert _count_tasks('_receive_loop') == 1
+            assert _count_tasks('_heartbeat_loop') == 1
+            assert _count_tasks('_supervise') == 1
+
+            status = client.get_connection_status()
+            assert status['reconnect_count'] == 3
+            assert status['last_reconnect_seconds'] is not None
+
+            await client.disconnect()
+            await asyncio.sleep(0)
+            assert _count_tasks('_receive_loop') == 0
+            assert _count_tasks('_supervise') == 0
+
+    asyncio.run(run())
+
+
+def test_supervisor_keeps_retrying_after_failed_first_attempt():
+    """首次连接失败时connect返回False，监督任务在服务器启动后完成连接"""
+    async def run():
+        # 先占用一个端口获取号码，关闭后该端口暂时无人监听
+        probe = await websockets.serve(lambda ws: ws.wait_closed(), '127.0.0.1', 0)
+        port = probe.sockets[0].getsockname()[1]
+        probe.close()
+        await probe.wait_closed()
+
+        client = _create_client(port)
+        client.max_reconnect_attempts = 100
+        assert await client.connect() is False
+
+        async def handler(websocket):
+            await websocket.wait_closed()
+
+        async with websockets.serve(handler, '127.0.0.1', port):
+            for _ in range(200):
+                if client.is_connected:
+                    break
+                await asyncio.sleep(0.01)
+            assert client.is_connected
+            assert client.get_connection_status()['reconnect_count'] == 1
+            await client.disconnect()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_backoff_delay_grows_with_jitter_and_cap()
+    test_supervisor_reconnects_without_duplicate_tasks()
+    test_supervisor_keeps_retrying_after_failed_first_attempt()
+    print("✓ 重连监督任务测试通过")
+    sys.exit(0)
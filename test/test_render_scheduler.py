@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+绘图调度测试脚本
+Render Scheduler Test Script
+
+验证绘图调度器按设定帧率绘图而与数据接收频率无关（没有新数据的帧不绘图）、
+事件循环滞后时帧率减半并在按时唤醒一段时间后恢复，以及实时曲线页面以50Hz接收数据时
+图表更新次数由帧率决定，且每个采样恰好发送一次。
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from config_manager import ConfigManager
+from pages.real_time_curve_page import RealTimeCurvePage
+from render_scheduler import RenderScheduler
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def test_frame_rate_independent_of_ingest():
+    """50Hz的数据只按10帧/秒绘图，没有新数据时不绘图"""
+    async def run():
+        renders = []
+
+        async def render():
+            renders.append(time.perf_counter())
+
+        scheduler = RenderScheduler(render, fps=10, name='test')
+        scheduler.start()
+        for _ in range(25):  # 0.5秒，50Hz
+            scheduler.mark_dirty()
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.3)  # 没有新数据
+        scheduler.stop()
+        assert not scheduler.running
+        return scheduler, renders
+
+    scheduler, renders = asyncio.run(run())
+    assert 3 <= len(renders) <= 7 and scheduler.marks == 25
+    assert scheduler.frames == len(renders) and scheduler.idle_ticks >= 2
+    assert min(b - a for a, b in zip(renders, renders[1:])) > 0.05
+
+
+def test_slows_down_when_loop_lags():
+    """事件循环被阻塞时帧率减半（不低于下限），之后逐步恢复"""
+    async def run():
+        async def render():
+            pass
+
+        scheduler = RenderScheduler(render, fps=20, min_fps=5, recover_seconds=0.1, name='test')
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        time.sleep(0.2)  # 阻塞事件循环
+        await asyncio.sleep(0)
+        await asyncio.sleep(0.06)
+        slowed = scheduler.fps
+        for _ in range(3):
+            time.sleep(0.25)
+            await asyncio.sleep(0.25)
+        lowest = scheduler.fps
+        await asyncio.sleep(0.8)
+        scheduler.stop()
+        return scheduler, slowed, lowest
+
+    scheduler, slowed, lowest = asyncio.run(run())
+    assert slowed == 10 and lowest == 5 and scheduler.slowdowns == 2
+    assert scheduler.fps == 20 and scheduler.get_stats()['lag_max_ms'] >= 150
+
+
+class _FakeClient:
+    def __init__(self, client_id='client_1'):
+        self.id = client_id
+        self.scripts = []
+
+    def run_javascript(self, code):
+        self.scripts.append(code)
+
+
+def test_curve_page_renders_at_frame_rate():
+    """实时曲线页面：接收频率与绘图帧率独立，每个采样恰好追加一次"""
+    async def run():
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        page = RealTimeCurvePage(config, None)
+        page.render_scheduler.target_fps = page.render_scheduler.fps = 5
+        page.chart_id = 'chart_1'
+        page.chart_initialized = True
+        page.viewers.add(_FakeClient())
+        page.render_scheduler.start()
+        for i in range(50):  # 1秒，50Hz
+            await page._handle_analog_data([{'name': '轨地电流SA1', 'physical_value': i},
+                                            {'name': '轨地电压SV1', 'physical_value': i * 0.5}])
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.3)
+        page.render_scheduler.stop()
+        return page
+
+    page = asyncio.run(run())
+    scripts = page.viewers.clients[0].scripts
+    assert 3 <= len(scripts) <= 8 and not page.render_scheduler.running
+    sent = []
+    for script in scripts:
+        if script.startswith('realtimeChart.append('):
+            sent.append(json.loads(script[script.index('['):-1])[0])
+        else:
+            assert script.startswith('realtimeChart.extend("chart_1",')
+            series = json.loads('[' + script[len('realtimeChart.extend("chart_1",'):-1] + ']')[1]
+            sent.extend(series[0])
+    assert sent == list(range(50))
+
+
+if __name__ == "__main__":
+    test_frame_rate_independent_of_ingest()
+    test_slows_down_when_loop_lags()
+    test_curve_page_renders_at_frame_rate()
+    print("✓ 绘图调度测试通过")
+    sys.exit(0)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+请求/应答关联测试脚本
+Request/Response Correlation Test Script
+
+本地启动一个模拟服务器，按request_id乱序返回应答，
+验证多个请求可同时进行、超时和错误应答抛出对应的异常。
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from websocket_client import WebSocketClient, RequestError, RequestTimeoutError
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+async def _server_handler(websocket):
+    """模拟服务器：param_read延迟后按request_id应答，fault_record_read返回错误，control_cmd不应答"""
+    await websocket.recv()  # device_register
+    async for raw in websocket:
+        message = json.loads(raw)
+        data = message['data']
+        request_id = data['request_id']
+        if message['type'] == 'param_read':
+            async def reply(delay=data['delay'], request_id=request_id, start=data['start_address']):
+                await asyncio.sleep(delay)
+                await websocket.send(json.dumps({
+                    'type': 'param_read_ack',
+                    'request_id': request_id,
+                    'data': {'start_address': start},
+                }))
+            asyncio.create_task(reply())
+        elif message['type'] == 'fault_record_read':
+            await websocket.send(json.dumps({
+                'type': 'fault_record_error',
+                'request_id': request_id,
+                'data': {'error_code': 2001, 'error_msg': '记录不存在'},
+            }))
+
+
+async def _connect(port):
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    client = WebSocketClient(config)
+    client.websocket_url = f"ws://127.0.0.1:{port}"
+    client.snapshot_bootstrap = False  # 模拟服务器不应答snapshot_request
+    assert await client.connect()
+    return client
+
+
+def test_concurrent_requests_resolve_by_request_id():
+    """多个请求同时进行，应答乱序到达时仍交给对应的请求"""
+    async def run():
+        async with websockets.serve(_server_handler, '127.0.0.1', 0) as server:
+            client = await _connect(server.sockets[0].getsockname()[1])
+            # 先发出的请求应答更晚
+            responses = await asyncio.gather(*[
+                client.request('param_read', {'start_address': f'0x220{i}', 'delay': 0.05 * (3 - i)})
+                for i in range(3)
+            ])
+            assert [r['data']['start_address'] for r in responses] == ['0x2200', '0x2201', '0x2202']
+            assert client.get_connection_status()['pending_requests'] == 0
+            await client.disconnect()
+
+    asyncio.run(run())
+
+
+def test_timeout_and_error_reply_raise_typed_errors():
+    """超时抛出RequestTimeoutError，错误应答抛出携带应答消息的RequestError"""
+    async def run():
+        async with websockets.serve(_server_handler, '127.0.0.1', 0) as server:
+            client = await _connect(server.sockets[0].getsockname()[1])
+
+            try:
+                await client.request('control_cmd', {'cmd': 'fault_reset'}, timeout=0.1)
+                assert False, "应抛出RequestTimeoutError"
+            except RequestTimeoutError:
+                pass
+
+            try:
+                await client.request('fault_record_read', {'record_id': 5})
+                assert False, "应抛出RequestError"
+            except RequestTimeoutError:
+                assert False, "错误应答不应按超时处理"
+            except RequestError as e:
+                assert e.response['type'] == 'fault_record_error'
+                assert '记录不存在' in str(e)
+
+            # 断开连接时等待中的请求立即失败
+            pending = asyncio.create_task(client.request('control_cmd', {'cmd': 'fault_reset'}, timeout=5))
+            await asyncio.sleep(0.05)
+            await client.disconnect()
+            try:
+                await pending
+                assert False, "应抛出RequestError"
+            except RequestError as e:
+                assert not isinstance(e, RequestTimeoutError)
+                assert e.response is None
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_resolve_by_request_id()
+    test_timeout_and_error_reply_raise_typed_errors()
+    print("✓ 请求/应答关联测试通过")
+    sys.exit(0)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+采样环形缓冲区测试脚本
+Sample Ring Buffer Test Script
+
+验证列式环形缓冲区写满后覆盖最旧的采样、window()/between()返回不复制的视图、
+批量写入超过容量时只保留最后的采样、新增通道对已有采样为NaN，
+以及实时曲线页面按全速保存采样时的内存占用不到按对象保存的三分之一、不超过max_memory_mb，
+超出缓存时长的时间窗口标明实际可显示的时长。
+"""
+# flake8: noqa
+import asyncio
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from config_manager import ConfigManager
+from pages.real_time_curve_page import RealTimeCurvePage
+from sample_ring import SampleRing
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def test_wraparound_and_views():
+    """写满后覆盖最旧的采样，窗口是缓冲区的只读视图且时间上连续"""
+    ring = SampleRing(5, ['SA1', 'SV1'])
+    assert ring.latest() is None and len(ring.window()[0]) == 0
+    for i in range(8):
+        ring.append(1000 * i, {'SA1': i, 'SV1': i * 0.5, 'unknown': 99})
+    assert len(ring) == 5
+    timestamps, values = ring.window()
+    assert timestamps.tolist() == [3000, 4000, 5000, 6000, 7000]
+    assert values[0].tolist() == [3, 4, 5, 6, 7] and values.dtype == np.float32
+    assert np.shares_memory(timestamps, ring._timestamps) and np.shares_memory(values, ring._values)
+    assert not values.flags.writeable
+    assert ring.column('SV1', 2).tolist() == [3.0, 3.5]
+
+    ring.append(8000, {'SA1': 8})
+    timestamp, latest = ring.latest()
+    assert timestamp == 8000 and latest['SA1'] == 8 and math.isnan(latest['SV1'])
+
+    timestamps, values = ring.between(5000, 7000)
+    assert timestamps.tolist() == [5000, 6000, 7000] and values[0].tolist() == [5, 6, 7]
+    assert np.shares_memory(values, ring._values)
+    assert ring.between(7500)[0].tolist() == [8000]
+    assert len(ring.between(100, 900)[0]) == 0
+
+
+def test_extend_and_add_channel():
+    """批量写入超过容量时只保留最后capacity个采样，新增通道对已有采样为NaN"""
+    ring = SampleRing(4, ['SA1'])
+    ring.extend([1, 2], np.array([[10, 20]]))
+    ring.extend(range(3, 10), np.arange(30, 100, 10).reshape(1, 7))
+    assert ring.window()[0].tolist() == [6, 7, 8, 9]
+    assert ring.column('SA1').tolist() == [60, 70, 80, 90]
+    assert ring.get_stats()['written'] == 9
+
+    assert ring.add_channel('SV1') == 1 and ring.add_channel('SA1') == 0
+    ring.append(10, {'SA1': 100, 'SV1': 1.5})
+    assert np.isnan(ring.column('SV1', 4)[:3]).all() and ring.column('SV1', 1).tolist() == [1.5]
+
+    ring.clear()
+    assert len(ring) == 0 and ring.latest() is None
+
+
+def test_curve_page_history_memory():
+    """实时曲线页面保存全部推送的采样，内存占用不到按对象保存的三分之一"""
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    page = RealTimeCurvePage(config, None)
+    names = [p['name'] for p in page.available_parameters]
+    # 24小时每秒10个采样超出max_memory_mb（16MB），按上限分配
+    assert page.samples.capacity == 16 * 1024 * 1024 // SampleRing.bytes_per_sample(len(names)) < 86400 * 10
+
+    async def feed():
+        for i in range(300):
+            await page._handle_analog_data([{'name': name, 'physical_value': i + n * 0.25} for n, name in enumerate(names)])
+
+    asyncio.run(feed())
+    assert len(page.samples) == 300
+    assert page.samples.column(names[1], 1).tolist() == [299.25]
+    labels = page._build_chart_config()['data']['labels']
+    assert len(labels) == 300
+
+    # 按对象保存时每个采样的开销：一个datetime和每个参数一个float，另外各占deque中的一个指针；
+    # 列式缓冲区每个采样为int64时间戳和每个参数一个float32（镜像存储各两份）
+    per_sample = sys.getsizeof(page.last_data_time) + 8 + len(names) * (sys.getsizeof(0.5) + 8)
+    assert page.samples.nbytes == page.samples.capacity * 2 * (8 + 4 * len(names))
+    assert page.samples.nbytes * 3 < per_sample * page.samples.capacity
+
+
+def test_curve_page_labels_windows_beyond_history():
+    """按实际推送频率计算缓存时长，超出的时间窗口在选择项中标明实际可显示的时长"""
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    page = RealTimeCurvePage(config, None)
+    assert page.retained_seconds() == page.samples.capacity / 10  # 尚无采样时按配置的sample_rate估计
+    assert page._window_options()[21600] == '6小时'
+
+    count = 1000
+    timestamps = 1727568000000 + np.arange(count, dtype=np.int64) * 20  # 每秒50个采样
+    page.samples.extend(timestamps, np.zeros((len(page.samples.channels), count), dtype=np.float32))
+    retained = page.retained_seconds()
+    assert retained == page.samples.capacity / 50
+    options = page._window_options()
+    assert options[3600] == '1小时'
+    assert options[21600] == '6小时（仅最近1.9小时）' and options[86400] == '24小时（仅最近1.9小时）'
+
+if __name__ == "__main__":
+    test_wraparound_and_views()
+    test_extend_and_add_channel()
+    test_curve_page_history_memory()
+    test_curve_page_labels_windows_beyond_history()
+    print("✓ 采样环形缓冲区测试通过")
+    sys.exit(0)
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+序列号缺失检测与断线续传测试脚本
+Sequence Gap Detection and Resume Test Script
+
+本地启动带补推缓存（replay ring）的模拟服务器，验证客户端检测缺失并请求补推、
+丢弃重复帧，断线重连后从最后的序列号续传，以及后台重启后序列号从头计数时重新开始跟踪。
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+from collections import deque
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator
+from sequence_tracker import SequenceTracker, SEQ_ACCEPTED, SEQ_DUPLICATE, SEQ_RECOVERED, SEQ_RESET
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+DEVICE_ID = 'HYP_RPLD_001'
+
+
+class ReplayServer:
+    """带补推缓存的模拟服务器"""
+
+    def __init__(self, ring_size=100):
+        self.ring = deque(maxlen=ring_size)
+        self.seq = 0
+        self.clients = set()
+        self.lost_requests = []
+        self.resume_requests = []
+        self.registered = asyncio.Event()
+
+    def make_frame(self):
+        self.seq += 1
+        frame = {'type': 'analog_data', 'device_id': DEVICE_ID, 'seq_num': self.seq, 'data': [{'physical_value': self.seq}]}
+        self.ring.append(frame)
+        return frame
+
+    async def push(self, frame=None, skip=False):
+        """推送一帧；skip=True时只写入补推缓存，模拟传输中丢失"""
+        frame = frame or self.make_frame()
+        if not skip:
+            for websocket in list(self.clients):
+                await websocket.send(json.dumps(frame))
+        return frame
+
+    def _replay(self, seqs):
+        return [{'type': 'data_recovery', 'seq_num': f['seq_num'], 'data': f} for f in self.ring if f['seq_num'] in seqs]
+
+    async def handler(self, websocket):
+        self.clients.add(websocket)
+        try:
+            await websocket.recv()  # device_register
+            self.registered.set()
+            async for raw in websocket:
+                message = json.loads(raw)
+                data = message.get('data', {})
+                if message['type'] == 'data_lost_request':
+                    self.lost_requests.append(data['missing_seq'])
+                    for frame in self._replay(set(data['missing_seq'])):
+                        await websocket.send(json.dumps(frame))
+                elif message['type'] == 'data_resume_request':
+                    self.resume_requests.append(data['last_seq'])
+                    seqs = {f['seq_num'] for f in self.ring if f['seq_num'] > data['last_seq']}
+                    for frame in self._replay(seqs):
+                        await websocket.send(json.dumps(frame))
+        finally:
+            self.clients.discard(websocket)
+
+
+async def _wait_for(predicate, timeout=3):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("等待超时")
+
+
+def test_sequence_tracker_states():
+    """序列号跟踪：新帧、缺失、补回、重复、重新计数"""
+    tracker = SequenceTracker(max_gap=100)
+    assert tracker.observe('dev', 10) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 11) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 14) == (SEQ_ACCEPTED, [12, 13])
+    assert tracker.observe('dev', 12) == (SEQ_RECOVERED, [])
+    assert tracker.observe('dev', 12) == (SEQ_DUPLICATE, [])
+    assert tracker.observe('dev', 14) == (SEQ_DUPLICATE, [])
+    assert tracker.get_missing('dev') == [13]
+    assert tracker.observe('dev', 1) == (SEQ_DUPLICATE, [])
+    assert tracker.observe('other', 5) == (SEQ_ACCEPTED, [])
+    assert tracker.get_offsets() == {'dev': 14, 'other': 5}
+
+    tracker = SequenceTracker(max_gap=100)
+    tracker.observe('dev', 5000)
+    assert tracker.observe('dev', 1) == (SEQ_RESET, [])
+    assert tracker.observe('dev', 2) == (SEQ_ACCEPTED, [])
+
+
+def test_gap_recovery_and_resume_after_reconnect():
+    """缺失帧被补推、重复帧被丢弃，断线期间的帧在重连后续传"""
+    async def run():
+        server = ReplayServer()
+        async with websockets.serve(server.handler, '127.0.0.1', 0) as ws_server:
+            config = ConfigManager(str(CONFIG_PATH))
+            config.load_config_sync()
+            client = WebSocketClient(config)
+            client.websocket_url = f"ws://127.0.0.1:{ws_server.sockets[0].getsockname()[1]}"
+            client.snapshot_bootstrap = False  # 模拟服务器不应答snapshot_request
+            client.reconnect_base_delay = 0.01
+            client.reconnect_max_delay = 0.02
+
+            received = []
+            recovered_old = []
+
+            async def on_analog(message):
+                received.append(message['seq_num'])
+
+            async def on_recovery(message):
+                recovered_old.append(message['seq_num'])
+
+            client.register_message_callback('analog_data', on_analog)
+            client.register_message_callback('data_recovery', on_recovery)
+            assert await client.connect()
+            await server.registered.wait()
+
+            # 1、2正常推送，3在传输中丢失，4到达时发现缺口并请求补推，4重复推送一次
+            await server.push()
+            await server.push()
+            await server.push(skip=True)
+            frame4 = await server.push()
+            await server.push(frame4)
+            await _wait_for(lambda: len(received) + len(recovered_old) >= 4)
+            assert server.lost_requests == [[3]]
+            # 3比已显示的4旧，只投递给data_recovery回调
+            assert received == [1, 2, 4]
+            assert recovered_old == [3]
+
+            # 断线期间推送5~8，重连后请求从4之后续传
+            for websocket in list(server.clients):
+                await websocket.close()
+            await _wait_for(lambda: not client.is_connected)
+            for _ in range(4):
+                await server.push(skip=True)
+            await _wait_for(lambda: len(received) >= 7)
+            await server.push()
+            await _wait_for(lambda: len(received) >= 8)
+
+            assert server.resume_requests == [4]
+            assert received == [1, 2, 4, 5, 6, 7, 8, 9]
+            stats = client.get_sequence_stats()[DEVICE_ID]
+            assert stats['last_seq'] == 9
+            assert stats['duplicates'] == 1
+            assert stats['recovered'] == 1
+            assert stats['missing'] == 0
+            await client.disconnect()
+
+    asyncio.run(run())
+
+
+def test_backend_restart_resets_tracking():
+    """序列号回退超过max_rewind（实时推送）或纪元变化时视为后台重启，不再当作重复帧丢弃"""
+    tracker = SequenceTracker()
+    for seq in range(1, 501):
+        tracker.observe('dev', seq)
+    assert tracker.observe('dev', 1) == (SEQ_RESET, [])
+    assert tracker.observe('dev', 2) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 3) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 100) == (SEQ_ACCEPTED, list(range(4, 100)))
+    # 小幅回退仍是重复帧；补推帧只按max_gap判断
+    assert tracker.observe('dev', 50) == (SEQ_RECOVERED, [])
+    assert tracker.observe('dev', 90, recovery=True) == (SEQ_RECOVERED, [])
+    assert tracker.observe('dev', 50) == (SEQ_DUPLICATE, [])
+    tracker.observe('dev', 400)
+    assert tracker.observe('dev', 100, recovery=True) == (SEQ_DUPLICATE, [])
+    assert tracker.get_stats()['dev']['resets'] == 1
+
+    # 纪元变化：回退没有超过max_rewind也重新开始跟踪
+    tracker = SequenceTracker()
+    assert not tracker.set_epoch('a')
+    for seq in range(1, 31):
+        tracker.observe('dev', seq)
+    assert not tracker.set_epoch('a')
+    assert tracker.observe('dev', 2) == (SEQ_DUPLICATE, [])
+    assert tracker.set_epoch('b') and tracker.get_offsets() == {}
+    assert tracker.observe('dev', 2) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 3) == (SEQ_ACCEPTED, [])
+
+
+def test_small_rewind_restart_without_epoch():
+    """服务器不报告纪元、重启前只推送了不到max_rewind帧：持续递增的回退或重连后的回退视为重启"""
+    tracker = SequenceTracker()
+    for seq in range(1, 31):
+        tracker.observe('dev', seq)
+    assert tracker.observe('dev', 1) == (SEQ_DUPLICATE, [])
+    assert tracker.observe('dev', 2) == (SEQ_DUPLICATE, [])
+    # 第3帧仍在回退后的位置递增：重新开始跟踪，之前丢弃的两帧请求补推
+    assert tracker.observe('dev', 3) == (SEQ_RESET, [1, 2])
+    assert tracker.observe('dev', 4) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 1, recovery=True) == (SEQ_RECOVERED, [])
+    stats = tracker.get_stats()['dev']
+    assert stats['resets'] == 1 and stats['duplicates'] == 0 and stats['missing'] == 1
+    # 零散的重复帧不会触发
+    assert tracker.observe('dev', 2) == (SEQ_RECOVERED, [])
+    assert tracker.observe('dev', 3) == (SEQ_DUPLICATE, [])
+    assert tracker.observe('dev', 5) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 4) == (SEQ_DUPLICATE, [])
+    assert tracker.observe('dev', 6) == (SEQ_ACCEPTED, [])
+
+    # 重连后（续传请求已发出）第一帧实时推送回退即为重启；补推帧不影响判断
+    tracker.expect_restart()
+    assert tracker.observe('dev', 5, recovery=True) == (SEQ_DUPLICATE, [])
+    assert tracker.observe('dev', 2) == (SEQ_RESET, [])
+    assert tracker.observe('dev', 3) == (SEQ_ACCEPTED, [])
+    # 重连后服务器未重启：推送从续传位置继续，之后的小幅回退仍是重复帧
+    tracker.expect_restart()
+    assert tracker.observe('dev', 4) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 3) == (SEQ_DUPLICATE, [])
+
+    # 服务器报告纪元时由纪元判断重启
+    tracker = SequenceTracker()
+    tracker.set_epoch('a')
+    for seq in range(1, 31):
+        tracker.observe('dev', seq)
+    tracker.expect_restart()
+    tracker.set_epoch('a')
+    assert tracker.observe('dev', 2) == (SEQ_DUPLICATE, [])
+
+
+def test_client_follows_simulator_restart():
+    """模拟器重启（同一端口、序列号从头计数）后客户端重连，按新的纪元继续接收推送"""
+    async def run():
+        config = ConfigManager(str(CONFIG_PATH))
+        config.load_config_sync()
+        rates = {'analog_data': 200, 'system_status': 0, 'full_snapshot': 0}
+        simulator = DeviceSimulator(config, rates=rates)
+        await simulator.start()
+        client = WebSocketClient(config, websocket_url=simulator.url)
+        client.snapshot_bootstrap = False
+        client.reconnect_base_delay = 0.01
+        client.reconnect_max_delay = 0.02
+        received = []
+
+        async def on_analog(message):
+            received.append(message['seq_num'])
+
+        client.register_message_callback('analog_data', on_analog)
+        try:
+            assert await client.connect()
+            await _wait_for(lambda: len(received) > 100)
+            old_epoch = client.sequence_tracker.epoch
+            assert old_epoch == simulator.seq_epoch
+            await simulator.stop()
+            await _wait_for(lambda: not client.is_connected)
+
+            simulator = DeviceSimulator(config, rates=rates, port=simulator.port)
+            await simulator.start()
+            count = len(received)
+            await _wait_for(lambda: len(received) > count + 20)
+            assert client.sequence_tracker.epoch == simulator.seq_epoch != old_epoch
+            # 重启后的帧全部投递，没有当作重复帧丢弃，旧的last_seq不用于补推
+            assert received[count] < received[count - 1]
+            stats = client.get_sequence_stats()[simulator.device_id]
+            assert stats['duplicates'] == 0 and stats['last_seq'] <= simulator.seq
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_sequence_tracker_states()
+    test_gap_recovery_and_resume_after_reconnect()
+    test_backend_restart_resets_tracking()
+    test_small_rewind_restart_without_epoch()
+    test_client_follows_simulator_restart()
+    print("✓ 序列号缺失检测与断线续传测试通过")
+    sys.exit(0)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+连接后快照启动测试脚本
+Snapshot Bootstrap Test Script
+
+验证连接后立即请求全量快照，快照回调执行完成之前暂存模拟量和状态字增量推送，
+快照之前生成的暂存帧不再投递（合并投递的快照订阅同样先于增量帧执行）；
+周期推送的快照同样完成快照请求；服务器不支持快照请求时立即放行暂存的帧。
+"""
+# flake8: noqa
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import websockets
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _create_client(url):
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    return config, WebSocketClient(config, websocket_url=url)
+
+
+def test_snapshot_applied_before_increments():
+    """快照最先投递，之后只投递比快照新的增量帧"""
+    async def run():
+        config, _ = _create_client(None)
+        simulator = DeviceSimulator(config, rates={'analog_data': 500, 'system_status': 200, 'full_snapshot': 0})
+        await simulator.start()
+        _, client = _create_client(simulator.url)
+        delivered = []
+        snapshot_seq = []
+
+        async def on_message(message):
+            delivered.append(message)
+            await asyncio.sleep(0.005)  # 快照回调较慢时增量帧仍需等待
+
+        async def on_snapshot(message):
+            snapshot_seq.append(message['last_seq'])
+            await on_message(message)
+
+        client.register_message_callback('full_snapshot', on_snapshot)
+        client.register_message_callback('analog_data', on_message)
+        client.register_message_callback('system_status', on_message)
+        try:
+            assert await client.connect()
+            for _ in range(300):
+                if len(delivered) > 20:
+                    break
+                await asyncio.sleep(0.01)
+            assert delivered[0]['type'] == 'full_snapshot' and delivered[0]['data']['analog_data']
+            assert all(message['seq_num'] > snapshot_seq[0] for message in delivered[1:])
+            assert {message['type'] for message in delivered[1:]} == {'analog_data', 'system_status'}
+            assert 0 < client.get_connection_status()['snapshot_bootstrap_ms'] < 1000
+            assert client.get_connection_status()['pending_requests'] == 0
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+def test_coalesced_snapshot_applied_before_increments():
+    """合并投递的快照订阅执行完成之后才放行暂存的增量帧"""
+    async def run():
+        config, _ = _create_client(None)
+        simulator = DeviceSimulator(config, rates={'analog_data': 500, 'system_status': 200, 'full_snapshot': 0})
+        await simulator.start()
+        _, client = _create_client(simulator.url)
+        delivered = []
+
+        async def on_snapshot(data):
+            await asyncio.sleep(0.05)
+            delivered.append('full_snapshot')
+
+        async def on_analog(data):
+            delivered.append('analog_data')
+
+        client.register_data_callback('full_snapshot', on_snapshot, coalesce=True)
+        client.register_data_callback('analog_data', on_analog)
+        try:
+            assert await client.connect()
+            for _ in range(300):
+                if len(delivered) > 5:
+                    break
+                await asyncio.sleep(0.01)
+            assert delivered[0] == 'full_snapshot'
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+def test_periodic_snapshot_completes_snapshot_request():
+    """服务器不应答快照请求但推送了周期快照时，快照请求随之完成，不等待超时"""
+    async def handler(websocket):
+        await websocket.recv()  # device_register
+        async for raw in websocket:
+            if json.loads(raw)['type'] == 'snapshot_request':
+                await websocket.send(json.dumps({'type': 'full_snapshot', 'last_seq': 0,
+                                                 'data': {'system_status': {'bit0': 1}}}))
+
+    async def run():
+        async with websockets.serve(handler, '127.0.0.1', 0) as server:
+            _, client = _create_client(f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+            client.snapshot_timeout = 10
+            assert await client.connect()
+            for _ in range(100):
+                if client.get_connection_status()['snapshot_bootstrap_ms'] is not None:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            assert client.get_connection_status()['snapshot_bootstrap_ms'] is not None
+            assert client.get_connection_status()['pending_requests'] == 0
+            await client.disconnect()
+
+    asyncio.run(run())
+
+
+def test_unsupported_snapshot_request_releases_frames():
+    """服务器返回错误应答时立即放行暂存的帧"""
+    async def handler(websocket):
+        await websocket.recv()  # device_register
+        async for raw in websocket:
+            message = json.loads(raw)
+            if message['type'] == 'snapshot_request':
+                await websocket.send(json.dumps({'type': 'system_status', 'data': {'bit0': 1}}))
+                await websocket.send(json.dumps({'type': 'error', 'request_id': message['data']['request_id'],
+                                                 'error_msg': '不支持的消息类型'}))
+
+    async def run():
+        async with websockets.serve(handler, '127.0.0.1', 0) as server:
+            _, client = _create_client(f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+            client.snapshot_timeout = 10
+            received = asyncio.Event()
+
+            async def on_status(data):
+                received.set()
+
+            client.register_data_callback('system_status', on_status)
+            assert await client.connect()
+            await asyncio.wait_for(received.wait(), 1)
+            assert client.get_connection_status()['snapshot_bootstrap_ms'] is None
+            await client.disconnect()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_snapshot_applied_before_increments()
+    test_coalesced_snapshot_applied_before_increments()
+    test_periodic_snapshot_completes_snapshot_request()
+    test_unsupported_snapshot_request_releases_frames()
+    print("✓ 连接后快照启动测试通过")
+    sys.exit(0)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+回调订阅生命周期测试脚本
+Callback Subscription Lifetime Test Script
+
+验证订阅句柄（close/上下文管理器）、弱引用回调在页面对象回收后自动注销，
+以及页面反复切换1000次后回调数量保持不变。
+"""
+# flake8: noqa
+import asyncio
+import gc
+import logging
+import sys
+from pathlib import Path
+
+from config_manager import ConfigManager
+from subscription import SubscriptionScope
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+# 订阅了WebSocket数据的页面，以及不订阅的页面（切换时清空上一页面）
+PAGE_KEYS = ['show_system_status', 'show_main_diagram', 'show_real_time_curve', 'show_fault_record', 'show_api_status']
+
+
+def _create_client():
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    return config, WebSocketClient(config)
+
+
+class _Page:
+    def __init__(self, received):
+        self.received = received
+
+    async def on_status(self, data):
+        self.received.append(data)
+
+
+def test_subscription_handles_and_weak_callbacks():
+    """句柄关闭、上下文管理器和页面对象回收后自动注销"""
+    async def run():
+        _, client = _create_client()
+        received = []
+
+        async def on_status(data):
+            received.append(data)
+
+        with client.register_data_callback('system_status', on_status) as subscription:
+            assert client.get_callback_counts() == {'system_status': 1}
+        assert not subscription.active
+        assert client.get_callback_counts() == {}
+        subscription.close()  # 重复关闭无影响
+
+        # 绑定方法以弱引用保存，页面对象回收后回调自动移除
+        page = _Page(received)
+        client.register_data_callback('system_status', page.on_status)
+        client.register_data_callback('analog_data', page.on_status, coalesce=True)
+        client.register_message_callback('fault', page.on_status)
+        assert client.get_callback_counts() == {'system_status': 1, 'analog_data': 1, 'fault': 1}
+        await client._handle_message({'type': 'system_status', 'data': {'bit0': 1}})
+        assert received == [{'bit0': 1}]
+        del page
+        gc.collect()
+        assert client.get_callback_counts() == {}
+
+        # 回调中关闭自身的订阅，不影响同一帧的其他回调
+        scope = SubscriptionScope('测试')
+        calls = []
+
+        async def once(data):
+            calls.append('once')
+            scope.close()
+
+        async def always(data):
+            calls.append('always')
+
+        scope.add(client.register_data_callback('system_status', once))
+        client.register_data_callback('system_status', always)
+        await client._handle_message({'type': 'system_status', 'data': {}})
+        await client._handle_message({'type': 'system_status', 'data': {}})
+        assert calls == ['once', 'always', 'always']
+        assert len(scope) == 0
+        client.dispatcher.stop()
+
+    asyncio.run(run())
+
+
+def test_page_switching_keeps_callback_count_constant():
+    """页面切换1000次后各消息类型的回调数量不变，会话结束后全部注销"""
+    from nicegui import Client, core
+    from nicegui.page import page
+    from pages.page_manager import PageManager
+
+    async def run():
+        core.loop = asyncio.get_running_loop()
+        config, client = _create_client()
+        ui_client = Client(page('/'), request=None)
+        with ui_client:
+            manager = PageManager(config, client)
+            manager.setup_pages()
+            for key in PAGE_KEYS:
+                manager.switch_page(key)
+            baseline = client.get_callback_counts()
+            for i in range(1000):
+                manager.switch_page(PAGE_KEYS[i % len(PAGE_KEYS)])
+            assert client.get_callback_counts() == baseline
+
+            # 系统状态页面只在显示期间订阅
+            manager.switch_page('show_main_diagram')
+            assert client.get_callback_counts()['system_status'] == 1
+            manager.switch_page('show_system_status')
+            assert client.get_callback_counts()['system_status'] == 2
+
+            manager.cleanup()
+        assert client.get_callback_counts() == {}
+        client.dispatcher.stop()
+
+    logging.disable(logging.ERROR)
+    try:
+        asyncio.run(run())
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def test_closing_one_session_keeps_shared_pages_subscribed():
+    """与main.py相同的接线：各会话共用一个页面管理器，一个会话结束后其他会话仍收到模拟量"""
+    from nicegui import Client, core
+    from nicegui.page import page
+    from pages.page_manager import PageManager
+
+    async def run():
+        core.loop = asyncio.get_running_loop()
+        config, client = _create_client()
+        manager = PageManager(config, client)
+        sessions = [Client(page('/'), request=None) for _ in range(2)]
+        for session in sessions:
+            with session:
+                manager.setup_pages()
+                session.on_delete(manager.cleanup)
+        with sessions[1]:
+            manager.switch_page('show_system_status')
+        with sessions[0]:
+            manager.switch_page('show_system_status')
+        baseline = client.get_callback_counts()
+
+        # 会话结束不关闭共用页面的订阅，另一个会话仍在显示的系统状态页面也保持订阅
+        sessions[0].delete()
+        assert client.get_callback_counts() == baseline
+        assert manager.session_pages == {sessions[1].id: 'show_system_status'}
+        await client._handle_message({'type': 'analog_data', 'data': [
+            {'name': '轨地电流SA1', 'physical_value': 12.5}]})
+        await asyncio.sleep(0.05)
+        assert manager.main_diagram_page.pending_svg_updates
+
+        # 最后一个显示系统状态的会话离开后关闭其订阅，故障录波页面的订阅始终保留
+        with sessions[1]:
+            manager.switch_page('show_fault_record')
+        assert client.get_callback_counts()['system_status'] == 1
+        sessions[1].delete()
+        assert client.get_callback_counts()['fault_record_chunk'] == 1 and manager.session_pages == {}
+        manager.cleanup()
+        assert client.get_callback_counts() == {}
+        client.dispatcher.stop()
+
+    logging.disable(logging.ERROR)
+    try:
+        asyncio.run(run())
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_subscription_handles_and_weak_callbacks()
+    test_page_switching_keeps_callback_count_constant()
+    test_closing_one_session_keeps_shared_pages_subscribed()
+    print("✓ 回调订阅生命周期测试通过")
+    sys.exit(0)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+推送主题订阅测试脚本
+Push Topic Subscription Test Script
+
+验证多个会话的主题需求汇总（取最高频率）、与服务器当前订阅的差异计算、
+按prev_seq区分被过滤和丢失的帧，以及客户端连接本地设备模拟器时，
+只推送已订阅的主题并按请求的频率限频，页面切换驱动各会话的主题需求。
+"""
+# flake8: noqa
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from config_manager import ConfigManager
+from device_simulator import DeviceSimulator
+from sequence_tracker import SequenceTracker, SEQ_ACCEPTED, SEQ_RECOVERED
+from topic_subscriptions import TopicDemand, merge_rates
+from websocket_client import WebSocketClient
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.ini'
+
+
+def _create_client(**kwargs):
+    config = ConfigManager(str(CONFIG_PATH))
+    config.load_config_sync()
+    return config, WebSocketClient(config, **kwargs)
+
+
+async def _wait_for(predicate, timeout=3):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("等待超时")
+
+
+def test_demand_merge_and_diff():
+    """多个订阅方取最高频率，0（不限）优先；首次协商时取消所有不需要的主题"""
+    assert merge_rates([2, 10]) == 10 and merge_rates([10, 0]) == 0
+    demand = TopicDemand()
+    assert not demand.active
+    demand.set('会话1', {'analog_data': 2, 'system_status': 0, 'fault': 0})
+    demand.set('会话2', {'analog_data': 10})
+    assert demand.active and demand.get_topics() == {'analog_data': 10, 'system_status': 0}
+    assert demand.diff(None) == ({'analog_data': 10, 'system_status': 0}, [])
+
+    demand.set('会话2', {})
+    demand.set('会话1', {'system_status': 0})
+    assert demand.diff(None) == ({'system_status': 0}, ['analog_data'])
+    assert demand.diff({'analog_data': 10, 'system_status': 0}) == ({}, ['analog_data'])
+    demand.release('会话1')
+    demand.release('会话2')
+    assert demand.diff({'system_status': 0}) == ({}, ['system_status'])
+
+
+def test_sequence_tracker_prev_seq():
+    """prev_seq与上一帧相同时跳过的序列号不计为缺失，否则只补推prev_seq"""
+    tracker = SequenceTracker()
+    tracker.observe('dev', 10)
+    assert tracker.observe('dev', 15, prev_seq=10) == (SEQ_ACCEPTED, [])
+    assert tracker.observe('dev', 30, prev_seq=20) == (SEQ_ACCEPTED, [20])
+    assert tracker.observe('dev', 20) == (SEQ_RECOVERED, [])
+    stats = tracker.get_stats()['dev']
+    assert stats['filtered'] == 4 + 9 and stats['missing'] == 0 and stats['gaps'] == 1
+
+
+def test_client_subscriptions_against_simulator():
+    """订阅方登记后服务器只推送订阅的主题，按请求的频率限频，丢帧仍能补推"""
+    async def run():
+        config, _ = _create_client()
+        simulator = DeviceSimulator(config, rates={'analog_data': 200, 'system_status': 50, 'full_snapshot': 0})
+        await simulator.start()
+        _, client = _create_client(websocket_url=simulator.url)
+        counts = {'analog_data': 0, 'system_status': 0}
+
+        async def on_analog(data):
+            counts['analog_data'] += 1
+
+        async def on_status(data):
+            counts['system_status'] += 1
+
+        client.register_data_callback('analog_data', on_analog)
+        client.register_data_callback('system_status', on_status)
+        try:
+            assert await client.connect()
+            # 没有订阅方登记时不协商，接收所有推送
+            await _wait_for(lambda: counts['analog_data'] > 20 and counts['system_status'] > 5)
+            assert 'subscribe' not in simulator.requests_handled
+
+            client.set_topic_demand('会话1', {'system_status': 0})
+            client.set_topic_demand('会话2', {'analog_data': 5})
+            client.set_topic_demand('会话2', {'analog_data': 10})  # 同一轮内的变化合并为一次同步
+            await _wait_for(lambda: simulator.get_stats()['subscriptions'])
+            await asyncio.sleep(0.1)
+            assert simulator.requests_handled['subscribe'] == 2
+            assert simulator.get_stats()['subscriptions'][0]['rates'] == {'system_status': 0, 'analog_data': 10.0}
+
+            before = dict(counts)
+            await asyncio.sleep(1.0)
+            analog = counts['analog_data'] - before['analog_data']
+            assert 5 <= analog <= 14, analog
+            assert counts['system_status'] - before['system_status'] > 25
+
+            # 丢帧时仍按prev_seq发现并补推，被过滤的帧不计为缺失
+            # （丢弃的帧可能都是限频时本就不会发送的analog_data，多丢几帧以包含system_status）
+            simulator.drop_next(20)
+            await _wait_for(lambda: client.get_sequence_stats()[simulator.device_id]['recovered'] >= 1)
+            await asyncio.sleep(0.3)
+            stats = client.get_sequence_stats()[simulator.device_id]
+            assert stats['filtered'] > 100 and stats['missing'] == 0 and stats['lost'] == 0
+            assert stats['recovered'] >= 1
+
+            # 所有会话关闭后不再推送
+            client.release_topic_demand('会话1')
+            client.release_topic_demand('会话2')
+            await _wait_for(lambda: simulator.requests_handled.get('unsubscribe') == 2)
+            await asyncio.sleep(0.1)
+            before = dict(counts)
+            await asyncio.sleep(0.3)
+            assert counts == before
+            assert client.get_topic_stats()['subscribed'] == {}
+        finally:
+            await client.disconnect()
+            await simulator.stop()
+
+    asyncio.run(run())
+
+
+def test_page_switching_drives_topic_demand():
+    """与main.py相同的接线：各会话共用一个页面管理器，按各自显示的页面登记主题，会话结束后只释放该会话的主题"""
+    from nicegui import Client, core
+    from nicegui.page import page
+    from pages.page_manager import PageManager
+
+    async def run():
+        core.loop = asyncio.get_running_loop()
+        config, client = _create_client()
+        manager = PageManager(config, client)
+        sessions = [Client(page('/'), request=None) for _ in range(2)]
+        for session in sessions:
+            with session:
+                manager.setup_pages()
+                session.on_delete(manager.cleanup)
+        assert client.topics.get_topics() == {'analog_data': 10, 'system_status': 0}
+
+        with sessions[0]:
+            manager.switch_page('show_real_time_curve')
+        with sessions[1]:
+            manager.switch_page('show_event_record')
+        # 后切换的会话不覆盖先切换的会话
+        assert client.topics.get_topics() == {'analog_data': 0}
+
+        with sessions[1]:
+            manager.switch_page('show_system_status')
+        assert client.topics.get_topics() == {'analog_data': 0, 'system_status': 0}
+
+        sessions[0].delete()
+        assert client.topics.get_topics() == {'system_status': 0}
+        sessions[1].delete()
+        assert client.get_topic_stats()['topics'] == {}
+        manager.cleanup()
+        client.dispatcher.stop()
+
+    logging.disable(logging.ERROR)
+    try:
+        asyncio.run(run())
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_demand_merge_and_diff()
+    test_sequence_tracker_prev_seq()
+    test_client_subscriptions_against_simulator()
+    test_page_switching_drives_topic_demand()
+    print("✓ 推送主题订阅测试通过")
+    sys.exit(0)
@@ -0,0 +1,74 @@
+"""
+推送主题订阅模块
+Push Topic Subscription Module
+
+各浏览器会话按当前显示的页面登记需要的推送主题和频率，汇总后向服务器发送
+subscribe/unsubscribe，没有页面显示的主题不再推送，减少链路带宽和后台串口轮询。
+
+协议消息（每个主题一条）：
+- subscribe：{'topic': 'analog_data', 'rate': 5}，rate为期望的推送频率（帧/秒），0为设备原始频率
+- unsubscribe：{'topic': 'analog_data'}
+
+服务器在收到第一条subscribe/unsubscribe之前推送所有主题；按连接过滤后推送的帧带有prev_seq
+（发给本连接的上一帧序列号），客户端据此区分被过滤的帧和丢失的帧。
+"""
+# flake8: noqa
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# 可按需订阅的推送主题，其余推送（故障事件、全量快照、应答）始终接收
+SUBSCRIBABLE_TOPICS = ('analog_data', 'system_status')
+
+
+def merge_rates(rates) -> float:
+    """多个页面请求同一主题时取最高频率，0（不限频率）优先"""
+    merged = 0.0
+    for rate in rates:
+        if not rate:
+            return 0.0
+        merged = max(merged, float(rate))
+    return merged
+
+
+class TopicDemand:
+    """按订阅方（浏览器会话ID）登记需要的推送主题"""
+
+    def __init__(self):
+        self._owners: Dict[Hashable, Dict[str, float]] = {}
+        # 有订阅方登记之前不与服务器协商，保持服务器默认推送所有主题
+        self.active = False
+
+    def set(self, owner: Hashable, topics: Dict[str, float]) -> None:
+        """登记订阅方当前需要的主题 -> 频率（帧/秒，0为不限）"""
+        self._owners[owner] = {topic: rate for topic, rate in topics.items() if topic in SUBSCRIBABLE_TOPICS}
+        self.active = True
+
+    def release(self, owner: Hashable) -> None:
+        """订阅方关闭（浏览器会话结束）"""
+        self._owners.pop(owner, None)
+
+    def get_topics(self) -> Dict[str, float]:
+        """汇总所有订阅方需要的主题 -> 频率"""
+        requested: Dict[str, List[float]] = {}
+        for topics in self._owners.values():
+            for topic, rate in topics.items():
+                requested.setdefault(topic, []).append(rate)
+        return {topic: merge_rates(rates) for topic, rates in requested.items()}
+
+    def diff(self, subscribed: Optional[Dict[str, float]]) -> Tuple[Dict[str, float], List[str]]:
+        """与服务器当前的订阅比较
+
+        Args:
+            subscribed: 已发送给服务器的订阅，None为本次连接尚未协商（服务器推送所有主题）
+
+        Returns:
+            (需要订阅或调整频率的主题 -> 频率, 需要取消订阅的主题)
+        """
+        wanted = self.get_topics()
+        if subscribed is None:
+            return wanted, [topic for topic in SUBSCRIBABLE_TOPICS if topic not in wanted]
+        subscribe = {topic: rate for topic, rate in wanted.items() if subscribed.get(topic) != rate}
+        unsubscribe = [topic for topic in subscribed if topic not in wanted]
+        return subscribe, unsubscribe
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'owners': len(self._owners), 'topics': self.get_topics()}
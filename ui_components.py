@@ -13,17 +13,21 @@ logger = logging.getLogger(__name__)
 class UIComponents:
     """UI组件管理器"""
     
-    def __init__(self, config_manager, page_manager=None):
+    def __init__(self, config_manager, page_manager=None, device_id=None, station_devices=None):
         self.config = config_manager
         self.page_manager = page_manager
         self.connection_status = False
         self.device_info = self.config.get_device_info()
+        # 本组件显示的设备和站点的所有设备（多台设备时顶部栏显示设备切换）
+        self.device_id = device_id or self.device_info.get('设备ID')
+        self.station_devices = list(station_devices or [])
         
         # UI元素引用
         self.header_time_label = None
         self.header_status_icon = None
         self.footer_status_labels = {}
         self.footer_status_icons = {}
+        self.footer_latency_label = None
         self.current_user = None  # 添加当前用户信息
         self.system_settings_dialog = None  # 添加系统设置对话框实例
         self.logout_callback = None  # 添加登出回调函数
@@ -32,8 +36,17 @@ class UIComponents:
         """创建顶部栏"""
         with ui.header().classes('q-pa-md').style('background-color: #2C3E50; color: white;'):
             with ui.row().classes('w-full items-center'):
-                # 设备名称
-                ui.label(self.device_info.get('设备名称', '钢轨电位限制柜')).classes('text-h5')
+                # 设备名称（站点的其他设备显示设备ID）
+                if self.device_id == self.device_info.get('设备ID'):
+                    ui.label(self.device_info.get('设备名称', '钢轨电位限制柜')).classes('text-h5')
+                else:
+                    ui.label(self.device_id).classes('text-h5')
+                
+                # 同一站点有多台设备时切换显示的设备
+                if len(self.station_devices) > 1:
+                    ui.select(self.station_devices, value=self.device_id,
+                              on_change=lambda e: ui.navigate.to(f'/main?device={e.value}')) \
+                        .props('dense dark options-dense').classes('q-ml-md').style('min-width: 160px;')
                 
                 ui.space()
                 
@@ -165,6 +178,15 @@ class UIComponents:
                         'white-space: nowrap; '
                         'color: #e74c3c;'
                     )
+                
+                # 数据延迟警告（最近p99延迟超出预算时显示）
+                self.footer_latency_label = ui.label('').style(
+                    'font-size: 14px; '
+                    'white-space: nowrap; '
+                    'color: #e67e22; '
+                    'font-weight: 500;'
+                )
+                self.footer_latency_label.set_visibility(False)
             
             # 右侧版本信息
             with ui.row().style('display: flex; align-items: center;'):
@@ -207,6 +229,10 @@ class UIComponents:
                 label.text = f'{display_name}: 未连接'
                 label.style('color: red; font-size: 12px;')
         
+        # 断开后不再显示延迟警告
+        if connection_type == 'websocket' and not connected:
+            self.update_latency_status({})
+        
         # 更新底部状态栏图标
         if connection_type in self.footer_status_icons:
             icon = self.footer_status_icons[connection_type]
@@ -218,6 +244,22 @@ class UIComponents:
                 icon_name = self._get_disconnected_icon(connection_type)
                 icon.props(f'name={icon_name} color=grey')
 
+    def update_latency_status(self, stale_types: Dict[str, float]) -> None:
+        """更新数据延迟警告
+        
+        Args:
+            stale_types: 最近p99延迟超出预算的消息类型 -> p99（毫秒），为空时隐藏警告
+        """
+        label = self.footer_latency_label
+        if label is None:
+            return
+        if stale_types:
+            message_type, p99 = max(stale_types.items(), key=lambda item: item[1])
+            label.text = f'⚠ 数据延迟: {message_type} p99 {p99:.0f}ms'
+            label.set_visibility(True)
+        else:
+            label.set_visibility(False)
+
     def _get_connection_name(self, connection_type: str) -> str:
         """获取连接类型的显示名称"""
         name_map = {
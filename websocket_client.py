@@ -4,27 +4,124 @@ WebSocket Client Module
 """
 # flake8: noqa
 import asyncio
-import json
 import logging
+import random
+import time
+import uuid
 import websockets
-from typing import Dict, Any, Callable, Optional
+from collections import deque
+from typing import Dict, Any, Callable, Optional, Iterable
 from datetime import datetime
+from message_dispatcher import MessageDispatcher, CoalescingSubscription
+from message_sender import OutboundQueue
+from message_metrics import MessageMetrics
+from latency_tracker import LatencyTracker
+from frame_recorder import FrameRecorder
+from sequence_tracker import SequenceTracker, SEQ_DUPLICATE, SEQ_RECOVERED, SEQ_RESET
+from message_codec import get_codec, get_binary_codec, available_binary_encodings, FrozenDict, DECODE_ERRORS
+from subscription import Subscription, weak_callback
+from protocol_messages import TypedMessageCache, TypedCallback
+from topic_subscriptions import TopicDemand
+from fault_record_assembler import ASSEMBLER_MESSAGE_TYPES
 
 logger = logging.getLogger(__name__)
 
+# 请求类型 -> (成功应答类型, 失败应答类型)，应答按request_id与请求对应
+REQUEST_REPLY_TYPES = {
+    'param_read': (('param_read_ack',), ('error',)),
+    'param_write': (('param_write_ack',), ('error',)),
+    'control_cmd': (('control_ack',), ('error',)),
+    'fault_record_list': (('fault_record_list_ack',), ('error',)),
+    'fault_record_read': (('fault_record_complete',), ('fault_record_error', 'fault_record_cancelled', 'error')),
+}
+
+# 补推的帧即使比已投递的帧旧也按原类型投递的事件类消息，其余类型只投递比已投递更新的帧
+SEQUENCE_EVENT_TYPES = ('fault',)
+
+# 故障事件和请求应答不能丢弃，分发队列不限长度（推送的最新值类型在队列满时丢弃最旧的帧）
+LOSSLESS_TYPES = SEQUENCE_EVENT_TYPES + tuple(dict.fromkeys(
+    message_type for replies, errors in REQUEST_REPLY_TYPES.values() for message_type in replies + errors))
+
+# 全量快照包含的增量推送类型，连接后请求的快照应用之前暂存
+SNAPSHOT_TYPES = ('analog_data', 'system_status', 'switch_io')
+
+
+def _frame_size(frame) -> int:
+    """获取帧的字节数（ASCII文本帧无需重新编码）"""
+    if isinstance(frame, str) and not frame.isascii():
+        return len(frame.encode('utf-8'))
+    return len(frame)
+
+
+def _callback_name(callback: Callable) -> str:
+    """获取回调函数的名称，用于按回调统计耗时"""
+    return getattr(callback, '__qualname__', None) or type(callback).__name__
+
+
+def _is_typed(entry: Callable) -> bool:
+    """判断回调表中的一项是否为typed=True注册的数据回调"""
+    if isinstance(entry, CoalescingSubscription):
+        entry = entry.callback
+    return isinstance(entry, TypedCallback)
+
+
+class RequestError(Exception):
+    """请求失败（发送失败、连接断开或服务器返回错误应答）
+
+    Attributes:
+        response: 服务器返回的错误应答消息，发送失败或连接断开时为None
+    """
+
+    def __init__(self, message: str, response: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.response = response
+
+
+class RequestTimeoutError(RequestError):
+    """请求在超时时间内未收到应答"""
+
+
+class _PendingRequest:
+    """等待应答的请求"""
+    __slots__ = ('message_type', 'future', 'reply_types', 'error_types', 'assembler')
+
+    def __init__(self, message_type: str, future: asyncio.Future, reply_types: tuple, error_types: tuple,
+                 assembler=None):
+        self.message_type = message_type
+        self.future = future
+        self.reply_types = reply_types
+        self.error_types = error_types
+        self.assembler = assembler
+
+
 class WebSocketClient:
     """WebSocket客户端"""
     
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, device_id: Optional[str] = None, websocket_url: Optional[str] = None,
+                 dispatcher: Optional[MessageDispatcher] = None, codec=None):
+        """
+        Args:
+            config_manager: 配置管理器
+            device_id: 设备ID，为None时使用[设备配置]中的设备ID
+            websocket_url: 服务器地址，为None时按[Web Socket配置]构建
+            dispatcher: 共享的消息分发器（多设备连接管理器使用），为None时创建自己的分发器
+            codec: 共享的JSON编解码器，为None时按配置选择
+        """
         self.config = config_manager
         self.websocket = None
         self.is_connected = False
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 10
-        self.reconnect_interval = 5
         self.heartbeat_task = None
         self.receive_task = None
         
+        # 连接监督任务：唯一负责建立连接、检测断开和重连
+        self.supervisor_task = None
+        self._closing = False
+        self._disconnected_at = None
+        self.reconnect_count = 0
+        self.reconnect_durations = deque(maxlen=20)  # 最近的断线重连耗时（秒）
+        
         # 数据回调函数
         self.data_callbacks = {}
         
@@ -40,6 +137,76 @@ class WebSocketClient:
         self.server_port = ws_config.get('listen_port', 8765)
         self.heartbeat_interval = ws_config.get('heartbeat_interval', 10)
         self.max_reconnect_attempts = ws_config.get('reconnect_attempts', 10)
+        # 重连退避：base_delay * 2^(n-1)，上限max_delay，并加入随机抖动
+        self.reconnect_base_delay = ws_config.get('reconnect_base_delay', 1)
+        self.reconnect_max_delay = ws_config.get('reconnect_max_delay', 30)
+        
+        # 按消息类型的分发队列，接收循环只入队，不等待回调
+        self._owns_dispatcher = dispatcher is None
+        self.dispatcher = dispatcher or MessageDispatcher(ws_config.get('dispatch_queue_size', 100),
+                                                          lossless_types=LOSSLESS_TYPES)
+        
+        # 按优先级发送的出站队列（控制命令 > 读取请求 > 心跳），队列满时发送方等待
+        self.outbound = OutboundQueue(ws_config.get('send_queue_size', 1000),
+                                      ws_config.get('send_log_sample', 100))
+        
+        # JSON编解码器（优先orjson/msgspec，未安装时使用标准库）
+        self.codec = codec or get_codec(ws_config.get('json_codec', 'auto'))
+        logger.debug(f"WebSocket消息编解码器: {self.codec.name}")
+        
+        # 可向服务器声明的二进制帧编码（MessagePack/CBOR），协商成功后才使用
+        configured_encodings = ws_config.get('binary_encodings', 'msgpack,cbor')
+        preferred = [name.strip().lower() for name in str(configured_encodings).split(',') if name.strip()]
+        self.supported_encodings = available_binary_encodings(preferred)
+        self.binary_codec = None
+        
+        # 按消息类型统计接收速率、帧大小、解码耗时和回调耗时
+        self.metrics = MessageMetrics(ws_config.get('metrics_rate_window', 10)) \
+            if ws_config.get('message_metrics', True) else None
+        
+        # 端到端延迟（设备时间戳 -> 收到 -> 分发 -> 回调完成），时钟偏差按心跳往返估计
+        self.latency = LatencyTracker(ws_config.get('latency_window', 10), ws_config.get('clock_sync_samples', 8)) \
+            if ws_config.get('latency_tracking', True) else None
+        self.latency_budget_ms = ws_config.get('latency_budget_ms', 1000)
+        self._heartbeat_sent_at: Optional[float] = None
+        if self.latency is not None and self._owns_dispatcher:
+            self.dispatcher.on_dispatch = self.on_dispatch
+        
+        # WebSocket帧录制（收发的每一帧写入压缩文件，用于现场问题复现），可在运行时开关
+        self.record_path = ws_config.get('record_path', 'recordings/ws_frames.rec')
+        self.record_queue_size = ws_config.get('record_queue_size', 10000)
+        self.recorder: Optional[FrameRecorder] = None
+        if ws_config.get('record_frames', False):
+            self.start_recording()
+        
+        # 等待应答的请求（request_id -> _PendingRequest），支持多个请求同时进行
+        self.request_timeout = ws_config.get('request_timeout', 10)
+        self._pending_requests: Dict[str, _PendingRequest] = {}
+        self._frame_bytes: Optional[int] = None  # 正在处理的帧的字节数
+        
+        # 按设备跟踪推送帧的seq_num，检测缺失并在重连后请求从最后的序列号续传
+        self.sequence_tracker = SequenceTracker(ws_config.get('max_sequence_gap', 1000),
+                                                max_rewind=ws_config.get('max_sequence_rewind', 64),
+                                                rewind_frames=ws_config.get('sequence_rewind_frames', 3)) \
+            if ws_config.get('sequence_tracking', True) else None
+        self._latest_seq_by_type: Dict[tuple, int] = {}
+        # typed=True的回调接收消息对象，每种消息类型缓存最近一帧的转换结果
+        self.typed_messages = TypedMessageCache()
+        self._background_tasks = set()
+        
+        # 按各会话显示的页面向服务器订阅推送主题，None为本次连接尚未协商（服务器推送所有主题）
+        self.topics = TopicDemand() if ws_config.get('topic_subscription', True) else None
+        self._subscribed_topics: Optional[Dict[str, float]] = None
+        self._topic_sync_scheduled = False
+        self._topic_sync_lock = asyncio.Lock()
+        
+        # 连接后立即请求全量快照，首屏无需等待周期推送的快照（最长30秒）
+        self.snapshot_bootstrap = ws_config.get('snapshot_bootstrap', True)
+        self.snapshot_timeout = ws_config.get('snapshot_timeout', 1)
+        self._held_frames: Optional[list] = None  # 快照应用之前暂存的增量推送，None为不暂存
+        self._bootstrap_started = 0.0
+        self._snapshot_request_id: Optional[str] = None
+        self.last_bootstrap_seconds: Optional[float] = None
         
         # 如果配置的是0.0.0.0，改为localhost用于客户端连接
         if self.server_host == '0.0.0.0':
@@ -47,19 +214,73 @@ class WebSocketClient:
         
         # 构建WebSocket URL
         protocol = ws_config.get('protocol_type', 'ws')
-        self.websocket_url = f"{protocol}://{self.server_host}:{self.server_port}"
+        self.websocket_url = websocket_url or f"{protocol}://{self.server_host}:{self.server_port}"
+        
+        # 本连接对应的设备ID
+        self.device_id = device_id or self.config.get_device_info().get('设备ID', 'HYP_RPLD_001')
         
     async def connect(self) -> bool:
-        """连接到WebSocket服务器"""
+        """连接到WebSocket服务器
+        
+        启动连接监督任务并等待首次连接结果；首次连接失败时监督任务继续在后台按退避策略重连。
+        """
+        if self.supervisor_task and not self.supervisor_task.done():
+            return self.is_connected
+        
+        self._closing = False
+        self.reconnect_attempts = 0
+        first_attempt = asyncio.get_running_loop().create_future()
+        self.supervisor_task = asyncio.create_task(self._supervise(first_attempt))
+        return await asyncio.shield(first_attempt)
+    
+    async def _supervise(self, first_attempt: asyncio.Future) -> None:
+        """连接监督循环：建立连接，等待接收或心跳任务结束，清理后按退避策略重连"""
+        try:
+            while not self._closing:
+                connected = await self._open_connection()
+                if not first_attempt.done():
+                    first_attempt.set_result(connected)
+                
+                if connected:
+                    if self._disconnected_at is not None:
+                        duration = time.monotonic() - self._disconnected_at
+                        self.reconnect_durations.append(duration)
+                        self.reconnect_count += 1
+                        self._disconnected_at = None
+                        logger.info(f"WebSocket重连成功，耗时 {duration:.2f} 秒")
+                    
+                    # 同一时刻只有一个接收任务和一个心跳任务，任一结束即视为连接断开
+                    await asyncio.wait({self.receive_task, self.heartbeat_task},
+                                       return_when=asyncio.FIRST_COMPLETED)
+                    await self._close_connection("WebSocket连接已关闭")
+                    if self._closing:
+                        break
+                    self._disconnected_at = time.monotonic()
+                    self.reconnect_attempts = 0
+                elif self._disconnected_at is None:
+                    self._disconnected_at = time.monotonic()
+                
+                if self.reconnect_attempts >= self.max_reconnect_attempts:
+                    logger.error(f"已达到最大重连次数 ({self.max_reconnect_attempts})，停止重连")
+                    break
+                self.reconnect_attempts += 1
+                delay = self._get_reconnect_delay(self.reconnect_attempts)
+                logger.info(f"将在{delay:.1f}秒后尝试重连 (第{self.reconnect_attempts}次)")
+                await asyncio.sleep(delay)
+        finally:
+            if not first_attempt.done():
+                first_attempt.set_result(False)
+    
+    def _get_reconnect_delay(self, attempt: int) -> float:
+        """计算第attempt次重连前的等待时间（指数退避 + 抖动）"""
+        delay = min(self.reconnect_max_delay, self.reconnect_base_delay * (2 ** (attempt - 1)))
+        # 在[delay/2, delay]之间随机，避免多个客户端同时重连
+        return random.uniform(delay / 2, delay)
+    
+    async def _open_connection(self) -> bool:
+        """建立一次连接并启动发送、心跳和接收任务"""
         try:
             logger.info(f"正在连接到WebSocket服务器: {self.websocket_url}")
-            # 清理旧连接
-            if self.websocket:
-                try:
-                    await self.websocket.close()
-                except:
-                    pass
-
             self.websocket = await websockets.connect(
                 self.websocket_url,
                 ping_interval=self.heartbeat_interval,
@@ -67,15 +288,26 @@ class WebSocketClient:
             )
             
             self.is_connected = True
-            self.reconnect_attempts = 0 # ⭐ 重置重连计数器
+            self.binary_codec = None  # 新连接需重新协商二进制编码
             
-            # 启动心跳和接收任务，异步任务在后台持续运行
+            # 启动发送、心跳和接收任务，异步任务在后台持续运行
+            self.outbound.start(self._send_frame)
             self.heartbeat_task = asyncio.create_task(self._heartbeat_loop())
             self.receive_task = asyncio.create_task(self._receive_loop())
             
             # 发送设备注册信息
             await self._send_device_registration()
             
+            # 请求服务器补推断线期间的帧
+            await self._send_resume_request()
+            
+            # 补推请求之后再订阅推送主题，过滤推送的prev_seq从已收到的帧开始
+            self._subscribed_topics = None
+            await self._sync_topics()
+            
+            # 请求全量快照，快照应用之前暂存增量推送
+            self._start_snapshot_bootstrap()
+            
             # 通知连接状态变化
             await self._notify_connection_status(True)
             
@@ -86,34 +318,57 @@ class WebSocketClient:
             logger.error(f"WebSocket连接失败: {e}")
             self.is_connected = False
             await self._notify_connection_status(False)
-            
-            # 尝试重连
-            if self.reconnect_attempts < self.max_reconnect_attempts:
-                await self._schedule_reconnect()
-            
             return False
     
-    async def disconnect(self) -> None:
-        """断开WebSocket连接"""
+    async def _close_connection(self, reason: str) -> None:
+        """停止本次连接的所有任务并关闭连接"""
+        was_connected = self.is_connected
         self.is_connected = False
         
         # 取消任务
-        if self.heartbeat_task:
-            self.heartbeat_task.cancel()
-        if self.receive_task:
-            self.receive_task.cancel()
+        current = asyncio.current_task()
+        for task in (self.heartbeat_task, self.receive_task):
+            if task and task is not current and not task.done():
+                task.cancel()
+        self.heartbeat_task = None
+        self.receive_task = None
+        self.outbound.stop()
+        self._held_frames = None
+        self._fail_pending_requests(reason)
         
         # 关闭连接
         if self.websocket:
-            await self.websocket.close()
+            try:
+                await self.websocket.close()
+            except Exception as e:
+                logger.debug(f"关闭WebSocket连接失败: {e}")
             self.websocket = None
         
-        await self._notify_connection_status(False)
+        if was_connected:
+            await self._notify_connection_status(False)
+    
+    async def disconnect(self) -> None:
+        """断开WebSocket连接"""
+        self._closing = True
+        
+        # 停止监督任务，不再重连
+        if self.supervisor_task and self.supervisor_task is not asyncio.current_task():
+            self.supervisor_task.cancel()
+            try:
+                await self.supervisor_task
+            except asyncio.CancelledError:
+                pass
+        self.supervisor_task = None
+        
+        await self._close_connection("WebSocket连接已断开")
+        if self._owns_dispatcher:
+            self.dispatcher.stop()
+        self.stop_recording()
         logger.info("WebSocket连接已断开")
     
     async def send_message(self, message_type: str, data: Dict[str, Any]) -> bool:
         """发送消息到服务器"""
-        if not self.is_connected or not self.websocket:
+        if not self.is_connected:
             logger.warning("WebSocket未连接，无法发送消息")
             return False
         
@@ -124,58 +379,420 @@ class WebSocketClient:
                 'data': data
             }
             
-            message_str = json.dumps(message, ensure_ascii=False)
-            await self.websocket.send(message_str)
-            logger.info(f"发送消息: {message_type}")
-            logger.info(f"消息内容: {message_str}")
-            return True
+            message_str = self.codec.dumps(message)
+            # 心跳等高频消息不逐条记录，消息内容只在DEBUG级别输出
+            if message_type != 'heartbeat':
+                logger.info(f"发送消息: {message_type}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"消息内容: {message_str}")
+            sent = await self._put_outbound(message_type, message_str)
+            if not sent:
+                logger.warning(f"消息未发送，发送队列已停止: {message_type}")
+            return sent
             
         except Exception as e:
             logger.error(f"发送消息失败: {e}")
             await self._notify_connection_status(False)
             return False
     
+    async def _put_outbound(self, message_type: str, payload) -> bool:
+        """已编码的帧按消息类型的优先级放入发送队列，等待其写入连接"""
+        return await self.outbound.put(message_type, payload)
+    
+    async def _send_frame(self, payload) -> None:
+        """将已编码的帧写入连接（录制开启时同时记录）"""
+        if self.recorder is not None:
+            self.recorder.record_outbound(payload)
+        await self.websocket.send(payload)
+    
+    def start_recording(self, path: Optional[str] = None) -> None:
+        """开始录制收发的WebSocket帧
+        
+        Args:
+            path: 录制文件路径，为None时使用配置的record_path
+        """
+        previous = self.recorder
+        self.stop_recording()
+        self.recorder = FrameRecorder(path or self.record_path, queue_size=self.record_queue_size)
+        self.recorder.start(after=previous)
+    
+    def stop_recording(self) -> None:
+        """停止录制，写完尚未落盘的帧
+        
+        在事件循环中调用时，写完剩余的帧和等待写入线程退出在线程池中进行，不阻塞事件循环。
+        """
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            recorder.stop()
+            return
+        loop.run_in_executor(None, recorder.stop)
+    
+    def get_recording_stats(self) -> Dict[str, Any]:
+        """获取录制状态和统计"""
+        return self.recorder.get_stats() if self.recorder else {'recording': False}
+    
+    def new_request_id(self, prefix: str = 'req') -> str:
+        """生成唯一的请求ID"""
+        return f"{prefix}_{uuid.uuid4().hex}"
+    
+    async def request(self, message_type: str, data: Dict[str, Any], timeout: Optional[float] = None,
+                      expect: Optional[Iterable[str]] = None, assembler=None) -> Dict[str, Any]:
+        """发送请求并等待request_id匹配的应答
+        
+        多个请求可以同时进行，应答在接收循环中按request_id直接交给对应的请求，
+        页面无需再注册全局回调并过滤无关的应答。
+        
+        Args:
+            message_type: 请求类型（param_read、param_write、control_cmd、fault_record_list、fault_record_read等）
+            data: 请求数据，未包含request_id时自动生成
+            timeout: 超时时间（秒），为None时使用配置的request_timeout
+            expect: 成功应答的消息类型，为None时按REQUEST_REPLY_TYPES确定
+            assembler: 分块应答的组装器（FaultRecordAssembler），同一request_id的开始、分块和完成消息
+                在接收循环中连同帧的字节数交给它解析
+        
+        Returns:
+            Dict[str, Any]: 完整的应答消息（只读）
+        
+        Raises:
+            RequestTimeoutError: 超时未收到应答
+            RequestError: 发送失败、连接断开或收到错误应答
+        """
+        reply_types, error_types = REQUEST_REPLY_TYPES.get(message_type, ((f"{message_type}_ack",), ('error',)))
+        if expect is not None:
+            reply_types = tuple(expect)
+        
+        data = dict(data)
+        request_id = data.setdefault('request_id', self.new_request_id(message_type))
+        if request_id in self._pending_requests:
+            raise RequestError(f"请求ID重复: {request_id}")
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending_requests[request_id] = _PendingRequest(message_type, future, reply_types, error_types, assembler)
+        try:
+            if not await self.send_message(message_type, data):
+                raise RequestError(f"发送请求失败: {message_type}")
+            timeout = self.request_timeout if timeout is None else timeout
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise RequestTimeoutError(f"请求超时: {message_type} ({request_id})，{timeout}秒内未收到应答")
+        finally:
+            self._pending_requests.pop(request_id, None)
+    
+    def _check_sequence(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """检查推送帧的序列号：丢弃重复帧，发现缺失时请求补推，展开data_recovery补推帧
+        
+        Returns:
+            需要分发的消息，重复帧返回None
+        """
+        seq = message.get('seq_num')
+        if not isinstance(seq, int):
+            return message
+        
+        frame = message
+        is_recovery = message.get('type') == 'data_recovery'
+        if is_recovery:
+            original = message.get('data')
+            if isinstance(original, dict) and 'type' in original:
+                frame = original
+        
+        stream = frame.get('device_id') or message.get('device_id') or 'default'
+        # 按订阅过滤推送时服务器附带发给本连接的上一帧序列号
+        prev_seq = message.get('prev_seq')
+        status, missing = self.sequence_tracker.observe(stream, seq, prev_seq if isinstance(prev_seq, int) else None,
+                                                        recovery=is_recovery)
+        if status == SEQ_DUPLICATE:
+            logger.debug(f"丢弃重复帧: {stream} seq={seq}")
+            return None
+        if status == SEQ_RESET:
+            # 后台重启后各类型的最新序列号从头计数
+            self._forget_latest_seq(stream)
+        if missing:
+            logger.warning(f"推送流 {stream} 缺失序列号 {missing[0]}~{missing[-1]}，请求补推")
+            self._run_in_background(self.send_message('data_lost_request', {
+                'device_id': stream,
+                'missing_seq': missing
+            }))
+        
+        frame_type = frame.get('type')
+        key = (stream, frame_type)
+        if (status == SEQ_RECOVERED or is_recovery) and frame_type not in SEQUENCE_EVENT_TYPES \
+                and seq < self._latest_seq_by_type.get(key, -1):
+            # 补回的旧帧不能覆盖已显示的最新状态，只投递给data_recovery回调
+            if is_recovery:
+                return message
+            return FrozenDict({'type': 'data_recovery', 'device_id': stream, 'seq_num': seq, 'data': frame})
+        
+        if seq > self._latest_seq_by_type.get(key, -1):
+            self._latest_seq_by_type[key] = seq
+        return frame
+    
+    def _forget_latest_seq(self, stream: Optional[str] = None) -> None:
+        """清除推送流（None为全部）各消息类型的最新序列号"""
+        for key in [key for key in self._latest_seq_by_type if stream is None or key[0] == stream]:
+            del self._latest_seq_by_type[key]
+    
+    def _apply_sequence_epoch(self, message: Dict[str, Any]) -> None:
+        """device_register_ack报告的序列号纪元变化时（后台已重启），重新开始跟踪所有推送流"""
+        data = message.get('data') or {}
+        epoch = message.get('seq_epoch', data.get('seq_epoch'))
+        if self.sequence_tracker is not None and self.sequence_tracker.set_epoch(epoch):
+            self._forget_latest_seq()
+    
+    async def _send_resume_request(self) -> None:
+        """重连后请求服务器从每个推送流最后收到的序列号之后续传"""
+        if self.sequence_tracker is None:
+            return
+        epoch = self.sequence_tracker.epoch
+        if epoch is None:
+            # 服务器不报告纪元，续传之后实时推送的序列号仍回退说明后台已重启
+            self.sequence_tracker.expect_restart()
+        for stream, last_seq in self.sequence_tracker.get_offsets().items():
+            logger.info(f"请求推送流 {stream} 从序列号 {last_seq} 之后续传")
+            request = {'device_id': stream, 'last_seq': last_seq}
+            if epoch is not None:
+                # 服务器的纪元不同（已重启）时last_seq无效，不按其补推
+                request['seq_epoch'] = epoch
+            await self.send_message('data_resume_request', request)
+    
+    def set_topic_demand(self, owner, topics: Dict[str, float]) -> None:
+        """登记订阅方（浏览器会话ID）当前需要的推送主题
+        
+        同一轮事件循环内的多次变化合并为一次同步，只发送与服务器当前订阅不同的主题。
+        
+        Args:
+            owner: 订阅方，各浏览器会话分别登记，互不覆盖
+            topics: 主题 -> 期望频率（帧/秒，0为设备原始频率）
+        """
+        if self.topics is not None:
+            self.topics.set(owner, topics)
+            self._schedule_topic_sync()
+    
+    def release_topic_demand(self, owner) -> None:
+        """订阅方关闭（浏览器会话结束），不再需要的主题取消订阅"""
+        if self.topics is not None:
+            self.topics.release(owner)
+            self._schedule_topic_sync()
+    
+    def _schedule_topic_sync(self) -> None:
+        if self._topic_sync_scheduled or not self.is_connected:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # 不在事件循环中时等下次连接再同步
+        self._topic_sync_scheduled = True
+        self._run_in_background(self._sync_topics())
+    
+    async def _sync_topics(self) -> None:
+        """向服务器发送订阅与当前需要的主题之间的差异"""
+        async with self._topic_sync_lock:
+            self._topic_sync_scheduled = False
+            if self.topics is None or not self.topics.active or not self.is_connected:
+                return
+            subscribe, unsubscribe = self.topics.diff(self._subscribed_topics)
+            subscribed = dict(self._subscribed_topics or {})
+            for topic in unsubscribe:
+                if await self.send_message('unsubscribe', {'topic': topic}):
+                    subscribed.pop(topic, None)
+            for topic, rate in subscribe.items():
+                if await self.send_message('subscribe', {'topic': topic, 'rate': rate}):
+                    subscribed[topic] = rate
+            self._subscribed_topics = subscribed
+            if subscribe or unsubscribe:
+                logger.info(f"推送主题订阅: {subscribed or '无'}")
+    
+    def get_topic_stats(self) -> Dict[str, Any]:
+        """获取各会话需要的推送主题和已向服务器订阅的主题"""
+        if self.topics is None:
+            return {'enabled': False}
+        stats = self.topics.get_stats()
+        stats.update(enabled=True, subscribed=self._subscribed_topics)
+        return stats
+    
+    def _start_snapshot_bootstrap(self) -> None:
+        """开始暂存增量推送，并在后台请求全量快照"""
+        if not self.snapshot_bootstrap:
+            return
+        self._held_frames = []
+        self._bootstrap_started = time.perf_counter()
+        self._run_in_background(self._request_snapshot())
+    
+    async def _request_snapshot(self) -> None:
+        request_id = self._snapshot_request_id = self.new_request_id('snapshot_request')
+        try:
+            await self.request('snapshot_request', {'device_id': self.device_id, 'request_id': request_id},
+                               timeout=self.snapshot_timeout, expect=('full_snapshot',))
+        except RequestError as e:
+            # 服务器不支持快照请求或超时，放行暂存的帧，等待周期推送的快照
+            logger.warning(f"请求全量快照失败，继续使用增量推送: {e}")
+            self._release_held_frames()
+    
+    async def _apply_snapshot(self, message: Dict[str, Any]) -> None:
+        """执行快照回调，完成后放行暂存的增量推送"""
+        await self._handle_message(message)
+        # 合并投递的订阅只登记了快照，等待其回调执行完成
+        for registry in (self.data_callbacks, self.message_callbacks):
+            for callback in list(registry.get('full_snapshot', ())):
+                if isinstance(callback, CoalescingSubscription):
+                    await callback.join()
+        # 周期推送的快照（不带本次请求的request_id）同样完成快照请求
+        pending = self._pending_requests.get(self._snapshot_request_id)
+        if pending is not None and not pending.future.done():
+            pending.future.set_result(message)
+        if self._held_frames is not None:
+            self.last_bootstrap_seconds = time.perf_counter() - self._bootstrap_started
+            logger.info(f"全量快照已应用，连接后 {self.last_bootstrap_seconds * 1000:.0f} ms")
+            self._release_held_frames(message.get('last_seq'))
+    
+    def _release_held_frames(self, last_seq: Optional[int] = None) -> None:
+        """放行暂存的增量推送，快照之前生成的帧（seq_num不大于快照的last_seq）不再投递"""
+        held, self._held_frames = self._held_frames, None
+        if not held:
+            return
+        for frame in held:
+            seq = frame.get('seq_num')
+            if isinstance(last_seq, int) and isinstance(seq, int) and seq <= last_seq:
+                continue
+            self.dispatcher.submit(frame.get('type', 'unknown'), self._handle_message, frame)
+    
+    def _run_in_background(self, coroutine) -> None:
+        """在后台执行协程，保留任务引用直到执行完成"""
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    def _resolve_pending_request(self, message: Dict[str, Any]) -> None:
+        """将应答交给request_id匹配的等待中请求"""
+        request_id = message.get('request_id')
+        if request_id is None:
+            data = message.get('data')
+            if isinstance(data, dict):
+                request_id = data.get('request_id')
+        pending = self._pending_requests.get(request_id)
+        if pending is None or pending.future.done():
+            return
+        
+        message_type = message.get('type')
+        if pending.assembler is not None and message_type in ASSEMBLER_MESSAGE_TYPES:
+            # 分块到达时立即解析，不等待分发队列
+            try:
+                pending.assembler.feed(message, self._frame_bytes)
+            except Exception as e:
+                logger.error(f"解析分块应答失败: {e}")
+        if message_type in pending.reply_types:
+            pending.future.set_result(message)
+        elif message_type in pending.error_types:
+            data = message.get('data')
+            detail = message.get('error_msg') or message.get('exec_msg')
+            if detail is None and isinstance(data, dict):
+                detail = data.get('error_msg') or data.get('exec_msg')
+            pending.future.set_exception(RequestError(f"{pending.message_type} 请求失败: {detail or message_type}", message))
+    
+    def _fail_pending_requests(self, reason: str) -> None:
+        """连接断开时让所有等待中的请求立即失败"""
+        for pending in self._pending_requests.values():
+            if not pending.future.done():
+                pending.future.set_exception(RequestError(reason))
+    
     async def _receive_loop(self) -> None:
         """接收消息循环"""
         try:
             async for message in self.websocket:
-                try:
-                    data = json.loads(message)
-                    # logger.info(f"收到消息: {data}")
-                    await self._handle_message(data)
-                except json.JSONDecodeError as e:
-                    logger.error(f"消息解析失败: {e}")
-                except Exception as e:
-                    logger.error(f"处理消息失败: {e}")
+                if self.recorder is not None:
+                    self.recorder.record_inbound(message)
+                self.process_frame(message)
                     
         except websockets.exceptions.ConnectionClosed:
+            # 由监督任务负责清理和重连
             logger.warning("WebSocket连接已关闭")
-            self.is_connected = False
-            await self._notify_connection_status(False)
-            
-            # 尝试重连
-            if self.reconnect_attempts < self.max_reconnect_attempts:
-                # logger.info("准备重新连接...")
-                await self._schedule_reconnect()
                 
         except Exception as e:
             logger.error(f"接收消息循环异常: {e}")
     
+    def process_frame(self, message) -> bool:
+        """处理收到的一帧：解码、检查序列号、交给等待中的请求并放入分发队列
+        
+        接收循环和录制回放（frame_replay）共用此入口，不等待回调执行。
+        
+        Returns:
+            bool: 帧已放入分发队列返回True，解码失败或被丢弃返回False
+        """
+        try:
+            received_at = time.time()
+            started = time.perf_counter()
+            # 每帧只解码一次，得到所有回调共享的只读结构
+            if isinstance(message, bytes):
+                if self.binary_codec is None:
+                    logger.error("收到二进制帧，但未与服务器协商二进制编码")
+                    return False
+                data = self.binary_codec.decode_frame(message)
+            else:
+                data = self.codec.decode_frame(message)
+            # logger.info(f"收到消息: {data}")
+            if not isinstance(data, dict):
+                logger.error(f"消息格式不正确，期望字典，实际: {type(data)}")
+                return False
+            self._frame_bytes = _frame_size(message)
+            if self.metrics is not None:
+                self.metrics.record_frame(data.get('type', 'unknown'), self._frame_bytes,
+                                          time.perf_counter() - started)
+            if self.sequence_tracker is not None and 'seq_num' in data:
+                data = self._check_sequence(data)
+                if data is None:
+                    return False
+            if self.latency is not None:
+                self._record_receipt(data, received_at)
+            if data.get('type') == 'device_register_ack':
+                # 在接收循环中同步处理，确保后续二进制帧能立即按协商结果解码、按新的纪元跟踪序列号
+                self._apply_negotiated_encoding(data)
+                self._apply_sequence_epoch(data)
+            self._submit(data)
+            return True
+        except DECODE_ERRORS as e:
+            logger.error(f"消息解析失败: {e}")
+        except Exception as e:
+            logger.error(f"处理消息失败: {e}")
+        return False
+    
+    def _record_receipt(self, data: Dict[str, Any], received_at: float) -> None:
+        """记录收到帧的延迟，心跳应答同时作为时钟偏差样本"""
+        if data.get('type') == 'heartbeat_ack' and self._heartbeat_sent_at is not None:
+            self.latency.observe_heartbeat(self._heartbeat_sent_at, data, received_at)
+            self._heartbeat_sent_at = None
+        self.latency.on_receipt(data, received_at)
+    
+    def _submit(self, data: Dict[str, Any]) -> None:
+        """将已解码的消息交给等待中的请求，并放入对应类型的分发队列"""
+        if self._pending_requests:
+            # 应答直接交给等待中的请求，不经过分发队列
+            self._resolve_pending_request(data)
+        self._queue_message(data)
+    
+    def _queue_message(self, data: Dict[str, Any]) -> None:
+        """放入对应类型的分发队列（全量快照应用之前暂存增量推送）"""
+        message_type = data.get('type', 'unknown')
+        if self._held_frames is not None:
+            if message_type == 'full_snapshot':
+                self.dispatcher.submit(message_type, self._apply_snapshot, data)
+                return
+            if message_type in SNAPSHOT_TYPES:
+                self._held_frames.append(data)
+                return
+        # 放入对应类型的分发队列，不等待回调执行
+        self.dispatcher.submit(message_type, self._handle_message, data)
+    
     async def _handle_message(self, message: Dict[str, Any]) -> None:
         """处理接收到的消息"""
         message_type = message.get('type')
-        data = message.get('data', {})
         
         # 记录所有收到的消息类型
         # logger.info(f"收到消息类型: {message_type}")
         
-        # 对于param_write_ack类型的消息，需要特殊处理，因为exec_status和exec_msg在根级别
-        if message_type == 'param_write_ack':
-            # 将根级别的字段合并到data中，确保回调函数可以访问
-            for key in ['exec_status', 'exec_msg', 'request_id', 'device_id', 'timestamp']:
-                if key in message and key not in data:
-                    data[key] = message[key]
-        
         # if message_type == 'full_snapshot':
         #     logger.info(f"全量快照数据详情: {message}")
         # # 处理特殊消息类型
@@ -185,14 +802,31 @@ class WebSocketClient:
         #     logger.debug("收到心跳响应")
         
         # 调用注册的回调函数
+        rendered = False
         if message_type in self.data_callbacks:
+            # 只有数据回调读取data（接收进程环形缓冲区中的行按需还原data）
+            data = message.get('data', {})
+            # 对于param_write_ack类型的消息，需要特殊处理，因为exec_status和exec_msg在根级别
+            if message_type == 'param_write_ack':
+                # 将根级别的字段合并到data中，确保回调函数可以访问（消息只读，合并到副本）
+                merged = dict(data)
+                for key in ['exec_status', 'exec_msg', 'request_id', 'device_id', 'timestamp']:
+                    if key in message and key not in merged:
+                        merged[key] = message[key]
+                data = FrozenDict(merged)
             # logger.info(f"找到 {message_type} 类型的回调函数，数量: {len(self.data_callbacks[message_type])}")
             for callback in self.data_callbacks[message_type]:
+                started = time.perf_counter()
                 try:
                     # logger.info(f"执行 {message_type} 类型的回调函数")
                     await callback(data)
                 except Exception as e:
                     logger.error(f"回调函数执行失败: {e}")
+                # 合并投递的订阅在实际投递时自行统计耗时和延迟
+                if not isinstance(callback, CoalescingSubscription):
+                    rendered = True
+                    if self.metrics is not None:
+                        self.metrics.record_callback(message_type, _callback_name(callback), time.perf_counter() - started)
         else:
             logger.debug(f"未找到 {message_type} 类型的回调函数")
         
@@ -200,11 +834,19 @@ class WebSocketClient:
         if message_type in self.message_callbacks:
             logger.debug(f"找到 {message_type} 类型的消息回调函数，数量: {len(self.message_callbacks[message_type])}")
             for callback in self.message_callbacks[message_type]:
+                started = time.perf_counter()
                 try:
                     logger.debug(f"执行 {message_type} 类型的消息回调函数")
                     await callback(message)
                 except Exception as e:
                     logger.error(f"消息回调函数执行失败: {e}")
+                if not isinstance(callback, CoalescingSubscription):
+                    rendered = True
+                    if self.metrics is not None:
+                        self.metrics.record_callback(message_type, _callback_name(callback), time.perf_counter() - started)
+        
+        if rendered and self.latency is not None:
+            self.latency.on_render(message_type, message)
     
     async def _heartbeat_loop(self) -> None:
         """心跳循环"""
@@ -212,22 +854,16 @@ class WebSocketClient:
             try:
                 await asyncio.sleep(self.heartbeat_interval)
                 if self.is_connected:
-                    await self.send_message('heartbeat', {'timestamp': datetime.now().isoformat()})
+                    await self._send_heartbeat()
             except Exception as e:
+                # 由监督任务负责清理和重连
                 logger.error(f"心跳发送失败: {e}")
-                # 尝试重连
-                if self.reconnect_attempts < self.max_reconnect_attempts:
-                    # logger.info("准备重新连接...")
-                    await self._schedule_reconnect()
                 break
     
-    async def _schedule_reconnect(self) -> None:
-        """安排重连"""
-        self.reconnect_attempts += 1
-        logger.info(f"将在{self.reconnect_interval}秒后尝试重连 (第{self.reconnect_attempts}次)")
-        
-        await asyncio.sleep(self.reconnect_interval)
-        await self.connect()
+    async def _send_heartbeat(self) -> None:
+        """发送心跳，记录发送时间用于按heartbeat_ack估计时钟偏差"""
+        self._heartbeat_sent_at = time.time()
+        await self.send_message('heartbeat', {'timestamp': datetime.now().isoformat()})
     
     async def _send_device_registration(self) -> None:
         """发送设备注册信息"""
@@ -237,19 +873,32 @@ class WebSocketClient:
             
             registration_data = {
                 "type": "device_register",
-                "device_id": device_config.get('设备ID', 'HYP_RPLD_001'),
+                "device_id": self.device_id,
                 "device_name": device_config.get('设备名称', '红岩坪站钢轨电位限制装置'),
                 "device_ip": self.config.get_device_ip(),  # 使用新的get_device_ip方法
                 "system_version": device_config.get('系统版本', '1.0.0'),
+                # 声明支持的帧编码，服务器在device_register_ack中返回选定的编码
+                "supported_encodings": self.supported_encodings + ['json'],
                 "timestamp": datetime.now().isoformat()
             }
             
-            await self.websocket.send(json.dumps(registration_data, ensure_ascii=False))
-            logger.info(f"发送设备注册信息: {device_config.get('设备ID')}")
+            await self._send_frame(self.codec.dumps(registration_data))
+            logger.info(f"发送设备注册信息: {self.device_id}")
             
         except Exception as e:
             logger.error(f"发送设备注册信息失败: {e}")
     
+    def _apply_negotiated_encoding(self, message: Dict[str, Any]) -> None:
+        """根据device_register_ack应用服务器选定的帧编码"""
+        data = message.get('data') or {}
+        encoding = message.get('encoding') or data.get('encoding') or 'json'
+        if encoding != 'json' and encoding not in self.supported_encodings:
+            logger.warning(f"服务器选定的编码 {encoding} 不受支持，继续使用JSON")
+            self.binary_codec = None
+            return
+        self.binary_codec = get_binary_codec(encoding)
+        logger.info(f"帧编码协商结果: {encoding}")
+    
     async def _notify_connection_status(self, connected: bool) -> None:
         """通知连接状态变化"""
         for callback in self.connection_callbacks:
@@ -258,39 +907,155 @@ class WebSocketClient:
             except Exception as e:
                 logger.error(f"连接状态回调失败: {e}")
     
-    def register_data_callback(self, message_type: str, callback: Callable) -> None:
-        """注册数据回调函数"""
-        if message_type not in self.data_callbacks:
-            self.data_callbacks[message_type] = []
-        self.data_callbacks[message_type].append(callback)
-        logger.debug(f"注册数据回调: {message_type}")
-    
-    def register_message_callback(self, message_type: str, callback: Callable) -> None:
-        """注册消息回调函数（接收完整消息）"""
-        if message_type not in self.message_callbacks:
-            self.message_callbacks[message_type] = []
-        self.message_callbacks[message_type].append(callback)
+    def register_data_callback(self, message_type: str, callback: Callable, coalesce: bool = False,
+                               typed: bool = False) -> Subscription:
+        """注册数据回调函数
+        
+        绑定方法以弱引用保存，所属页面对象被回收后自动注销；返回的句柄可直接close()，
+        或交给页面的SubscriptionScope在页面清空、会话断开时统一关闭。
+        
+        Args:
+            message_type: 消息类型
+            callback: 回调函数
+            coalesce: 是否使用最新值合并投递，订阅者处理不过来时只接收最新一帧
+            typed: 是否接收消息对象（protocol_messages）而不是data字典；
+                消息对象由整条消息转换，登记在消息回调表中，合并投递时只转换实际投递的帧
+        
+        Returns:
+            Subscription: 订阅句柄
+        """
+        name = _callback_name(callback)
+        registry = self.message_callbacks if typed else self.data_callbacks
+        remove = lambda: self._remove_callback(registry, message_type, entry)
+        entry = weak_callback(callback, remove)
+        if typed:
+            entry = TypedCallback(entry, self.typed_messages.convert)
+        if coalesce:
+            def on_delivered(seconds, delivered):
+                if self.metrics is not None:
+                    self.metrics.record_callback(message_type, name, seconds)
+                if self.latency is not None:
+                    self.latency.on_render(message_type, delivered)
+            entry = CoalescingSubscription(message_type, entry, on_delivered)
+        registry.setdefault(message_type, []).append(entry)
+        logger.debug(f"注册数据回调: {message_type}{' (合并投递)' if coalesce else ''}{' (消息对象)' if typed else ''}")
+        return Subscription(message_type, name, remove)
+    
+    def register_message_callback(self, message_type: str, callback: Callable) -> Subscription:
+        """注册消息回调函数（接收完整消息），绑定方法以弱引用保存"""
+        remove = lambda: self._remove_callback(self.message_callbacks, message_type, entry)
+        entry = weak_callback(callback, remove)
+        self.message_callbacks.setdefault(message_type, []).append(entry)
         logger.debug(f"注册消息回调: {message_type}")
+        return Subscription(message_type, _callback_name(callback), remove)
     
-    def register_connection_callback(self, callback: Callable) -> None:
-        """注册连接状态回调函数"""
-        self.connection_callbacks.append(callback)
+    def register_connection_callback(self, callback: Callable) -> Subscription:
+        """注册连接状态回调函数，绑定方法以弱引用保存"""
+        def remove():
+            self.connection_callbacks = [cb for cb in self.connection_callbacks if cb is not entry]
+        entry = weak_callback(callback, remove)
+        self.connection_callbacks.append(entry)
         logger.debug("注册连接状态回调")
+        return Subscription('connection', _callback_name(callback), remove)
+    
+    @staticmethod
+    def _remove_callback(registry: Dict[str, list], message_type: str, entry: Callable) -> None:
+        """从回调表中移除一项
+        
+        替换为新列表而不是原地删除，正在遍历旧列表的分发协程不受影响（回调中注销自身也安全）。
+        """
+        callbacks = registry.get(message_type)
+        if not callbacks or not any(registered is entry for registered in callbacks):
+            return
+        remaining = [registered for registered in callbacks if registered is not entry]
+        if remaining:
+            registry[message_type] = remaining
+        else:
+            del registry[message_type]
+        if isinstance(entry, CoalescingSubscription):
+            entry.cancel()
+        logger.debug(f"取消注册回调: {message_type}")
     
     def unregister_data_callback(self, message_type: str, callback: Callable) -> None:
         """取消注册数据回调函数"""
-        if message_type in self.data_callbacks:
-            try:
-                self.data_callbacks[message_type].remove(callback)
-                logger.debug(f"取消注册数据回调: {message_type}")
-            except ValueError:
-                pass
+        for registry in (self.data_callbacks, self.message_callbacks):
+            for registered in registry.get(message_type, ()):
+                if registry is self.message_callbacks and not _is_typed(registered):
+                    continue
+                if registered.matches(callback) if isinstance(registered, CoalescingSubscription) else registered == callback:
+                    self._remove_callback(registry, message_type, registered)
+                    return
+    
+    def get_callback_counts(self) -> Dict[str, int]:
+        """获取各消息类型已注册的回调数量（数据回调与消息回调合计）"""
+        counts = {}
+        for registry in (self.data_callbacks, self.message_callbacks):
+            for message_type, callbacks in registry.items():
+                counts[message_type] = counts.get(message_type, 0) + len(callbacks)
+        return counts
     
     def get_connection_status(self) -> Dict[str, Any]:
         """获取连接状态信息"""
         return {
             'connected': self.is_connected,
+            'device_id': self.device_id,
             'server_url': self.websocket_url,
             'reconnect_attempts': self.reconnect_attempts,
-            'max_reconnect_attempts': self.max_reconnect_attempts
-        }
\ No newline at end of file
+            'max_reconnect_attempts': self.max_reconnect_attempts,
+            'reconnect_count': self.reconnect_count,
+            'last_reconnect_seconds': round(self.reconnect_durations[-1], 3) if self.reconnect_durations else None,
+            'frame_encoding': self.binary_codec.name if self.binary_codec else 'json',
+            'pending_requests': len(self._pending_requests),
+            'send_queue_depth': self.outbound.get_depth(),
+            'snapshot_bootstrap_ms': round(self.last_bootstrap_seconds * 1000, 1)
+            if self.last_bootstrap_seconds is not None else None
+        }
+    
+    def on_dispatch(self, message_type: str, seconds: float, handler: Optional[Callable] = None) -> None:
+        """分发队列取出本连接提交的一帧时调用，seconds为排队时间"""
+        if self.latency is not None:
+            self.latency.on_dispatch(message_type, seconds)
+    
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """获取时钟偏差估计和各消息类型的端到端延迟统计"""
+        return self.latency.get_stats() if self.latency else {}
+    
+    def get_stale_message_types(self) -> Dict[str, float]:
+        """最近p99延迟超出latency_budget_ms的消息类型 -> p99（毫秒）"""
+        return self.latency.get_stale_types(self.latency_budget_ms) if self.latency else {}
+    
+    def get_dispatch_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取各消息类型的分发队列深度和丢帧计数"""
+        return self.dispatcher.get_stats()
+    
+    def get_send_stats(self) -> Dict[str, Any]:
+        """获取出站队列各优先级的发送数、排队深度和发送延迟"""
+        return self.outbound.get_stats()
+    
+    def get_message_metrics(self, include_buckets: bool = False) -> Dict[str, Dict[str, Any]]:
+        """获取各消息类型的接收速率、帧大小、解码耗时和回调耗时统计
+        
+        返回值可直接序列化为JSON，用于界面显示或导出。
+        """
+        return self.metrics.get_stats(include_buckets) if self.metrics else {}
+    
+    def reset_message_metrics(self) -> None:
+        """清空消息统计"""
+        if self.metrics:
+            self.metrics.reset()
+        if self.latency:
+            self.latency.reset()
+    
+    def get_sequence_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取各推送流的序列号统计（缺失、补回、重复、丢失）"""
+        return self.sequence_tracker.get_stats() if self.sequence_tracker else {}
+    
+    def get_coalescing_stats(self) -> Dict[str, list]:
+        """获取合并投递订阅的投递数和跳帧计数"""
+        stats = {}
+        for registry in (self.data_callbacks, self.message_callbacks):
+            for message_type, callbacks in registry.items():
+                subscriptions = [cb.get_stats() for cb in callbacks if isinstance(cb, CoalescingSubscription)]
+                if subscriptions:
+                    stats.setdefault(message_type, []).extend(subscriptions)
+        return stats
\ No newline at end of file